@@ -6,6 +6,35 @@ from sqlite3 import Error
 import os
 import csv
 import json
+import argparse
+import array
+import mmap
+import struct
+import zlib
+import time
+import pathlib
+import concurrent.futures
+from multiprocessing import shared_memory, resource_tracker
+import functools
+import contextlib
+import bisect
+import atexit
+import signal
+import cProfile
+import pstats
+import tracemalloc
+import re
+import threading
+import shutil
+import tempfile
+import heapq
+import hashlib
+import uuid
+import inspect
+import itertools
+import gzip
+import socket
+import unicodedata
 
 try:
     import openpyxl
@@ -26,13 +55,801 @@ DB_FILE = "Evidencia.db"
 FORMATO_FECHA_INPUT = "%m-%d-%Y"   
 FORMATO_FECHA_ISO = "%Y-%m-%d"    
 
-def asegurar_tablas():
+LIMITES_HISTOGRAMA_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+estadisticas_operaciones = {}
+candado_operaciones = threading.Lock()
+archivo_traza_sql = None
+perfilador = None
+estadisticas_sentencias = {}
+candado_sentencias = threading.Lock()
+sentencias_medidas = False
+umbral_lento_ms = None
+archivo_log_lento = None
+ruta_replica = None
+replica_actualizada = None
+conexion_referencia = None
+ruta_referencia = None
+data_version_referencia = None
+cache_referencia = None
+candado_referencia = threading.Lock()
+parada_replica = threading.Event()
+
+def registrar_operacion(nombre, segundos, error=False):
+    milisegundos = segundos * 1000
+    cubeta = bisect.bisect_left(LIMITES_HISTOGRAMA_MS, milisegundos)
+    with candado_operaciones:
+        registro = estadisticas_operaciones.get(nombre)
+        if registro is None:
+            registro = {"conteo": 0, "errores": 0, "total_ms": 0.0, "max_ms": 0.0,
+                        "histograma": [0] * (len(LIMITES_HISTOGRAMA_MS) + 1)}
+            estadisticas_operaciones[nombre] = registro
+        registro["conteo"] += 1
+        registro["total_ms"] += milisegundos
+        if milisegundos > registro["max_ms"]:
+            registro["max_ms"] = milisegundos
+        if error:
+            registro["errores"] += 1
+        registro["histograma"][cubeta] += 1
+
+@contextlib.contextmanager
+def medir(nombre):
+    inicio = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        registrar_operacion(nombre, time.perf_counter() - inicio, error)
+
+def instrumentado(nombre):
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+archivo_grabacion = None
+inicio_grabacion = None
+candado_grabacion = threading.Lock()
+contexto_grabacion = threading.local()
+operaciones_trazables = {}
+ARGUMENTOS_NO_GRABADOS = ("conexion", "ruta_bd", "retencion_id", "terminal", "clave")
+
+def _codificar_traza(valor):
+    if isinstance(valor, datetime.date):
+        return {"$fecha": valor.strftime(FORMATO_FECHA_ISO)}
+    raise TypeError(f"valor no serializable en la traza: {valor!r}")
+
+def _decodificar_traza(objeto):
+    if "$fecha" in objeto:
+        return datetime.datetime.strptime(objeto["$fecha"], FORMATO_FECHA_ISO).date()
+    return objeto
+
+def _grabar_evento(evento):
+    linea = json.dumps(evento, ensure_ascii=False, separators=(",", ":"), default=_codificar_traza) + "\n"
+    with candado_grabacion:
+        if archivo_grabacion is not None:
+            archivo_grabacion.write(linea)
+            archivo_grabacion.flush()
+
+def trazable(operacion, opcion=None):
+    def decorador(funcion):
+        firma = inspect.signature(funcion)
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if archivo_grabacion is None or getattr(contexto_grabacion, "activo", False):
+                return funcion(*args, **kwargs)
+            argumentos = {nombre: valor for nombre, valor in firma.bind(*args, **kwargs).arguments.items()
+                          if nombre not in ARGUMENTOS_NO_GRABADOS}
+            contexto_grabacion.activo = True
+            inicio = time.perf_counter()
+            error = False
+            try:
+                return funcion(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                contexto_grabacion.activo = False
+                _grabar_evento({"t": round(inicio - inicio_grabacion, 6), "op": operacion, "opcion": opcion, "args": argumentos,
+                                "ms": round((time.perf_counter() - inicio) * 1000, 3), "error": error})
+        operaciones_trazables[operacion] = envoltura
+        return envoltura
+    return decorador
+
+def _percentil_histograma(registro, fraccion):
+    objetivo = registro["conteo"] * fraccion
+    acumulado = 0
+    for indice, cantidad in enumerate(registro["histograma"]):
+        acumulado += cantidad
+        if acumulado >= objetivo and cantidad:
+            if indice < len(LIMITES_HISTOGRAMA_MS):
+                return f"<={LIMITES_HISTOGRAMA_MS[indice]:g}"
+            return f">{LIMITES_HISTOGRAMA_MS[-1]:g}"
+    return "-"
+
+def volcar_estadisticas(destino="-"):
+    with candado_operaciones:
+        copia = {nombre: dict(registro, histograma=list(registro["histograma"])) for nombre, registro in estadisticas_operaciones.items()}
+    if destino and destino != "-" and destino.lower().endswith(".json"):
+        datos = {"limites_histograma_ms": list(LIMITES_HISTOGRAMA_MS), "operaciones": copia}
+        try:
+            with open(destino, "w", encoding="utf-8") as archivo_salida:
+                json.dump(datos, archivo_salida, ensure_ascii=False, indent=2)
+            print(f"Estadisticas de operaciones guardadas como: {destino}")
+        except Exception as error:
+            print(f"Error al guardar estadisticas: {error}")
+        return
+
+    filas = []
+    for nombre, registro in sorted(copia.items(), key=lambda par: par[1]["total_ms"], reverse=True):
+        filas.append([
+            nombre,
+            registro["conteo"],
+            registro["errores"],
+            f"{registro['total_ms']:.2f}",
+            f"{registro['total_ms'] / registro['conteo']:.3f}",
+            _percentil_histograma(registro, 0.5),
+            _percentil_histograma(registro, 0.95),
+            f"{registro['max_ms']:.3f}",
+        ])
+    texto = tabulate(filas, headers=["OPERACION", "CONTEO", "ERRORES", "TOTAL MS", "PROM MS", "P50 MS", "P95 MS", "MAX MS"], tablefmt="grid")
+    if destino and destino != "-":
+        try:
+            with open(destino, "w", encoding="utf-8") as archivo_salida:
+                archivo_salida.write(texto + "\n")
+            print(f"Estadisticas de operaciones guardadas como: {destino}")
+        except Exception as error:
+            print(f"Error al guardar estadisticas: {error}")
+    else:
+        print("\n" + "=" * 80)
+        print("ESTADISTICAS DE OPERACIONES".center(80))
+        print("=" * 80)
+        print(texto)
+
+def _escribir_traza_sql(sentencia):
+    archivo_traza_sql.write(f"{datetime.datetime.now().isoformat(timespec='milliseconds')} {sentencia}\n")
+
+_RE_SQL_CADENA = re.compile(r"'(?:[^']|'')*'")
+_RE_SQL_NUMERO = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_RE_SQL_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_SQL_ESPACIOS = re.compile(r"\s+")
+
+@functools.lru_cache(maxsize=2048)
+def normalizar_sql(sentencia):
+    texto = _RE_SQL_CADENA.sub("?", sentencia)
+    texto = _RE_SQL_NUMERO.sub("?", texto)
+    texto = _RE_SQL_ESPACIOS.sub(" ", texto).strip().rstrip(";").strip()
+    return _RE_SQL_LISTA.sub("(?, ...)", texto)
+
+def _plan_consulta(conexion, sentencia, parametros):
+    if not sentencia.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")):
+        return []
+    cursor_plan = sqlite3.Connection.cursor(conexion)
+    try:
+        cursor_plan.execute("EXPLAIN QUERY PLAN " + sentencia, parametros)
+        filas_plan = cursor_plan.fetchall()
+    except Exception as error:
+        return [f"(sin plan: {error})"]
+    finally:
+        cursor_plan.close()
+    profundidad = {0: 0}
+    lineas = []
+    for fila_plan in filas_plan:
+        nivel = profundidad.get(fila_plan[1], 0) + 1
+        profundidad[fila_plan[0]] = nivel
+        lineas.append("  " * nivel + str(fila_plan[3]))
+    return lineas
+
+def registrar_sentencia(conexion, sentencia, parametros, segundos, filas, explicar=True):
+    normalizada = normalizar_sql(sentencia)
+    milisegundos = segundos * 1000
+    with candado_sentencias:
+        registro = estadisticas_sentencias.get(normalizada)
+        if registro is None:
+            registro = {"ejecuciones": 0, "total_ms": 0.0, "max_ms": 0.0, "filas": 0, "lentas": 0}
+            estadisticas_sentencias[normalizada] = registro
+        registro["ejecuciones"] += 1
+        registro["total_ms"] += milisegundos
+        registro["filas"] += filas
+        if milisegundos > registro["max_ms"]:
+            registro["max_ms"] = milisegundos
+        lenta = umbral_lento_ms is not None and milisegundos >= umbral_lento_ms
+        if lenta:
+            registro["lentas"] += 1
+    if lenta and archivo_log_lento is not None:
+        lineas_plan = _plan_consulta(conexion, sentencia, parametros) if explicar else []
+        with candado_sentencias:
+            archivo_log_lento.write(f"# {datetime.datetime.now().isoformat(timespec='milliseconds')} "
+                                    f"tiempo_ms={milisegundos:.3f} filas={filas}\n")
+            archivo_log_lento.write(normalizada + ";\n")
+            for linea in lineas_plan:
+                archivo_log_lento.write(f"-- {linea}\n")
+            archivo_log_lento.write("\n")
+
+class CursorMedido(sqlite3.Cursor):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._sentencia = None
+
+    def _iniciar_sentencia(self, sentencia, parametros, segundos):
+        self._sentencia = [sentencia, parametros, segundos, 0]
+
+    def _acumular(self, segundos, filas):
+        if self._sentencia is not None:
+            self._sentencia[2] += segundos
+            self._sentencia[3] += filas
+
+    def _finalizar_sentencia(self, explicar=True):
+        if self._sentencia is None:
+            return
+        sentencia, parametros, segundos, filas = self._sentencia
+        self._sentencia = None
+        registrar_sentencia(self.connection, sentencia, parametros, segundos, filas, explicar)
+
+    def execute(self, sentencia, parametros=()):
+        self._finalizar_sentencia()
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sentencia, parametros)
+        finally:
+            self._iniciar_sentencia(sentencia, parametros, time.perf_counter() - inicio)
+
+    def executemany(self, sentencia, secuencia_parametros):
+        self._finalizar_sentencia()
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sentencia, secuencia_parametros)
+        finally:
+            registrar_sentencia(self.connection, sentencia, (), time.perf_counter() - inicio, 0, explicar=False)
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        self._acumular(time.perf_counter() - inicio, 0 if fila is None else 1)
+        if fila is None:
+            self._finalizar_sentencia()
+        return fila
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        filas = super().fetchmany(self.arraysize if size is None else size)
+        self._acumular(time.perf_counter() - inicio, len(filas))
+        if not filas:
+            self._finalizar_sentencia()
+        return filas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        self._acumular(time.perf_counter() - inicio, len(filas))
+        self._finalizar_sentencia()
+        return filas
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        try:
+            fila = super().__next__()
+        except StopIteration:
+            self._acumular(time.perf_counter() - inicio, 0)
+            self._finalizar_sentencia()
+            raise
+        self._acumular(time.perf_counter() - inicio, 1)
+        return fila
+
+    def close(self):
+        self._finalizar_sentencia()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finalizar_sentencia(explicar=False)
+        except Exception:
+            pass
+
+class ConexionMedida(sqlite3.Connection):
+    def cursor(self, factory=None):
+        return super().cursor(factory or CursorMedido)
+
+    def execute(self, sentencia, parametros=()):
+        return self.cursor().execute(sentencia, parametros)
+
+    def executemany(self, sentencia, secuencia_parametros):
+        return self.cursor().executemany(sentencia, secuencia_parametros)
+
+def volcar_estadisticas_sentencias(destino="-", limite=50):
+    with candado_sentencias:
+        copia = {sentencia: dict(registro) for sentencia, registro in estadisticas_sentencias.items()}
+    if destino and destino != "-" and destino.lower().endswith(".json"):
+        try:
+            with open(destino, "w", encoding="utf-8") as archivo_salida:
+                json.dump({"umbral_lento_ms": umbral_lento_ms, "sentencias": copia}, archivo_salida, ensure_ascii=False, indent=2)
+            print(f"Estadisticas de sentencias SQL guardadas como: {destino}")
+        except Exception as error:
+            print(f"Error al guardar estadisticas de sentencias: {error}")
+        return
+
+    filas = []
+    for sentencia, registro in sorted(copia.items(), key=lambda par: par[1]["total_ms"], reverse=True)[:limite]:
+        filas.append([
+            sentencia if len(sentencia) <= 70 else sentencia[:67] + "...",
+            registro["ejecuciones"],
+            registro["filas"],
+            f"{registro['total_ms']:.2f}",
+            f"{registro['total_ms'] / registro['ejecuciones']:.3f}",
+            f"{registro['max_ms']:.3f}",
+            registro["lentas"],
+        ])
+    texto = tabulate(filas, headers=["SENTENCIA", "EJEC", "FILAS", "TOTAL MS", "PROM MS", "MAX MS", "LENTAS"], tablefmt="grid")
+    if destino and destino != "-":
+        try:
+            with open(destino, "w", encoding="utf-8") as archivo_salida:
+                archivo_salida.write(texto + "\n")
+            print(f"Estadisticas de sentencias SQL guardadas como: {destino}")
+        except Exception as error:
+            print(f"Error al guardar estadisticas de sentencias: {error}")
+    else:
+        print("\n" + "=" * 80)
+        print("ESTADISTICAS DE SENTENCIAS SQL".center(80))
+        print("=" * 80)
+        print(texto)
+
+def _configurar_conexion(conexion):
+    if archivo_traza_sql is not None:
+        conexion.set_trace_callback(_escribir_traza_sql)
+    return conexion
+
+def _abrir_conexion(destino, **opciones):
+    if sentencias_medidas:
+        opciones["factory"] = ConexionMedida
+    return _configurar_conexion(sqlite3.connect(destino, **opciones))
+
+def conectar_bd(ruta_bd=None):
+    return _abrir_conexion(ruta_bd or DB_FILE)
+
+def iniciar_perfil(modo):
+    global perfilador
+    if modo in ("tracemalloc", "ambos"):
+        tracemalloc.start()
+    if modo in ("cprofile", "ambos"):
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+
+def detener_perfil():
+    global perfilador
+    marca = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    if perfilador is not None:
+        perfilador.disable()
+        nombre_archivo = f"perfil_{marca}.prof"
+        perfilador.dump_stats(nombre_archivo)
+        print(f"\nPerfil cProfile guardado como: {nombre_archivo}")
+        pstats.Stats(perfilador).sort_stats("cumulative").print_stats(20)
+        perfilador = None
+    if tracemalloc.is_tracing():
+        captura = tracemalloc.take_snapshot()
+        actual, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"\nMemoria rastreada: actual {actual / 1024:.1f} KiB, pico {pico / 1024:.1f} KiB")
+        for estadistica in captura.statistics("lineno")[:15]:
+            print(estadistica)
+
+def configurar_instrumentacion(destino_estadisticas=None, destino_traza=None, modo_perfil=None,
+                               destino_sentencias=None, umbral_lento=None, ruta_log_lento=None):
+    global archivo_traza_sql, sentencias_medidas, umbral_lento_ms, archivo_log_lento
+    if destino_traza:
+        if destino_traza == "-":
+            archivo_traza_sql = sys.stderr
+        else:
+            archivo_traza_sql = open(destino_traza, "a", encoding="utf-8", buffering=1)
+            atexit.register(archivo_traza_sql.close)
+    if modo_perfil:
+        iniciar_perfil(modo_perfil)
+        atexit.register(detener_perfil)
+    if destino_sentencias or umbral_lento is not None:
+        sentencias_medidas = True
+        umbral_lento_ms = umbral_lento
+        if umbral_lento is not None:
+            archivo_log_lento = open(ruta_log_lento or "consultas_lentas.log", "a", encoding="utf-8", buffering=1)
+            atexit.register(archivo_log_lento.close)
+
+    volcados = []
+    if destino_estadisticas:
+        volcados.append(functools.partial(volcar_estadisticas, destino_estadisticas))
+    if destino_sentencias:
+        volcados.append(functools.partial(volcar_estadisticas_sentencias, destino_sentencias))
+    for volcado in reversed(volcados):
+        atexit.register(volcado)
+    if volcados and hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda numero, marco: [volcado() for volcado in volcados])
+
+def _ruta_base_traza(ruta_traza):
+    nombre = ruta_traza[:-3] if ruta_traza.endswith(".gz") else ruta_traza
+    return os.path.abspath(os.path.splitext(nombre)[0] + "_base.db")
+
+def iniciar_grabacion(ruta_traza):
+    global archivo_grabacion, inicio_grabacion
+    ruta_base = _ruta_base_traza(ruta_traza)
+    if ruta_base == os.path.abspath(DB_FILE):
+        print(f"No se puede grabar la traza: la copia base {ruta_base} coincide con la BD en uso.")
+        return False
+    origen = conectar_bd()
+    copia = sqlite3.connect(ruta_base)
+    try:
+        origen.backup(copia)
+    finally:
+        copia.close()
+        origen.close()
+    archivo_grabacion = gzip.open(ruta_traza, "wt", encoding="utf-8") if ruta_traza.endswith(".gz") else open(ruta_traza, "w", encoding="utf-8")
+    inicio_grabacion = time.perf_counter()
+    archivo_grabacion.write(json.dumps({"traza": 1, "inicio": datetime.datetime.now().isoformat(timespec="seconds"),
+                                        "bd": os.path.abspath(DB_FILE), "base": ruta_base, "terminal": TERMINAL_ID}) + "\n")
+    atexit.register(detener_grabacion)
+    return True
+
+def detener_grabacion():
+    global archivo_grabacion
+    with candado_grabacion:
+        if archivo_grabacion is not None:
+            archivo_grabacion.close()
+            archivo_grabacion = None
+
+DDL_VERSION_REFERENCIA = """
+CREATE TABLE IF NOT EXISTS version_referencia (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO version_referencia (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS tr_salas_version_ins AFTER INSERT ON salas
+BEGIN UPDATE version_referencia SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS tr_salas_version_upd AFTER UPDATE ON salas
+BEGIN UPDATE version_referencia SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS tr_salas_version_del AFTER DELETE ON salas
+BEGIN UPDATE version_referencia SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS tr_turnos_version_ins AFTER INSERT ON turnos
+BEGIN UPDATE version_referencia SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS tr_turnos_version_upd AFTER UPDATE ON turnos
+BEGIN UPDATE version_referencia SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS tr_turnos_version_del AFTER DELETE ON turnos
+BEGIN UPDATE version_referencia SET version = version + 1 WHERE id = 1; END;
+"""
+
+TURNO_HORARIO_ID = 0
+MINUTOS_DIA = 24 * 60
+INTERVALOS_TURNO_PREDETERMINADOS = {1: (8 * 60, 13 * 60), 2: (13 * 60, 18 * 60), 3: (18 * 60, 23 * 60)}
+
+def _columnas_tabla(conexion, tabla):
+    return {fila[1] for fila in conexion.execute(f"PRAGMA table_info({tabla})")}
+
+def _migrar_intervalos(conexion):
+    if "minuto_inicio" not in _columnas_tabla(conexion, "turnos"):
+        conexion.execute("ALTER TABLE turnos ADD COLUMN minuto_inicio INTEGER")
+        conexion.execute("ALTER TABLE turnos ADD COLUMN minuto_fin INTEGER")
+    for turno_id, (minuto_inicio, minuto_fin) in INTERVALOS_TURNO_PREDETERMINADOS.items():
+        conexion.execute("UPDATE turnos SET minuto_inicio = ?, minuto_fin = ? WHERE turno_id = ? AND minuto_inicio IS NULL",
+                         (minuto_inicio, minuto_fin, turno_id))
+    conexion.execute("INSERT OR IGNORE INTO turnos (turno_id, descripcion, minuto_inicio, minuto_fin) VALUES (?, 'Horario', 0, ?)",
+                     (TURNO_HORARIO_ID, MINUTOS_DIA))
+
+    if "minuto_inicio" not in _columnas_tabla(conexion, "reservas"):
+        conexion.execute("ALTER TABLE reservas ADD COLUMN minuto_inicio INTEGER")
+        conexion.execute("ALTER TABLE reservas ADD COLUMN minuto_fin INTEGER")
+        conexion.execute("""
+            UPDATE reservas SET
+                minuto_inicio = (SELECT COALESCE(t.minuto_inicio, 0) FROM turnos t WHERE t.turno_id = reservas.turno_id),
+                minuto_fin = (SELECT COALESCE(t.minuto_fin, ?) FROM turnos t WHERE t.turno_id = reservas.turno_id)
+        """, (MINUTOS_DIA,))
+
+    fila_indice = conexion.execute("SELECT sql FROM sqlite_master WHERE type='index' AND name='ux_reserva_sala_fecha_turno_activo'").fetchone()
+    if not fila_indice or "turno_id <> 0" not in fila_indice[0]:
+        conexion.execute("DROP INDEX IF EXISTS ux_reserva_sala_fecha_turno_activo")
+        conexion.execute("""
+            CREATE UNIQUE INDEX ux_reserva_sala_fecha_turno_activo
+            ON reservas (sala_id, fecha_normalizada, turno_id)
+            WHERE activo = 1 AND turno_id <> 0
+        """)
+    conexion.executescript(f"""
+CREATE INDEX IF NOT EXISTS ix_reserva_sala_fecha_intervalo
+ON reservas (sala_id, fecha_normalizada, minuto_inicio)
+WHERE activo = 1;
+
+CREATE TRIGGER IF NOT EXISTS tr_reservas_intervalo_turno AFTER INSERT ON reservas
+WHEN NEW.minuto_inicio IS NULL OR NEW.minuto_fin IS NULL
+BEGIN
+  UPDATE reservas SET
+    minuto_inicio = (SELECT COALESCE(minuto_inicio, 0) FROM turnos WHERE turno_id = NEW.turno_id),
+    minuto_fin = (SELECT COALESCE(minuto_fin, {MINUTOS_DIA}) FROM turnos WHERE turno_id = NEW.turno_id)
+  WHERE folio = NEW.folio;
+END;
+""")
+
+def _migrar_grupos(conexion):
+    conexion.execute("""
+        CREATE TABLE IF NOT EXISTS grupos_reserva (
+            grupo_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER NOT NULL,
+            evento TEXT NOT NULL,
+            creado TEXT NOT NULL DEFAULT (datetime('now')),
+            FOREIGN KEY (cliente_id) REFERENCES clientes(cliente_id) ON DELETE CASCADE
+        )
+    """)
+    if "grupo_id" not in _columnas_tabla(conexion, "reservas"):
+        conexion.execute("ALTER TABLE reservas ADD COLUMN grupo_id INTEGER REFERENCES grupos_reserva(grupo_id)")
+    conexion.execute("CREATE INDEX IF NOT EXISTS ix_reserva_grupo ON reservas (grupo_id) WHERE grupo_id IS NOT NULL")
+
+def _migrar_retenciones(conexion):
+    conexion.executescript("""
+CREATE TABLE IF NOT EXISTS retenciones (
+  retencion_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  sala_id INTEGER NOT NULL,
+  fecha_normalizada TEXT NOT NULL,
+  minuto_inicio INTEGER NOT NULL,
+  minuto_fin INTEGER NOT NULL,
+  terminal TEXT NOT NULL,
+  expira REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_retencion_sala_fecha ON retenciones (sala_id, fecha_normalizada, minuto_inicio);
+CREATE INDEX IF NOT EXISTS ix_retencion_expira ON retenciones (expira);
+""")
+
+def _migrar_lista_espera(conexion):
+    conexion.executescript("""
+CREATE TABLE IF NOT EXISTS lista_espera (
+  espera_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  cliente_id INTEGER NOT NULL,
+  sala_id INTEGER NOT NULL,
+  fecha_normalizada DATE NOT NULL,
+  turno_id INTEGER NOT NULL,
+  evento TEXT NOT NULL,
+  estado TEXT NOT NULL DEFAULT 'pendiente' CHECK (estado IN ('pendiente', 'promovida', 'retirada')),
+  folio INTEGER,
+  creado TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY (cliente_id) REFERENCES clientes(cliente_id) ON DELETE CASCADE,
+  FOREIGN KEY (sala_id) REFERENCES salas(sala_id) ON DELETE CASCADE,
+  FOREIGN KEY (turno_id) REFERENCES turnos(turno_id),
+  FOREIGN KEY (folio) REFERENCES reservas(folio)
+);
+CREATE INDEX IF NOT EXISTS ix_espera_pendiente
+ON lista_espera (sala_id, fecha_normalizada, turno_id, espera_id)
+WHERE estado = 'pendiente';
+""")
+
+DDL_BUSQUEDA = """
+CREATE TRIGGER IF NOT EXISTS tr_busqueda_reserva_ins AFTER INSERT ON reservas
+BEGIN
+  INSERT INTO busqueda_reservas (rowid, evento, cliente)
+  SELECT NEW.folio, NEW.evento, c.nombre || ' ' || c.apellidos FROM clientes c WHERE c.cliente_id = NEW.cliente_id;
+END;
+CREATE TRIGGER IF NOT EXISTS tr_busqueda_reserva_upd AFTER UPDATE OF evento, cliente_id ON reservas
+BEGIN
+  DELETE FROM busqueda_reservas WHERE rowid = OLD.folio;
+  INSERT INTO busqueda_reservas (rowid, evento, cliente)
+  SELECT NEW.folio, NEW.evento, c.nombre || ' ' || c.apellidos FROM clientes c WHERE c.cliente_id = NEW.cliente_id;
+END;
+CREATE TRIGGER IF NOT EXISTS tr_busqueda_reserva_del AFTER DELETE ON reservas
+BEGIN
+  DELETE FROM busqueda_reservas WHERE rowid = OLD.folio;
+END;
+CREATE TRIGGER IF NOT EXISTS tr_busqueda_cliente_upd AFTER UPDATE OF nombre, apellidos ON clientes
+BEGIN
+  UPDATE busqueda_reservas SET cliente = NEW.nombre || ' ' || NEW.apellidos
+  WHERE rowid IN (SELECT folio FROM reservas WHERE cliente_id = NEW.cliente_id);
+END;
+CREATE TRIGGER IF NOT EXISTS tr_busqueda_cliente_del AFTER DELETE ON clientes
+BEGIN
+  DELETE FROM busqueda_reservas WHERE rowid IN (SELECT folio FROM reservas WHERE cliente_id = OLD.cliente_id);
+END;
+"""
+
+def _reconstruir_busqueda(conexion):
+    conexion.execute("DELETE FROM busqueda_reservas")
+    conexion.execute("""
+        INSERT INTO busqueda_reservas (rowid, evento, cliente)
+        SELECT r.folio, r.evento, c.nombre || ' ' || c.apellidos
+        FROM reservas r JOIN clientes c ON c.cliente_id = r.cliente_id
+    """)
+    conexion.execute("INSERT INTO busqueda_reservas (busqueda_reservas) VALUES ('optimize')")
+
+def _migrar_busqueda(conexion):
+    if conexion.execute("SELECT 1 FROM sqlite_master WHERE name = 'busqueda_reservas'").fetchone() is None:
+        conexion.execute("""
+            CREATE VIRTUAL TABLE busqueda_reservas USING fts5(
+                evento, cliente, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            )
+        """)
+        _reconstruir_busqueda(conexion)
+    conexion.executescript(DDL_BUSQUEDA)
+
+DDL_HISTORIAL = """
+CREATE TRIGGER IF NOT EXISTS tr_historial_reserva_ins AFTER INSERT ON reservas
+BEGIN
+  INSERT INTO resumen_cliente (cliente_id, reservas, canceladas) VALUES (NEW.cliente_id, 1, NEW.activo = 0)
+  ON CONFLICT (cliente_id) DO UPDATE SET reservas = reservas + 1, canceladas = canceladas + excluded.canceladas;
+  INSERT INTO uso_cliente_sala (cliente_id, sala_id, reservas) SELECT NEW.cliente_id, NEW.sala_id, 1 WHERE NEW.activo = 1
+  ON CONFLICT (cliente_id, sala_id) DO UPDATE SET reservas = reservas + 1;
+  INSERT INTO uso_cliente_turno (cliente_id, turno_id, reservas) SELECT NEW.cliente_id, NEW.turno_id, 1 WHERE NEW.activo = 1
+  ON CONFLICT (cliente_id, turno_id) DO UPDATE SET reservas = reservas + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS tr_historial_reserva_upd AFTER UPDATE OF cliente_id, sala_id, turno_id, activo ON reservas
+WHEN OLD.cliente_id IS NOT NEW.cliente_id OR OLD.sala_id IS NOT NEW.sala_id
+  OR OLD.turno_id IS NOT NEW.turno_id OR OLD.activo IS NOT NEW.activo
+BEGIN
+  UPDATE resumen_cliente SET reservas = reservas - 1, canceladas = canceladas - (OLD.activo = 0) WHERE cliente_id = OLD.cliente_id;
+  UPDATE uso_cliente_sala SET reservas = reservas - 1 WHERE OLD.activo = 1 AND cliente_id = OLD.cliente_id AND sala_id = OLD.sala_id;
+  UPDATE uso_cliente_turno SET reservas = reservas - 1 WHERE OLD.activo = 1 AND cliente_id = OLD.cliente_id AND turno_id = OLD.turno_id;
+  INSERT INTO resumen_cliente (cliente_id, reservas, canceladas) VALUES (NEW.cliente_id, 1, NEW.activo = 0)
+  ON CONFLICT (cliente_id) DO UPDATE SET reservas = reservas + 1, canceladas = canceladas + excluded.canceladas;
+  INSERT INTO uso_cliente_sala (cliente_id, sala_id, reservas) SELECT NEW.cliente_id, NEW.sala_id, 1 WHERE NEW.activo = 1
+  ON CONFLICT (cliente_id, sala_id) DO UPDATE SET reservas = reservas + 1;
+  INSERT INTO uso_cliente_turno (cliente_id, turno_id, reservas) SELECT NEW.cliente_id, NEW.turno_id, 1 WHERE NEW.activo = 1
+  ON CONFLICT (cliente_id, turno_id) DO UPDATE SET reservas = reservas + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS tr_historial_reserva_del AFTER DELETE ON reservas
+BEGIN
+  UPDATE resumen_cliente SET reservas = reservas - 1, canceladas = canceladas - (OLD.activo = 0) WHERE cliente_id = OLD.cliente_id;
+  UPDATE uso_cliente_sala SET reservas = reservas - 1 WHERE OLD.activo = 1 AND cliente_id = OLD.cliente_id AND sala_id = OLD.sala_id;
+  UPDATE uso_cliente_turno SET reservas = reservas - 1 WHERE OLD.activo = 1 AND cliente_id = OLD.cliente_id AND turno_id = OLD.turno_id;
+END;
+"""
+
+def _reconstruir_resumen_clientes(conexion):
+    conexion.execute("DELETE FROM resumen_cliente")
+    conexion.execute("DELETE FROM uso_cliente_sala")
+    conexion.execute("DELETE FROM uso_cliente_turno")
+    conexion.execute("""
+        INSERT INTO resumen_cliente (cliente_id, reservas, canceladas)
+        SELECT cliente_id, COUNT(*), SUM(activo = 0) FROM reservas GROUP BY cliente_id
+    """)
+    conexion.execute("""
+        INSERT INTO uso_cliente_sala (cliente_id, sala_id, reservas)
+        SELECT cliente_id, sala_id, COUNT(*) FROM reservas WHERE activo = 1 GROUP BY cliente_id, sala_id
+    """)
+    conexion.execute("""
+        INSERT INTO uso_cliente_turno (cliente_id, turno_id, reservas)
+        SELECT cliente_id, turno_id, COUNT(*) FROM reservas WHERE activo = 1 GROUP BY cliente_id, turno_id
+    """)
+
+def _migrar_historial(conexion):
+    fila_indice = conexion.execute("SELECT sql FROM sqlite_master WHERE type='index' AND name='ix_reserva_cliente'").fetchone()
+    if not fila_indice or "fecha_normalizada" not in fila_indice[0]:
+        conexion.execute("DROP INDEX IF EXISTS ix_reserva_cliente")
+        conexion.execute("CREATE INDEX ix_reserva_cliente ON reservas (cliente_id, fecha_normalizada)")
+    if conexion.execute("SELECT 1 FROM sqlite_master WHERE name = 'resumen_cliente'").fetchone() is None:
+        conexion.executescript("""
+CREATE TABLE resumen_cliente (
+  cliente_id INTEGER PRIMARY KEY REFERENCES clientes(cliente_id) ON DELETE CASCADE,
+  reservas INTEGER NOT NULL DEFAULT 0,
+  canceladas INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE uso_cliente_sala (
+  cliente_id INTEGER NOT NULL REFERENCES clientes(cliente_id) ON DELETE CASCADE,
+  sala_id INTEGER NOT NULL,
+  reservas INTEGER NOT NULL,
+  PRIMARY KEY (cliente_id, sala_id)
+) WITHOUT ROWID;
+CREATE TABLE uso_cliente_turno (
+  cliente_id INTEGER NOT NULL REFERENCES clientes(cliente_id) ON DELETE CASCADE,
+  turno_id INTEGER NOT NULL,
+  reservas INTEGER NOT NULL,
+  PRIMARY KEY (cliente_id, turno_id)
+) WITHOUT ROWID;
+""")
+        _reconstruir_resumen_clientes(conexion)
+    conexion.executescript(DDL_HISTORIAL)
+
+DDL_CAMBIOS = f"""
+CREATE INDEX IF NOT EXISTS ix_reserva_cambio ON reservas (secuencia_cambio);
+
+CREATE TRIGGER IF NOT EXISTS tr_cambios_reserva_ins AFTER INSERT ON reservas
+BEGIN
+  UPDATE secuencia_cambios SET ultimo = ultimo + 1 WHERE id = 1;
+  UPDATE reservas SET
+    secuencia_alta = (SELECT ultimo FROM secuencia_cambios WHERE id = 1),
+    secuencia_cambio = (SELECT ultimo FROM secuencia_cambios WHERE id = 1),
+    modificado = datetime('now')
+  WHERE folio = NEW.folio;
+  INSERT INTO avisos_reserva (secuencia, folio, tipo, sala_id, fecha_normalizada, minuto_inicio, minuto_fin, activo)
+  VALUES ((SELECT ultimo FROM secuencia_cambios WHERE id = 1), NEW.folio, 'alta', NEW.sala_id, NEW.fecha_normalizada,
+          COALESCE(NEW.minuto_inicio, (SELECT COALESCE(minuto_inicio, 0) FROM turnos WHERE turno_id = NEW.turno_id)),
+          COALESCE(NEW.minuto_fin, (SELECT COALESCE(minuto_fin, {MINUTOS_DIA}) FROM turnos WHERE turno_id = NEW.turno_id)),
+          NEW.activo);
+END;
+CREATE TRIGGER IF NOT EXISTS tr_cambios_reserva_upd
+AFTER UPDATE OF cliente_id, sala_id, fecha_normalizada, turno_id, evento, activo ON reservas
+WHEN OLD.cliente_id IS NOT NEW.cliente_id OR OLD.sala_id IS NOT NEW.sala_id OR OLD.fecha_normalizada IS NOT NEW.fecha_normalizada
+  OR OLD.turno_id IS NOT NEW.turno_id OR OLD.evento IS NOT NEW.evento OR OLD.activo IS NOT NEW.activo
+BEGIN
+  UPDATE secuencia_cambios SET ultimo = ultimo + 1 WHERE id = 1;
+  UPDATE reservas SET
+    secuencia_cambio = (SELECT ultimo FROM secuencia_cambios WHERE id = 1),
+    modificado = datetime('now')
+  WHERE folio = NEW.folio;
+  INSERT INTO avisos_reserva (secuencia, folio, tipo, sala_id, fecha_normalizada, minuto_inicio, minuto_fin, activo,
+                              sala_anterior, fecha_anterior, inicio_anterior, fin_anterior)
+  SELECT (SELECT ultimo FROM secuencia_cambios WHERE id = 1), NEW.folio,
+         CASE WHEN NEW.activo = 0 AND OLD.activo = 1 THEN 'cancelada' ELSE 'modificada' END,
+         NEW.sala_id, NEW.fecha_normalizada, NEW.minuto_inicio, NEW.minuto_fin, NEW.activo,
+         OLD.sala_id, OLD.fecha_normalizada, OLD.minuto_inicio, OLD.minuto_fin
+  WHERE OLD.sala_id IS NOT NEW.sala_id OR OLD.fecha_normalizada IS NOT NEW.fecha_normalizada
+     OR OLD.minuto_inicio IS NOT NEW.minuto_inicio OR OLD.minuto_fin IS NOT NEW.minuto_fin;
+  INSERT INTO avisos_reserva (secuencia, folio, tipo, sala_id, fecha_normalizada, minuto_inicio, minuto_fin, activo)
+  SELECT (SELECT ultimo FROM secuencia_cambios WHERE id = 1), NEW.folio,
+         CASE WHEN NEW.activo = 0 AND OLD.activo = 1 THEN 'cancelada' ELSE 'modificada' END,
+         NEW.sala_id, NEW.fecha_normalizada, NEW.minuto_inicio, NEW.minuto_fin, NEW.activo
+  WHERE OLD.sala_id IS NEW.sala_id AND OLD.fecha_normalizada IS NEW.fecha_normalizada
+    AND OLD.minuto_inicio IS NEW.minuto_inicio AND OLD.minuto_fin IS NEW.minuto_fin;
+END;
+"""
+
+def _migrar_cambios(conexion):
+    conexion.executescript("""
+CREATE TABLE IF NOT EXISTS secuencia_cambios (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  ultimo INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS marcas_exportacion (
+  consumidor TEXT PRIMARY KEY,
+  secuencia INTEGER NOT NULL,
+  actualizado TEXT NOT NULL DEFAULT (datetime('now'))
+);
+""")
+    if "secuencia_cambio" not in _columnas_tabla(conexion, "reservas"):
+        conexion.execute("ALTER TABLE reservas ADD COLUMN secuencia_alta INTEGER")
+        conexion.execute("ALTER TABLE reservas ADD COLUMN secuencia_cambio INTEGER")
+        conexion.execute("ALTER TABLE reservas ADD COLUMN modificado TEXT")
+        conexion.execute("UPDATE reservas SET secuencia_alta = folio, secuencia_cambio = folio")
+    conexion.execute("INSERT OR IGNORE INTO secuencia_cambios (id, ultimo) SELECT 1, COALESCE(MAX(secuencia_cambio), 0) FROM reservas")
+    conexion.executescript(DDL_CAMBIOS)
+
+def _migrar_avisos(conexion):
+    conexion.executescript("""
+CREATE TABLE IF NOT EXISTS avisos_reserva (
+  secuencia INTEGER PRIMARY KEY,
+  folio INTEGER NOT NULL,
+  tipo TEXT NOT NULL,
+  sala_id INTEGER NOT NULL,
+  fecha_normalizada DATE NOT NULL,
+  minuto_inicio INTEGER,
+  minuto_fin INTEGER,
+  activo INTEGER NOT NULL,
+  sala_anterior INTEGER,
+  fecha_anterior DATE,
+  inicio_anterior INTEGER,
+  fin_anterior INTEGER
+);
+""")
+    sql_disparador = conexion.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'tr_cambios_reserva_ins'").fetchone()
+    if sql_disparador is None or "COALESCE(NEW.minuto_inicio" not in sql_disparador[0]:
+        conexion.execute("DROP TRIGGER IF EXISTS tr_cambios_reserva_ins")
+        conexion.execute("DROP TRIGGER IF EXISTS tr_cambios_reserva_upd")
+        conexion.executescript(DDL_CAMBIOS)
+
+def _migrar_idempotencia(conexion):
+    conexion.executescript("""
+CREATE TABLE IF NOT EXISTS claves_idempotencia (
+  clave TEXT PRIMARY KEY,
+  huella TEXT NOT NULL,
+  folio INTEGER,
+  grupo_id INTEGER,
+  expira REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_clave_expira ON claves_idempotencia (expira);
+""")
+
+@instrumentado("bd.asegurar_tablas")
+def asegurar_tablas(ruta_bd=None):
+    ruta_bd = ruta_bd or DB_FILE
     crear = False
-    if not os.path.exists(DB_FILE):
+    if not os.path.exists(ruta_bd):
         crear = True
     else:
         try:
-            conexion = sqlite3.connect(DB_FILE)
+            conexion = conectar_bd(ruta_bd)
             cursor = conexion.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='clientes';")
             if not cursor.fetchone():
@@ -45,6 +862,7 @@ def asegurar_tablas():
     
     if crear:
         ddl = """
+PRAGMA auto_vacuum = INCREMENTAL;
 PRAGMA foreign_keys = ON;
 
 CREATE TABLE IF NOT EXISTS clientes (
@@ -84,21 +902,21 @@ ON reservas (sala_id, fecha_normalizada, turno_id)
 WHERE activo = 1;
 
 CREATE INDEX IF NOT EXISTS ix_reserva_fecha ON reservas (fecha_normalizada);
-CREATE INDEX IF NOT EXISTS ix_reserva_cliente ON reservas (cliente_id);
+CREATE INDEX IF NOT EXISTS ix_reserva_cliente ON reservas (cliente_id, fecha_normalizada);
 
 INSERT OR IGNORE INTO turnos (turno_id, descripcion) VALUES (1, 'Matutino');
 INSERT OR IGNORE INTO turnos (turno_id, descripcion) VALUES (2, 'Vespertino');
 INSERT OR IGNORE INTO turnos (turno_id, descripcion) VALUES (3, 'Nocturno');
 """
         try:
-            with sqlite3.connect(DB_FILE) as conexion:
+            with conectar_bd(ruta_bd) as conexion:
                 conexion.executescript(ddl)
         except Error as error:
             print(f"Error al crear tablas en la base de datos: {error}")
             sys.exit(1)
     else:
         try:
-            with sqlite3.connect(DB_FILE) as conexion:
+            with conectar_bd(ruta_bd) as conexion:
                 cursor = conexion.cursor()
                 
                 cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='ux_reserva_sala_fecha_turno_activo'")
@@ -114,11 +932,85 @@ INSERT OR IGNORE INTO turnos (turno_id, descripcion) VALUES (3, 'Nocturno');
         except Exception as error:
             print(f"Error verificando/creando índice único parcial: {error}")
 
+    migraciones = (
+        ("activar el modo WAL", lambda conexion: conexion.execute("PRAGMA journal_mode = WAL")),
+        ("crear la version de salas y turnos", lambda conexion: conexion.executescript(DDL_VERSION_REFERENCIA)),
+        ("migrar los intervalos de horario", _migrar_intervalos),
+        ("migrar las reservaciones en grupo", _migrar_grupos),
+        ("migrar las retenciones de espacios", _migrar_retenciones),
+        ("migrar la lista de espera", _migrar_lista_espera),
+        ("crear el indice de busqueda (FTS5)", _migrar_busqueda),
+        ("migrar el historial de clientes", _migrar_historial),
+        ("migrar el registro de cambios", _migrar_cambios),
+        ("migrar las claves de idempotencia", _migrar_idempotencia),
+        ("migrar los avisos de cambios", _migrar_avisos),
+        ("migrar las particiones de reservaciones", _migrar_particiones),
+    )
+    conexion = conectar_bd(ruta_bd)
+    try:
+        for descripcion, migracion in migraciones:
+            try:
+                with conexion:
+                    migracion(conexion)
+            except Exception as error:
+                print(f"Advertencia: no se pudo {descripcion}: {error}")
+    finally:
+        conexion.close()
+
+def _cargar_referencia(conexion, version):
+    filas_salas = [{"sala_id": sala_id, "nombre": nombre, "cupo": cupo}
+                   for sala_id, nombre, cupo in conexion.execute("SELECT sala_id, nombre, cupo FROM salas ORDER BY nombre")]
+    filas_turnos = []
+    for turno_id, descripcion, minuto_inicio, minuto_fin in conexion.execute(
+            "SELECT turno_id, descripcion, minuto_inicio, minuto_fin FROM turnos WHERE turno_id <> ? ORDER BY turno_id",
+            (TURNO_HORARIO_ID,)):
+        if minuto_inicio is None or minuto_fin is None:
+            print(f"Advertencia: el turno {turno_id} ({descripcion}) no tiene horario definido y no se ofrecera.")
+            continue
+        filas_turnos.append({"turno_id": turno_id, "descripcion": descripcion,
+                             "minuto_inicio": minuto_inicio, "minuto_fin": minuto_fin})
+    return {
+        "version": version,
+        "salas": filas_salas,
+        "salas_por_id": {fila_sala["sala_id"]: fila_sala for fila_sala in filas_salas},
+        "salas_por_nombre": {fila_sala["nombre"]: fila_sala for fila_sala in filas_salas},
+        "turnos": filas_turnos,
+        "turnos_por_id": {fila_turno["turno_id"]: fila_turno for fila_turno in filas_turnos},
+        "turnos_por_descripcion": {fila_turno["descripcion"]: fila_turno for fila_turno in filas_turnos},
+    }
+
+def referencia_actual():
+    global conexion_referencia, ruta_referencia, data_version_referencia, cache_referencia
+    with candado_referencia:
+        if conexion_referencia is None or ruta_referencia != DB_FILE:
+            if conexion_referencia is not None:
+                conexion_referencia.close()
+            conexion_referencia = _abrir_conexion(DB_FILE, check_same_thread=False)
+            ruta_referencia = DB_FILE
+            data_version_referencia = None
+            cache_referencia = None
+        data_version = conexion_referencia.execute("PRAGMA data_version").fetchone()[0]
+        if cache_referencia is None or data_version != data_version_referencia:
+            version = conexion_referencia.execute("SELECT version FROM version_referencia WHERE id = 1").fetchone()[0]
+            if cache_referencia is None or version != cache_referencia["version"]:
+                with medir("bd.cargar_referencia"):
+                    cache_referencia = _cargar_referencia(conexion_referencia, version)
+            data_version_referencia = data_version
+        return cache_referencia
+
+def referencia_mapa(mapa=None):
+    mapa = mapa or mapa_disponibilidad
+    referencia = cache_referencia
+    if referencia is not None and ruta_referencia == DB_FILE and referencia["version"] == estado_mapa(mapa)[1]:
+        return referencia
+    return referencia_actual()
+
+@instrumentado("bd.cargar_estado")
 def cargar_estado_desde_bd():
     global clientes, salas, turnos, reservas, next_cliente_id, next_sala_id, next_folio
     asegurar_tablas()
     try:
-        with sqlite3.connect(DB_FILE) as conexion:
+        with conectar_bd() as conexion:
             conexion.row_factory = sqlite3.Row
             cursor = conexion.cursor()
             
@@ -133,7 +1025,8 @@ def cargar_estado_desde_bd():
             
             cursor.execute("""
                 SELECT r.folio, r.cliente_id, r.sala_id, r.fecha_normalizada, 
-                       t.turno_id, t.descripcion as turno_desc, r.evento, r.activo
+                       t.turno_id, CASE WHEN r.turno_id = 0 THEN printf('%02d:%02d-%02d:%02d', r.minuto_inicio / 60, r.minuto_inicio % 60, r.minuto_fin / 60, r.minuto_fin % 60) ELSE t.descripcion END as turno_desc,
+                       r.evento, r.activo
                 FROM reservas r
                 INNER JOIN turnos t ON r.turno_id = t.turno_id
                 WHERE r.activo = 1
@@ -175,7 +1068,7 @@ def cargar_estado_desde_bd():
             })
             
         try:
-            with sqlite3.connect(DB_FILE) as conexion:
+            with conectar_bd() as conexion:
                 cursor = conexion.cursor()
                 cursor.execute("SELECT MAX(cliente_id) FROM clientes")
                 max_cliente = cursor.fetchone()
@@ -202,48 +1095,42 @@ def cargar_estado_desde_bd():
         print(f"No se pudo cargar estado desde BD: {error}")
         return False
 
+CONSULTA_REPORTE_FECHA = """
+SELECT 
+    r.folio,
+    c.nombre as cliente_nombre,
+    c.apellidos as cliente_apellidos,
+    s.nombre as sala_nombre,
+    s.cupo,
+    CASE WHEN r.turno_id = 0 THEN printf('%02d:%02d-%02d:%02d', r.minuto_inicio / 60, r.minuto_inicio % 60, r.minuto_fin / 60, r.minuto_fin % 60) ELSE t.descripcion END as turno_descripcion,
+    r.evento
+FROM reservas r
+INNER JOIN clientes c ON r.cliente_id = c.cliente_id
+INNER JOIN salas s ON r.sala_id = s.sala_id
+INNER JOIN turnos t ON r.turno_id = t.turno_id
+WHERE r.fecha_normalizada = ? AND r.activo = 1
+ORDER BY r.folio
+"""
+
+def _iterar_reporte_fecha(conexion, fecha_consulta):
+    fecha_texto = fecha_consulta.strftime(FORMATO_FECHA_INPUT)
+    return ([folio, fecha_texto, f"{cliente_apellidos}, {cliente_nombre}", sala_nombre, cupo, turno_descripcion, evento]
+            for folio, cliente_nombre, cliente_apellidos, sala_nombre, cupo, turno_descripcion, evento
+            in conexion.execute(CONSULTA_REPORTE_FECHA, (fecha_consulta.strftime(FORMATO_FECHA_ISO),)))
+
+def _filas_reporte_fecha(conexion, fecha_consulta):
+    return list(_iterar_reporte_fecha(conexion, fecha_consulta))
+
+@instrumentado("reporte.por_fecha")
 def generar_reporte_por_fecha_lista(fecha_consulta):
+    entrada = dia_precargado(fecha_consulta)
+    if entrada is not None:
+        return [list(fila) for fila in entrada["reporte"]]
     filas_reporte = []
-    fecha_iso = fecha_consulta.strftime(FORMATO_FECHA_ISO)
     
     try:
-        with sqlite3.connect(DB_FILE) as conexion:
-            conexion.row_factory = sqlite3.Row
-            cursor = conexion.cursor()
-            
-            query = """
-            SELECT 
-                r.folio,
-                r.fecha_normalizada,
-                c.nombre as cliente_nombre,
-                c.apellidos as cliente_apellidos,
-                s.nombre as sala_nombre,
-                s.cupo,
-                t.descripcion as turno_descripcion,
-                r.evento
-            FROM reservas r
-            INNER JOIN clientes c ON r.cliente_id = c.cliente_id
-            INNER JOIN salas s ON r.sala_id = s.sala_id
-            INNER JOIN turnos t ON r.turno_id = t.turno_id
-            WHERE r.fecha_normalizada = ? AND r.activo = 1
-            ORDER BY r.folio
-            """
-            
-            cursor.execute(query, (fecha_iso,))
-            resultados = cursor.fetchall()
-            
-            for resultado in resultados:
-                filas_reporte.append([
-                    resultado["folio"],
-                    fecha_consulta.strftime(FORMATO_FECHA_INPUT),
-                    f"{resultado['cliente_apellidos']}, {resultado['cliente_nombre']}",
-                    resultado["sala_nombre"],
-                    resultado["cupo"],
-                    resultado["turno_descripcion"],
-                    resultado["evento"]
-                ])
-            
-            cursor.close()
+        with conectar_lectura(permitir_replica=True) as conexion:
+            filas_reporte = _filas_reporte_fecha(conexion, fecha_consulta)
             
     except Exception as error:
         print(f"Error al generar reporte desde BD: {error}")
@@ -272,46 +1159,21 @@ def generar_reporte_por_fecha_lista(fecha_consulta):
     
     return filas_reporte
 
+@instrumentado("reporte.por_rango")
 def generar_reporte_por_rango_fecha(fecha_inicio, fecha_fin):
-    fecha_ini_iso = fecha_inicio.strftime(FORMATO_FECHA_ISO)
-    fecha_fin_iso = fecha_fin.strftime(FORMATO_FECHA_ISO)
-    
     try:
-        with sqlite3.connect(DB_FILE) as conexion:
-            conexion.row_factory = sqlite3.Row
-            cursor = conexion.cursor()
-            
-            query = """
-            SELECT 
-                r.folio,
-                r.fecha_normalizada,
-                c.nombre as cliente_nombre,
-                c.apellidos as cliente_apellidos,
-                s.nombre as sala_nombre,
-                t.descripcion as turno_descripcion,
-                r.evento
-            FROM reservas r
-            INNER JOIN clientes c ON r.cliente_id = c.cliente_id
-            INNER JOIN salas s ON r.sala_id = s.sala_id
-            INNER JOIN turnos t ON r.turno_id = t.turno_id
-            WHERE r.fecha_normalizada BETWEEN ? AND ? AND r.activo = 1
-            ORDER BY r.fecha_normalizada, r.folio
-            """
-            
-            cursor.execute(query, (fecha_ini_iso, fecha_fin_iso))
-            resultados = cursor.fetchall()
-            cursor.close()
-            
+        with conectar_lectura() as conexion:
             registros = []
-            for resultado in resultados:
-                fecha_dt = datetime.datetime.strptime(resultado["fecha_normalizada"], FORMATO_FECHA_ISO).date()
+            for folio, fecha_texto, cliente_nombre, cliente_apellidos, sala_nombre, _, turno_descripcion, evento in \
+                    _iterar_reporte_rango(conexion, fecha_inicio, fecha_fin):
+                fecha_dt = datetime.datetime.strptime(fecha_texto, FORMATO_FECHA_ISO).date()
                 registros.append({
-                    "folio": resultado["folio"],
+                    "folio": folio,
                     "fecha": fecha_dt.strftime(FORMATO_FECHA_INPUT),
-                    "cliente": f"{resultado['cliente_apellidos']}, {resultado['cliente_nombre']}",
-                    "sala": resultado["sala_nombre"],
-                    "turno": resultado["turno_descripcion"],
-                    "evento": resultado["evento"]
+                    "cliente": f"{cliente_apellidos}, {cliente_nombre}",
+                    "sala": sala_nombre,
+                    "turno": turno_descripcion,
+                    "evento": evento
                 })
             
             return registros
@@ -320,32 +1182,158 @@ def generar_reporte_por_rango_fecha(fecha_inicio, fecha_fin):
         print(f"Error al obtener reservas por rango: {error}")
         return []
 
+ENCABEZADOS_REPORTE_FECHA = ["FOLIO", "FECHA", "CLIENTE", "SALA", "CUPO", "TURNO", "EVENTO"]
+ANCHOS_REPORTE_FECHA = [None, len("MM-DD-YYYY"), None, None, None, None, None]
+MUESTRA_TABLA = 1000
+LOTE_ESCRITURA_TABLA = 2000
+TIPOS_CELDA = (type(None), bool, int, float, str)
+
+def _tipo_celda(valor):
+    if valor is None or valor == "":
+        return 0
+    if isinstance(valor, bool) or valor in ("True", "False"):
+        return 1
+    if isinstance(valor, int):
+        return 2
+    if isinstance(valor, float):
+        return 3
+    if isinstance(valor, str):
+        try:
+            int(valor)
+            return 2
+        except ValueError:
+            pass
+        try:
+            numero = float(valor)
+        except ValueError:
+            return 4
+        if numero != numero or numero in (float("inf"), float("-inf")):
+            return 3 if valor.strip().lower() in ("inf", "-inf", "nan") else 4
+        return 3
+    return 4
+
+def _texto_celda(valor, tipo=4):
+    if valor is None:
+        return ""
+    if TIPOS_CELDA[tipo] is float and valor != "":
+        try:
+            return format(float(str(valor).replace(",", "")), "g")
+        except ValueError:
+            pass
+    return str(valor).replace("\n", " ").strip()
+
+def _decimales_celda(texto):
+    if _tipo_celda(texto) == 3:
+        posicion = texto.rfind(".")
+        posicion = texto.lower().rfind("e") if posicion < 0 else posicion
+        if posicion >= 0:
+            return len(texto) - posicion - 1
+    return -1
+
+def imprimir_tabla(filas, encabezados, anchos=None, muestra=MUESTRA_TABLA, ancho_maximo=None, salida=None):
+    salida = salida or sys.stdout
+    filas = iter(filas)
+    muestra_filas = list(itertools.islice(filas, muestra))
+    anchos = anchos or [None] * len(encabezados)
+    tipos = [max((_tipo_celda(fila[indice]) for fila in muestra_filas), default=0) for indice in range(len(encabezados))]
+    numericas = [TIPOS_CELDA[tipo] in (int, float) for tipo in tipos]
+    decimales = [max((_decimales_celda(_texto_celda(fila[indice], tipos[indice])) for fila in muestra_filas), default=-1)
+                 if numericas[indice] else -1 for indice in range(len(encabezados))]
+
+    def celdas_fila(fila):
+        celdas = []
+        for indice, valor in enumerate(fila):
+            texto = _texto_celda(valor, tipos[indice])
+            if numericas[indice]:
+                texto += " " * max(0, decimales[indice] - _decimales_celda(texto))
+            if ancho_maximo and len(texto) > ancho_maximo:
+                texto = texto[:ancho_maximo - 1] + "…"
+            celdas.append(texto)
+        return celdas
+
+    anchos_columna = [max(len(encabezado) + 2, anchos[indice] or 0) for indice, encabezado in enumerate(encabezados)]
+    textos_muestra = [celdas_fila(fila) for fila in muestra_filas]
+    for celdas in textos_muestra:
+        anchos_columna = [max(ancho, len(texto)) for ancho, texto in zip(anchos_columna, celdas)]
+
+    def separador(relleno="-"):
+        return "+" + "+".join(relleno * (ancho + 2) for ancho in anchos_columna) + "+"
+
+    def renglon(celdas):
+        return "| " + " | ".join(texto.rjust(ancho) if numerica else texto.ljust(ancho)
+                                 for texto, ancho, numerica in zip(celdas, anchos_columna, numericas)) + " |"
+
+    lineas = [separador(), renglon(encabezados), separador("=")]
+    linea_separador = separador()
+    total = 0
+    for celdas in itertools.chain(textos_muestra, map(celdas_fila, filas)):
+        if any(len(texto) > ancho for texto, ancho in zip(celdas, anchos_columna)):
+            anchos_columna = [max(ancho, len(texto)) for ancho, texto in zip(anchos_columna, celdas)]
+            linea_separador = separador()
+        lineas.append(renglon(celdas))
+        lineas.append(linea_separador)
+        total += 1
+        if len(lineas) >= LOTE_ESCRITURA_TABLA:
+            salida.write("\n".join(lineas) + "\n")
+            lineas = []
+    if not total:
+        lineas.append(linea_separador)
+    salida.write("\n".join(lineas) + "\n")
+    return total
+
+@trazable("reporte_fecha", 4)
+@instrumentado("reporte.imprimir_por_fecha")
 def imprimir_reporte_tabular_por_fecha(fecha_consulta):
-    filas = generar_reporte_por_fecha_lista(fecha_consulta)
-    if not filas:
-        print("\n" + "-" * 60)
-        print("NO HAY RESERVACIONES".center(60))
-        print("-" * 60)
-        print(f"Fecha consultada: {fecha_consulta.strftime(FORMATO_FECHA_INPUT)}")
-        print("No se encontraron reservaciones para la fecha indicada.")
-        print("-" * 60)
-        return False
-        
-    encabezado = f"REPORTE DE RESERVACIONES PARA EL {fecha_consulta.strftime(FORMATO_FECHA_INPUT)}"
-    print("\n" + "=" * 80)
-    print(encabezado.center(80))
-    print("=" * 80)
-    print(tabulate(filas, headers=["FOLIO", "FECHA", "CLIENTE", "SALA", "CUPO", "TURNO", "EVENTO"], tablefmt="grid"))
-    print("-" * 80)
-    print("FIN DEL REPORTE")
-    print("-" * 80)
-    return True
+    global primer_reporte_medido
+    inicio = time.perf_counter()
+    conexion = None
+    entrada = dia_precargado(fecha_consulta)
+    if entrada is not None:
+        filas = iter(entrada["reporte"])
+    else:
+        try:
+            conexion = conectar_lectura(permitir_replica=True)
+            filas = _iterar_reporte_fecha(conexion, fecha_consulta)
+        except sqlite3.Error:
+            if conexion is not None:
+                conexion.close()
+                conexion = None
+            filas = iter(generar_reporte_por_fecha_lista(fecha_consulta))
+    try:
+        primera = next(filas, None)
+        if not primer_reporte_medido:
+            primer_reporte_medido = True
+            registrar_operacion("reporte.primero_con_precarga" if dias_precarga else "reporte.primero_sin_precarga",
+                                time.perf_counter() - inicio)
+        if primera is None:
+            print("\n" + "-" * 60)
+            print("NO HAY RESERVACIONES".center(60))
+            print("-" * 60)
+            print(f"Fecha consultada: {fecha_consulta.strftime(FORMATO_FECHA_INPUT)}")
+            print("No se encontraron reservaciones para la fecha indicada.")
+            print("-" * 60)
+            return False
+            
+        encabezado = f"REPORTE DE RESERVACIONES PARA EL {fecha_consulta.strftime(FORMATO_FECHA_INPUT)}"
+        print("\n" + "=" * 80)
+        print(encabezado.center(80))
+        print("=" * 80)
+        imprimir_tabla(itertools.chain([primera], filas), ENCABEZADOS_REPORTE_FECHA, ANCHOS_REPORTE_FECHA)
+        print("-" * 80)
+        print("FIN DEL REPORTE")
+        print("-" * 80)
+        return True
+    finally:
+        if conexion is not None:
+            conexion.close()
 
-def exportar_reporte_json(fecha_consulta, filas_export):
+@instrumentado("exportar.json")
+def exportar_reporte_json(fecha_consulta, filas_export, nombre_archivo=None):
     if not filas_export:
         print("No hay datos para exportar en esa fecha.")
         return
-    nombre_archivo = f"reporte_{fecha_consulta.strftime('%Y%m%d')}.json"
+    if nombre_archivo is None:
+        nombre_archivo = f"reporte_{fecha_consulta.strftime('%Y%m%d')}.json"
     datos_json = []
     for fila in filas_export:
         datos_json.append({
@@ -364,11 +1352,13 @@ def exportar_reporte_json(fecha_consulta, filas_export):
     except Exception as error:
         print(f"Error al exportar JSON: {error}")
 
-def exportar_reporte_csv(fecha_consulta, filas_export):
+@instrumentado("exportar.csv")
+def exportar_reporte_csv(fecha_consulta, filas_export, nombre_archivo=None):
     if not filas_export:
         print("No hay datos para exportar en esa fecha.")
         return
-    nombre_archivo = f"reporte_{fecha_consulta.strftime('%Y%m%d')}.csv"
+    if nombre_archivo is None:
+        nombre_archivo = f"reporte_{fecha_consulta.strftime('%Y%m%d')}.csv"
     try:
         with open(nombre_archivo, "w", newline='', encoding="utf-8") as archivo_csv:
             escritor = csv.writer(archivo_csv)
@@ -379,14 +1369,16 @@ def exportar_reporte_csv(fecha_consulta, filas_export):
     except Exception as error:
         print(f"Error al exportar CSV: {error}")
 
-def exportar_reporte_excel(fecha_consulta, filas_export):
+@instrumentado("exportar.xlsx")
+def exportar_reporte_excel(fecha_consulta, filas_export, nombre_archivo=None):
     if openpyxl is None:
         print("openpyxl no esta instalado. Instale openpyxl para exportar a Excel.")
         return
     if not filas_export:
         print("No hay datos para exportar en esa fecha.")
         return
-    nombre_archivo = f"reporte_{fecha_consulta.strftime('%Y%m%d')}.xlsx"
+    if nombre_archivo is None:
+        nombre_archivo = f"reporte_{fecha_consulta.strftime('%Y%m%d')}.xlsx"
     try:
         libro = openpyxl.Workbook()
         hoja = libro.active
@@ -409,398 +1401,4054 @@ def exportar_reporte_excel(fecha_consulta, filas_export):
     except Exception as error:
         print(f"Error al exportar Excel: {error}")
 
-inicio_bd_ok = cargar_estado_desde_bd()
-if inicio_bd_ok:
-    print("\n" + "=" * 70)
-    print("Estado inicial cargado desde Evidencia.db".center(70))
-    print("=" * 70)
-else:
-    print("\n" + "=" * 70)
-    print("No se pudo cargar Evidencia.db; iniciando con estado vacio".center(70))
-    print("=" * 70)
-
-while True:
-    print("\n" + "=" * 60)
-    print("SISTEMA DE RESERVACION DE SALAS".center(60))
-    print("=" * 60)
-    print("1. Registrar reservacion de una sala.")
-    print("2. Cancelar evento.")
-    print("3. Editar nombre de evento.")
-    print("4. Consultar reservaciones por fecha.")
-    print("5. Registrar un nuevo cliente.")
-    print("6. Registrar una sala.")
-    print("7. Salir.")
-    print("=" * 60)
+SNAPSHOT_MAGIC = b"EVSN"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_FLAG_ZLIB = 1
+SNAPSHOT_CABECERA = struct.Struct("<4sHHQ")
+SNAPSHOT_COLUMNA = struct.Struct("<c7xQ")
+SNAPSHOT_COLUMNAS = (
+    "cadenas_offsets", "cadenas_datos",
+    "clientes_id", "clientes_nombre", "clientes_apellidos",
+    "salas_id", "salas_nombre", "salas_cupo",
+    "turnos_id", "turnos_descripcion",
+    "reservas_folio", "reservas_cliente_id", "reservas_sala_id", "reservas_fecha",
+    "reservas_turno_id", "reservas_evento", "reservas_activo",
+    "contadores",
+)
+SNAPSHOT_COLUMNAS_POR_VERSION = {
+    1: SNAPSHOT_COLUMNAS,
+    2: SNAPSHOT_COLUMNAS + ("turnos_minuto_inicio", "turnos_minuto_fin", "reservas_minuto_inicio", "reservas_minuto_fin"),
+}
 
-    try:
-        opcion_texto = input("Seleccionar una opcion (1-7): ").strip()
-    except (EOFError, KeyboardInterrupt):
-        print("\nOperacion cancelada por el usuario.")
-        sys.exit()
-        
-    if opcion_texto == "":
-        print("Entrada vacia: ingrese un numero entre 1 and 7.")
-        continue
-    if not opcion_texto.isdigit():
-        print("Formato invalido: la opcion debe ser numerica entre 1 and 7.")
-        continue
-        
-    opcion = int(opcion_texto)
-    if opcion < 1 or opcion > 7:
-        print("Opcion fuera de rango: seleccione un valor entre 1 and 7.")
-        continue
+def _columna_snapshot(codigo, valores=()):
+    return array.array(codigo, valores)
 
-    if opcion == 1:
-        while True:
-            print("\n" + "=" * 60)
-            print("REGISTRAR RESERVACION".center(60))
-            print("=" * 60)
-            cancelar = False
+def _construir_snapshot(filas_clientes, filas_salas, filas_turnos, filas_reservas, contadores):
+    cadenas_indice = {}
+    cadenas_offsets = _columna_snapshot("Q", [0])
+    cadenas_datos = bytearray()
 
-            while True:
-                try:
-                    texto_fecha = input("\nIngrese fecha de reservacion (MM-DD-YYYY) o 'X' para cancelar: ").strip()
-                except (EOFError, KeyboardInterrupt):
-                    print("\nOperacion cancelada por el usuario.")
-                    cancelar = True
-                    break
-                    
-                if texto_fecha.upper() == "X":
-                    print("Operacion cancelada por el usuario.")
-                    cancelar = True
-                    break
-                    
-                if texto_fecha == "":
-                    print("Fecha invalida: el campo 'Fecha' esta vacio. Formato esperado: MM-DD-YYYY.")
-                    continue
-                    
-                if any(caracter.isalpha() for caracter in texto_fecha):
-                    print("Fecha invalida: hay letras en la fecha. Use solo digitos y guiones, ejemplo: 12-31-2025.")
-                    continue
-                if any(caracter in ",./\\" for caracter in texto_fecha) and "-" not in texto_fecha:
-                    print("Fecha invalida: separadores incorrectos. Use '-' entre mes, dia y año. Ejemplo: MM-DD-YYYY.")
-                    continue
-                try:
-                    fecha = datetime.datetime.strptime(texto_fecha, FORMATO_FECHA_INPUT).date()
-                except ValueError:
-                    print("Fecha invalida: formato incorrecto. Use MM-DD-YYYY, ejemplo: 12-31-2025.")
-                    continue
-                    
-                if fecha < datetime.date.today() + datetime.timedelta(days=2):
-                    print("Restriccion de antelacion: la fecha debe ser al menos dos dias posterior a hoy.")
-                    continue
-                    
-                if fecha.weekday() == 6:
-                    lunes_propuesto = fecha + datetime.timedelta(days=1)
-                    while True:
-                        try:
-                            respuesta_domingo = input(f"La fecha ingresada es domingo. Se propone {lunes_propuesto.strftime(FORMATO_FECHA_INPUT)}. Aceptar? (S/N) o 'X' para cancelar: ").strip().upper()
-                        except (EOFError, KeyboardInterrupt):
-                            print("\nOperacion cancelada por el usuario.")
-                            respuesta_domingo = "X"
-                            
-                        if respuesta_domingo == "X":
-                            cancelar = True
-                            break
-                        if respuesta_domingo == "":
-                            print("Respuesta vacia: escriba 'S' para aceptar o 'N' para rechazar.")
-                            continue
-                        if respuesta_domingo not in ("S", "N"):
-                            print("Respuesta invalida: escriba 'S' para aceptar o 'N' para rechazar.")
-                            continue
-                        if respuesta_domingo == "S":
-                            fecha = lunes_propuesto
-                            break
-                        else:
-                            print("Fecha domingo rechazada. Por favor ingrese una nueva fecha que no sea domingo.")
-                            break
-                            
-                    if cancelar:
-                        break
-                        
-                    if respuesta_domingo == "N":
-                        continue
-                    else:
-                        break
-                        
-                else:
-                    print(f"Fecha aceptada: {fecha.strftime(FORMATO_FECHA_INPUT)}")
-                    break
-                    
-            if cancelar:
-                break
+    def internar(texto):
+        indice = cadenas_indice.get(texto)
+        if indice is None:
+            indice = len(cadenas_indice)
+            cadenas_indice[texto] = indice
+            cadenas_datos.extend(texto.encode("utf-8"))
+            cadenas_offsets.append(len(cadenas_datos))
+        return indice
 
-            cliente_nombre_completo = ""
-            while True:
-                clientes_bd = []
-                try:
-                    with sqlite3.connect(DB_FILE) as conexion:
-                        conexion.row_factory = sqlite3.Row
-                        cursor = conexion.cursor()
-                        cursor.execute("SELECT cliente_id, apellidos, nombre FROM clientes ORDER BY apellidos, nombre")
-                        clientes_bd = cursor.fetchall()
-                        cursor.close()
-                except Exception as error:
-                    print(f"Error al leer lista de clientes desde BD: {error}")
-                    clientes_bd = []
+    columnas = {nombre: None for nombre in SNAPSHOT_COLUMNAS_POR_VERSION[SNAPSHOT_VERSION]}
+    columnas["clientes_id"] = _columna_snapshot("q")
+    columnas["clientes_nombre"] = _columna_snapshot("I")
+    columnas["clientes_apellidos"] = _columna_snapshot("I")
+    for cliente_id, nombre, apellidos in filas_clientes:
+        columnas["clientes_id"].append(cliente_id)
+        columnas["clientes_nombre"].append(internar(nombre))
+        columnas["clientes_apellidos"].append(internar(apellidos))
 
-                if not clientes_bd:
-                    print("\nNo hay clientes registrados. Use la opcion 5 para registrar un cliente.")
-                    cancelar = True
-                    break
+    columnas["salas_id"] = _columna_snapshot("q")
+    columnas["salas_nombre"] = _columna_snapshot("I")
+    columnas["salas_cupo"] = _columna_snapshot("q")
+    for sala_id, nombre, cupo in filas_salas:
+        columnas["salas_id"].append(sala_id)
+        columnas["salas_nombre"].append(internar(nombre))
+        columnas["salas_cupo"].append(cupo)
 
-                print("\n" + "-" * 50)
-                print("CLIENTES REGISTRADOS")
-                print("-" * 50)
-                for fila_cliente in clientes_bd:
-                    print(f"{fila_cliente['cliente_id']}: {fila_cliente['apellidos']}, {fila_cliente['nombre']}")
-                    
-                try:
-                    sel_cliente_texto = input("\nIngrese ID de cliente o 'X' para cancelar: ").strip()
-                except (EOFError, KeyboardInterrupt):
-                    print("\nOperacion cancelada por el usuario.")
-                    cancelar = True
-                    break
-                    
-                if sel_cliente_texto.upper() == "X":
-                    print("Operacion cancelada por el usuario.")
-                    cancelar = True
-                    break
-                    
-                if sel_cliente_texto == "":
-                    print("ID invalido: el campo esta vacio.")
-                    continue
-                if sel_cliente_texto == "0":
-                    print("ID invalido: el numero debe ser mayor a 0.")
-                    continue
-                if not sel_cliente_texto.isdigit():
-                    print("ID invalido: no se aceptan letras en el ID del cliente.")
-                    continue
-                    
-                cliente_id = int(sel_cliente_texto)
-                encontrado = any(fila_cliente['cliente_id'] == cliente_id for fila_cliente in clientes_bd)
-                if not encontrado:
-                    print(f"ID {cliente_id} no encontrado en la base de datos. Ingrese un ID valido de la lista.")
-                    continue
-                    
-                cliente_seleccionado = next((fila_cliente for fila_cliente in clientes_bd if fila_cliente['cliente_id'] == cliente_id), None)
-                if cliente_seleccionado:
-                    cliente_nombre_completo = f"{cliente_seleccionado['apellidos']}, {cliente_seleccionado['nombre']}"
-                    print(f"Cliente seleccionado: {cliente_nombre_completo}")
-                break
-                
-            if cancelar:
-                break
+    columnas["turnos_id"] = _columna_snapshot("q")
+    columnas["turnos_descripcion"] = _columna_snapshot("I")
+    columnas["turnos_minuto_inicio"] = _columna_snapshot("i")
+    columnas["turnos_minuto_fin"] = _columna_snapshot("i")
+    for turno_id, descripcion, minuto_inicio, minuto_fin in filas_turnos:
+        columnas["turnos_id"].append(turno_id)
+        columnas["turnos_descripcion"].append(internar(descripcion))
+        columnas["turnos_minuto_inicio"].append(-1 if minuto_inicio is None else minuto_inicio)
+        columnas["turnos_minuto_fin"].append(-1 if minuto_fin is None else minuto_fin)
 
-            fecha_norm_texto = fecha.strftime(FORMATO_FECHA_ISO)
-            disponibles = []
-            try:
-                with sqlite3.connect(DB_FILE) as conexion:
-                    conexion.row_factory = sqlite3.Row
-                    cursor = conexion.cursor()
-                    
-                    cursor.execute("SELECT sala_id, nombre, cupo FROM salas ORDER BY nombre")
-                    filas_salas = cursor.fetchall()
-                    
-                    cursor.execute("SELECT turno_id, descripcion FROM turnos ORDER BY turno_id")
-                    filas_turnos = cursor.fetchall()
-                    cursor.close()
-                    
-                for fila_sala in filas_salas:
-                    sala_id_tmp = fila_sala['sala_id']
-                    sala_nombre_tmp = fila_sala['nombre']
-                    sala_cupo_tmp = fila_sala['cupo']
-                    
-                    for fila_turno in filas_turnos:
-                        turno_id_tmp = fila_turno['turno_id']
-                        turno_desc_tmp = fila_turno['descripcion']
-                        
-                        try:
-                            with sqlite3.connect(DB_FILE) as conexion_check:
-                                cursor_check = conexion_check.cursor()
-                                cursor_check.execute("SELECT 1 FROM reservas WHERE sala_id=? AND fecha_normalizada=? AND turno_id=? AND activo=1",
-                                                     (sala_id_tmp, fecha_norm_texto, turno_id_tmp))
-                                ocupado_bd = cursor_check.fetchone() is not None
-                                cursor_check.close()
-                        except Exception as error:
-                            print(f"Error verificando disponibilidad: {error}")
-                            ocupado_bd = True
-                            
-                        if not ocupado_bd:
-                            disponibles.append((sala_id_tmp, sala_nombre_tmp, sala_cupo_tmp, turno_desc_tmp))
-                            
-            except Exception as error:
-                print(f"Error al leer salas desde BD: {error}")
-                disponibles = []
+    columnas["reservas_folio"] = _columna_snapshot("q")
+    columnas["reservas_cliente_id"] = _columna_snapshot("q")
+    columnas["reservas_sala_id"] = _columna_snapshot("q")
+    columnas["reservas_fecha"] = _columna_snapshot("I")
+    columnas["reservas_turno_id"] = _columna_snapshot("q")
+    columnas["reservas_evento"] = _columna_snapshot("I")
+    columnas["reservas_activo"] = _columna_snapshot("B")
+    columnas["reservas_minuto_inicio"] = _columna_snapshot("i")
+    columnas["reservas_minuto_fin"] = _columna_snapshot("i")
+    for folio, cliente_id, sala_id, fecha_dt, turno_id, evento, activo, minuto_inicio, minuto_fin in filas_reservas:
+        columnas["reservas_folio"].append(folio)
+        columnas["reservas_cliente_id"].append(cliente_id)
+        columnas["reservas_sala_id"].append(sala_id)
+        columnas["reservas_fecha"].append(fecha_dt.toordinal())
+        columnas["reservas_turno_id"].append(turno_id)
+        columnas["reservas_evento"].append(internar(evento))
+        columnas["reservas_activo"].append(1 if activo else 0)
+        columnas["reservas_minuto_inicio"].append(-1 if minuto_inicio is None else minuto_inicio)
+        columnas["reservas_minuto_fin"].append(-1 if minuto_fin is None else minuto_fin)
 
-            if not disponibles:
-                print("\n" + "-" * 60)
-                print("NO HAY SALAS DISPONIBLES")
-                print("-" * 60)
-                print(f"Para la fecha: {fecha.strftime(FORMATO_FECHA_INPUT)}")
-                print("No existen salas con turnos libres.")
-                print("\nSugerencias:")
-                print("Seleccione otra fecha")
-                print("Registre mas salas (Opcion 6)")
-                print("-" * 60)
-                
-                while True:
-                    try:
-                        reintentar = input("\n¿Desea intentar con otra fecha? (S/N): ").strip().upper()
+    columnas["cadenas_offsets"] = cadenas_offsets
+    columnas["cadenas_datos"] = _columna_snapshot("B", bytes(cadenas_datos))
+    columnas["contadores"] = _columna_snapshot("q", contadores)
+    return columnas
+
+def _escribir_snapshot(ruta, columnas, comprimir=False):
+    cuerpo = bytearray()
+    for nombre in SNAPSHOT_COLUMNAS_POR_VERSION[SNAPSHOT_VERSION]:
+        columna = columnas[nombre]
+        if sys.byteorder != "little":
+            columna = array.array(columna.typecode, columna)
+            columna.byteswap()
+        cuerpo.extend(SNAPSHOT_COLUMNA.pack(columna.typecode.encode("ascii"), len(columna)))
+        cuerpo.extend(columna.tobytes())
+        cuerpo.extend(b"\x00" * (-len(cuerpo) % 8))
+    banderas = 0
+    longitud = len(cuerpo)
+    if comprimir:
+        cuerpo = zlib.compress(bytes(cuerpo), 6)
+        banderas |= SNAPSHOT_FLAG_ZLIB
+    ruta_tmp = ruta + ".tmp"
+    with open(ruta_tmp, "wb") as archivo:
+        archivo.write(SNAPSHOT_CABECERA.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, banderas, longitud))
+        archivo.write(cuerpo)
+    os.replace(ruta_tmp, ruta)
+
+def abrir_snapshot(ruta):
+    archivo = open(ruta, "rb")
+    try:
+        cabecera = archivo.read(SNAPSHOT_CABECERA.size)
+        if len(cabecera) < SNAPSHOT_CABECERA.size:
+            raise ValueError(f"Snapshot truncado: {ruta}")
+        magic, version, banderas, longitud = SNAPSHOT_CABECERA.unpack(cabecera)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"El archivo {ruta} no es un snapshot de estado")
+        if version not in SNAPSHOT_COLUMNAS_POR_VERSION:
+            raise ValueError(f"Version de snapshot no soportada: {version}")
+        mapa = None
+        if banderas & SNAPSHOT_FLAG_ZLIB:
+            vista = memoryview(zlib.decompress(archivo.read()))
+        else:
+            mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+            vista = memoryview(mapa)[SNAPSHOT_CABECERA.size:]
+        if len(vista) != longitud:
+            raise ValueError(f"Snapshot corrupto: se esperaban {longitud} bytes y hay {len(vista)}")
+    except Exception:
+        archivo.close()
+        raise
+
+    columnas = {}
+    posicion = 0
+    for nombre in SNAPSHOT_COLUMNAS_POR_VERSION[version]:
+        codigo, cantidad = SNAPSHOT_COLUMNA.unpack_from(vista, posicion)
+        codigo = codigo.decode("ascii")
+        posicion += SNAPSHOT_COLUMNA.size
+        tamano = array.array(codigo).itemsize * cantidad
+        datos = vista[posicion:posicion + tamano]
+        if sys.byteorder != "little":
+            columna = array.array(codigo, datos.tobytes())
+            columna.byteswap()
+            columnas[nombre] = memoryview(columna)
+        else:
+            columnas[nombre] = datos.cast(codigo)
+        posicion += tamano + (-tamano % 8)
+
+    return {
+        "ruta": ruta,
+        "version": version,
+        "comprimido": bool(banderas & SNAPSHOT_FLAG_ZLIB),
+        "columnas": columnas,
+        "_archivo": archivo,
+        "_mapa": mapa,
+        "_vista": vista,
+    }
+
+def cerrar_snapshot(snapshot):
+    for columna in snapshot["columnas"].values():
+        columna.release()
+    snapshot["columnas"] = {}
+    snapshot["_vista"].release()
+    if snapshot["_mapa"] is not None:
+        snapshot["_mapa"].close()
+    snapshot["_archivo"].close()
+
+def cadena_snapshot(snapshot, indice):
+    offsets = snapshot["columnas"]["cadenas_offsets"]
+    datos = snapshot["columnas"]["cadenas_datos"]
+    return bytes(datos[offsets[indice]:offsets[indice + 1]]).decode("utf-8")
+
+def _minutos_snapshot(columnas, nombre, cantidad):
+    if nombre not in columnas:
+        return itertools.repeat(None, cantidad)
+    return (None if minuto < 0 else minuto for minuto in columnas[nombre])
+
+def _filas_snapshot(snapshot):
+    columnas = snapshot["columnas"]
+    cadena = functools.lru_cache(maxsize=None)(functools.partial(cadena_snapshot, snapshot))
+    filas_clientes = zip(columnas["clientes_id"], map(cadena, columnas["clientes_nombre"]), map(cadena, columnas["clientes_apellidos"]))
+    filas_salas = zip(columnas["salas_id"], map(cadena, columnas["salas_nombre"]), columnas["salas_cupo"])
+    filas_turnos = list(zip(
+        columnas["turnos_id"],
+        map(cadena, columnas["turnos_descripcion"]),
+        _minutos_snapshot(columnas, "turnos_minuto_inicio", len(columnas["turnos_id"])),
+        _minutos_snapshot(columnas, "turnos_minuto_fin", len(columnas["turnos_id"])),
+    ))
+    filas_reservas = zip(
+        columnas["reservas_folio"],
+        columnas["reservas_cliente_id"],
+        columnas["reservas_sala_id"],
+        map(datetime.date.fromordinal, columnas["reservas_fecha"]),
+        columnas["reservas_turno_id"],
+        map(cadena, columnas["reservas_evento"]),
+        columnas["reservas_activo"],
+        _minutos_snapshot(columnas, "reservas_minuto_inicio", len(columnas["reservas_folio"])),
+        _minutos_snapshot(columnas, "reservas_minuto_fin", len(columnas["reservas_folio"])),
+    )
+    return filas_clientes, filas_salas, filas_turnos, filas_reservas
+
+@instrumentado("snapshot.exportar")
+def exportar_estado_snapshot(ruta, comprimir=False):
+    asegurar_tablas()
+    try:
+        with conectar_bd() as conexion:
+            cursor = conexion.cursor()
+            cursor.execute("SELECT cliente_id, nombre, apellidos FROM clientes ORDER BY cliente_id")
+            filas_clientes = cursor.fetchall()
+            cursor.execute("SELECT sala_id, nombre, cupo FROM salas ORDER BY sala_id")
+            filas_salas = cursor.fetchall()
+            cursor.execute("SELECT turno_id, descripcion, minuto_inicio, minuto_fin FROM turnos ORDER BY turno_id")
+            filas_turnos = cursor.fetchall()
+            cursor.execute("SELECT (SELECT MAX(cliente_id) FROM clientes), (SELECT MAX(sala_id) FROM salas), (SELECT MAX(folio) FROM reservas)")
+            max_cliente, max_sala, max_folio = cursor.fetchone()
+            contadores = [(max_cliente or 0) + 1, (max_sala or 0) + 1, (max_folio or 1000) + 1]
+            cursor.execute("SELECT folio, cliente_id, sala_id, fecha_normalizada, turno_id, evento, activo, minuto_inicio, minuto_fin FROM reservas ORDER BY folio")
+            filas_reservas = ((folio, cliente_id, sala_id, datetime.date.fromisoformat(fecha_texto), turno_id, evento, activo, minuto_inicio, minuto_fin)
+                              for folio, cliente_id, sala_id, fecha_texto, turno_id, evento, activo, minuto_inicio, minuto_fin in cursor)
+            columnas = _construir_snapshot(filas_clientes, filas_salas, filas_turnos, filas_reservas, contadores)
+            cursor.close()
+        _escribir_snapshot(ruta, columnas, comprimir)
+        print(f"Snapshot de estado guardado como: {ruta} ({len(columnas['reservas_folio'])} reservaciones)")
+        return True
+    except Exception as error:
+        print(f"Error al exportar snapshot de estado: {error}")
+        return False
+
+@instrumentado("snapshot.importar")
+def importar_estado_snapshot(ruta):
+    asegurar_tablas()
+    try:
+        snapshot = abrir_snapshot(ruta)
+        try:
+            filas_clientes, filas_salas, filas_turnos, filas_reservas = _filas_snapshot(snapshot)
+            with conectar_bd() as conexion:
+                cursor = conexion.cursor()
+                cursor.execute("SELECT COUNT(*) FROM reservas")
+                if cursor.fetchone()[0]:
+                    print("La base de datos ya contiene reservaciones; importe el snapshot en una BD vacia.")
+                    return False
+                cursor.executemany("INSERT OR REPLACE INTO turnos (turno_id, descripcion, minuto_inicio, minuto_fin) VALUES (?,?,?,?)", filas_turnos)
+                cursor.executemany("INSERT OR REPLACE INTO clientes (cliente_id, nombre, apellidos) VALUES (?,?,?)", filas_clientes)
+                cursor.executemany("INSERT OR REPLACE INTO salas (sala_id, nombre, cupo) VALUES (?,?,?)", filas_salas)
+                cursor.executemany("INSERT INTO reservas (folio, cliente_id, sala_id, fecha_normalizada, turno_id, evento, activo, minuto_inicio, minuto_fin) VALUES (?,?,?,?,?,?,?,?,?)",
+                                   ((folio, cliente_id, sala_id, fecha_dt.strftime(FORMATO_FECHA_ISO), turno_id, evento, activo, minuto_inicio, minuto_fin)
+                                    for folio, cliente_id, sala_id, fecha_dt, turno_id, evento, activo, minuto_inicio, minuto_fin in filas_reservas))
+                conexion.commit()
+                cursor.close()
+        finally:
+            cerrar_snapshot(snapshot)
+        if not cargar_estado_desde_snapshot(ruta):
+            cargar_estado_desde_bd()
+        print(f"Snapshot {ruta} importado en {DB_FILE}")
+        return True
+    except Exception as error:
+        print(f"Error al importar snapshot de estado: {error}")
+        return False
+
+def _turno_reserva_snapshot(descripcion_turno, turno_id, minuto_inicio, minuto_fin):
+    if turno_id == TURNO_HORARIO_ID and minuto_inicio is not None and minuto_fin is not None:
+        return formatear_intervalo(minuto_inicio, minuto_fin)
+    return descripcion_turno.get(turno_id)
+
+@instrumentado("snapshot.cargar_estado")
+def cargar_estado_desde_snapshot(ruta):
+    global clientes, salas, turnos, reservas, next_cliente_id, next_sala_id, next_folio
+    try:
+        snapshot = abrir_snapshot(ruta)
+    except Exception as error:
+        print(f"No se pudo abrir el snapshot {ruta}: {error}")
+        return False
+    try:
+        filas_clientes, filas_salas, filas_turnos, filas_reservas = _filas_snapshot(snapshot)
+        nuevos_clientes = sorted(({"id": cliente_id, "nombre": nombre, "apellidos": apellidos} for cliente_id, nombre, apellidos in filas_clientes),
+                                 key=lambda cliente: (cliente["apellidos"], cliente["nombre"]))
+        nuevas_salas = sorted(({"id": sala_id, "nombre": nombre, "cupo": cupo} for sala_id, nombre, cupo in filas_salas),
+                              key=lambda sala: sala["nombre"])
+        nuevos_turnos = [{"id": turno_id, "descripcion": descripcion} for turno_id, descripcion, _, _ in filas_turnos]
+        descripcion_turno = {turno_id: descripcion for turno_id, descripcion, _, _ in filas_turnos}
+        nuevas_reservas = [{
+            "folio": folio,
+            "cliente_id": cliente_id,
+            "sala_id": sala_id,
+            "fecha": fecha_dt,
+            "turno_id": turno_id,
+            "turno": _turno_reserva_snapshot(descripcion_turno, turno_id, minuto_inicio, minuto_fin),
+            "evento": evento,
+            "activo": activo
+        } for folio, cliente_id, sala_id, fecha_dt, turno_id, evento, activo, minuto_inicio, minuto_fin in filas_reservas if activo == 1]
+        contadores = snapshot["columnas"]["contadores"].tolist()
+    except Exception as error:
+        print(f"Error al cargar el snapshot {ruta}: {error}")
+        return False
+    finally:
+        cerrar_snapshot(snapshot)
+    clientes, salas, turnos, reservas = nuevos_clientes, nuevas_salas, nuevos_turnos, nuevas_reservas
+    next_cliente_id, next_sala_id, next_folio = contadores
+    return True
+
+@instrumentado("snapshot.desde_json")
+def convertir_json_a_snapshot(ruta_json, ruta_snapshot, comprimir=False):
+    try:
+        with open(ruta_json, "r", encoding="utf-8") as archivo_json:
+            estado = json.load(archivo_json)
+        turnos_por_descripcion = {"Horario": TURNO_HORARIO_ID, "Matutino": 1, "Vespertino": 2, "Nocturno": 3}
+        intervalos_turno = dict(INTERVALOS_TURNO_PREDETERMINADOS)
+        intervalos_turno[TURNO_HORARIO_ID] = (0, MINUTOS_DIA)
+        for reserva in estado.get("reservas", []):
+            if reserva["turno"] not in turnos_por_descripcion:
+                turnos_por_descripcion[reserva["turno"]] = len(turnos_por_descripcion)
+        filas_reservas = []
+        for reserva in estado.get("reservas", []):
+            minuto_inicio = minuto_fin = None
+            if reserva.get("horario"):
+                texto_inicio, texto_fin = reserva["horario"].split("-")
+                minuto_inicio, minuto_fin = interpretar_hora(texto_inicio), interpretar_hora(texto_fin)
+            filas_reservas.append((reserva["folio"], reserva["cliente_id"], reserva["sala_id"],
+                                   datetime.datetime.strptime(reserva["fecha"], FORMATO_FECHA_ISO).date(),
+                                   turnos_por_descripcion[reserva["turno"]], reserva["evento"], reserva.get("activo", 1),
+                                   minuto_inicio, minuto_fin))
+        columnas = _construir_snapshot(
+            [(cliente["id"], cliente["nombre"], cliente["apellidos"]) for cliente in estado.get("clientes", [])],
+            [(sala["id"], sala["nombre"], sala["cupo"]) for sala in estado.get("salas", [])],
+            [(turno_id, descripcion) + intervalos_turno.get(turno_id, (None, None))
+             for descripcion, turno_id in turnos_por_descripcion.items()],
+            filas_reservas,
+            [estado.get("next_cliente_id", 1), estado.get("next_sala_id", 1), estado.get("next_folio", 1001)],
+        )
+        _escribir_snapshot(ruta_snapshot, columnas, comprimir)
+        print(f"Estado {ruta_json} convertido a snapshot: {ruta_snapshot}")
+        return True
+    except Exception as error:
+        print(f"Error al convertir JSON a snapshot: {error}")
+        return False
+
+@instrumentado("snapshot.a_json")
+def convertir_snapshot_a_json(ruta_snapshot, ruta_json):
+    try:
+        snapshot = abrir_snapshot(ruta_snapshot)
+        try:
+            filas_clientes, filas_salas, filas_turnos, filas_reservas = _filas_snapshot(snapshot)
+            descripcion_turno = {turno_id: descripcion for turno_id, descripcion, _, _ in filas_turnos}
+            next_cliente, next_sala, next_folio_snapshot = snapshot["columnas"]["contadores"].tolist()
+            estado = {
+                "clientes": [{"id": cliente_id, "nombre": nombre, "apellidos": apellidos} for cliente_id, nombre, apellidos in filas_clientes],
+                "salas": [{"id": sala_id, "nombre": nombre, "cupo": cupo} for sala_id, nombre, cupo in filas_salas],
+                "reservas": [],
+                "next_cliente_id": next_cliente,
+                "next_sala_id": next_sala,
+                "next_folio": next_folio_snapshot,
+            }
+            for folio, cliente_id, sala_id, fecha_dt, turno_id, evento, activo, minuto_inicio, minuto_fin in filas_reservas:
+                if activo != 1:
+                    continue
+                reserva = {
+                    "folio": folio,
+                    "cliente_id": cliente_id,
+                    "sala_id": sala_id,
+                    "fecha": fecha_dt.strftime(FORMATO_FECHA_ISO),
+                    "turno": descripcion_turno.get(turno_id),
+                    "evento": evento
+                }
+                if turno_id == TURNO_HORARIO_ID and minuto_inicio is not None:
+                    reserva["horario"] = formatear_intervalo(minuto_inicio, minuto_fin)
+                estado["reservas"].append(reserva)
+        finally:
+            cerrar_snapshot(snapshot)
+        with open(ruta_json, "w", encoding="utf-8") as archivo_json:
+            json.dump(estado, archivo_json, ensure_ascii=False, indent=2)
+        print(f"Snapshot {ruta_snapshot} convertido a JSON: {ruta_json}")
+        return True
+    except Exception as error:
+        print(f"Error al convertir snapshot a JSON: {error}")
+        return False
+
+EXPORTADORES = {
+    "csv": exportar_reporte_csv,
+    "json": exportar_reporte_json,
+    "xlsx": exportar_reporte_excel,
+}
+
+CONSULTA_REPORTE_RANGO = """
+SELECT 
+    r.folio,
+    r.fecha_normalizada,
+    c.nombre as cliente_nombre,
+    c.apellidos as cliente_apellidos,
+    s.nombre as sala_nombre,
+    s.cupo,
+    CASE WHEN r.turno_id = 0 THEN printf('%02d:%02d-%02d:%02d', r.minuto_inicio / 60, r.minuto_inicio % 60, r.minuto_fin / 60, r.minuto_fin % 60) ELSE t.descripcion END as turno_descripcion,
+    r.evento
+FROM reservas r
+INNER JOIN clientes c ON r.cliente_id = c.cliente_id
+INNER JOIN salas s ON r.sala_id = s.sala_id
+INNER JOIN turnos t ON r.turno_id = t.turno_id
+WHERE r.fecha_normalizada BETWEEN ? AND ? AND r.activo = 1
+ORDER BY r.fecha_normalizada, r.folio
+"""
+
+def conectar_solo_lectura(ruta_bd):
+    return _abrir_conexion(pathlib.Path(ruta_bd).resolve().as_uri() + "?mode=ro", uri=True)
+
+def ruta_lectura(permitir_replica=False):
+    if permitir_replica and ruta_replica and os.path.exists(ruta_replica):
+        return ruta_replica
+    return DB_FILE
+
+def conectar_lectura(permitir_replica=False):
+    try:
+        return conectar_solo_lectura(ruta_lectura(permitir_replica))
+    except sqlite3.OperationalError:
+        return conectar_bd()
+
+def refrescar_replica(ruta_destino=None, ruta_origen=None, paginas=1024, pausa=0.0):
+    global replica_actualizada
+    ruta_destino = ruta_destino or ruta_replica
+    ruta_temporal = ruta_destino + ".tmp"
+    if os.path.exists(ruta_temporal):
+        os.remove(ruta_temporal)
+    inicio = time.perf_counter()
+    origen = conectar_bd(ruta_origen)
+    copia = sqlite3.connect(ruta_temporal)
+    try:
+        origen.backup(copia, pages=paginas, sleep=pausa)
+        copia.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        copia.close()
+        origen.close()
+    os.replace(ruta_temporal, ruta_destino)
+    if ruta_destino == ruta_replica:
+        replica_actualizada = datetime.datetime.now()
+    return time.perf_counter() - inicio
+
+def _ciclo_replica(intervalo, parada):
+    while not parada.wait(intervalo):
+        try:
+            with medir("replica.refrescar"):
+                refrescar_replica()
+        except Exception as error:
+            print(f"\nAdvertencia: no se pudo refrescar la replica de lectura: {error}")
+
+def configurar_replica(ruta, intervalo=60):
+    global ruta_replica
+    ruta_replica = ruta
+    try:
+        refrescar_replica()
+    except Exception as error:
+        print(f"Advertencia: no se pudo crear la replica de lectura {ruta}: {error}")
+        ruta_replica = None
+        return False
+    if intervalo and intervalo > 0:
+        threading.Thread(target=_ciclo_replica, args=(intervalo, parada_replica), name="replica", daemon=True).start()
+    return True
+
+PAGINAS_RESPALDO = 1024
+PAUSA_RESPALDO = 0.005
+REINICIOS_RESPALDO_MAXIMOS = 2
+
+def _progreso_respaldo(estado, inicio, mostrar):
+    def progreso(_, restantes, total):
+        if estado["restantes"] is not None and restantes > estado["restantes"]:
+            estado["reinicios"] += 1
+        estado["restantes"], estado["total"] = restantes, total
+        if mostrar and total:
+            segundos = time.perf_counter() - inicio
+            copiadas = total - restantes
+            print(f"\r  Respaldo: {100.0 * copiadas / total:5.1f}% ({copiadas}/{total} paginas, "
+                  f"{copiadas * estado['tamano_pagina'] / 1048576 / max(segundos, 1e-9):.1f} MB/s)",
+                  end="", file=sys.stderr, flush=True)
+        if estado["reinicios"] > REINICIOS_RESPALDO_MAXIMOS:
+            raise InterruptedError("el respaldo se reinicio demasiadas veces por escrituras concurrentes")
+    return progreso
+
+@instrumentado("bd.respaldar")
+def respaldar_bd(destino, paginas=None, pausa=PAUSA_RESPALDO, comprimir=False, verificar=True,
+                 mostrar_progreso=False, ruta_bd=None):
+    ruta_copia = (destino[:-3] if destino.endswith(".gz") else destino) + ".tmp"
+    if os.path.exists(ruta_copia):
+        os.remove(ruta_copia)
+    inicio = time.perf_counter()
+    origen = conectar_bd(ruta_bd)
+    if paginas is None:
+        paginas = -1 if origen.execute("PRAGMA journal_mode").fetchone()[0] == "wal" else PAGINAS_RESPALDO
+    estado = {"restantes": None, "total": 0, "reinicios": 0,
+              "tamano_pagina": origen.execute("PRAGMA page_size").fetchone()[0]}
+    copia = sqlite3.connect(ruta_copia)
+    try:
+        try:
+            origen.backup(copia, pages=paginas, sleep=pausa, progress=_progreso_respaldo(estado, inicio, mostrar_progreso))
+        except InterruptedError:
+            estado["reinicios"] += 1
+            origen.backup(copia)
+        copia.execute("PRAGMA journal_mode = DELETE")
+        integridad = None
+        if verificar:
+            integridad = [fila[0] for fila in copia.execute("PRAGMA integrity_check")]
+        paginas_copiadas = copia.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        copia.close()
+        origen.close()
+    if mostrar_progreso:
+        print(file=sys.stderr)
+    segundos_copia = time.perf_counter() - inicio
+    if integridad is not None and integridad != ["ok"]:
+        os.remove(ruta_copia)
+        return {"ok": False, "integridad": integridad, "reinicios": estado["reinicios"]}
+    if comprimir:
+        destino = destino if destino.endswith(".gz") else destino + ".gz"
+        with open(ruta_copia, "rb") as entrada, gzip.open(destino + ".tmp", "wb", compresslevel=6) as salida:
+            shutil.copyfileobj(entrada, salida, 1 << 20)
+        os.remove(ruta_copia)
+        ruta_copia = destino + ".tmp"
+    os.replace(ruta_copia, destino)
+    segundos = time.perf_counter() - inicio
+    bytes_copiados = paginas_copiadas * estado["tamano_pagina"]
+    return {"ok": True, "destino": destino, "paginas": paginas_copiadas, "bytes": bytes_copiados,
+            "bytes_archivo": os.path.getsize(destino), "segundos_copia": segundos_copia, "segundos": segundos,
+            "mb_s": bytes_copiados / 1048576 / max(segundos_copia, 1e-9), "reinicios": estado["reinicios"],
+            "integridad": integridad}
+
+ENCABEZADOS_REPORTE_SEDES = ["SEDE", "FOLIO", "FECHA", "CLIENTE", "SALA", "CUPO", "TURNO", "EVENTO"]
+MODOS_FEDERADOS = ("serie", "hilos", "procesos", "attach")
+sedes = {}
+
+def cargar_sedes(ruta):
+    with open(ruta, encoding="utf-8") as archivo:
+        configuracion = json.load(archivo)
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    cargadas = {}
+    for nombre, ruta_sede in configuracion.items():
+        if not re.fullmatch(r"\w+", nombre):
+            raise ValueError(f"nombre de sede invalido '{nombre}': use solo letras, digitos y guion bajo")
+        cargadas[nombre] = os.path.join(directorio, ruta_sede)
+    sedes.clear()
+    sedes.update(cargadas)
+    return sedes
+
+def ruta_sede(sede):
+    if sede not in sedes:
+        raise KeyError(f"La sede '{sede}' no existe; sedes configuradas: {', '.join(sedes) or 'ninguna'}")
+    return sedes[sede]
+
+def reservar_en_sede(sede, cliente_id, sala_id, fecha_dt, turno_id, evento, minuto_inicio, minuto_fin, clave=None):
+    return confirmar_reserva(cliente_id, sala_id, fecha_dt, turno_id, evento, minuto_inicio, minuto_fin,
+                             clave=clave, ruta_bd=ruta_sede(sede))
+
+def _consulta_reporte_sede(sede, esquema="main"):
+    return f"""
+SELECT
+    '{sede}',
+    r.folio,
+    r.fecha_normalizada,
+    c.apellidos || ', ' || c.nombre,
+    s.nombre,
+    s.cupo,
+    CASE WHEN r.turno_id = 0 THEN printf('%02d:%02d-%02d:%02d', r.minuto_inicio / 60, r.minuto_inicio % 60, r.minuto_fin / 60, r.minuto_fin % 60) ELSE t.descripcion END,
+    r.evento
+FROM {esquema}.reservas r
+INNER JOIN {esquema}.clientes c ON r.cliente_id = c.cliente_id
+INNER JOIN {esquema}.salas s ON r.sala_id = s.sala_id
+INNER JOIN {esquema}.turnos t ON r.turno_id = t.turno_id
+WHERE r.fecha_normalizada BETWEEN :inicio AND :fin AND r.activo = 1
+"""
+
+def _consulta_disponibilidad_sede(sede, esquema="main"):
+    return f"""
+SELECT '{sede}', s.sala_id, s.nombre, s.cupo, t.descripcion
+FROM {esquema}.salas s CROSS JOIN {esquema}.turnos t
+WHERE t.turno_id <> {TURNO_HORARIO_ID}
+  AND NOT EXISTS (
+    SELECT 1 FROM {esquema}.reservas r
+    WHERE r.sala_id = s.sala_id AND r.fecha_normalizada = :fecha AND r.activo = 1
+      AND r.minuto_inicio < COALESCE(t.minuto_fin, {MINUTOS_DIA}) AND r.minuto_fin > COALESCE(t.minuto_inicio, 0))
+  AND NOT EXISTS (
+    SELECT 1 FROM {esquema}.retenciones h
+    WHERE h.sala_id = s.sala_id AND h.fecha_normalizada = :fecha AND h.expira > :ahora
+      AND h.minuto_inicio < COALESCE(t.minuto_fin, {MINUTOS_DIA}) AND h.minuto_fin > COALESCE(t.minuto_inicio, 0))
+"""
+
+def _consultar_sede(ruta_bd, consulta, parametros):
+    conexion = conectar_solo_lectura(ruta_bd)
+    try:
+        return conexion.execute(consulta, parametros).fetchall()
+    finally:
+        conexion.close()
+
+def _consulta_federada(generar_consulta, parametros, orden, modo, nombres=None):
+    nombres = list(nombres or sedes)
+    if modo == "attach":
+        if len(nombres) > 10:
+            raise ValueError("SQLite admite como maximo 10 BD adjuntas; use los modos hilos o procesos")
+        conexion = _abrir_conexion(":memory:")
+        try:
+            for indice, nombre in enumerate(nombres):
+                conexion.execute(f"ATTACH DATABASE ? AS sede_{indice}",
+                                 (pathlib.Path(ruta_sede(nombre)).resolve().as_uri() + "?mode=ro",))
+            consulta = " UNION ALL ".join(generar_consulta(nombre, f"sede_{indice}") for indice, nombre in enumerate(nombres))
+            return conexion.execute(f"SELECT * FROM ({consulta}) ORDER BY {orden}", parametros).fetchall()
+        finally:
+            conexion.close()
+    tareas = [(ruta_sede(nombre), generar_consulta(nombre) + f" ORDER BY {orden}", parametros) for nombre in nombres]
+    if modo == "serie":
+        partes = [_consultar_sede(*tarea) for tarea in tareas]
+    else:
+        ejecutor = (concurrent.futures.ProcessPoolExecutor if modo == "procesos" else concurrent.futures.ThreadPoolExecutor)
+        with ejecutor(max_workers=min(len(tareas), os.cpu_count() or 1)) as grupo:
+            partes = list(grupo.map(_consultar_sede, *zip(*tareas)))
+    return partes
+
+@instrumentado("reporte.sedes")
+def reporte_sedes(fecha_inicio, fecha_fin, modo="hilos", nombres=None):
+    parametros = {"inicio": fecha_inicio.strftime(FORMATO_FECHA_ISO), "fin": fecha_fin.strftime(FORMATO_FECHA_ISO)}
+    resultado = _consulta_federada(_consulta_reporte_sede, parametros, "3, 2, 1", modo, nombres)
+    if modo == "attach":
+        return resultado
+    return list(heapq.merge(*resultado, key=lambda fila: (fila[2], fila[1], fila[0])))
+
+@instrumentado("bd.disponibilidad_sedes")
+def disponibilidad_sedes(fecha_dt, modo="hilos", nombres=None):
+    parametros = {"fecha": fecha_dt.strftime(FORMATO_FECHA_ISO), "ahora": time.time()}
+    resultado = _consulta_federada(_consulta_disponibilidad_sede, parametros, "1, 3, 2", modo, nombres)
+    if modo == "attach":
+        return resultado
+    return list(heapq.merge(*resultado, key=lambda fila: (fila[0], fila[2], fila[1])))
+
+def imprimir_reporte_sedes(filas, fecha_inicio, fecha_fin):
+    if not filas:
+        print(f"No hay reservaciones en ninguna sede entre {fecha_inicio.strftime(FORMATO_FECHA_INPUT)} "
+              f"y {fecha_fin.strftime(FORMATO_FECHA_INPUT)}.")
+        return
+    imprimir_tabla(([sede, folio, datetime.datetime.strptime(fecha, FORMATO_FECHA_ISO).strftime(FORMATO_FECHA_INPUT),
+                     cliente, sala, cupo, turno, evento]
+                    for sede, folio, fecha, cliente, sala, cupo, turno, evento in filas),
+                   ENCABEZADOS_REPORTE_SEDES)
+
+def _fecha_argumento(texto):
+    try:
+        return datetime.datetime.strptime(texto, FORMATO_FECHA_INPUT).date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha invalida '{texto}', use MM-DD-YYYY")
+
+COLUMNAS_PARTICION = "folio, cliente_id, sala_id, fecha_normalizada, turno_id, evento, activo, minuto_inicio, minuto_fin"
+ANIOS_PARTICIONES_FUTURAS = 1
+LOTE_COPIA_PARTICION = 5000
+
+def _periodos_particion(por, fecha_inicio, fecha_fin):
+    periodos = []
+    desde = datetime.date(fecha_inicio.year, 1 if por == "anio" else fecha_inicio.month, 1)
+    while desde <= fecha_fin:
+        if por == "anio":
+            hasta = datetime.date(desde.year + 1, 1, 1)
+            nombre = f"reservas_{desde.year}"
+        else:
+            hasta = datetime.date(desde.year + desde.month // 12, desde.month % 12 + 1, 1)
+            nombre = f"reservas_{desde.year}{desde.month:02d}"
+        periodos.append((nombre, desde.strftime(FORMATO_FECHA_ISO), hasta.strftime(FORMATO_FECHA_ISO)))
+        desde = hasta
+    return periodos
+
+def _ddl_particion(tabla, desde, hasta):
+    return [f"""
+CREATE TABLE IF NOT EXISTS {tabla} (
+  folio INTEGER NOT NULL,
+  cliente_id INTEGER NOT NULL,
+  sala_id INTEGER NOT NULL,
+  fecha_normalizada DATE NOT NULL CHECK (fecha_normalizada >= '{desde}' AND fecha_normalizada < '{hasta}'),
+  turno_id INTEGER NOT NULL,
+  evento TEXT NOT NULL,
+  activo INTEGER NOT NULL,
+  minuto_inicio INTEGER,
+  minuto_fin INTEGER,
+  PRIMARY KEY (fecha_normalizada, folio)
+) WITHOUT ROWID
+"""]
+
+DISPARADORES_PARTICION = ("""
+CREATE TRIGGER IF NOT EXISTS tr_reservas_particion_ins AFTER INSERT ON reservas
+BEGIN
+  INSERT OR IGNORE INTO particion_pendientes (folio, fecha_normalizada) VALUES (NEW.folio, NEW.fecha_normalizada);
+END
+""", """
+CREATE TRIGGER IF NOT EXISTS tr_reservas_particion_upd
+AFTER UPDATE OF cliente_id, sala_id, fecha_normalizada, turno_id, evento, activo, minuto_inicio, minuto_fin ON reservas
+BEGIN
+  INSERT OR IGNORE INTO particion_pendientes (folio, fecha_normalizada) VALUES (OLD.folio, OLD.fecha_normalizada);
+  INSERT OR IGNORE INTO particion_pendientes (folio, fecha_normalizada) VALUES (NEW.folio, NEW.fecha_normalizada);
+END
+""", """
+CREATE TRIGGER IF NOT EXISTS tr_reservas_particion_del AFTER DELETE ON reservas
+BEGIN
+  INSERT OR IGNORE INTO particion_pendientes (folio, fecha_normalizada) VALUES (OLD.folio, OLD.fecha_normalizada);
+END
+""")
+
+def _migrar_particiones(conexion):
+    conexion.executescript("""
+CREATE TABLE IF NOT EXISTS particiones_reservas (
+  tabla TEXT PRIMARY KEY,
+  por TEXT NOT NULL,
+  desde DATE NOT NULL,
+  hasta DATE NOT NULL,
+  completa INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS particion_pendientes (
+  folio INTEGER NOT NULL,
+  fecha_normalizada DATE NOT NULL,
+  PRIMARY KEY (folio, fecha_normalizada)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_particion_pendientes_fecha ON particion_pendientes (fecha_normalizada);
+""")
+    if "completa" not in _columnas_tabla(conexion, "particiones_reservas"):
+        conexion.execute("ALTER TABLE particiones_reservas ADD COLUMN completa INTEGER NOT NULL DEFAULT 1")
+    tablas = [fila[0] for fila in conexion.execute("SELECT tabla FROM particiones_reservas")]
+    if any(conexion.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f"tr_{tabla}_ins",)).fetchone()
+           for tabla in tablas):
+        for tabla in tablas:
+            for sufijo in ("ins", "upd", "del"):
+                conexion.execute(f"DROP TRIGGER IF EXISTS tr_{tabla}_{sufijo}")
+            conexion.execute(f"DROP INDEX IF EXISTS ux_{tabla}_sala_fecha_turno_activo")
+        for sentencia in DISPARADORES_PARTICION:
+            conexion.execute(sentencia)
+
+def _enrutar_particion(particiones, desdes, fecha_texto):
+    indice = bisect.bisect_right(desdes, fecha_texto) - 1
+    if indice >= 0 and fecha_texto < particiones[indice][2]:
+        return particiones[indice][0]
+    return None
+
+def _aplicar_pendientes_particion(cursor, lote):
+    cursor.execute("SELECT tabla, desde, hasta FROM particiones_reservas ORDER BY desde")
+    particiones = cursor.fetchall()
+    desdes = [desde for _, desde, _ in particiones]
+    cursor.execute("SELECT folio, fecha_normalizada FROM particion_pendientes ORDER BY folio LIMIT ?", (lote,))
+    pendientes = cursor.fetchall()
+    borrados, insertados = {}, {}
+    for folio, fecha_texto in pendientes:
+        tabla = _enrutar_particion(particiones, desdes, fecha_texto)
+        if tabla is not None:
+            borrados.setdefault(tabla, []).append((fecha_texto, folio))
+    for tabla, claves in borrados.items():
+        cursor.executemany(f"DELETE FROM {tabla} WHERE fecha_normalizada = ? AND folio = ?", claves)
+    cursor.execute(f"SELECT {COLUMNAS_PARTICION} FROM reservas WHERE folio IN (SELECT value FROM json_each(?))",
+                   (json.dumps(sorted({folio for folio, _ in pendientes})),))
+    for fila in cursor.fetchall():
+        tabla = _enrutar_particion(particiones, desdes, fila[3])
+        if tabla is not None:
+            insertados.setdefault(tabla, []).append(fila)
+    marcadores = ", ".join("?" * len(COLUMNAS_PARTICION.split(",")))
+    for tabla, filas in insertados.items():
+        cursor.executemany(f"INSERT OR REPLACE INTO {tabla} ({COLUMNAS_PARTICION}) VALUES ({marcadores})", filas)
+    cursor.executemany("DELETE FROM particion_pendientes WHERE folio = ? AND fecha_normalizada = ?", pendientes)
+    return len(pendientes)
+
+@instrumentado("bd.sincronizar_particiones")
+def sincronizar_particiones(ruta_bd=None, lote=LOTE_COPIA_PARTICION):
+    total = 0
+    while True:
+        with transaccion_inmediata(ruta_bd) as cursor:
+            aplicados = _aplicar_pendientes_particion(cursor, lote)
+        total += aplicados
+        if aplicados < lote:
+            return total
+
+def _copiar_particion(tabla, desde, hasta, ruta_bd=None, lote=LOTE_COPIA_PARTICION):
+    marcadores = ", ".join("?" * len(COLUMNAS_PARTICION.split(",")))
+    ultimo = (desde, 0)
+    while True:
+        with transaccion_inmediata(ruta_bd) as cursor:
+            cursor.execute(f"""
+                SELECT {COLUMNAS_PARTICION} FROM reservas
+                WHERE (fecha_normalizada, folio) > (?, ?) AND fecha_normalizada < ?
+                ORDER BY fecha_normalizada, folio
+                LIMIT ?
+            """, (*ultimo, hasta, lote))
+            filas = cursor.fetchall()
+            cursor.executemany(f"INSERT OR REPLACE INTO {tabla} ({COLUMNAS_PARTICION}) VALUES ({marcadores})", filas)
+            if len(filas) < lote:
+                cursor.execute("UPDATE particiones_reservas SET completa = 1 WHERE tabla = ?", (tabla,))
+                return
+        ultimo = (filas[-1][3], filas[-1][0])
+
+@instrumentado("bd.particionar")
+def particionar_reservas(por="mes", hasta=None, ruta_bd=None):
+    creadas = []
+    with transaccion_inmediata(ruta_bd) as cursor:
+        cursor.execute("SELECT DISTINCT por FROM particiones_reservas")
+        esquemas = [fila[0] for fila in cursor.fetchall()]
+        if esquemas and esquemas != [por]:
+            raise ValueError(f"Las reservaciones ya estan particionadas por {esquemas[0]}; quite las particiones antes de cambiar.")
+        cursor.execute("SELECT MIN(fecha_normalizada), MAX(fecha_normalizada) FROM reservas")
+        primera, ultima = cursor.fetchone()
+        hoy = datetime.date.today()
+        fecha_inicio = datetime.datetime.strptime(primera, FORMATO_FECHA_ISO).date() if primera else hoy
+        fecha_fin = max(datetime.datetime.strptime(ultima, FORMATO_FECHA_ISO).date() if ultima else hoy,
+                        hasta or datetime.date(hoy.year + ANIOS_PARTICIONES_FUTURAS, 12, 31))
+        cursor.execute("SELECT tabla FROM particiones_reservas")
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        for tabla, desde, limite in _periodos_particion(por, fecha_inicio, fecha_fin):
+            if tabla in existentes:
+                continue
+            for sentencia in _ddl_particion(tabla, desde, limite):
+                cursor.execute(sentencia)
+            cursor.execute("INSERT INTO particiones_reservas (tabla, por, desde, hasta, completa) VALUES (?, ?, ?, ?, 0)",
+                           (tabla, por, desde, limite))
+            creadas.append(tabla)
+        if creadas:
+            for sentencia in DISPARADORES_PARTICION:
+                cursor.execute(sentencia)
+        cursor.execute("SELECT tabla, desde, hasta FROM particiones_reservas WHERE completa = 0 ORDER BY desde")
+        pendientes = cursor.fetchall()
+    for tabla, desde, limite in pendientes:
+        _copiar_particion(tabla, desde, limite, ruta_bd)
+    sincronizar_particiones(ruta_bd)
+    return creadas
+
+@instrumentado("bd.quitar_particiones")
+def quitar_particiones(ruta_bd=None):
+    with transaccion_inmediata(ruta_bd) as cursor:
+        cursor.execute("SELECT tabla FROM particiones_reservas")
+        tablas = [fila[0] for fila in cursor.fetchall()]
+        for sufijo in ("ins", "upd", "del"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS tr_reservas_particion_{sufijo}")
+        for tabla in tablas:
+            cursor.execute(f"DROP TABLE IF EXISTS {tabla}")
+        cursor.execute("DELETE FROM particiones_reservas")
+        cursor.execute("DELETE FROM particion_pendientes")
+    return len(tablas)
+
+def tramos_rango(conexion, fecha_inicio_iso, fecha_fin_iso):
+    tramos = []
+    cursor_fecha = fecha_inicio_iso
+    for tabla, desde, hasta in conexion.execute("""
+            SELECT tabla, desde, hasta FROM particiones_reservas p
+            WHERE desde <= ? AND hasta > ? AND completa = 1
+              AND NOT EXISTS (SELECT 1 FROM particion_pendientes pp
+                              WHERE pp.fecha_normalizada >= p.desde AND pp.fecha_normalizada < p.hasta)
+            ORDER BY desde
+        """, (fecha_fin_iso, fecha_inicio_iso)).fetchall():
+        if desde > cursor_fecha:
+            anterior = (datetime.datetime.strptime(desde, FORMATO_FECHA_ISO).date() - datetime.timedelta(days=1)).strftime(FORMATO_FECHA_ISO)
+            tramos.append(("reservas", cursor_fecha, anterior))
+        ultimo_dia = (datetime.datetime.strptime(hasta, FORMATO_FECHA_ISO).date() - datetime.timedelta(days=1)).strftime(FORMATO_FECHA_ISO)
+        tramos.append((tabla, max(cursor_fecha, desde), min(fecha_fin_iso, ultimo_dia)))
+        cursor_fecha = hasta
+    if cursor_fecha <= fecha_fin_iso:
+        tramos.append(("reservas", cursor_fecha, fecha_fin_iso))
+    return tramos
+
+def _consulta_reporte_tramo(tabla):
+    return CONSULTA_REPORTE_RANGO.replace("FROM reservas r", f"FROM {tabla} r")
+
+def _iterar_reporte_rango(conexion, fecha_inicio, fecha_fin):
+    fecha_inicio_iso, fecha_fin_iso = fecha_inicio.strftime(FORMATO_FECHA_ISO), fecha_fin.strftime(FORMATO_FECHA_ISO)
+    try:
+        tramos = tramos_rango(conexion, fecha_inicio_iso, fecha_fin_iso)
+    except sqlite3.OperationalError:
+        tramos = [("reservas", fecha_inicio_iso, fecha_fin_iso)]
+    for tabla, desde, hasta in tramos:
+        yield from conexion.execute(_consulta_reporte_tramo(tabla), (desde, hasta))
+
+@instrumentado("reporte.rango_exportacion")
+def _filas_reporte_rango(conexion, fecha_inicio, fecha_fin):
+    filas_por_fecha = {}
+    for folio, fecha_texto, cliente_nombre, cliente_apellidos, sala_nombre, cupo, turno_descripcion, evento in \
+            _iterar_reporte_rango(conexion, fecha_inicio, fecha_fin):
+        fecha_dt = datetime.datetime.strptime(fecha_texto, FORMATO_FECHA_ISO).date()
+        filas_por_fecha.setdefault(fecha_dt, []).append([
+            folio,
+            fecha_dt.strftime(FORMATO_FECHA_INPUT),
+            f"{cliente_apellidos}, {cliente_nombre}",
+            sala_nombre,
+            cupo,
+            turno_descripcion,
+            evento
+        ])
+    return filas_por_fecha
+
+def particionar_rango(fecha_inicio, fecha_fin, particion="dia"):
+    dias_por_particion = 7 if particion == "semana" else 1
+    particiones = []
+    inicio_particion = fecha_inicio
+    while inicio_particion <= fecha_fin:
+        fin_particion = min(inicio_particion + datetime.timedelta(days=dias_por_particion - 1), fecha_fin)
+        particiones.append((inicio_particion, fin_particion))
+        inicio_particion = fin_particion + datetime.timedelta(days=1)
+    return particiones
+
+def _trabajo_exportacion(ruta_bd, fecha_inicio, fecha_fin, formatos, directorio, devolver_filas):
+    conexion = conectar_solo_lectura(ruta_bd)
+    try:
+        filas_por_fecha = _filas_reporte_rango(conexion, fecha_inicio, fecha_fin)
+    finally:
+        conexion.close()
+    archivos = 0
+    for fecha_dt, filas in filas_por_fecha.items():
+        for formato in formatos:
+            nombre_archivo = os.path.join(directorio, f"reporte_{fecha_dt.strftime('%Y%m%d')}.{formato}")
+            EXPORTADORES[formato](fecha_dt, filas, nombre_archivo)
+            archivos += 1
+    num_filas = sum(len(filas) for filas in filas_por_fecha.values())
+    filas_devueltas = [fila for filas in filas_por_fecha.values() for fila in filas] if devolver_filas else []
+    return fecha_inicio, num_filas, archivos, filas_devueltas
+
+@instrumentado("exportar.rango")
+def ejecutar_exportacion_rango(fecha_inicio, fecha_fin, formatos, particion="dia", procesos=None,
+                               directorio=".", combinado=False, en_serie=False):
+    os.makedirs(directorio, exist_ok=True)
+    particiones = particionar_rango(fecha_inicio, fecha_fin, particion)
+    ruta_bd = ruta_lectura(permitir_replica=True)
+    resultados = []
+    inicio = time.perf_counter()
+    if en_serie:
+        for inicio_particion, fin_particion in particiones:
+            try:
+                resultados.append(_trabajo_exportacion(ruta_bd, inicio_particion, fin_particion, formatos, directorio, combinado))
+            except Exception as error:
+                print(f"Error exportando {inicio_particion.strftime(FORMATO_FECHA_INPUT)}: {error}")
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            futuros = {
+                ejecutor.submit(_trabajo_exportacion, ruta_bd, inicio_particion, fin_particion, formatos, directorio, combinado): inicio_particion
+                for inicio_particion, fin_particion in particiones
+            }
+            for futuro in concurrent.futures.as_completed(futuros):
+                try:
+                    resultados.append(futuro.result())
+                except Exception as error:
+                    print(f"Error exportando {futuros[futuro].strftime(FORMATO_FECHA_INPUT)}: {error}")
+    resultados.sort(key=lambda resultado: resultado[0])
+
+    total_filas = sum(resultado[1] for resultado in resultados)
+    total_archivos = sum(resultado[2] for resultado in resultados)
+    if combinado and total_filas:
+        filas_combinadas = [fila for resultado in resultados for fila in resultado[3]]
+        sufijo = f"{fecha_inicio.strftime('%Y%m%d')}_{fecha_fin.strftime('%Y%m%d')}"
+        for formato in formatos:
+            EXPORTADORES[formato](fecha_inicio, filas_combinadas, os.path.join(directorio, f"reporte_{sufijo}.{formato}"))
+            total_archivos += 1
+    segundos = time.perf_counter() - inicio
+
+    return {
+        "modo": "serie" if en_serie else "procesos",
+        "particiones": len(particiones),
+        "filas": total_filas,
+        "archivos": total_archivos,
+        "segundos": segundos,
+        "filas_por_segundo": total_filas / segundos if segundos > 0 else 0.0,
+    }
+
+def comparar_exportacion_rango(fecha_inicio, fecha_fin, formatos, particion="dia", procesos=None, directorio="."):
+    resultado_serie = ejecutar_exportacion_rango(fecha_inicio, fecha_fin, formatos, particion, procesos,
+                                                 os.path.join(directorio, "serie"), en_serie=True)
+    resultado_procesos = ejecutar_exportacion_rango(fecha_inicio, fecha_fin, formatos, particion, procesos,
+                                                    os.path.join(directorio, "procesos"))
+    aceleracion = resultado_serie["segundos"] / resultado_procesos["segundos"] if resultado_procesos["segundos"] > 0 else 0.0
+    print(tabulate(
+        [[resultado["modo"], resultado["particiones"], resultado["filas"], resultado["archivos"],
+          f"{resultado['segundos']:.3f}", f"{resultado['filas_por_segundo']:.0f}"]
+         for resultado in (resultado_serie, resultado_procesos)],
+        headers=["MODO", "PARTICIONES", "FILAS", "ARCHIVOS", "SEGUNDOS", "FILAS/S"], tablefmt="grid"))
+    print(f"Aceleracion con procesos: {aceleracion:.2f}x")
+    return resultado_serie, resultado_procesos
+
+COLUMNAS_CAMBIOS = ("secuencia", "tipo", "folio", "fecha", "cliente", "sala", "cupo", "turno", "evento", "activo", "modificado")
+
+CONSULTA_CAMBIOS = """
+SELECT
+    r.secuencia_cambio,
+    CASE WHEN r.secuencia_alta > :marca THEN 'alta' WHEN r.activo = 0 THEN 'cancelada' ELSE 'modificada' END,
+    r.folio,
+    r.fecha_normalizada,
+    c.apellidos || ', ' || c.nombre,
+    s.nombre,
+    s.cupo,
+    CASE WHEN r.turno_id = 0 THEN printf('%02d:%02d-%02d:%02d', r.minuto_inicio / 60, r.minuto_inicio % 60, r.minuto_fin / 60, r.minuto_fin % 60) ELSE t.descripcion END,
+    r.evento,
+    r.activo,
+    r.modificado
+FROM reservas r INDEXED BY ix_reserva_cambio
+INNER JOIN clientes c ON r.cliente_id = c.cliente_id
+INNER JOIN salas s ON r.sala_id = s.sala_id
+INNER JOIN turnos t ON r.turno_id = t.turno_id
+WHERE r.secuencia_cambio > :marca AND r.secuencia_cambio <= :tope
+ORDER BY r.secuencia_cambio
+"""
+
+def marca_exportacion(consumidor, conexion=None):
+    with (contextlib.nullcontext(conexion) if conexion is not None else conectar_bd()) as conexion_marca:
+        fila = conexion_marca.execute("SELECT secuencia FROM marcas_exportacion WHERE consumidor = ?", (consumidor,)).fetchone()
+    return fila[0] if fila else 0
+
+def _abrir_salida_cambios(ruta, comprimir):
+    if comprimir:
+        return gzip.open(ruta, "wt", encoding="utf-8", newline="", compresslevel=6)
+    return open(ruta, "w", encoding="utf-8", newline="")
+
+@instrumentado("exportar.cambios")
+def exportar_cambios(consumidor, formato="csv", directorio=".", comprimir=False, desde=None, ruta_bd=None):
+    os.makedirs(directorio, exist_ok=True)
+    conexion = conectar_bd(ruta_bd)
+    try:
+        conexion.execute("BEGIN")
+        marca = marca_exportacion(consumidor, conexion) if desde is None else desde
+        tope = conexion.execute("SELECT ultimo FROM secuencia_cambios WHERE id = 1").fetchone()[0]
+        if tope <= marca:
+            conexion.rollback()
+            return {"consumidor": consumidor, "desde": marca, "hasta": marca, "filas": 0, "archivo": None}
+        nombre_archivo = os.path.join(directorio, f"cambios_{consumidor}_{marca + 1:010d}_{tope:010d}."
+                                                  f"{'ndjson' if formato == 'ndjson' else 'csv'}{'.gz' if comprimir else ''}")
+        ruta_temporal = nombre_archivo + ".tmp"
+        filas = 0
+        cursor = conexion.execute(CONSULTA_CAMBIOS, {"marca": marca, "tope": tope})
+        with _abrir_salida_cambios(ruta_temporal, comprimir) as salida:
+            if formato == "ndjson":
+                for fila in cursor:
+                    salida.write(json.dumps(dict(zip(COLUMNAS_CAMBIOS, fila)), ensure_ascii=False) + "\n")
+                    filas += 1
+            else:
+                escritor = csv.writer(salida)
+                escritor.writerow([columna.upper() for columna in COLUMNAS_CAMBIOS])
+                for fila in cursor:
+                    escritor.writerow(fila)
+                    filas += 1
+        cursor.close()
+        conexion.rollback()
+        os.replace(ruta_temporal, nombre_archivo)
+        with conexion:
+            conexion.execute("""
+                INSERT INTO marcas_exportacion (consumidor, secuencia, actualizado) VALUES (?, ?, datetime('now'))
+                ON CONFLICT (consumidor) DO UPDATE SET secuencia = excluded.secuencia, actualizado = excluded.actualizado
+                WHERE excluded.secuencia > marcas_exportacion.secuencia
+            """, (consumidor, tope))
+    finally:
+        conexion.close()
+    return {"consumidor": consumidor, "desde": marca, "hasta": tope, "filas": filas, "archivo": nombre_archivo}
+
+def _percentil(valores_ordenados, fraccion):
+    if not valores_ordenados:
+        return 0.0
+    return valores_ordenados[min(len(valores_ordenados) - 1, int(len(valores_ordenados) * fraccion))]
+
+SQL_INTERVALO_OCUPADO = """
+SELECT 1 FROM reservas
+WHERE sala_id = ? AND fecha_normalizada = ? AND activo = 1 AND minuto_inicio < ? AND minuto_fin > ?
+LIMIT 1
+"""
+
+def formatear_minuto(minuto):
+    return f"{minuto // 60:02d}:{minuto % 60:02d}"
+
+def formatear_intervalo(minuto_inicio, minuto_fin):
+    return f"{formatear_minuto(minuto_inicio)}-{formatear_minuto(minuto_fin)}"
+
+def interpretar_hora(texto):
+    partes = texto.strip().split(":")
+    if len(partes) != 2 or not all(parte.isdigit() for parte in partes):
+        return None
+    horas, minutos = int(partes[0]), int(partes[1])
+    if minutos > 59 or horas > 24 or (horas == 24 and minutos):
+        return None
+    return horas * 60 + minutos
+
+def _recalcular_maximos(fines, maximos, desde):
+    previo = maximos[desde - 1] if desde else 0
+    maximos[desde:] = itertools.islice(itertools.accumulate(fines[desde:], max, initial=previo), 1, None)
+
+def construir_indice_intervalos(filas):
+    indice = {}
+    for sala_id, fecha_dt, minuto_inicio, minuto_fin in sorted(filas, key=lambda fila: (fila[0], fila[1], fila[2])):
+        inicios, fines, maximos = indice.setdefault((sala_id, fecha_dt), ([], [], []))
+        inicios.append(minuto_inicio)
+        fines.append(minuto_fin)
+        maximos.append(max(maximos[-1], minuto_fin) if maximos else minuto_fin)
+    return indice
+
+def intervalo_ocupado(indice, sala_id, fecha_dt, minuto_inicio, minuto_fin):
+    entrada = indice.get((sala_id, fecha_dt))
+    if not entrada:
+        return False
+    inicios, _, maximos = entrada
+    posicion = bisect.bisect_left(inicios, minuto_fin)
+    return posicion > 0 and maximos[posicion - 1] > minuto_inicio
+
+def agregar_intervalo(indice, sala_id, fecha_dt, minuto_inicio, minuto_fin):
+    inicios, fines, maximos = indice.setdefault((sala_id, fecha_dt), ([], [], []))
+    posicion = bisect.bisect_left(inicios, minuto_inicio)
+    inicios.insert(posicion, minuto_inicio)
+    fines.insert(posicion, minuto_fin)
+    _recalcular_maximos(fines, maximos, posicion)
+
+def quitar_intervalo(indice, sala_id, fecha_dt, minuto_inicio):
+    entrada = indice.get((sala_id, fecha_dt))
+    if not entrada:
+        return False
+    inicios, fines, maximos = entrada
+    posicion = bisect.bisect_left(inicios, minuto_inicio)
+    if posicion == len(inicios) or inicios[posicion] != minuto_inicio:
+        return False
+    del inicios[posicion]
+    del fines[posicion]
+    _recalcular_maximos(fines, maximos, posicion)
+    return True
+
+def buscar_huecos(indice, sala_id, fecha_dt, duracion, desde=0, hasta=MINUTOS_DIA, limite=None):
+    inicios, fines, maximos = indice.get((sala_id, fecha_dt), ([], [], []))
+    huecos = []
+    posicion = bisect.bisect_right(maximos, desde)
+    cursor_minuto = desde
+    while cursor_minuto < hasta and (limite is None or len(huecos) < limite):
+        siguiente_inicio = inicios[posicion] if posicion < len(inicios) else hasta
+        fin_hueco = min(siguiente_inicio, hasta)
+        if fin_hueco - cursor_minuto >= duracion:
+            huecos.append((cursor_minuto, fin_hueco))
+        if posicion >= len(inicios):
+            break
+        cursor_minuto = max(cursor_minuto, fines[posicion])
+        posicion += 1
+    return huecos
+
+@instrumentado("bd.cargar_indice_intervalos")
+def cargar_indice_intervalos(fecha_inicio, fecha_fin, sala_id=None, incluir_retenciones=False):
+    consulta = """
+        SELECT sala_id, fecha_normalizada, minuto_inicio, minuto_fin FROM reservas
+        WHERE fecha_normalizada BETWEEN ? AND ? AND activo = 1 AND minuto_inicio IS NOT NULL
+    """
+    parametros = [fecha_inicio.strftime(FORMATO_FECHA_ISO), fecha_fin.strftime(FORMATO_FECHA_ISO)]
+    if sala_id is not None:
+        consulta += " AND sala_id = ?"
+        parametros.append(sala_id)
+    if incluir_retenciones:
+        consulta += """
+        UNION ALL
+        SELECT sala_id, fecha_normalizada, minuto_inicio, minuto_fin FROM retenciones
+        WHERE fecha_normalizada BETWEEN ? AND ? AND expira > ? AND terminal <> ?
+        """
+        parametros += parametros[:2] + [time.time(), TERMINAL_ID]
+        if sala_id is not None:
+            consulta += " AND sala_id = ?"
+            parametros.append(sala_id)
+    with (conectar_bd() if incluir_retenciones else conectar_lectura()) as conexion:
+        filas = [(fila_sala, datetime.datetime.strptime(fecha_texto, FORMATO_FECHA_ISO).date(), minuto_inicio, minuto_fin)
+                 for fila_sala, fecha_texto, minuto_inicio, minuto_fin in conexion.execute(consulta, parametros)]
+    return construir_indice_intervalos(filas)
+
+def solicitar_intervalo_horario(sala_id, fecha_dt):
+    while True:
+        try:
+            texto_inicio = input("Hora de inicio (HH:MM) o 'X' para regresar: ").strip()
+            if texto_inicio.upper() == "X":
+                return None
+            texto_fin = input("Hora de fin (HH:MM) o 'X' para regresar: ").strip()
+            if texto_fin.upper() == "X":
+                return None
+        except (EOFError, KeyboardInterrupt):
+            print("\nOperacion cancelada por el usuario.")
+            return None
+        minuto_inicio = interpretar_hora(texto_inicio)
+        minuto_fin = interpretar_hora(texto_fin)
+        if minuto_inicio is None or minuto_fin is None:
+            print("Hora invalida: use formato HH:MM de 24 horas, ejemplo: 09:30.")
+            continue
+        if minuto_fin <= minuto_inicio:
+            print("Horario invalido: la hora de fin debe ser posterior a la de inicio.")
+            continue
+        try:
+            indice = cargar_indice_intervalos(fecha_dt, fecha_dt, sala_id, incluir_retenciones=True)
+        except Exception as error:
+            print(f"Error verificando disponibilidad: {error}")
+            return None
+        if not intervalo_ocupado(indice, sala_id, fecha_dt, minuto_inicio, minuto_fin):
+            return minuto_inicio, minuto_fin
+        print(f"El horario {formatear_intervalo(minuto_inicio, minuto_fin)} se empalma con otra reservacion de la sala.")
+        huecos = buscar_huecos(indice, sala_id, fecha_dt, minuto_fin - minuto_inicio)
+        if huecos:
+            print("Horarios libres con esa duracion: " + ", ".join(formatear_intervalo(*hueco) for hueco in huecos))
+        else:
+            print("No hay horarios libres con esa duracion para la sala en esa fecha.")
+
+LOTE_ESPACIOS_CONSULTA = 400
+
+@contextlib.contextmanager
+def transaccion_inmediata(ruta_bd=None):
+    conexion = conectar_bd(ruta_bd)
+    conexion.isolation_level = None
+    cursor = conexion.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        yield cursor
+        cursor.execute("COMMIT")
+    except BaseException:
+        if conexion.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        cursor.close()
+        conexion.close()
+
+def _espacios_en_conflicto(cursor, espacios):
+    conflictos = []
+    for inicio in range(0, len(espacios), LOTE_ESPACIOS_CONSULTA):
+        lote = espacios[inicio:inicio + LOTE_ESPACIOS_CONSULTA]
+        valores = ", ".join("(?, ?, ?, ?, ?)" for _ in lote)
+        cursor.execute(f"""
+            WITH solicitados (sala_id, fecha_normalizada, turno_id, minuto_inicio, minuto_fin) AS (VALUES {valores})
+            SELECT s.sala_id, s.fecha_normalizada, s.turno_id, r.folio
+            FROM solicitados s
+            JOIN reservas r
+              ON r.sala_id = s.sala_id AND r.fecha_normalizada = s.fecha_normalizada AND r.activo = 1
+             AND r.minuto_inicio < s.minuto_fin AND r.minuto_fin > s.minuto_inicio
+            UNION ALL
+            SELECT s.sala_id, s.fecha_normalizada, s.turno_id, NULL
+            FROM solicitados s
+            JOIN retenciones t
+              ON t.sala_id = s.sala_id AND t.fecha_normalizada = s.fecha_normalizada
+             AND t.minuto_inicio < s.minuto_fin AND t.minuto_fin > s.minuto_inicio
+             AND t.expira > ? AND t.terminal <> ?
+            ORDER BY 2, 1, 3
+        """, [valor for espacio in lote for valor in espacio] + [time.time(), TERMINAL_ID])
+        conflictos.extend(cursor.fetchall())
+    return conflictos
+
+def _espacios_empalmados(solicitados):
+    empalmados = []
+    anterior = None
+    for espacio in sorted(solicitados, key=lambda espacio: (espacio[0], espacio[1], espacio[3])):
+        sala_id, fecha_iso, turno_id, minuto_inicio, minuto_fin = espacio
+        if anterior is not None and anterior[:2] == (sala_id, fecha_iso) and minuto_inicio < anterior[4]:
+            empalmados.append((sala_id, fecha_iso, turno_id, anterior[2]))
+            if minuto_fin <= anterior[4]:
+                continue
+        anterior = espacio
+    return empalmados
+
+@trazable("reservar_grupo", 1)
+@instrumentado("bd.reservar_multiples")
+def reservar_multiples(cliente_id, espacios, evento, ruta_bd=None, clave=None):
+    referencia = referencia_actual()
+    solicitados = []
+    vistos = set()
+    for sala_id, fecha_dt, turno_id in espacios:
+        if sala_id not in referencia["salas_por_id"]:
+            return {"ok": False, "error": f"La sala {sala_id} no existe."}
+        turno = referencia["turnos_por_id"].get(turno_id)
+        if turno is None:
+            return {"ok": False, "error": f"El turno {turno_id} no existe."}
+        if (sala_id, fecha_dt, turno_id) in vistos:
+            continue
+        vistos.add((sala_id, fecha_dt, turno_id))
+        solicitados.append((sala_id, fecha_dt.strftime(FORMATO_FECHA_ISO), turno_id, turno["minuto_inicio"], turno["minuto_fin"]))
+    if not solicitados:
+        return {"ok": False, "error": "No se indicaron espacios a reservar."}
+    empalmados = _espacios_empalmados(solicitados)
+    if empalmados:
+        return {"ok": False, "error": f"{len(empalmados)} espacio(s) se empalman con otro espacio de la misma solicitud.", "conflictos": empalmados}
+
+    try:
+        with transaccion_inmediata(ruta_bd) as cursor:
+            cursor.execute("SELECT 1 FROM clientes WHERE cliente_id = ?", (cliente_id,))
+            if cursor.fetchone() is None:
+                return {"ok": False, "error": f"El cliente {cliente_id} no existe."}
+            if clave is not None:
+                huella = _huella_solicitud(cliente_id, solicitados, evento)
+                registrada = _clave_registrada(cursor, clave, huella)
+                if registrada is not None:
+                    cursor.execute("SELECT folio FROM reservas WHERE grupo_id = ? ORDER BY folio", (registrada[2],))
+                    return {"ok": True, "grupo_id": registrada[2], "folios": [fila[0] for fila in cursor.fetchall()], "repetida": True}
+            conflictos = _espacios_en_conflicto(cursor, solicitados)
+            if conflictos:
+                return {"ok": False, "error": f"{len(conflictos)} espacio(s) ya estan ocupados.", "conflictos": conflictos}
+            cursor.execute("INSERT INTO grupos_reserva (cliente_id, evento) VALUES (?, ?)", (cliente_id, evento))
+            grupo_id = cursor.lastrowid
+            cursor.executemany("""
+                INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento, minuto_inicio, minuto_fin, grupo_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(cliente_id, sala_id, fecha_iso, turno_id, evento, minuto_inicio, minuto_fin, grupo_id)
+                  for sala_id, fecha_iso, turno_id, minuto_inicio, minuto_fin in solicitados])
+            cursor.execute("SELECT folio FROM reservas WHERE grupo_id = ? ORDER BY folio", (grupo_id,))
+            folios = [fila[0] for fila in cursor.fetchall()]
+            if clave is not None:
+                _registrar_clave(cursor, clave, huella, grupo_id=grupo_id)
+    except sqlite3.IntegrityError as error:
+        return {"ok": False, "error": f"La reservacion en grupo fue rechazada por la BD: {error}"}
+    if mapa_disponibilidad is not None and ruta_bd is None:
+        for sala_id, fecha_iso, _, minuto_inicio, minuto_fin in solicitados:
+            marcar_ocupado_mapa(sala_id, fecha_iso, minuto_inicio, minuto_fin)
+    return {"ok": True, "grupo_id": grupo_id, "folios": folios}
+
+def grupo_de_folio(folio, ruta_bd=None):
+    with conectar_bd(ruta_bd) as conexion:
+        fila = conexion.execute("""
+            SELECT r.grupo_id, COUNT(g.folio), MIN(g.fecha_normalizada)
+            FROM reservas r
+            JOIN reservas g ON g.grupo_id = r.grupo_id AND g.activo = 1
+            WHERE r.folio = ? AND r.grupo_id IS NOT NULL
+            GROUP BY r.grupo_id
+        """, (folio,)).fetchone()
+    if fila is None:
+        return None
+    return {"grupo_id": fila[0], "activas": fila[1],
+            "primera_fecha": datetime.datetime.strptime(fila[2], FORMATO_FECHA_ISO).date()}
+
+@trazable("cancelar_grupo", 2)
+@instrumentado("bd.cancelar_grupo")
+def cancelar_grupo(grupo_id, dias_minimos=2, ruta_bd=None):
+    with transaccion_inmediata(ruta_bd) as cursor:
+        cursor.execute("SELECT MIN(fecha_normalizada) FROM reservas WHERE grupo_id = ? AND activo = 1", (grupo_id,))
+        primera_fecha = cursor.fetchone()[0]
+        if primera_fecha is None:
+            return {"ok": False, "error": f"El grupo {grupo_id} no tiene reservaciones activas."}
+        dias_restantes = (datetime.datetime.strptime(primera_fecha, FORMATO_FECHA_ISO).date() - datetime.date.today()).days
+        if dias_restantes < dias_minimos:
+            return {"ok": False, "error": f"No se puede cancelar: faltan {dias_restantes} dia(s) para la primera reservacion del grupo."}
+        canceladas, promovidas = _cancelar_y_promover(cursor, "grupo_id = ?", (grupo_id,))
+    return {"ok": True, "canceladas": len(canceladas), "promovidas": promovidas}
+
+@trazable("renombrar_grupo", 3)
+@instrumentado("bd.renombrar_grupo")
+def renombrar_grupo(grupo_id, evento, ruta_bd=None):
+    with transaccion_inmediata(ruta_bd) as cursor:
+        cursor.execute("UPDATE grupos_reserva SET evento = ? WHERE grupo_id = ?", (evento, grupo_id))
+        if cursor.rowcount == 0:
+            return {"ok": False, "error": f"El grupo {grupo_id} no existe."}
+        cursor.execute("UPDATE reservas SET evento = ? WHERE grupo_id = ?", (evento, grupo_id))
+        actualizadas = cursor.rowcount
+    return {"ok": True, "actualizadas": actualizadas}
+
+@trazable("renombrar", 3)
+@instrumentado("bd.renombrar_evento")
+def renombrar_evento(folio, evento, ruta_bd=None):
+    with transaccion_inmediata(ruta_bd) as cursor:
+        cursor.execute("UPDATE reservas SET evento = ? WHERE folio = ?", (evento, folio))
+        return cursor.rowcount
+
+@trazable("registrar_cliente", 5)
+@instrumentado("bd.registrar_cliente")
+def registrar_cliente(nombre, apellidos, ruta_bd=None):
+    with transaccion_inmediata(ruta_bd) as cursor:
+        cursor.execute("INSERT INTO clientes(nombre,apellidos) VALUES(?,?)", (nombre, apellidos))
+        return cursor.lastrowid
+
+@trazable("registrar_sala", 6)
+@instrumentado("bd.registrar_sala")
+def registrar_sala(nombre, cupo, ruta_bd=None):
+    with transaccion_inmediata(ruta_bd) as cursor:
+        cursor.execute("INSERT INTO salas(nombre,cupo) VALUES(?,?)", (nombre, cupo))
+        return cursor.lastrowid
+
+def preguntar_si_no(mensaje):
+    while True:
+        try:
+            respuesta = input(mensaje).strip().upper()
+        except (EOFError, KeyboardInterrupt):
+            print("\nOperacion cancelada por el usuario.")
+            return None
+        if respuesta == "":
+            print("Confirmacion vacia: escriba 'S' para si o 'N' para no.")
+            continue
+        if respuesta not in ("S", "N"):
+            print("Confirmacion invalida: escriba 'S' para si o 'N' para no.")
+            continue
+        return respuesta == "S"
+
+def _lista_enteros_argumento(texto):
+    try:
+        return [int(parte) for parte in texto.split(",") if parte.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"lista invalida: {texto} (use enteros separados por comas)")
+
+def espacios_de_rango(salas_ids, fecha_inicio, fecha_fin, turnos_ids):
+    espacios = []
+    fecha_dt = fecha_inicio
+    while fecha_dt <= fecha_fin:
+        if fecha_dt.weekday() != 6:
+            espacios.extend((sala_id, fecha_dt, turno_id) for sala_id in salas_ids for turno_id in turnos_ids)
+        fecha_dt += datetime.timedelta(days=1)
+    return espacios
+
+TTL_RETENCION_PREDETERMINADO = 120.0
+ttl_retencion = TTL_RETENCION_PREDETERMINADO
+TERMINAL_ID = f"{socket.gethostname()}:{os.getpid()}"
+monticulo_retenciones = []
+candado_retenciones = threading.Lock()
+parada_barrido = None
+
+SQL_ESPACIO_OCUPADO = """
+SELECT 1 FROM reservas
+WHERE sala_id = :sala_id AND fecha_normalizada = :fecha AND activo = 1
+  AND minuto_inicio < :minuto_fin AND minuto_fin > :minuto_inicio
+UNION ALL
+SELECT 1 FROM retenciones
+WHERE sala_id = :sala_id AND fecha_normalizada = :fecha
+  AND minuto_inicio < :minuto_fin AND minuto_fin > :minuto_inicio
+  AND expira > :ahora AND terminal <> :terminal AND retencion_id IS NOT :retencion_id
+LIMIT 1
+"""
+
+SQL_RETENCIONES_FECHA = """
+SELECT sala_id, minuto_inicio, minuto_fin FROM retenciones
+WHERE fecha_normalizada = ? AND expira > ? AND terminal <> ?
+"""
+
+def espacio_ocupado(cursor, sala_id, fecha_iso, minuto_inicio, minuto_fin, terminal=None, retencion_id=None):
+    cursor.execute(SQL_ESPACIO_OCUPADO, {"sala_id": sala_id, "fecha": fecha_iso, "minuto_inicio": minuto_inicio,
+                                         "minuto_fin": minuto_fin, "ahora": time.time(), "terminal": terminal or TERMINAL_ID,
+                                         "retencion_id": retencion_id})
+    return cursor.fetchone() is not None
+
+@trazable("disponibilidad", 1)
+@instrumentado("bd.disponibilidad_fecha")
+def disponibilidad_fecha(fecha_dt, terminal=None):
+    referencia = referencia_mapa() if mapa_disponibilidad is not None else referencia_actual()
+    fecha_iso = fecha_dt.strftime(FORMATO_FECHA_ISO)
+    disponibles = []
+    entrada = dia_precargado(fecha_dt)
+    if entrada is not None and entrada["version_referencia"] == referencia["version"]:
+        ocupados = entrada["ocupados"]
+        with candado_cache_dias:
+            retenidos = conexion_cache_dias.execute(SQL_RETENCIONES_FECHA, (fecha_iso, time.time(), terminal or TERMINAL_ID)).fetchall()
+    else:
+        ocupados = ocupados_mapa(fecha_dt, referencia)
+        if ocupados is not None:
+            retenidos = retenciones_mapa(fecha_dt, terminal)
+    if ocupados is not None:
+        for fila_sala in referencia["salas"]:
+            for fila_turno in referencia["turnos"]:
+                if (fila_sala["sala_id"], fila_turno["turno_id"]) in ocupados:
+                    continue
+                if any(sala_id == fila_sala["sala_id"] and minuto_inicio < fila_turno["minuto_fin"] and minuto_fin > fila_turno["minuto_inicio"]
+                       for sala_id, minuto_inicio, minuto_fin in retenidos):
+                    continue
+                disponibles.append((fila_sala["sala_id"], fila_sala["nombre"], fila_sala["cupo"], fila_turno["descripcion"]))
+        return disponibles
+    with conectar_bd() as conexion:
+        cursor = conexion.cursor()
+        for fila_sala in referencia["salas"]:
+            for fila_turno in referencia["turnos"]:
+                if not espacio_ocupado(cursor, fila_sala["sala_id"], fecha_iso, fila_turno["minuto_inicio"], fila_turno["minuto_fin"], terminal):
+                    disponibles.append((fila_sala["sala_id"], fila_sala["nombre"], fila_sala["cupo"], fila_turno["descripcion"]))
+        cursor.close()
+    return disponibles
+
+@instrumentado("bd.retener_espacio")
+def retener_espacio(sala_id, fecha_dt, minuto_inicio, minuto_fin, terminal=None, ttl=None):
+    terminal = terminal or TERMINAL_ID
+    fecha_iso = fecha_dt.strftime(FORMATO_FECHA_ISO)
+    expira = time.time() + (ttl or ttl_retencion)
+    with transaccion_inmediata() as cursor:
+        if espacio_ocupado(cursor, sala_id, fecha_iso, minuto_inicio, minuto_fin, terminal):
+            return None
+        cursor.execute("""
+            INSERT INTO retenciones (sala_id, fecha_normalizada, minuto_inicio, minuto_fin, terminal, expira)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (sala_id, fecha_iso, minuto_inicio, minuto_fin, terminal, expira))
+        retencion_id = cursor.lastrowid
+    with candado_retenciones:
+        heapq.heappush(monticulo_retenciones, (expira, retencion_id))
+    if mapa_disponibilidad is not None:
+        marcar_retencion_mapa(retencion_id, sala_id, fecha_iso, minuto_inicio, minuto_fin, terminal, expira)
+    return retencion_id
+
+def liberar_retencion(retencion_id):
+    if retencion_id is None:
+        return
+    with conectar_bd() as conexion:
+        conexion.execute("DELETE FROM retenciones WHERE retencion_id = ?", (retencion_id,))
+        conexion.commit()
+    quitar_retencion_mapa(retencion_id)
+
+TTL_CLAVE_IDEMPOTENCIA = 24 * 3600.0
+INTERVALO_PURGA_CLAVES = 600.0
+LOTE_PURGA_CLAVES = 500
+REINTENTOS_RESERVA = 3
+
+def nueva_clave_idempotencia():
+    return uuid.uuid4().hex
+
+def _huella_solicitud(*valores):
+    return hashlib.sha1(json.dumps(valores, default=_codificar_traza).encode("utf-8")).hexdigest()
+
+def _clave_registrada(cursor, clave, huella):
+    cursor.execute("SELECT huella, folio, grupo_id FROM claves_idempotencia WHERE clave = ? AND expira > ?", (clave, time.time()))
+    fila = cursor.fetchone()
+    if fila is not None and fila[0] != huella:
+        raise ValueError(f"La clave de idempotencia {clave} ya se uso con datos distintos.")
+    return fila
+
+def _registrar_clave(cursor, clave, huella, folio=None, grupo_id=None):
+    cursor.execute("INSERT OR REPLACE INTO claves_idempotencia (clave, huella, folio, grupo_id, expira) VALUES (?, ?, ?, ?, ?)",
+                   (clave, huella, folio, grupo_id, time.time() + TTL_CLAVE_IDEMPOTENCIA))
+
+@trazable("reservar", 1)
+@instrumentado("bd.confirmar_reserva")
+def confirmar_reserva(cliente_id, sala_id, fecha_dt, turno_id, evento, minuto_inicio, minuto_fin, retencion_id=None, terminal=None,
+                      clave=None, ruta_bd=None):
+    fecha_iso = fecha_dt.strftime(FORMATO_FECHA_ISO)
+    with transaccion_inmediata(ruta_bd) as cursor:
+        if clave is not None:
+            huella = _huella_solicitud(cliente_id, sala_id, fecha_iso, turno_id, evento, minuto_inicio, minuto_fin)
+            registrada = _clave_registrada(cursor, clave, huella)
+            if registrada is not None:
+                return registrada[1]
+        if espacio_ocupado(cursor, sala_id, fecha_iso, minuto_inicio, minuto_fin, terminal, retencion_id):
+            return None
+        cursor.execute("""
+            INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento, minuto_inicio, minuto_fin)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (cliente_id, sala_id, fecha_iso, turno_id, evento, minuto_inicio, minuto_fin))
+        folio = cursor.lastrowid
+        if retencion_id is not None:
+            cursor.execute("DELETE FROM retenciones WHERE retencion_id = ?", (retencion_id,))
+        if clave is not None:
+            _registrar_clave(cursor, clave, huella, folio=folio)
+    if mapa_disponibilidad is not None and ruta_bd is None:
+        marcar_ocupado_mapa(sala_id, fecha_iso, minuto_inicio, minuto_fin)
+        if retencion_id is not None:
+            quitar_retencion_mapa(retencion_id)
+    return folio
+
+@instrumentado("bd.purgar_claves")
+def purgar_claves_idempotencia(ahora=None, lote=LOTE_PURGA_CLAVES):
+    ahora = time.time() if ahora is None else ahora
+    total = 0
+    while True:
+        with transaccion_inmediata() as cursor:
+            cursor.execute("""
+                DELETE FROM claves_idempotencia WHERE clave IN (
+                    SELECT clave FROM claves_idempotencia WHERE expira <= ? ORDER BY expira LIMIT ?
+                )
+            """, (ahora, lote))
+            borradas = cursor.rowcount
+        total += borradas
+        if borradas < lote:
+            return total
+
+@instrumentado("bd.barrer_retenciones")
+def barrer_retenciones(ahora=None):
+    ahora = time.time() if ahora is None else ahora
+    with candado_retenciones:
+        while monticulo_retenciones and monticulo_retenciones[0][0] <= ahora:
+            heapq.heappop(monticulo_retenciones)
+    with conectar_bd() as conexion:
+        borradas = conexion.execute("DELETE FROM retenciones WHERE expira <= ?", (ahora,)).rowcount
+        conexion.commit()
+    return borradas
+
+def _ciclo_barrido(parada):
+    proxima_purga = time.time()
+    while True:
+        with candado_retenciones:
+            proxima = monticulo_retenciones[0][0] if monticulo_retenciones else None
+        espera = ttl_retencion if proxima is None else min(ttl_retencion, max(0.0, proxima - time.time()))
+        if parada.wait(espera):
+            return
+        try:
+            barrer_retenciones()
+        except Exception as error:
+            print(f"Advertencia: no se pudieron barrer las retenciones vencidas: {error}")
+        if time.time() >= proxima_purga:
+            proxima_purga = time.time() + INTERVALO_PURGA_CLAVES
+            try:
+                purgar_claves_idempotencia()
+            except Exception as error:
+                print(f"Advertencia: no se pudieron purgar las claves de idempotencia vencidas: {error}")
+            try:
+                purgar_avisos()
+            except Exception as error:
+                print(f"Advertencia: no se pudieron purgar los avisos de cambios antiguos: {error}")
+
+def configurar_retenciones(ttl=None, barrido=True):
+    global ttl_retencion, parada_barrido
+    if ttl:
+        ttl_retencion = ttl
+    if barrido and parada_barrido is None:
+        parada_barrido = threading.Event()
+        threading.Thread(target=_ciclo_barrido, args=(parada_barrido,), name="barrido-retenciones", daemon=True).start()
+
+INTERVALO_AVISOS = 0.05
+LOTE_AVISOS = 1000
+AVISOS_CONSERVADOS = 100000
+suscriptores_avisos = {}
+candado_avisos = threading.Condition()
+secuencia_avisos = None
+parada_avisos = None
+hilo_avisos = None
+
+CONSULTA_AVISOS = """
+SELECT secuencia, folio, tipo, sala_id, fecha_normalizada, minuto_inicio, minuto_fin, activo,
+       sala_anterior, fecha_anterior, inicio_anterior, fin_anterior
+FROM avisos_reserva
+WHERE secuencia > ?
+ORDER BY secuencia
+LIMIT ?
+"""
+
+def _aviso_desde_fila(fila):
+    aviso = {"secuencia": fila[0], "folio": fila[1], "tipo": fila[2], "sala_id": fila[3], "fecha": fila[4],
+             "minuto_inicio": fila[5], "minuto_fin": fila[6], "activo": fila[7]}
+    if fila[8] is not None:
+        aviso["anterior"] = {"sala_id": fila[8], "fecha": fila[9], "minuto_inicio": fila[10], "minuto_fin": fila[11]}
+    return aviso
+
+def leer_avisos(desde, limite=LOTE_AVISOS, conexion=None):
+    with (contextlib.nullcontext(conexion) if conexion is not None else conectar_bd()) as conexion_avisos:
+        avisos = [_aviso_desde_fila(fila) for fila in conexion_avisos.execute(CONSULTA_AVISOS, (desde, limite))]
+        if avisos:
+            return avisos, avisos[-1]["secuencia"], avisos[0]["secuencia"] != desde + 1
+        ultimo = conexion_avisos.execute("SELECT ultimo FROM secuencia_cambios WHERE id = 1").fetchone()[0]
+    return [], max(desde, ultimo), ultimo > desde
+
+def suscribir_cambios(funcion, nombre=None):
+    nombre = nombre or f"suscriptor-{id(funcion)}"
+    with candado_avisos:
+        suscriptores_avisos[nombre] = funcion
+    iniciar_avisos()
+    return nombre
+
+def cancelar_suscripcion(nombre):
+    with candado_avisos:
+        suscriptores_avisos.pop(nombre, None)
+        sin_suscriptores = not suscriptores_avisos
+    if sin_suscriptores:
+        detener_avisos()
+
+def _repartir_avisos(avisos, reinicio):
+    with candado_avisos:
+        destinos = list(suscriptores_avisos.items())
+    for nombre, funcion in destinos:
+        try:
+            funcion(avisos, reinicio)
+        except Exception as error:
+            print(f"\nAdvertencia: el suscriptor '{nombre}' fallo al recibir cambios: {error}")
+
+def _ciclo_avisos(parada):
+    global secuencia_avisos
+    conexion = None
+    data_version = None
+    while not parada.is_set():
+        try:
+            if conexion is None:
+                conexion = _abrir_conexion(DB_FILE)
+                data_version = None
+                if secuencia_avisos is None:
+                    secuencia_avisos = conexion.execute("SELECT ultimo FROM secuencia_cambios WHERE id = 1").fetchone()[0]
+            version_actual = conexion.execute("PRAGMA data_version").fetchone()[0]
+            if version_actual != data_version:
+                data_version = version_actual
+                while True:
+                    with medir("avisos.lote"):
+                        avisos, hasta, reinicio = leer_avisos(secuencia_avisos, conexion=conexion)
+                    if hasta == secuencia_avisos:
+                        break
+                    with candado_avisos:
+                        secuencia_avisos = hasta
+                        candado_avisos.notify_all()
+                    _repartir_avisos(avisos, reinicio)
+                    if len(avisos) < LOTE_AVISOS:
+                        break
+        except Exception as error:
+            print(f"\nAdvertencia: no se pudieron leer los avisos de cambios: {error}")
+            if conexion is not None:
+                conexion.close()
+                conexion = None
+        parada.wait(INTERVALO_AVISOS)
+    if conexion is not None:
+        conexion.close()
+
+def iniciar_avisos():
+    global parada_avisos, hilo_avisos
+    if parada_avisos is None:
+        parada_avisos = threading.Event()
+        hilo_avisos = threading.Thread(target=_ciclo_avisos, args=(parada_avisos,), name="avisos", daemon=True)
+        hilo_avisos.start()
+
+def detener_avisos():
+    global parada_avisos, hilo_avisos, secuencia_avisos
+    if parada_avisos is not None:
+        parada_avisos.set()
+        hilo_avisos.join()
+        parada_avisos = None
+        hilo_avisos = None
+        secuencia_avisos = None
+
+def esperar_cambios(desde, espera=30.0, limite=LOTE_AVISOS):
+    iniciar_avisos()
+    limite_tiempo = time.monotonic() + espera
+    with candado_avisos:
+        while secuencia_avisos is None or secuencia_avisos <= desde:
+            restante = limite_tiempo - time.monotonic()
+            if restante <= 0:
+                return [], desde, False
+            candado_avisos.wait(restante)
+    return leer_avisos(desde, limite)
+
+@instrumentado("bd.purgar_avisos")
+def purgar_avisos(conservar=AVISOS_CONSERVADOS, lote=LOTE_PURGA_CLAVES):
+    total = 0
+    while True:
+        with transaccion_inmediata() as cursor:
+            cursor.execute("""
+                DELETE FROM avisos_reserva WHERE secuencia IN (
+                    SELECT secuencia FROM avisos_reserva
+                    WHERE secuencia <= (SELECT ultimo FROM secuencia_cambios WHERE id = 1) - ?
+                    ORDER BY secuencia LIMIT ?
+                )
+            """, (conservar, lote))
+            borradas = cursor.rowcount
+        total += borradas
+        if borradas < lote:
+            return total
+
+DIAS_PRECARGA_PREDETERMINADOS = 14
+INTERVALO_PRECARGA = 5.0
+dias_precarga = 0
+cache_dias = {}
+candado_cache_dias = threading.Lock()
+conexion_cache_dias = None
+ruta_cache_dias = None
+data_version_cache_dias = None
+secuencia_cache_dias = None
+version_cache_dias = None
+despertar_precarga = threading.Event()
+precarga_completa = threading.Event()
+parada_precarga = None
+hilo_precarga = None
+primer_reporte_medido = False
+
+SQL_OCUPACION_TURNOS = f"""
+SELECT DISTINCT r.sala_id, t.turno_id
+FROM reservas r
+JOIN turnos t ON t.turno_id <> {TURNO_HORARIO_ID}
+  AND r.minuto_inicio < COALESCE(t.minuto_fin, {MINUTOS_DIA}) AND r.minuto_fin > COALESCE(t.minuto_inicio, 0)
+WHERE r.fecha_normalizada = ? AND r.activo = 1
+"""
+
+SQL_VERSIONES_CACHE = """
+SELECT (SELECT version FROM version_referencia WHERE id = 1), (SELECT ultimo FROM secuencia_cambios WHERE id = 1)
+"""
+
+def _validar_cache_dias():
+    global conexion_cache_dias, ruta_cache_dias, data_version_cache_dias, secuencia_cache_dias, version_cache_dias
+    if conexion_cache_dias is None or ruta_cache_dias != DB_FILE:
+        if conexion_cache_dias is not None:
+            conexion_cache_dias.close()
+        conexion_cache_dias = _abrir_conexion(DB_FILE, check_same_thread=False)
+        ruta_cache_dias = DB_FILE
+        data_version_cache_dias = None
+        secuencia_cache_dias = None
+    data_version = conexion_cache_dias.execute("PRAGMA data_version").fetchone()[0]
+    if data_version == data_version_cache_dias:
+        return
+    version, secuencia = conexion_cache_dias.execute(SQL_VERSIONES_CACHE).fetchone()
+    if secuencia_cache_dias is None or version != version_cache_dias:
+        if cache_dias:
+            cache_dias.clear()
+            despertar_precarga.set()
+    elif secuencia > secuencia_cache_dias:
+        for (fecha_iso,) in conexion_cache_dias.execute(
+                "SELECT DISTINCT fecha_normalizada FROM reservas INDEXED BY ix_reserva_cambio WHERE secuencia_cambio > ?",
+                (secuencia_cache_dias,)):
+            if cache_dias.pop(fecha_iso, None) is not None:
+                despertar_precarga.set()
+    data_version_cache_dias, secuencia_cache_dias, version_cache_dias = data_version, secuencia, version
+
+def _calcular_dia(conexion, fecha_dt):
+    conexion.execute("BEGIN")
+    try:
+        version, secuencia = conexion.execute(SQL_VERSIONES_CACHE).fetchone()
+        reporte = _filas_reporte_fecha(conexion, fecha_dt)
+        ocupados = set(conexion.execute(SQL_OCUPACION_TURNOS, (fecha_dt.strftime(FORMATO_FECHA_ISO),)).fetchall())
+    finally:
+        conexion.rollback()
+    return {"secuencia": secuencia, "version_referencia": version, "reporte": reporte, "ocupados": ocupados}
+
+def _guardar_dia(fecha_iso, entrada):
+    _validar_cache_dias()
+    if entrada["version_referencia"] != version_cache_dias:
+        return False
+    if entrada["secuencia"] < secuencia_cache_dias and conexion_cache_dias.execute("""
+            SELECT 1 FROM reservas INDEXED BY ix_reserva_cambio
+            WHERE secuencia_cambio > ? AND secuencia_cambio <= ? AND fecha_normalizada = ? LIMIT 1
+        """, (entrada["secuencia"], secuencia_cache_dias, fecha_iso)).fetchone():
+        return False
+    cache_dias[fecha_iso] = entrada
+    return True
+
+def dia_precargado(fecha_dt):
+    if not dias_precarga:
+        return None
+    inicio = time.perf_counter()
+    try:
+        with candado_cache_dias:
+            _validar_cache_dias()
+            entrada = cache_dias.get(fecha_dt.strftime(FORMATO_FECHA_ISO))
+    except sqlite3.Error:
+        return None
+    registrar_operacion("precarga.acierto" if entrada is not None else "precarga.fallo", time.perf_counter() - inicio)
+    return entrada
+
+def _ciclo_precarga(parada):
+    conexion = None
+    inicio = time.perf_counter()
+    while not parada.is_set():
+        try:
+            if conexion is None:
+                conexion = conectar_bd()
+            hoy = datetime.date.today()
+            with candado_cache_dias:
+                _validar_cache_dias()
+                for fecha_iso in [fecha_iso for fecha_iso in cache_dias if fecha_iso < hoy.strftime(FORMATO_FECHA_ISO)]:
+                    del cache_dias[fecha_iso]
+                faltantes = [fecha for fecha in (hoy + datetime.timedelta(days=indice) for indice in range(dias_precarga))
+                             if fecha.strftime(FORMATO_FECHA_ISO) not in cache_dias]
+            for fecha in faltantes:
+                if parada.is_set():
+                    break
+                with medir("precarga.dia"):
+                    entrada = _calcular_dia(conexion, fecha)
+                with candado_cache_dias:
+                    if not _guardar_dia(fecha.strftime(FORMATO_FECHA_ISO), entrada):
+                        despertar_precarga.set()
+            if not precarga_completa.is_set() and not parada.is_set():
+                registrar_operacion("precarga.inicial", time.perf_counter() - inicio)
+                precarga_completa.set()
+        except Exception as error:
+            print(f"\nAdvertencia: no se pudo precargar reportes: {error}")
+            if conexion is not None:
+                conexion.close()
+                conexion = None
+        despertar_precarga.wait(INTERVALO_PRECARGA)
+        despertar_precarga.clear()
+    if conexion is not None:
+        conexion.close()
+
+def _aviso_precarga(avisos, reinicio):
+    fechas = {aviso["fecha"] for aviso in avisos} | {aviso["anterior"]["fecha"] for aviso in avisos if "anterior" in aviso}
+    with candado_cache_dias:
+        if reinicio:
+            cache_dias.clear()
+        for fecha_iso in fechas:
+            cache_dias.pop(fecha_iso, None)
+    despertar_precarga.set()
+
+def iniciar_precarga(dias=DIAS_PRECARGA_PREDETERMINADOS):
+    global dias_precarga, parada_precarga, hilo_precarga
+    dias_precarga = dias
+    if dias and parada_precarga is None:
+        parada_precarga = threading.Event()
+        precarga_completa.clear()
+        hilo_precarga = threading.Thread(target=_ciclo_precarga, args=(parada_precarga,), name="precarga", daemon=True)
+        hilo_precarga.start()
+        suscribir_cambios(_aviso_precarga, "precarga")
+
+def detener_precarga():
+    global dias_precarga, parada_precarga, hilo_precarga
+    dias_precarga = 0
+    if parada_precarga is not None:
+        cancelar_suscripcion("precarga")
+        parada_precarga.set()
+        despertar_precarga.set()
+        hilo_precarga.join()
+        parada_precarga = None
+        hilo_precarga = None
+    with candado_cache_dias:
+        cache_dias.clear()
+
+DIAS_MAPA_PREDETERMINADOS = 365
+MARGEN_SALAS_MAPA = 64
+MAGIA_MAPA = b"EVMP"
+VERSION_MAPA = 2
+CABECERA_MAPA = struct.Struct("<4sHHIIIIqq")
+RANURA_RETENCION_MAPA = struct.Struct("<qIIHHd8s")
+CAPACIDAD_RETENCIONES_MAPA = 1024
+SONDEOS_RETENCION_MAPA = 32
+ESPERA_VERIFICACION_MAPA = 5.0
+mapa_disponibilidad = None
+candado_mapa = threading.Lock()
+candado_registro_memoria = threading.Lock()
+
+SQL_OCUPACION_MAPA = f"""
+SELECT DISTINCT r.sala_id, r.fecha_normalizada, t.turno_id
+FROM reservas r
+JOIN turnos t ON t.turno_id <> {TURNO_HORARIO_ID}
+  AND r.minuto_inicio < COALESCE(t.minuto_fin, {MINUTOS_DIA}) AND r.minuto_fin > COALESCE(t.minuto_inicio, 0)
+WHERE r.fecha_normalizada BETWEEN ? AND ? AND r.activo = 1
+"""
+
+SQL_OCUPACION_CELDA = f"""
+SELECT DISTINCT t.turno_id
+FROM reservas r
+JOIN turnos t ON t.turno_id <> {TURNO_HORARIO_ID}
+  AND r.minuto_inicio < COALESCE(t.minuto_fin, {MINUTOS_DIA}) AND r.minuto_fin > COALESCE(t.minuto_inicio, 0)
+WHERE r.fecha_normalizada = ? AND r.sala_id = ? AND r.activo = 1
+"""
+
+def _abrir_memoria_compartida(nombre):
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)
+    except TypeError:
+        pass
+    with candado_registro_memoria:
+        registrar = resource_tracker.register
+        resource_tracker.register = lambda *argumentos: None
+        try:
+            return shared_memory.SharedMemory(name=nombre)
+        finally:
+            resource_tracker.register = registrar
+
+def _mapa_desde_memoria(memoria, propietario):
+    magia, version, ranuras, salas_mapa, dias, base, capacidad, _, _ = CABECERA_MAPA.unpack_from(memoria.buf)
+    if magia != MAGIA_MAPA or version != VERSION_MAPA:
+        memoria.close()
+        raise ValueError(f"La memoria compartida {memoria.name} no contiene un mapa de disponibilidad.")
+    fin_datos = CABECERA_MAPA.size + dias * salas_mapa * ranuras
+    return {"memoria": memoria, "nombre": memoria.name, "propietario": propietario, "ranuras": ranuras, "salas": salas_mapa,
+            "dias": dias, "base": base, "capacidad": capacidad, "datos": memoria.buf[CABECERA_MAPA.size:fin_datos],
+            "retenciones": memoria.buf[fin_datos:fin_datos + capacidad * RANURA_RETENCION_MAPA.size]}
+
+def estado_mapa(mapa):
+    _, _, _, _, _, _, _, secuencia, version_referencia = CABECERA_MAPA.unpack_from(mapa["memoria"].buf)
+    return secuencia, version_referencia
+
+def _guardar_estado_mapa(mapa, secuencia, version_referencia):
+    CABECERA_MAPA.pack_into(mapa["memoria"].buf, 0, MAGIA_MAPA, VERSION_MAPA, mapa["ranuras"], mapa["salas"],
+                            mapa["dias"], mapa["base"], mapa["capacidad"], secuencia, version_referencia)
+
+def _posicion_mapa(mapa, sala_id, fecha_ordinal, turno_id=0):
+    dia = fecha_ordinal - mapa["base"]
+    if not (0 <= dia < mapa["dias"] and 0 <= sala_id < mapa["salas"] and 0 <= turno_id < mapa["ranuras"]):
+        return None
+    return (dia * mapa["salas"] + sala_id) * mapa["ranuras"] + turno_id
+
+def _ocupacion_esperada(mapa, conexion):
+    conexion.execute("BEGIN")
+    try:
+        secuencia = conexion.execute("SELECT ultimo FROM secuencia_cambios WHERE id = 1").fetchone()[0]
+        fecha_inicio = datetime.date.fromordinal(mapa["base"])
+        fecha_fin = fecha_inicio + datetime.timedelta(days=mapa["dias"] - 1)
+        ocupacion = bytearray(len(mapa["datos"]))
+        for sala_id, fecha_iso, turno_id in conexion.execute(
+                SQL_OCUPACION_MAPA, (fecha_inicio.strftime(FORMATO_FECHA_ISO), fecha_fin.strftime(FORMATO_FECHA_ISO))):
+            posicion = _posicion_mapa(mapa, sala_id, datetime.date.fromisoformat(fecha_iso).toordinal(), turno_id)
+            if posicion is not None:
+                ocupacion[posicion] = 1
+    finally:
+        conexion.rollback()
+    return secuencia, ocupacion
+
+@instrumentado("mapa.reconstruir")
+def reconstruir_mapa(mapa=None):
+    mapa = mapa or mapa_disponibilidad
+    referencia = referencia_actual()
+    with candado_mapa, conectar_bd() as conexion:
+        secuencia, ocupacion = _ocupacion_esperada(mapa, conexion)
+        mapa["datos"][:] = ocupacion
+        mapa["retenciones"][:] = bytes(len(mapa["retenciones"]))
+        for retencion_id, sala_id, fecha_iso, minuto_inicio, minuto_fin, terminal, expira in conexion.execute(
+                "SELECT retencion_id, sala_id, fecha_normalizada, minuto_inicio, minuto_fin, terminal, expira FROM retenciones WHERE expira > ?",
+                (time.time(),)):
+            marcar_retencion_mapa(retencion_id, sala_id, fecha_iso, minuto_inicio, minuto_fin, terminal, expira, mapa)
+        _guardar_estado_mapa(mapa, secuencia, referencia["version"])
+    return secuencia
+
+def marcar_ocupado_mapa(sala_id, fecha_iso, minuto_inicio, minuto_fin, mapa=None, turnos_referencia=None):
+    mapa = mapa or mapa_disponibilidad
+    if mapa is None:
+        return
+    fecha_ordinal = datetime.date.fromisoformat(fecha_iso).toordinal()
+    for fila_turno in turnos_referencia or referencia_actual()["turnos"]:
+        if minuto_inicio < fila_turno["minuto_fin"] and minuto_fin > fila_turno["minuto_inicio"]:
+            posicion = _posicion_mapa(mapa, sala_id, fecha_ordinal, fila_turno["turno_id"])
+            if posicion is not None:
+                mapa["datos"][posicion] = 1
+
+def _huella_terminal(terminal):
+    return hashlib.blake2b(terminal.encode("utf-8"), digest_size=8).digest()
+
+def _ranuras_retencion_mapa(mapa, retencion_id):
+    capacidad = mapa["capacidad"]
+    for sondeo in range(min(SONDEOS_RETENCION_MAPA, capacidad)):
+        yield (retencion_id + sondeo) % capacidad * RANURA_RETENCION_MAPA.size
+
+def marcar_retencion_mapa(retencion_id, sala_id, fecha_iso, minuto_inicio, minuto_fin, terminal, expira, mapa=None):
+    mapa = mapa or mapa_disponibilidad
+    if mapa is None:
+        return False
+    ahora = time.time()
+    for desplazamiento in _ranuras_retencion_mapa(mapa, retencion_id):
+        ocupante, _, _, _, _, vence, _ = RANURA_RETENCION_MAPA.unpack_from(mapa["retenciones"], desplazamiento)
+        if ocupante in (0, retencion_id) or vence <= ahora:
+            RANURA_RETENCION_MAPA.pack_into(mapa["retenciones"], desplazamiento, 0, sala_id, datetime.date.fromisoformat(fecha_iso).toordinal(),
+                                            minuto_inicio, minuto_fin, expira, _huella_terminal(terminal))
+            struct.pack_into("<q", mapa["retenciones"], desplazamiento, retencion_id)
+            return True
+    return False
+
+def quitar_retencion_mapa(retencion_id, mapa=None):
+    mapa = mapa or mapa_disponibilidad
+    if mapa is None:
+        return
+    for desplazamiento in _ranuras_retencion_mapa(mapa, retencion_id):
+        if struct.unpack_from("<q", mapa["retenciones"], desplazamiento)[0] == retencion_id:
+            struct.pack_into("<q", mapa["retenciones"], desplazamiento, 0)
+            return
+
+def retenciones_mapa(fecha_dt, terminal=None, mapa=None):
+    mapa = mapa or mapa_disponibilidad
+    fecha_ordinal = fecha_dt.toordinal()
+    propia = _huella_terminal(terminal or TERMINAL_ID)
+    ahora = time.time()
+    return [(sala_id, minuto_inicio, minuto_fin)
+            for retencion_id, sala_id, ordinal, minuto_inicio, minuto_fin, expira, huella in RANURA_RETENCION_MAPA.iter_unpack(mapa["retenciones"])
+            if retencion_id and ordinal == fecha_ordinal and expira > ahora and huella != propia]
+
+def _recalcular_celdas_mapa(mapa, conexion, celdas):
+    for sala_id, fecha_iso in celdas:
+        posicion = _posicion_mapa(mapa, sala_id, datetime.date.fromisoformat(fecha_iso).toordinal())
+        if posicion is None:
+            continue
+        celda = bytearray(mapa["ranuras"])
+        for (turno_id,) in conexion.execute(SQL_OCUPACION_CELDA, (fecha_iso, sala_id)):
+            if turno_id < mapa["ranuras"]:
+                celda[turno_id] = 1
+        mapa["datos"][posicion:posicion + mapa["ranuras"]] = celda
+
+def _aviso_mapa(avisos, reinicio):
+    mapa = mapa_disponibilidad
+    if mapa is None:
+        return
+    secuencia, version_referencia = estado_mapa(mapa)
+    referencia = referencia_actual()
+    if reinicio or referencia["version"] != version_referencia:
+        reconstruir_mapa(mapa)
+        return
+    with candado_mapa:
+        secuencia, _ = estado_mapa(mapa)
+        celdas = set()
+        for aviso in avisos:
+            if aviso["secuencia"] <= secuencia:
+                continue
+            if aviso["activo"] and aviso["minuto_inicio"] is not None and aviso["minuto_fin"] is not None:
+                marcar_ocupado_mapa(aviso["sala_id"], aviso["fecha"], aviso["minuto_inicio"], aviso["minuto_fin"], mapa,
+                                    referencia["turnos"])
+            else:
+                celdas.add((aviso["sala_id"], aviso["fecha"]))
+            if "anterior" in aviso:
+                celdas.add((aviso["anterior"]["sala_id"], aviso["anterior"]["fecha"]))
+        if celdas:
+            with medir("mapa.recalcular"), conectar_bd() as conexion:
+                _recalcular_celdas_mapa(mapa, conexion, celdas)
+        if avisos and avisos[-1]["secuencia"] > secuencia:
+            _guardar_estado_mapa(mapa, avisos[-1]["secuencia"], version_referencia)
+
+def crear_mapa_disponibilidad(nombre=None, dias=DIAS_MAPA_PREDETERMINADOS, fecha_inicio=None):
+    global mapa_disponibilidad, secuencia_avisos
+    cerrar_mapa_disponibilidad()
+    referencia = referencia_actual()
+    salas_mapa = max((fila_sala["sala_id"] for fila_sala in referencia["salas"]), default=0) + MARGEN_SALAS_MAPA
+    ranuras = max((fila_turno["turno_id"] for fila_turno in referencia["turnos"]), default=0) + 1
+    memoria = shared_memory.SharedMemory(name=nombre, create=True, size=CABECERA_MAPA.size + dias * salas_mapa * ranuras
+                                         + CAPACIDAD_RETENCIONES_MAPA * RANURA_RETENCION_MAPA.size)
+    CABECERA_MAPA.pack_into(memoria.buf, 0, MAGIA_MAPA, VERSION_MAPA, ranuras, salas_mapa, dias,
+                            (fecha_inicio or datetime.date.today()).toordinal(), CAPACIDAD_RETENCIONES_MAPA, -1, referencia["version"])
+    mapa_disponibilidad = _mapa_desde_memoria(memoria, os.getpid())
+    with conectar_bd() as conexion:
+        ultimo = conexion.execute("SELECT ultimo FROM secuencia_cambios WHERE id = 1").fetchone()[0]
+    with candado_avisos:
+        if secuencia_avisos is None:
+            secuencia_avisos = ultimo
+    suscribir_cambios(_aviso_mapa, "mapa")
+    reconstruir_mapa(mapa_disponibilidad)
+    return mapa_disponibilidad
+
+def abrir_mapa_disponibilidad(nombre):
+    global mapa_disponibilidad
+    cerrar_mapa_disponibilidad()
+    mapa_disponibilidad = _mapa_desde_memoria(_abrir_memoria_compartida(nombre), None)
+    return mapa_disponibilidad
+
+def cerrar_mapa_disponibilidad():
+    global mapa_disponibilidad
+    mapa = mapa_disponibilidad
+    if mapa is None:
+        return
+    mapa_disponibilidad = None
+    propietario = mapa["propietario"] == os.getpid()
+    if propietario:
+        cancelar_suscripcion("mapa")
+    mapa["datos"].release()
+    mapa["retenciones"].release()
+    mapa["memoria"].close()
+    if propietario:
+        mapa["memoria"].unlink()
+
+atexit.register(cerrar_mapa_disponibilidad)
+
+def turno_libre_mapa(sala_id, fecha_dt, turno_id, mapa=None):
+    mapa = mapa or mapa_disponibilidad
+    if mapa is None:
+        return None
+    posicion = _posicion_mapa(mapa, sala_id, fecha_dt.toordinal(), turno_id)
+    if posicion is None:
+        return None
+    return mapa["datos"][posicion] == 0
+
+def ocupados_mapa(fecha_dt, referencia, mapa=None):
+    mapa = mapa or mapa_disponibilidad
+    if mapa is None or estado_mapa(mapa)[1] != referencia["version"]:
+        return None
+    ocupados = set()
+    for fila_sala in referencia["salas"]:
+        posicion = _posicion_mapa(mapa, fila_sala["sala_id"], fecha_dt.toordinal())
+        if posicion is None:
+            return None
+        celda = mapa["datos"][posicion:posicion + mapa["ranuras"]]
+        ocupados.update((fila_sala["sala_id"], fila_turno["turno_id"]) for fila_turno in referencia["turnos"]
+                        if fila_turno["turno_id"] >= mapa["ranuras"] or celda[fila_turno["turno_id"]])
+    return ocupados
+
+@instrumentado("mapa.verificar")
+def verificar_mapa_disponibilidad(mapa=None, espera=ESPERA_VERIFICACION_MAPA):
+    mapa = mapa or mapa_disponibilidad
+    referencia = referencia_actual()
+    with conectar_bd() as conexion:
+        limite = time.monotonic() + espera
+        while True:
+            secuencia, ocupacion = _ocupacion_esperada(mapa, conexion)
+            secuencia_mapa, version_referencia = estado_mapa(mapa)
+            if secuencia_mapa >= secuencia or time.monotonic() >= limite:
+                break
+            time.sleep(INTERVALO_AVISOS)
+    actual = bytes(mapa["datos"])
+    diferencias = []
+    if actual != ocupacion:
+        for posicion in (indice for indice in range(len(actual)) if actual[indice] != ocupacion[indice]):
+            dia, resto = divmod(posicion, mapa["salas"] * mapa["ranuras"])
+            sala_id, turno_id = divmod(resto, mapa["ranuras"])
+            diferencias.append({"sala_id": sala_id, "fecha": datetime.date.fromordinal(mapa["base"] + dia).strftime(FORMATO_FECHA_ISO),
+                                "turno_id": turno_id, "bd": ocupacion[posicion], "mapa": actual[posicion]})
+    return {"nombre": mapa["nombre"], "secuencia_bd": secuencia, "secuencia_mapa": secuencia_mapa,
+            "referencia_vigente": version_referencia == referencia["version"], "espacios": len(actual), "diferencias": diferencias}
+
+def imprimir_verificacion_mapa(resultado, limite=20):
+    print(f"\nMapa {resultado['nombre']}: {resultado['espacios']} espacio(s), secuencia {resultado['secuencia_mapa']} "
+          f"(BD {resultado['secuencia_bd']})")
+    if not resultado["referencia_vigente"]:
+        print("Advertencia: el mapa se construyo con otra version de salas y turnos.")
+    if not resultado["diferencias"]:
+        print("El mapa coincide con las reservaciones de la BD.")
+        return
+    print(f"{len(resultado['diferencias'])} diferencia(s) con la BD:")
+    print(tabulate([[diferencia["sala_id"], diferencia["fecha"], diferencia["turno_id"], diferencia["bd"], diferencia["mapa"]]
+                    for diferencia in resultado["diferencias"][:limite]],
+                   headers=["SALA", "FECHA", "TURNO", "OCUPADO EN BD", "OCUPADO EN MAPA"], tablefmt="grid"))
+
+def servir_mapa_disponibilidad(nombre=None, dias=DIAS_MAPA_PREDETERMINADOS):
+    mapa = crear_mapa_disponibilidad(nombre, dias)
+    print(f"Mapa de disponibilidad '{mapa['nombre']}' publicado: {mapa['dias']} dia(s) desde "
+          f"{datetime.date.fromordinal(mapa['base']).strftime(FORMATO_FECHA_INPUT)}, {len(mapa['datos'])} byte(s) "
+          f"(Ctrl+C para salir)...", file=sys.stderr)
+    parada = threading.Event()
+    signal.signal(signal.SIGTERM, lambda numero, marco: parada.set())
+    try:
+        while not parada.wait(1.0):
+            if referencia_actual()["version"] != estado_mapa(mapa)[1]:
+                reconstruir_mapa(mapa)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cerrar_mapa_disponibilidad()
+
+def seguir_cambios(desde=None, espera=30.0):
+    if desde is None:
+        with conectar_bd() as conexion:
+            desde = conexion.execute("SELECT ultimo FROM secuencia_cambios WHERE id = 1").fetchone()[0]
+    print(f"Esperando cambios posteriores a la secuencia {desde} (Ctrl+C para salir)...", file=sys.stderr)
+    try:
+        while True:
+            avisos, desde, reinicio = esperar_cambios(desde, espera)
+            if reinicio:
+                print(json.dumps({"reinicio": True}), flush=True)
+            for aviso in avisos:
+                print(json.dumps(aviso, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        detener_avisos()
+
+PAGINAS_VACUUM_PASO = 256
+PAUSA_MANTENIMIENTO = 0.05
+ESPERAS_ACTIVIDAD_MAXIMAS = 3
+LIMITE_ANALISIS = 1000
+DERIVA_ESTADISTICAS = 0.25
+HORAS_MANTENIMIENTO_PREDETERMINADAS = 6.0
+MODOS_AUTO_VACUUM = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+parada_mantenimiento = None
+hilo_mantenimiento = None
+
+def estado_almacenamiento(conexion, detalle=False):
+    paginas = conexion.execute("PRAGMA page_count").fetchone()[0]
+    libres = conexion.execute("PRAGMA freelist_count").fetchone()[0]
+    tamano_pagina = conexion.execute("PRAGMA page_size").fetchone()[0]
+    estado = {
+        "paginas": paginas,
+        "libres": libres,
+        "bytes": paginas * tamano_pagina,
+        "fragmentacion": 100.0 * libres / paginas if paginas else 0.0,
+        "auto_vacuum": MODOS_AUTO_VACUUM.get(conexion.execute("PRAGMA auto_vacuum").fetchone()[0], "?"),
+        "sin_usar": None,
+    }
+    if detalle:
+        try:
+            sin_usar, total = conexion.execute("SELECT SUM(unused), SUM(pgsize) FROM dbstat WHERE aggregate = 1").fetchone()
+            estado["sin_usar"] = 100.0 * (sin_usar or 0) / total if total else 0.0
+        except sqlite3.OperationalError:
+            pass
+    return estado
+
+def _tablas_con_estadisticas_vencidas(conexion):
+    if conexion.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is None:
+        return None
+    estimadas = {}
+    for tabla, estadistica in conexion.execute("SELECT tbl, stat FROM sqlite_stat1"):
+        estimadas[tabla] = max(estimadas.get(tabla, 0), int(estadistica.split()[0]))
+    vencidas = []
+    for (tabla,) in conexion.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL%'
+              AND name IN (SELECT tbl_name FROM sqlite_master WHERE type = 'index')
+        """).fetchall():
+        if tabla not in estimadas:
+            if conexion.execute(f'SELECT 1 FROM "{tabla}" LIMIT 1').fetchone() is not None:
+                vencidas.append(tabla)
+        elif abs(conexion.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0] - estimadas[tabla]) > \
+                DERIVA_ESTADISTICAS * max(estimadas[tabla], 1):
+            vencidas.append(tabla)
+    return vencidas
+
+def _pasos_mantenimiento(conexion, paginas_vacuum, verificar):
+    conexion.execute(f"PRAGMA analysis_limit = {LIMITE_ANALISIS}")
+    vencidas = _tablas_con_estadisticas_vencidas(conexion)
+    if vencidas is None:
+        conexion.execute("ANALYZE")
+        yield "analyze", "todas"
+    else:
+        for tabla in vencidas:
+            conexion.execute(f'ANALYZE "{tabla}"')
+            yield "analyze", tabla
+    conexion.execute("PRAGMA optimize")
+    yield "optimize", ""
+    if conexion.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        libres = conexion.execute("PRAGMA freelist_count").fetchone()[0]
+        for _ in range(-(-libres // paginas_vacuum) + 1):
+            if conexion.execute("PRAGMA freelist_count").fetchone()[0] == 0:
+                break
+            conexion.executescript(f"PRAGMA incremental_vacuum({paginas_vacuum});")
+            yield "incremental_vacuum", paginas_vacuum
+    if verificar:
+        for (tabla,) in conexion.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name").fetchall():
+            resultado = [fila[0] for fila in conexion.execute(f'PRAGMA quick_check("{tabla}")')]
+            yield "quick_check", tabla if resultado == ["ok"] else f"{tabla}: {'; '.join(resultado)}"
+    esquema = conexion.execute("SELECT por FROM particiones_reservas LIMIT 1").fetchone()
+    if esquema is not None:
+        nuevas = particionar_reservas(esquema[0], ruta_bd=conexion.execute("PRAGMA database_list").fetchone()[2])
+        yield "particiones", ", ".join(nuevas)
+    conexion.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+    yield "checkpoint", ""
+
+@instrumentado("bd.mantenimiento")
+def mantenimiento(ruta_bd=None, paginas_vacuum=PAGINAS_VACUUM_PASO, verificar=True, convertir=False, pausa=PAUSA_MANTENIMIENTO,
+                  parada=None, detalle=False):
+    conexion = conectar_bd(ruta_bd)
+    try:
+        antes = estado_almacenamiento(conexion, detalle)
+        pasos = []
+        problemas = []
+        if convertir and antes["auto_vacuum"] != "INCREMENTAL":
+            inicio = time.perf_counter()
+            conexion.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conexion.execute("VACUUM")
+            pasos.append(("vacuum (conversion)", "", (time.perf_counter() - inicio) * 1000))
+        data_version = conexion.execute("PRAGMA data_version").fetchone()[0]
+        pendientes = _pasos_mantenimiento(conexion, paginas_vacuum, verificar)
+        while True:
+            inicio = time.perf_counter()
+            paso = next(pendientes, None)
+            if paso is None:
+                break
+            pasos.append(paso + ((time.perf_counter() - inicio) * 1000,))
+            registrar_operacion(f"mantenimiento.{paso[0]}", time.perf_counter() - inicio)
+            if paso[0] == "quick_check" and ":" in str(paso[1]):
+                problemas.append(paso[1])
+            for _ in range(ESPERAS_ACTIVIDAD_MAXIMAS):
+                if parada is not None and parada.wait(pausa):
+                    pendientes.close()
+                    return None
+                if parada is None:
+                    time.sleep(pausa)
+                version_actual = conexion.execute("PRAGMA data_version").fetchone()[0]
+                if version_actual == data_version:
+                    break
+                data_version = version_actual
+        despues = estado_almacenamiento(conexion, detalle)
+    finally:
+        conexion.close()
+    return {"antes": antes, "despues": despues, "pasos": pasos, "problemas": problemas}
+
+def imprimir_mantenimiento(resultado):
+    filas = []
+    for etiqueta, clave in (("Paginas", "paginas"), ("Paginas libres", "libres"), ("Tamano (bytes)", "bytes"),
+                            ("Fragmentacion (% libres)", "fragmentacion"), ("Espacio sin usar en paginas (%)", "sin_usar"),
+                            ("auto_vacuum", "auto_vacuum")):
+        antes, despues = resultado["antes"][clave], resultado["despues"][clave]
+        if antes is None and despues is None:
+            continue
+        filas.append([etiqueta] + [f"{valor:.2f}" if isinstance(valor, float) else valor for valor in (antes, despues)])
+    print(tabulate(filas, headers=["", "ANTES", "DESPUES"], tablefmt="grid"))
+    resumen = {}
+    for paso, _, milisegundos in resultado["pasos"]:
+        cuenta, total, maximo = resumen.get(paso, (0, 0.0, 0.0))
+        resumen[paso] = (cuenta + 1, total + milisegundos, max(maximo, milisegundos))
+    print(tabulate([[paso, cuenta, f"{total:.1f}", f"{maximo:.1f}"] for paso, (cuenta, total, maximo) in resumen.items()],
+                   headers=["PASO", "PORCIONES", "MS TOTAL", "MS MAX POR PORCION"], tablefmt="grid"))
+    if resultado["antes"]["auto_vacuum"] != "INCREMENTAL" and resultado["despues"]["auto_vacuum"] != "INCREMENTAL":
+        print("La BD no usa auto_vacuum INCREMENTAL; ejecute 'mantenimiento --convertir' una vez (requiere un VACUUM completo).")
+    for problema in resultado["problemas"]:
+        print(f"quick_check reporto: {problema}")
+
+def _ciclo_mantenimiento(intervalo, parada):
+    while not parada.wait(intervalo):
+        try:
+            resultado = mantenimiento(parada=parada)
+            if resultado is not None and resultado["problemas"]:
+                print(f"\nAdvertencia: quick_check reporto {len(resultado['problemas'])} problema(s): {resultado['problemas'][0]}")
+        except Exception as error:
+            print(f"\nAdvertencia: no se pudo completar el mantenimiento: {error}")
+
+def iniciar_mantenimiento(horas=HORAS_MANTENIMIENTO_PREDETERMINADAS):
+    global parada_mantenimiento, hilo_mantenimiento
+    if horas and parada_mantenimiento is None:
+        parada_mantenimiento = threading.Event()
+        hilo_mantenimiento = threading.Thread(target=_ciclo_mantenimiento, args=(horas * 3600, parada_mantenimiento),
+                                              name="mantenimiento", daemon=True)
+        hilo_mantenimiento.start()
+
+def detener_mantenimiento():
+    global parada_mantenimiento, hilo_mantenimiento
+    if parada_mantenimiento is not None:
+        parada_mantenimiento.set()
+        hilo_mantenimiento.join()
+        parada_mantenimiento = None
+        hilo_mantenimiento = None
+
+SQL_PRIMEROS_EN_ESPERA = """
+WITH liberados AS (
+    SELECT DISTINCT r.sala_id, r.fecha_normalizada, t.turno_id, t.minuto_inicio, t.minuto_fin
+    FROM reservas r
+    JOIN turnos t ON t.turno_id <> 0 AND t.minuto_inicio < r.minuto_fin AND t.minuto_fin > r.minuto_inicio
+    WHERE r.folio IN (SELECT value FROM json_each(?))
+)
+SELECT l.sala_id, l.fecha_normalizada, l.turno_id, l.minuto_inicio, l.minuto_fin,
+       (SELECT e.espera_id FROM lista_espera e
+        WHERE e.sala_id = l.sala_id AND e.fecha_normalizada = l.fecha_normalizada AND e.turno_id = l.turno_id
+          AND e.estado = 'pendiente'
+        ORDER BY e.espera_id LIMIT 1)
+FROM liberados l
+"""
+
+@trazable("lista_espera", 1)
+@instrumentado("bd.inscribir_lista_espera")
+def inscribir_lista_espera(cliente_id, sala_id, fecha_dt, turno_id, evento):
+    with transaccion_inmediata() as cursor:
+        cursor.execute("""
+            INSERT INTO lista_espera (cliente_id, sala_id, fecha_normalizada, turno_id, evento)
+            VALUES (?, ?, ?, ?, ?)
+        """, (cliente_id, sala_id, fecha_dt.strftime(FORMATO_FECHA_ISO), turno_id, evento))
+        espera_id = cursor.lastrowid
+        cursor.execute("""
+            SELECT COUNT(*) FROM lista_espera
+            WHERE sala_id = ? AND fecha_normalizada = ? AND turno_id = ? AND estado = 'pendiente' AND espera_id <= ?
+        """, (sala_id, fecha_dt.strftime(FORMATO_FECHA_ISO), turno_id, espera_id))
+        posicion = cursor.fetchone()[0]
+    return {"espera_id": espera_id, "posicion": posicion}
+
+def retirar_lista_espera(espera_id):
+    with conectar_bd() as conexion:
+        retiradas = conexion.execute("UPDATE lista_espera SET estado = 'retirada' WHERE espera_id = ? AND estado = 'pendiente'",
+                                     (espera_id,)).rowcount
+        conexion.commit()
+    return retiradas > 0
+
+def _promover_lista_espera(cursor, folios_cancelados):
+    cursor.execute(SQL_PRIMEROS_EN_ESPERA, (json.dumps(folios_cancelados),))
+    candidatos = [fila for fila in cursor.fetchall() if fila[5] is not None]
+    promovidas = []
+    for sala_id, fecha_iso, turno_id, minuto_inicio, minuto_fin, espera_id in candidatos:
+        if espacio_ocupado(cursor, sala_id, fecha_iso, minuto_inicio, minuto_fin):
+            continue
+        cursor.execute("""
+            INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento, minuto_inicio, minuto_fin)
+            SELECT cliente_id, sala_id, fecha_normalizada, turno_id, evento, ?, ? FROM lista_espera WHERE espera_id = ?
+        """, (minuto_inicio, minuto_fin, espera_id))
+        promovidas.append((cursor.lastrowid, espera_id))
+    cursor.executemany("UPDATE lista_espera SET estado = 'promovida', folio = ? WHERE espera_id = ?", promovidas)
+    return promovidas
+
+def _cancelar_y_promover(cursor, condicion, parametros):
+    cursor.execute(f"SELECT folio FROM reservas WHERE activo = 1 AND {condicion}", parametros)
+    folios = [fila[0] for fila in cursor.fetchall()]
+    if not folios:
+        return [], []
+    cursor.execute("UPDATE reservas SET activo = 0 WHERE folio IN (SELECT value FROM json_each(?))", (json.dumps(folios),))
+    return folios, _promover_lista_espera(cursor, folios)
+
+@trazable("cancelar", 2)
+@instrumentado("bd.cancelar_reservas")
+def cancelar_reservas(folios):
+    with transaccion_inmediata() as cursor:
+        canceladas, promovidas = _cancelar_y_promover(cursor, "folio IN (SELECT value FROM json_each(?))", (json.dumps(list(folios)),))
+    return {"canceladas": canceladas, "promovidas": promovidas}
+
+def imprimir_promociones(promovidas):
+    for folio, espera_id in promovidas:
+        print(f"Lista de espera {espera_id}: se asigno el folio {folio} al siguiente cliente en espera.")
+
+def solicitar_lista_espera(cliente_id, fecha_dt, referencia, sala_id=None, turno=None):
+    while sala_id is None:
+        try:
+            texto_sala = input("ID de sala para la lista de espera o 'X' para regresar: ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print("\nOperacion cancelada por el usuario.")
+            return None
+        if texto_sala.upper() == "X":
+            return None
+        if not texto_sala.isdigit() or int(texto_sala) not in referencia["salas_por_id"]:
+            print("ID de sala invalido: ingrese un ID de la lista de salas.")
+            continue
+        sala_id = int(texto_sala)
+    while turno is None:
+        for indice, fila_turno in enumerate(referencia["turnos"], start=1):
+            print(f"{indice}. {fila_turno['descripcion']}")
+        try:
+            texto_turno = input(f"Turno para la lista de espera (1-{len(referencia['turnos'])}) o 'X' para regresar: ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print("\nOperacion cancelada por el usuario.")
+            return None
+        if texto_turno.upper() == "X":
+            return None
+        if not texto_turno.isdigit() or not 1 <= int(texto_turno) <= len(referencia["turnos"]):
+            print("Seleccion de turno invalida.")
+            continue
+        turno = referencia["turnos"][int(texto_turno) - 1]
+    while True:
+        try:
+            evento = input("Nombre del evento o 'X' para regresar: ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print("\nOperacion cancelada por el usuario.")
+            return None
+        if evento.upper() == "X":
+            return None
+        if len(evento) < 3:
+            print("El nombre del evento debe tener al menos 3 caracteres")
+            continue
+        break
+    try:
+        resultado = inscribir_lista_espera(cliente_id, sala_id, fecha_dt, turno["turno_id"], evento)
+    except Exception as error:
+        print(f"Error al inscribir en la lista de espera: {error}")
+        return None
+    print(f"Cliente inscrito en la lista de espera {resultado['espera_id']} "
+          f"(sala {sala_id}, {fecha_dt.strftime(FORMATO_FECHA_INPUT)}, {turno['descripcion']}), posicion {resultado['posicion']}.")
+    return resultado
+
+PESO_DESPERDICIO = 10
+
+def leer_solicitudes_lote(ruta):
+    if ruta.lower().endswith(".json"):
+        with open(ruta, "r", encoding="utf-8") as archivo:
+            registros = json.load(archivo)
+    else:
+        with open(ruta, "r", newline="", encoding="utf-8") as archivo:
+            registros = list(csv.DictReader(archivo))
+    solicitudes = []
+    for numero, registro in enumerate(registros, start=1):
+        turnos = registro.get("turnos") or []
+        if isinstance(turnos, str):
+            turnos = [int(parte) for parte in re.split(r"[|;, ]+", turnos) if parte]
+        try:
+            solicitudes.append({
+                "cliente_id": int(registro["cliente_id"]),
+                "asistentes": int(registro["asistentes"]),
+                "fecha": datetime.datetime.strptime(str(registro["fecha"]).strip(), FORMATO_FECHA_INPUT).date(),
+                "turnos": [int(turno_id) for turno_id in turnos],
+                "evento": str(registro["evento"]).strip(),
+            })
+        except (KeyError, ValueError) as error:
+            raise ValueError(f"Solicitud {numero} invalida: {error}")
+    return solicitudes
+
+@instrumentado("bd.espacios_libres")
+def espacios_libres(fechas):
+    referencia = referencia_actual()
+    fechas = sorted(set(fechas))
+    if not fechas:
+        return {}
+    indice = cargar_indice_intervalos(fechas[0], fechas[-1], incluir_retenciones=True)
+    libres = {}
+    for fecha_dt in fechas:
+        libres[fecha_dt] = [(fila_sala["sala_id"], fila_sala["cupo"], fila_turno["turno_id"], fila_turno["minuto_inicio"], fila_turno["minuto_fin"])
+                            for fila_sala in referencia["salas"] for fila_turno in referencia["turnos"]
+                            if not intervalo_ocupado(indice, fila_sala["sala_id"], fecha_dt, fila_turno["minuto_inicio"], fila_turno["minuto_fin"])]
+    return libres
+
+def _rango_turno(solicitud, turno_id):
+    if not solicitud["turnos"]:
+        return 0
+    return solicitud["turnos"].index(turno_id) if turno_id in solicitud["turnos"] else None
+
+def _asignacion_voraz(solicitudes, indices, libres):
+    asignaciones = {}
+    disponibles = sorted(libres, key=lambda espacio: espacio[1])
+    usados = set()
+    for indice in indices:
+        solicitud = solicitudes[indice]
+        mejor = None
+        for posicion, espacio in enumerate(disponibles):
+            if posicion in usados or espacio[1] < solicitud["asistentes"]:
+                continue
+            rango = _rango_turno(solicitud, espacio[2])
+            if rango is None:
+                continue
+            if mejor is None or (espacio[1], rango) < (disponibles[mejor][1], mejor_rango):
+                mejor, mejor_rango = posicion, rango
+            if espacio[1] > disponibles[mejor][1]:
+                break
+        if mejor is not None:
+            usados.add(mejor)
+            asignaciones[indice] = disponibles[mejor]
+    return asignaciones, [espacio for posicion, espacio in enumerate(disponibles) if posicion not in usados]
+
+def _flujo_costo_minimo(num_nodos, aristas, origen, destino, limite):
+    grafo = [[] for _ in range(num_nodos)]
+    referencias = []
+    for nodo_origen, nodo_destino, capacidad, costo in aristas:
+        grafo[nodo_origen].append([nodo_destino, capacidad, costo, len(grafo[nodo_destino])])
+        grafo[nodo_destino].append([nodo_origen, 0, -costo, len(grafo[nodo_origen]) - 1])
+        referencias.append((nodo_origen, len(grafo[nodo_origen]) - 1, capacidad))
+    potencial = [0] * num_nodos
+    completo = True
+    while True:
+        if time.perf_counter() > limite:
+            completo = False
+            break
+        distancia = [float("inf")] * num_nodos
+        previo = [None] * num_nodos
+        distancia[origen] = 0
+        cola = [(0, origen)]
+        while cola:
+            distancia_nodo, nodo = heapq.heappop(cola)
+            if distancia_nodo > distancia[nodo]:
+                continue
+            for posicion, (vecino, capacidad, costo, _) in enumerate(grafo[nodo]):
+                if capacidad <= 0:
+                    continue
+                nueva = distancia_nodo + costo + potencial[nodo] - potencial[vecino]
+                if nueva < distancia[vecino]:
+                    distancia[vecino] = nueva
+                    previo[vecino] = (nodo, posicion)
+                    heapq.heappush(cola, (nueva, vecino))
+        if previo[destino] is None:
+            break
+        for nodo in range(num_nodos):
+            if previo[nodo] is not None or nodo == origen:
+                potencial[nodo] += distancia[nodo]
+        empuje = float("inf")
+        nodo = destino
+        while nodo != origen:
+            anterior, posicion = previo[nodo]
+            empuje = min(empuje, grafo[anterior][posicion][1])
+            nodo = anterior
+        nodo = destino
+        while nodo != origen:
+            anterior, posicion = previo[nodo]
+            arista = grafo[anterior][posicion]
+            arista[1] -= empuje
+            grafo[nodo][arista[3]][1] += empuje
+            nodo = anterior
+    return [capacidad - grafo[nodo][posicion][1] for nodo, posicion, capacidad in referencias], completo
+
+def _asignacion_flujo(solicitudes, indices, libres, limite):
+    clases_solicitud = {}
+    for indice in indices:
+        solicitud = solicitudes[indice]
+        clases_solicitud.setdefault((solicitud["asistentes"], tuple(solicitud["turnos"])), []).append(indice)
+    clases_espacio = {}
+    for espacio in libres:
+        clases_espacio.setdefault((espacio[1], espacio[2]), []).append(espacio)
+    claves_solicitud = list(clases_solicitud)
+    claves_espacio = list(clases_espacio)
+    origen, destino = 0, len(claves_solicitud) + len(claves_espacio) + 1
+    aristas = [(origen, 1 + posicion, len(clases_solicitud[clave]), 0) for posicion, clave in enumerate(claves_solicitud)]
+    aristas += [(1 + len(claves_solicitud) + posicion, destino, len(clases_espacio[clave]), 0) for posicion, clave in enumerate(claves_espacio)]
+    pares = []
+    for posicion_solicitud, (asistentes, turnos) in enumerate(claves_solicitud):
+        representante = {"asistentes": asistentes, "turnos": list(turnos)}
+        for posicion_espacio, (cupo, turno_id) in enumerate(claves_espacio):
+            rango = _rango_turno(representante, turno_id)
+            if cupo < asistentes or rango is None:
+                continue
+            pares.append((posicion_solicitud, posicion_espacio))
+            aristas.append((1 + posicion_solicitud, 1 + len(claves_solicitud) + posicion_espacio,
+                            len(clases_solicitud[claves_solicitud[posicion_solicitud]]),
+                            (cupo - asistentes) * PESO_DESPERDICIO + rango))
+    flujos, completo = _flujo_costo_minimo(destino + 1, aristas, origen, destino, limite)
+    asignaciones = {}
+    for (posicion_solicitud, posicion_espacio), flujo in zip(pares, flujos[len(claves_solicitud) + len(claves_espacio):]):
+        for _ in range(flujo):
+            indice = clases_solicitud[claves_solicitud[posicion_solicitud]].pop()
+            asignaciones[indice] = clases_espacio[claves_espacio[posicion_espacio]].pop()
+    restantes = [espacio for clave in claves_espacio for espacio in clases_espacio[clave]]
+    return asignaciones, restantes, completo
+
+def optimizar_asignacion(solicitudes, libres, segundos=5.0, metodo="flujo"):
+    limite = time.perf_counter() + segundos
+    por_fecha = {}
+    for indice, solicitud in enumerate(solicitudes):
+        por_fecha.setdefault(solicitud["fecha"], []).append(indice)
+    asignaciones = {}
+    completo = True
+    for fecha_dt, indices in sorted(por_fecha.items()):
+        libres_fecha = libres.get(fecha_dt, [])
+        if metodo == "flujo" and time.perf_counter() < limite:
+            asignadas, libres_fecha, completo_fecha = _asignacion_flujo(solicitudes, indices, libres_fecha, limite)
+            completo = completo and completo_fecha
+            asignaciones.update(asignadas)
+            indices = [indice for indice in indices if indice not in asignadas]
+        elif metodo == "flujo":
+            completo = False
+        asignadas, _ = _asignacion_voraz(solicitudes, indices, libres_fecha)
+        asignaciones.update(asignadas)
+    desperdicio = sum(espacio[1] - solicitudes[indice]["asistentes"] for indice, espacio in asignaciones.items())
+    return {"asignaciones": asignaciones, "sin_asignar": [indice for indice in range(len(solicitudes)) if indice not in asignaciones],
+            "desperdicio": desperdicio, "completo": completo}
+
+@instrumentado("bd.aplicar_asignacion")
+def aplicar_asignacion(solicitudes, asignaciones):
+    filas = [(solicitudes[indice]["cliente_id"], sala_id, solicitudes[indice]["fecha"].strftime(FORMATO_FECHA_ISO), turno_id,
+              solicitudes[indice]["evento"], minuto_inicio, minuto_fin)
+             for indice, (sala_id, _, turno_id, minuto_inicio, minuto_fin) in sorted(asignaciones.items())]
+    with transaccion_inmediata() as cursor:
+        cursor.execute("SELECT value FROM json_each(?) WHERE value NOT IN (SELECT cliente_id FROM clientes)",
+                       (json.dumps(sorted({fila[0] for fila in filas})),))
+        faltantes = [fila[0] for fila in cursor.fetchall()]
+        if faltantes:
+            return {"ok": False, "error": f"Clientes inexistentes: {', '.join(map(str, faltantes))}"}
+        conflictos = _espacios_en_conflicto(cursor, [(fila[1], fila[2], fila[3], fila[5], fila[6]) for fila in filas])
+        if conflictos:
+            return {"ok": False, "error": f"{len(conflictos)} espacio(s) se ocuparon mientras se optimizaba; vuelva a ejecutar."}
+        cursor.executemany("""
+            INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento, minuto_inicio, minuto_fin)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, filas)
+    return {"ok": True, "insertadas": len(filas)}
+
+def asignar_salas_lote(ruta, segundos=5.0, aplicar=False):
+    try:
+        solicitudes = leer_solicitudes_lote(ruta)
+    except (OSError, ValueError) as error:
+        print(f"Error al leer solicitudes: {error}")
+        return False
+    libres = espacios_libres(solicitud["fecha"] for solicitud in solicitudes)
+    inicio = time.perf_counter()
+    voraz = optimizar_asignacion(solicitudes, libres, metodo="voraz")
+    segundos_voraz = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    resultado = optimizar_asignacion(solicitudes, libres, segundos)
+    segundos_flujo = time.perf_counter() - inicio
+
+    referencia = referencia_actual()
+    filas = []
+    for indice, (sala_id, cupo, turno_id, _, _) in sorted(resultado["asignaciones"].items()):
+        solicitud = solicitudes[indice]
+        filas.append([solicitud["evento"], solicitud["fecha"].strftime(FORMATO_FECHA_INPUT), referencia["salas_por_id"][sala_id]["nombre"],
+                      referencia["turnos_por_id"][turno_id]["descripcion"], solicitud["asistentes"], cupo, cupo - solicitud["asistentes"]])
+    print(tabulate(filas, headers=["EVENTO", "FECHA", "SALA", "TURNO", "ASISTENTES", "CUPO", "DESPERDICIO"], tablefmt="grid"))
+    for indice in resultado["sin_asignar"]:
+        solicitud = solicitudes[indice]
+        print(f"Sin asignar: {solicitud['evento']} ({solicitud['asistentes']} asistentes, {solicitud['fecha'].strftime(FORMATO_FECHA_INPUT)})")
+    _imprimir_comparacion_asignacion(len(solicitudes), voraz, segundos_voraz, resultado, segundos_flujo)
+    if not aplicar:
+        print("Plan no aplicado; use --aplicar para registrar las reservaciones.")
+        return True
+    escritura = aplicar_asignacion(solicitudes, resultado["asignaciones"])
+    if not escritura["ok"]:
+        print(f"Asignacion no aplicada: {escritura['error']}")
+        return False
+    cargar_estado_desde_bd()
+    print(f"{escritura['insertadas']} reservacion(es) registrada(s) en una sola transaccion.")
+    return True
+
+def _imprimir_comparacion_asignacion(total, voraz, segundos_voraz, flujo, segundos_flujo):
+    filas = []
+    for nombre, resultado, segundos in (("voraz (mejor ajuste)", voraz, segundos_voraz), ("flujo de costo minimo", flujo, segundos_flujo)):
+        asignadas = len(resultado["asignaciones"])
+        filas.append([nombre + ("" if resultado["completo"] else " (parcial)"), total, asignadas, len(resultado["sin_asignar"]),
+                      resultado["desperdicio"], f"{resultado['desperdicio'] / asignadas if asignadas else 0:.1f}", f"{segundos:.3f}"])
+    print(tabulate(filas, headers=["METODO", "SOLICITUDES", "ASIGNADAS", "SIN ASIGNAR", "DESPERDICIO", "DESPERDICIO/ASIG.", "SEGUNDOS"],
+                   tablefmt="grid"))
+
+PESO_EVENTO = 2.0
+PESO_CLIENTE = 1.0
+UMBRAL_FILTRO_BUSQUEDA = 200
+
+def _palabras_busqueda(texto):
+    texto = texto.lower()
+    if not texto.isascii():
+        texto = "".join(caracter for caracter in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(caracter))
+    return re.findall(r"\w+", texto)
+
+def consulta_fts(texto, prefijo=True):
+    terminos = _palabras_busqueda(texto)
+    if not terminos:
+        return ""
+    return " ".join([f'"{termino}"' for termino in terminos[:-1]] + [f'"{terminos[-1]}"' + ("*" if prefijo else "")])
+
+def _relevancia(terminos, evento, cliente):
+    puntaje = 0.0
+    encontrados = set()
+    for peso, palabras in ((PESO_EVENTO, _palabras_busqueda(evento)), (PESO_CLIENTE, _palabras_busqueda(cliente))):
+        if not palabras:
+            continue
+        coincidencias = 0
+        for posicion, termino in enumerate(terminos):
+            if termino in palabras or (posicion == len(terminos) - 1 and any(palabra.startswith(termino) for palabra in palabras)):
+                coincidencias += 1
+                encontrados.add(posicion)
+        puntaje += peso * coincidencias / len(palabras) ** 0.5
+    return puntaje if len(encontrados) == len(terminos) else 0.0
+
+@trazable("buscar", 3)
+@instrumentado("bd.buscar_reservas")
+def buscar_reservas(texto, fecha_inicio=None, fecha_fin=None, sala_id=None, incluir_canceladas=False, limite=20,
+                    conexion=None):
+    terminos = _palabras_busqueda(texto)
+    if not terminos:
+        return []
+    filtros = ""
+    parametros = []
+    if not incluir_canceladas:
+        filtros += " AND r.activo = 1"
+    if fecha_inicio:
+        filtros += " AND r.fecha_normalizada >= ?"
+        parametros.append(fecha_inicio.strftime(FORMATO_FECHA_ISO))
+    if fecha_fin:
+        filtros += " AND r.fecha_normalizada <= ?"
+        parametros.append(fecha_fin.strftime(FORMATO_FECHA_ISO))
+    if sala_id is not None:
+        filtros += " AND r.sala_id = ?"
+        parametros.append(sala_id)
+    with (contextlib.nullcontext(conexion) if conexion is not None else conectar_bd()) as conexion_busqueda:
+        puntajes = {}
+        acotada = None
+        if fecha_inicio or fecha_fin or sala_id is not None:
+            acotada = conexion_busqueda.execute(f"""
+                SELECT r.folio, b.evento, b.cliente
+                FROM reservas r CROSS JOIN busqueda_reservas b
+                WHERE b.rowid = r.folio{filtros}
+                LIMIT ?
+            """, parametros + [UMBRAL_FILTRO_BUSQUEDA + 1]).fetchall()
+        if acotada is not None and len(acotada) <= UMBRAL_FILTRO_BUSQUEDA:
+            for folio, evento, cliente in acotada:
+                puntaje = _relevancia(terminos, evento, cliente)
+                if puntaje > 0:
+                    puntajes[folio] = puntaje
+        else:
+            for prefijo in (False, True):
+                for folio, rango in conexion_busqueda.execute(f"""
+                    SELECT b.rowid, bm25(busqueda_reservas, ?, ?) AS rango
+                    FROM busqueda_reservas b
+                    JOIN reservas r ON r.folio = b.rowid
+                    WHERE busqueda_reservas MATCH ?{filtros}
+                    ORDER BY rango, b.rowid DESC
+                    LIMIT ?
+                """, [PESO_EVENTO, PESO_CLIENTE, consulta_fts(texto, prefijo)] + parametros + [limite]):
+                    puntajes[folio] = -rango
+                if puntajes:
+                    break
+        mejores = sorted(puntajes, key=lambda folio: (-puntajes[folio], -folio))[:limite]
+        filas = conexion_busqueda.execute("""
+            SELECT r.folio, r.fecha_normalizada, c.nombre, c.apellidos, s.nombre,
+                   CASE WHEN r.turno_id = 0 THEN printf('%02d:%02d-%02d:%02d', r.minuto_inicio / 60, r.minuto_inicio % 60, r.minuto_fin / 60, r.minuto_fin % 60) ELSE t.descripcion END,
+                   r.evento, r.activo
+            FROM reservas r
+            JOIN clientes c ON c.cliente_id = r.cliente_id
+            JOIN salas s ON s.sala_id = r.sala_id
+            JOIN turnos t ON t.turno_id = r.turno_id
+            WHERE r.folio IN (SELECT value FROM json_each(?))
+        """, (json.dumps(mejores),)).fetchall()
+    resultados = [{
+        "folio": folio,
+        "fecha": datetime.datetime.strptime(fecha_iso, FORMATO_FECHA_ISO).strftime(FORMATO_FECHA_INPUT),
+        "cliente": f"{apellidos}, {nombre}",
+        "sala": sala_nombre,
+        "turno": turno_descripcion,
+        "evento": evento,
+        "activo": bool(activo),
+        "puntaje": puntajes[folio],
+    } for folio, fecha_iso, nombre, apellidos, sala_nombre, turno_descripcion, evento, activo in filas]
+    resultados.sort(key=lambda resultado: (-resultado["puntaje"], -resultado["folio"]))
+    return resultados
+
+@instrumentado("bd.reconstruir_busqueda")
+def reconstruir_busqueda():
+    with transaccion_inmediata() as cursor:
+        _reconstruir_busqueda(cursor.connection)
+        cursor.execute("SELECT COUNT(*) FROM busqueda_reservas")
+        return cursor.fetchone()[0]
+
+def imprimir_busqueda(resultados):
+    print(tabulate([[resultado["folio"], resultado["fecha"], resultado["cliente"], resultado["sala"], resultado["turno"],
+                     resultado["evento"] + ("" if resultado["activo"] else " (cancelada)"), f"{resultado['puntaje']:.4g}"]
+                    for resultado in resultados],
+                   headers=["FOLIO", "FECHA", "CLIENTE", "SALA", "TURNO", "EVENTO", "RELEVANCIA"], tablefmt="grid"))
+
+PAGINA_HISTORIAL = 20
+
+@trazable("resumen_cliente", 4)
+@instrumentado("bd.resumen_cliente")
+def resumen_cliente(cliente_id, conexion=None):
+    with (contextlib.nullcontext(conexion) if conexion is not None else conectar_bd()) as conexion_resumen:
+        fila_cliente = conexion_resumen.execute("""
+            SELECT c.nombre, c.apellidos, COALESCE(rc.reservas, 0), COALESCE(rc.canceladas, 0)
+            FROM clientes c LEFT JOIN resumen_cliente rc ON rc.cliente_id = c.cliente_id
+            WHERE c.cliente_id = ?
+        """, (cliente_id,)).fetchone()
+        if fila_cliente is None:
+            return None
+        sala_favorita = conexion_resumen.execute("""
+            SELECT s.nombre, u.reservas FROM uso_cliente_sala u JOIN salas s ON s.sala_id = u.sala_id
+            WHERE u.cliente_id = ? AND u.reservas > 0 ORDER BY u.reservas DESC, u.sala_id LIMIT 1
+        """, (cliente_id,)).fetchone()
+        turno_favorito = conexion_resumen.execute("""
+            SELECT t.descripcion, u.reservas FROM uso_cliente_turno u JOIN turnos t ON t.turno_id = u.turno_id
+            WHERE u.cliente_id = ? AND u.reservas > 0 ORDER BY u.reservas DESC, u.turno_id LIMIT 1
+        """, (cliente_id,)).fetchone()
+    nombre, apellidos, reservas, canceladas = fila_cliente
+    return {
+        "cliente_id": cliente_id,
+        "cliente": f"{apellidos}, {nombre}",
+        "reservas": reservas,
+        "activas": reservas - canceladas,
+        "canceladas": canceladas,
+        "sala_favorita": sala_favorita,
+        "turno_favorito": turno_favorito,
+    }
+
+@trazable("historial", 4)
+@instrumentado("bd.historial_cliente")
+def historial_cliente(cliente_id, pasadas=False, limite=PAGINA_HISTORIAL, despues=None, incluir_canceladas=False,
+                      conexion=None, hoy=None):
+    hoy = hoy or datetime.date.today()
+    despues = despues or (hoy.strftime(FORMATO_FECHA_ISO), 0)
+    comparacion, orden = ("<", "DESC") if pasadas else (">", "ASC")
+    filtro_activo = "" if incluir_canceladas else " AND r.activo = 1"
+    with (contextlib.nullcontext(conexion) if conexion is not None else conectar_bd()) as conexion_historial:
+        filas = conexion_historial.execute(f"""
+            SELECT r.folio, r.fecha_normalizada, s.nombre,
+                   CASE WHEN r.turno_id = 0 THEN printf('%02d:%02d-%02d:%02d', r.minuto_inicio / 60, r.minuto_inicio % 60, r.minuto_fin / 60, r.minuto_fin % 60) ELSE t.descripcion END,
+                   r.evento, r.activo
+            FROM reservas r INDEXED BY ix_reserva_cliente
+            JOIN salas s ON s.sala_id = r.sala_id
+            JOIN turnos t ON t.turno_id = r.turno_id
+            WHERE r.cliente_id = ? AND (r.fecha_normalizada, r.folio) {comparacion} (?, ?){filtro_activo}
+            ORDER BY r.fecha_normalizada {orden}, r.folio {orden}
+            LIMIT ?
+        """, (cliente_id, despues[0], despues[1], limite + 1)).fetchall()
+    siguiente = (filas[limite - 1][1], filas[limite - 1][0]) if len(filas) > limite else None
+    return [{
+        "folio": folio,
+        "fecha": datetime.datetime.strptime(fecha_iso, FORMATO_FECHA_ISO).strftime(FORMATO_FECHA_INPUT),
+        "sala": sala_nombre,
+        "turno": turno_descripcion,
+        "evento": evento,
+        "activo": bool(activo),
+    } for folio, fecha_iso, sala_nombre, turno_descripcion, evento, activo in filas[:limite]], siguiente
+
+def _cursor_historial_argumento(texto):
+    fecha_texto, _, folio_texto = texto.partition(":")
+    try:
+        datetime.datetime.strptime(fecha_texto, FORMATO_FECHA_ISO)
+        return fecha_texto, int(folio_texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"cursor invalido '{texto}': use YYYY-MM-DD:FOLIO")
+
+def imprimir_resumen_cliente(resumen):
+    print(f"\nCliente {resumen['cliente_id']}: {resumen['cliente']}")
+    print(f"Reservaciones: {resumen['reservas']} (activas {resumen['activas']}, canceladas {resumen['canceladas']})")
+    if resumen["sala_favorita"]:
+        print(f"Sala favorita: {resumen['sala_favorita'][0]} ({resumen['sala_favorita'][1]} reservacion(es) activas)")
+    if resumen["turno_favorito"]:
+        print(f"Turno favorito: {resumen['turno_favorito'][0]} ({resumen['turno_favorito'][1]} reservacion(es) activas)")
+
+def imprimir_historial(filas):
+    print(tabulate([[fila["folio"], fila["fecha"], fila["sala"], fila["turno"],
+                     fila["evento"] + ("" if fila["activo"] else " (cancelada)")] for fila in filas],
+                   headers=["FOLIO", "FECHA", "SALA", "TURNO", "EVENTO"], tablefmt="grid"))
+
+def consultar_historial_cliente(cliente_id):
+    resumen = resumen_cliente(cliente_id)
+    if resumen is None:
+        print(f"Cliente invalido: no existe el cliente con ID {cliente_id}.")
+        return False
+    imprimir_resumen_cliente(resumen)
+    pasadas = False
+    despues = None
+    while True:
+        filas, siguiente = historial_cliente(cliente_id, pasadas, despues=despues, incluir_canceladas=True)
+        print(f"\n{'RESERVACIONES PASADAS' if pasadas else 'PROXIMAS RESERVACIONES'}")
+        if filas:
+            imprimir_historial(filas)
+        else:
+            print("Sin reservaciones en esta seccion.")
+        opciones = "'S' siguiente pagina, " if siguiente else ""
+        try:
+            respuesta = input(f"\n{opciones}'P' {'proximas' if pasadas else 'pasadas'} o 'X' para regresar: ").strip().upper()
+        except (EOFError, KeyboardInterrupt):
+            print("\nOperacion cancelada por el usuario.")
+            return True
+        if respuesta == "S" and siguiente:
+            despues = siguiente
+        elif respuesta == "P":
+            pasadas = not pasadas
+            despues = None
+        elif respuesta == "X":
+            return True
+        else:
+            print("Opcion invalida.")
+
+UMBRAL_DUPLICADOS = 0.93
+LONGITUD_PREFIJO_BLOQUE = 4
+LONGITUD_CODIGO_FONETICO = 8
+TAMANO_MAXIMO_BLOQUE = 50
+VENTANA_BLOQUE = 8
+UMBRAL_CONFLICTO_DUPLICADOS = 0.85
+PESO_NOMBRE_DUPLICADO = 0.35
+PENALIZACION_APELLIDO_FALTANTE = 0.95
+REEMPLAZOS_FONETICOS = tuple((re.compile(patron), reemplazo) for patron, reemplazo in (
+    (r"ch", "X"), (r"qu", "k"), (r"gu(?=[ei])", "G"), (r"c(?=[ei])", "s"), (r"[cq]", "k"), (r"z", "s"),
+    (r"g(?=[ei])", "j"), (r"G", "g"), (r"ll", "y"), (r"[vw]", "b"), (r"h", ""), (r"x", "ks"), (r"y$", "i"),
+))
+
+def _normalizar_nombre(texto):
+    return " ".join(_palabras_busqueda(texto or ""))
+
+@functools.lru_cache(maxsize=65536)
+def codigo_fonetico(palabra):
+    palabra = "".join(caracter for caracter in palabra if "a" <= caracter <= "z")
+    if not palabra:
+        return ""
+    for patron, reemplazo in REEMPLAZOS_FONETICOS:
+        palabra = patron.sub(reemplazo, palabra)
+    if not palabra:
+        return ""
+    codigo = palabra[0]
+    for caracter in palabra[1:]:
+        if caracter != codigo[-1]:
+            codigo += caracter
+    return codigo[:LONGITUD_CODIGO_FONETICO]
+
+def _claves_bloqueo(nombre, apellidos):
+    palabras_apellidos = apellidos.split() or [""]
+    primer_apellido = palabras_apellidos[0]
+    segundo_apellido = palabras_apellidos[1] if len(palabras_apellidos) > 1 else ""
+    inicial_nombre = nombre[:1]
+    claves = [f"p:{primer_apellido[:LONGITUD_PREFIJO_BLOQUE]}:{segundo_apellido[:2]}:{inicial_nombre}",
+              f"f:{codigo_fonetico(primer_apellido)}:{codigo_fonetico(nombre.split()[0] if nombre else '')[:2]}"]
+    if segundo_apellido:
+        claves.append(f"s:{codigo_fonetico(segundo_apellido)}:{primer_apellido[:1]}:{inicial_nombre}")
+    return claves
+
+def similitud_jaro_winkler(texto_a, texto_b):
+    if texto_a == texto_b:
+        return 1.0
+    longitud_a, longitud_b = len(texto_a), len(texto_b)
+    if not longitud_a or not longitud_b:
+        return 0.0
+    alcance = max(0, max(longitud_a, longitud_b) // 2 - 1)
+    usados_b = [False] * longitud_b
+    coincidencias_a = []
+    for indice, caracter in enumerate(texto_a):
+        limite = min(longitud_b, indice + alcance + 1)
+        posicion = texto_b.find(caracter, max(0, indice - alcance), limite)
+        while posicion != -1 and usados_b[posicion]:
+            posicion = texto_b.find(caracter, posicion + 1, limite)
+        if posicion != -1:
+            usados_b[posicion] = True
+            coincidencias_a.append(caracter)
+    coincidencias = len(coincidencias_a)
+    if not coincidencias:
+        return 0.0
+    coincidencias_b = [caracter for caracter, usado in zip(texto_b, usados_b) if usado]
+    transposiciones = sum(caracter_a != caracter_b for caracter_a, caracter_b in zip(coincidencias_a, coincidencias_b)) / 2
+    jaro = (coincidencias / longitud_a + coincidencias / longitud_b + (coincidencias - transposiciones) / coincidencias) / 3
+    prefijo = 0
+    for caracter_a, caracter_b in zip(texto_a[:4], texto_b[:4]):
+        if caracter_a != caracter_b:
+            break
+        prefijo += 1
+    return jaro + prefijo * 0.1 * (1 - jaro)
+
+def similitud_clientes(nombre_a, apellidos_a, nombre_b, apellidos_b, minimo=0.0):
+    similitud_nombre = similitud_jaro_winkler(nombre_a, nombre_b)
+    palabras_a, palabras_b = apellidos_a.split(), apellidos_b.split()
+    if not palabras_a or not palabras_b:
+        return PESO_NOMBRE_DUPLICADO * similitud_nombre
+    minimo_apellidos = (minimo - PESO_NOMBRE_DUPLICADO * similitud_nombre) / (1 - PESO_NOMBRE_DUPLICADO)
+    similitud_apellidos = 1.0
+    for palabra_a, palabra_b in zip(palabras_a, palabras_b):
+        if palabra_a == palabra_b or (palabra_a[:1] == palabra_b[:1] and codigo_fonetico(palabra_a) == codigo_fonetico(palabra_b)):
+            continue
+        similitud_apellidos = min(similitud_apellidos, similitud_jaro_winkler(palabra_a, palabra_b))
+        if similitud_apellidos < minimo_apellidos and len(palabras_a) == len(palabras_b):
+            return 0.0
+    if len(palabras_a) != len(palabras_b):
+        similitud_apellidos = PENALIZACION_APELLIDO_FALTANTE * max(
+            similitud_apellidos, similitud_jaro_winkler("".join(palabras_a), "".join(palabras_b)))
+    return PESO_NOMBRE_DUPLICADO * similitud_nombre + (1 - PESO_NOMBRE_DUPLICADO) * similitud_apellidos
+
+def _pares_bloque(miembros):
+    if len(miembros) <= TAMANO_MAXIMO_BLOQUE:
+        return itertools.combinations(miembros, 2)
+    miembros = sorted(miembros, key=lambda cliente: cliente[2] + " " + cliente[1])
+    return ((miembros[indice], miembros[siguiente]) for indice in range(len(miembros))
+            for siguiente in range(indice + 1, min(len(miembros), indice + 1 + VENTANA_BLOQUE)))
+
+def _clientes_ambiguos(pares, nombres):
+    vecinos = {}
+    for cliente_a, cliente_b, _ in pares:
+        vecinos.setdefault(cliente_a, []).append(cliente_b)
+        vecinos.setdefault(cliente_b, []).append(cliente_a)
+    ambiguos = set()
+    for cliente_id, candidatos in vecinos.items():
+        if len(candidatos) > 1 and any(similitud_clientes(*nombres[cliente_a], *nombres[cliente_b]) < UMBRAL_CONFLICTO_DUPLICADOS
+                                       for cliente_a, cliente_b in itertools.combinations(candidatos, 2)):
+            ambiguos.add(cliente_id)
+    return ambiguos
+
+def _agrupar_duplicados(pares, reservas_por_cliente):
+    padres = {}
+
+    def raiz(cliente_id):
+        while padres.get(cliente_id, cliente_id) != cliente_id:
+            padres[cliente_id] = padres.get(padres[cliente_id], padres[cliente_id])
+            cliente_id = padres[cliente_id]
+        return cliente_id
+
+    for cliente_a, cliente_b, _ in pares:
+        raiz_a, raiz_b = raiz(cliente_a), raiz(cliente_b)
+        if raiz_a != raiz_b:
+            padres[max(raiz_a, raiz_b)] = min(raiz_a, raiz_b)
+    miembros = {}
+    for cliente_id in padres:
+        miembros.setdefault(raiz(cliente_id), set()).update((cliente_id, raiz(cliente_id)))
+    grupos = []
+    for ids in miembros.values():
+        conservar = min(ids, key=lambda cliente_id: (-reservas_por_cliente.get(cliente_id, 0), cliente_id))
+        grupos.append({"conservar": conservar, "duplicados": sorted(ids - {conservar})})
+    grupos.sort(key=lambda grupo: grupo["conservar"])
+    return grupos
+
+@instrumentado("clientes.buscar_duplicados")
+def buscar_clientes_duplicados(umbral=UMBRAL_DUPLICADOS, ruta_bd=None):
+    tiempos = {}
+    inicio = time.perf_counter()
+    with conectar_bd(ruta_bd) as conexion:
+        filas = conexion.execute("SELECT cliente_id, nombre, apellidos FROM clientes").fetchall()
+        reservas_por_cliente = dict(conexion.execute("SELECT cliente_id, reservas FROM resumen_cliente WHERE reservas > 0"))
+    tiempos["carga"] = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    bloques = {}
+    nombres = {}
+    for cliente_id, nombre, apellidos in filas:
+        cliente = (cliente_id, _normalizar_nombre(nombre), _normalizar_nombre(apellidos))
+        nombres[cliente_id] = cliente[1:]
+        for clave in _claves_bloqueo(cliente[1], cliente[2]):
+            bloques.setdefault(clave, []).append(cliente)
+    tiempos["bloqueo"] = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    comparados = set()
+    pares = []
+    for miembros in bloques.values():
+        if len(miembros) < 2:
+            continue
+        for (cliente_a, nombre_a, apellidos_a), (cliente_b, nombre_b, apellidos_b) in _pares_bloque(miembros):
+            par = (cliente_a, cliente_b) if cliente_a < cliente_b else (cliente_b, cliente_a)
+            if par in comparados:
+                continue
+            comparados.add(par)
+            puntaje = similitud_clientes(nombre_a, apellidos_a, nombre_b, apellidos_b, umbral)
+            if puntaje >= umbral:
+                pares.append((par[0], par[1], puntaje))
+    tiempos["comparacion"] = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    ambiguos = _clientes_ambiguos(pares, nombres)
+    grupos = _agrupar_duplicados([par for par in pares if par[0] not in ambiguos and par[1] not in ambiguos], reservas_por_cliente)
+    tiempos["agrupacion"] = time.perf_counter() - inicio
+    return {"clientes": len(filas), "bloques": sum(len(miembros) > 1 for miembros in bloques.values()),
+            "comparaciones": len(comparados), "pares": pares, "ambiguos": sorted(ambiguos), "grupos": grupos, "tiempos": tiempos}
+
+@instrumentado("clientes.fusionar")
+def fusionar_clientes(grupos, ruta_bd=None):
+    destino_por_duplicado = {}
+    for grupo in grupos:
+        for cliente_id in grupo["duplicados"]:
+            if cliente_id == grupo["conservar"] or cliente_id in destino_por_duplicado:
+                raise ValueError(f"El cliente {cliente_id} aparece en mas de un grupo de fusion.")
+            destino_por_duplicado[cliente_id] = grupo["conservar"]
+    if set(destino_por_duplicado) & {grupo["conservar"] for grupo in grupos}:
+        raise ValueError("Un cliente que se conserva no puede fusionarse a su vez en otro.")
+    if not destino_por_duplicado:
+        return {"clientes": 0, "reservas": 0, "esperas": 0, "grupos_reserva": 0}
+    with transaccion_inmediata(ruta_bd) as cursor:
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS fusion_clientes (duplicado INTEGER PRIMARY KEY, conservar INTEGER NOT NULL)")
+        cursor.execute("DELETE FROM fusion_clientes")
+        cursor.executemany("INSERT INTO fusion_clientes (duplicado, conservar) VALUES (?, ?)", destino_por_duplicado.items())
+        cursor.execute("SELECT COUNT(*) FROM fusion_clientes f LEFT JOIN clientes c ON c.cliente_id = f.conservar WHERE c.cliente_id IS NULL")
+        if cursor.fetchone()[0]:
+            raise ValueError("Alguno de los clientes que se conservan no existe.")
+        resultado = {"clientes": 0}
+        for tabla, llave in (("reservas", "reservas"), ("lista_espera", "esperas"), ("grupos_reserva", "grupos_reserva")):
+            cursor.execute(f"""
+                UPDATE {tabla} SET cliente_id = (SELECT conservar FROM fusion_clientes WHERE duplicado = {tabla}.cliente_id)
+                WHERE cliente_id IN (SELECT duplicado FROM fusion_clientes)
+            """)
+            resultado[llave] = cursor.rowcount
+        for tabla in ("resumen_cliente", "uso_cliente_sala", "uso_cliente_turno"):
+            cursor.execute(f"DELETE FROM {tabla} WHERE cliente_id IN (SELECT duplicado FROM fusion_clientes)")
+        cursor.execute("DELETE FROM clientes WHERE cliente_id IN (SELECT duplicado FROM fusion_clientes)")
+        resultado["clientes"] = cursor.rowcount
+        cursor.execute("DELETE FROM fusion_clientes")
+    return resultado
+
+def imprimir_duplicados(resultado, limite=50):
+    print(f"\n{resultado['clientes']} cliente(s), {resultado['bloques']} bloque(s) con candidatos, "
+          f"{resultado['comparaciones']} comparacion(es), {len(resultado['pares'])} par(es) sobre el umbral")
+    if resultado["ambiguos"]:
+        print(f"{len(resultado['ambiguos'])} cliente(s) se parecen a varios clientes distintos y se dejan para revision manual: "
+              f"{', '.join(str(cliente_id) for cliente_id in resultado['ambiguos'][:limite])}{' ...' if len(resultado['ambiguos']) > limite else ''}")
+    if not resultado["grupos"]:
+        print("No se encontraron clientes duplicados.")
+        return
+    ids = [cliente_id for grupo in resultado["grupos"][:limite] for cliente_id in [grupo["conservar"]] + grupo["duplicados"]]
+    with conectar_bd() as conexion:
+        nombres = {cliente_id: f"{apellidos}, {nombre}" for cliente_id, nombre, apellidos in conexion.execute(
+            "SELECT cliente_id, nombre, apellidos FROM clientes WHERE cliente_id IN (SELECT value FROM json_each(?))", (json.dumps(ids),))}
+    filas = []
+    for grupo in resultado["grupos"][:limite]:
+        filas.append([grupo["conservar"], nombres.get(grupo["conservar"], ""), "se conserva"])
+        filas.extend([cliente_id, nombres.get(cliente_id, ""), f"se fusiona en {grupo['conservar']}"] for cliente_id in grupo["duplicados"])
+    print(tabulate(filas, headers=["ID", "CLIENTE", "ACCION"], tablefmt="grid"))
+    if len(resultado["grupos"]) > limite:
+        print(f"... y {len(resultado['grupos']) - limite} grupo(s) mas.")
+
+EXITO_OPERACION_TRAZA = {
+    "reservar": lambda resultado: resultado is not None,
+    "reservar_grupo": lambda resultado: resultado["ok"],
+    "cancelar": lambda resultado: bool(resultado["canceladas"]),
+    "cancelar_grupo": lambda resultado: resultado["ok"],
+    "renombrar": lambda resultado: resultado > 0,
+    "renombrar_grupo": lambda resultado: resultado["ok"],
+}
+
+def leer_traza(ruta):
+    with (gzip.open(ruta, "rt", encoding="utf-8") if ruta.endswith(".gz") else open(ruta, encoding="utf-8")) as archivo:
+        cabecera = json.loads(archivo.readline())
+        eventos = [json.loads(linea, object_hook=_decodificar_traza) for linea in archivo if linea.strip()]
+    return cabecera, eventos
+
+def _sesion_reproduccion(eventos, tiempo_real, inicio, resultados):
+    for evento in eventos:
+        if tiempo_real:
+            espera = inicio + evento["t"] - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+        funcion = operaciones_trazables.get(evento["op"])
+        comienzo = time.perf_counter()
+        try:
+            resultado = funcion(**evento["args"])
+            exito = EXITO_OPERACION_TRAZA.get(evento["op"], lambda resultado: True)(resultado)
+            estado = "ok" if exito else "conflicto"
+        except Exception:
+            estado = "error"
+        resultados.append((evento["op"], estado, (time.perf_counter() - comienzo) * 1000))
+
+def reproducir_traza(ruta_traza, ruta_base=None, modo="original", sesiones=1):
+    global DB_FILE
+    cabecera, eventos = leer_traza(ruta_traza)
+    desconocidas = sorted({evento["op"] for evento in eventos} - set(operaciones_trazables))
+    if desconocidas:
+        print(f"Traza invalida: operaciones desconocidas {', '.join(desconocidas)}.")
+        return None
+    ruta_base = ruta_base or cabecera["base"]
+    if not os.path.exists(ruta_base):
+        print(f"No existe la copia base {ruta_base}.")
+        return None
+    ruta_original = DB_FILE
+    with tempfile.TemporaryDirectory() as directorio:
+        DB_FILE = os.path.join(directorio, "reproduccion.db")
+        origen = sqlite3.connect(ruta_base)
+        copia = sqlite3.connect(DB_FILE)
+        try:
+            origen.backup(copia)
+        finally:
+            copia.close()
+            origen.close()
+        try:
+            asegurar_tablas()
+            resultados = [[] for _ in range(sesiones)]
+            inicio = time.perf_counter()
+            with open(os.devnull, "w", encoding="utf-8") as nulo, contextlib.redirect_stdout(nulo):
+                hilos = [threading.Thread(target=_sesion_reproduccion, args=(eventos, modo == "original", inicio, resultados[indice]))
+                         for indice in range(sesiones)]
+                for hilo in hilos:
+                    hilo.start()
+                for hilo in hilos:
+                    hilo.join()
+            segundos = time.perf_counter() - inicio
+        finally:
+            DB_FILE = ruta_original
+
+    por_operacion = {}
+    for op, estado, milisegundos in (resultado for sesion in resultados for resultado in sesion):
+        registro = por_operacion.setdefault(op, {"ok": 0, "conflicto": 0, "error": 0, "latencias": []})
+        registro[estado] += 1
+        registro["latencias"].append(milisegundos)
+    originales = {}
+    for evento in eventos:
+        originales.setdefault(evento["op"], []).append(evento["ms"])
+    filas_resultado = []
+    for op, registro in sorted(por_operacion.items()):
+        latencias = sorted(registro["latencias"])
+        filas_resultado.append([op, len(latencias), registro["ok"], registro["conflicto"], registro["error"],
+                                f"{_percentil(sorted(originales[op]), 0.5):.3f}", f"{_percentil(latencias, 0.5):.3f}",
+                                f"{_percentil(latencias, 0.95):.3f}", f"{_percentil(latencias, 0.99):.3f}", f"{latencias[-1]:.3f}"])
+    total = sum(len(registro["latencias"]) for registro in por_operacion.values())
+    print(f"\nReproduccion de {ruta_traza}: {len(eventos)} operacion(es) x {sesiones} sesion(es), modo {modo}, base {ruta_base}")
+    print(tabulate(filas_resultado, headers=["OPERACION", "EJECUCIONES", "OK", "CONFLICTOS", "ERRORES", "P50 GRABADO MS",
+                                             "P50 MS", "P95 MS", "P99 MS", "MAX MS"], tablefmt="grid"))
+    print(f"Total: {total} operacion(es) en {segundos:.2f} s ({total / segundos if segundos > 0 else 0:.1f} op/s), "
+          f"{sum(registro['conflicto'] for registro in por_operacion.values())} conflicto(s), "
+          f"{sum(registro['error'] for registro in por_operacion.values())} error(es)")
+    return {"operaciones": total, "segundos": segundos, "por_operacion": filas_resultado}
+
+def menu_principal(precarga=0):
+    inicio_bd_ok = cargar_estado_desde_bd()
+    if inicio_bd_ok and precarga:
+        iniciar_precarga(precarga)
+    if inicio_bd_ok:
+        print("\n" + "=" * 70)
+        print("Estado inicial cargado desde Evidencia.db".center(70))
+        print("=" * 70)
+    else:
+        print("\n" + "=" * 70)
+        print("No se pudo cargar Evidencia.db; iniciando con estado vacio".center(70))
+        print("=" * 70)
+
+    operacion_en_curso = None
+    while True:
+        if operacion_en_curso is not None:
+            registrar_operacion(f"menu.opcion_{operacion_en_curso[0]}", time.perf_counter() - operacion_en_curso[1])
+            operacion_en_curso = None
+        print("\n" + "=" * 60)
+        print("SISTEMA DE RESERVACION DE SALAS".center(60))
+        print("=" * 60)
+        print("1. Registrar reservacion de una sala.")
+        print("2. Cancelar evento.")
+        print("3. Editar nombre de evento.")
+        print("4. Consultar reservaciones por fecha.")
+        print("5. Registrar un nuevo cliente.")
+        print("6. Registrar una sala.")
+        print("7. Salir.")
+        print("=" * 60)
+
+        try:
+            opcion_texto = input("Seleccionar una opcion (1-7): ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print("\nOperacion cancelada por el usuario.")
+            sys.exit()
+        
+        if opcion_texto == "":
+            print("Entrada vacia: ingrese un numero entre 1 and 7.")
+            continue
+        if not opcion_texto.isdigit():
+            print("Formato invalido: la opcion debe ser numerica entre 1 and 7.")
+            continue
+        
+        opcion = int(opcion_texto)
+        if opcion < 1 or opcion > 7:
+            print("Opcion fuera de rango: seleccione un valor entre 1 and 7.")
+            continue
+
+        operacion_en_curso = (opcion, time.perf_counter())
+        if opcion == 1:
+            while True:
+                print("\n" + "=" * 60)
+                print("REGISTRAR RESERVACION".center(60))
+                print("=" * 60)
+                cancelar = False
+
+                while True:
+                    try:
+                        texto_fecha = input("\nIngrese fecha de reservacion (MM-DD-YYYY) o 'X' para cancelar: ").strip()
+                    except (EOFError, KeyboardInterrupt):
+                        print("\nOperacion cancelada por el usuario.")
+                        cancelar = True
+                        break
+                    
+                    if texto_fecha.upper() == "X":
+                        print("Operacion cancelada por el usuario.")
+                        cancelar = True
+                        break
+                    
+                    if texto_fecha == "":
+                        print("Fecha invalida: el campo 'Fecha' esta vacio. Formato esperado: MM-DD-YYYY.")
+                        continue
+                    
+                    if any(caracter.isalpha() for caracter in texto_fecha):
+                        print("Fecha invalida: hay letras en la fecha. Use solo digitos y guiones, ejemplo: 12-31-2025.")
+                        continue
+                    if any(caracter in ",./\\" for caracter in texto_fecha) and "-" not in texto_fecha:
+                        print("Fecha invalida: separadores incorrectos. Use '-' entre mes, dia y año. Ejemplo: MM-DD-YYYY.")
+                        continue
+                    try:
+                        fecha = datetime.datetime.strptime(texto_fecha, FORMATO_FECHA_INPUT).date()
+                    except ValueError:
+                        print("Fecha invalida: formato incorrecto. Use MM-DD-YYYY, ejemplo: 12-31-2025.")
+                        continue
+                    
+                    if fecha < datetime.date.today() + datetime.timedelta(days=2):
+                        print("Restriccion de antelacion: la fecha debe ser al menos dos dias posterior a hoy.")
+                        continue
+                    
+                    if fecha.weekday() == 6:
+                        lunes_propuesto = fecha + datetime.timedelta(days=1)
+                        while True:
+                            try:
+                                respuesta_domingo = input(f"La fecha ingresada es domingo. Se propone {lunes_propuesto.strftime(FORMATO_FECHA_INPUT)}. Aceptar? (S/N) o 'X' para cancelar: ").strip().upper()
+                            except (EOFError, KeyboardInterrupt):
+                                print("\nOperacion cancelada por el usuario.")
+                                respuesta_domingo = "X"
+                            
+                            if respuesta_domingo == "X":
+                                cancelar = True
+                                break
+                            if respuesta_domingo == "":
+                                print("Respuesta vacia: escriba 'S' para aceptar o 'N' para rechazar.")
+                                continue
+                            if respuesta_domingo not in ("S", "N"):
+                                print("Respuesta invalida: escriba 'S' para aceptar o 'N' para rechazar.")
+                                continue
+                            if respuesta_domingo == "S":
+                                fecha = lunes_propuesto
+                                break
+                            else:
+                                print("Fecha domingo rechazada. Por favor ingrese una nueva fecha que no sea domingo.")
+                                break
+                            
+                        if cancelar:
+                            break
+                        
+                        if respuesta_domingo == "N":
+                            continue
+                        else:
+                            break
+                        
+                    else:
+                        print(f"Fecha aceptada: {fecha.strftime(FORMATO_FECHA_INPUT)}")
+                        break
+                    
+                if cancelar:
+                    break
+
+                cliente_nombre_completo = ""
+                while True:
+                    clientes_bd = []
+                    try:
+                        with conectar_bd() as conexion:
+                            conexion.row_factory = sqlite3.Row
+                            cursor = conexion.cursor()
+                            cursor.execute("SELECT cliente_id, apellidos, nombre FROM clientes ORDER BY apellidos, nombre")
+                            clientes_bd = cursor.fetchall()
+                            cursor.close()
+                    except Exception as error:
+                        print(f"Error al leer lista de clientes desde BD: {error}")
+                        clientes_bd = []
+
+                    if not clientes_bd:
+                        print("\nNo hay clientes registrados. Use la opcion 5 para registrar un cliente.")
+                        cancelar = True
+                        break
+
+                    print("\n" + "-" * 50)
+                    print("CLIENTES REGISTRADOS")
+                    print("-" * 50)
+                    for fila_cliente in clientes_bd:
+                        print(f"{fila_cliente['cliente_id']}: {fila_cliente['apellidos']}, {fila_cliente['nombre']}")
+                    
+                    try:
+                        sel_cliente_texto = input("\nIngrese ID de cliente o 'X' para cancelar: ").strip()
+                    except (EOFError, KeyboardInterrupt):
+                        print("\nOperacion cancelada por el usuario.")
+                        cancelar = True
+                        break
+                    
+                    if sel_cliente_texto.upper() == "X":
+                        print("Operacion cancelada por el usuario.")
+                        cancelar = True
+                        break
+                    
+                    if sel_cliente_texto == "":
+                        print("ID invalido: el campo esta vacio.")
+                        continue
+                    if sel_cliente_texto == "0":
+                        print("ID invalido: el numero debe ser mayor a 0.")
+                        continue
+                    if not sel_cliente_texto.isdigit():
+                        print("ID invalido: no se aceptan letras en el ID del cliente.")
+                        continue
+                    
+                    cliente_id = int(sel_cliente_texto)
+                    encontrado = any(fila_cliente['cliente_id'] == cliente_id for fila_cliente in clientes_bd)
+                    if not encontrado:
+                        print(f"ID {cliente_id} no encontrado en la base de datos. Ingrese un ID valido de la lista.")
+                        continue
+                    
+                    cliente_seleccionado = next((fila_cliente for fila_cliente in clientes_bd if fila_cliente['cliente_id'] == cliente_id), None)
+                    if cliente_seleccionado:
+                        cliente_nombre_completo = f"{cliente_seleccionado['apellidos']}, {cliente_seleccionado['nombre']}"
+                        print(f"Cliente seleccionado: {cliente_nombre_completo}")
+                    break
+                
+                if cancelar:
+                    break
+
+                disponibles = []
+                try:
+                    referencia = referencia_actual()
+                    disponibles = disponibilidad_fecha(fecha)
+                except Exception as error:
+                    print(f"Error al leer salas desde BD: {error}")
+                    disponibles = []
+
+                if not disponibles:
+                    print("\n" + "-" * 60)
+                    print("NO HAY SALAS DISPONIBLES")
+                    print("-" * 60)
+                    print(f"Para la fecha: {fecha.strftime(FORMATO_FECHA_INPUT)}")
+                    print("No existen salas con turnos libres.")
+                    print("\nSugerencias:")
+                    print("Seleccione otra fecha")
+                    print("Inscriba al cliente en la lista de espera de una sala y turno")
+                    print("Registre mas salas (Opcion 6)")
+                    print("-" * 60)
+
+                    inscribir = preguntar_si_no("\n¿Desea inscribir al cliente en lista de espera? (S/N): ")
+                    if inscribir is None:
+                        break
+                    if inscribir and referencia["salas"] and referencia["turnos"]:
+                        solicitar_lista_espera(cliente_id, fecha, referencia)
+                
+                    while True:
+                        try:
+                            reintentar = input("\n¿Desea intentar con otra fecha? (S/N): ").strip().upper()
+                        except (EOFError, KeyboardInterrupt):
+                            print("\nOperacion cancelada por el usuario.")
+                            reintentar = "N"
+                            break
+
+                        if reintentar == "":
+                            print("Respuesta vacia: escriba 'S' para si o 'N' para no.")
+                            continue
+                        if reintentar not in ("S", "N"):
+                            print("Respuesta invalida: escriba 'S' para si o 'N' para no.")
+                            continue
+
+                        if reintentar == "S":
+                            break
+                        else:
+                            cancelar = True
+                            break
+
+                    if cancelar:
+                        break
+                    else:
+                        continue
+
+                print("\n" + "-" * 50)
+                print(f"SALAS DISPONIBLES PARA {fecha.strftime(FORMATO_FECHA_INPUT)}")
+                print("-" * 50)
+                salas_mostradas = set()
+                for registro_disponible in disponibles:
+                    id_sala_disp = registro_disponible[0]
+                    nombre_sala_disp = registro_disponible[1]
+                    cupo_sala_disp = registro_disponible[2]
+                
+                    if id_sala_disp not in salas_mostradas:
+                        print(f"\nSALA {id_sala_disp}: {nombre_sala_disp} (Cupo: {cupo_sala_disp} personas)")
+                        salas_mostradas.add(id_sala_disp)
+                
+                    turno_disp = registro_disponible[3]
+                    print(f"   {turno_disp}")
+
+                sala_nombre = ""
+                while True:
+                    try:
+                        sel_sala_texto = input("\nIngrese ID de sala o 'X' para cancelar: ").strip()
                     except (EOFError, KeyboardInterrupt):
                         print("\nOperacion cancelada por el usuario.")
-                        reintentar = "N"
+                        cancelar = True
+                        break
+                    
+                    if sel_sala_texto.upper() == "X":
+                        print("Operacion cancelada por el usuario.")
+                        cancelar = True
                         break
+                    
+                    if sel_sala_texto == "":
+                        print("ID de sala invalido: campo vacio.")
+                        continue
+                    if sel_sala_texto == "0":
+                        print("ID invalido: el numero debe ser mayor a 0.")
+                        continue
+                    if not sel_sala_texto.isdigit():
+                        print("ID de sala invalido: no se aceptan letras en el ID.")
+                        continue
+                    
+                    sala_id = int(sel_sala_texto)
 
-                    if reintentar == "":
-                        print("Respuesta vacia: escriba 'S' para si o 'N' para no.")
+                    sala_referencia = referencia["salas_por_id"].get(sala_id)
+                    if not sala_referencia:
+                        print(f"ID {sala_id} no encontrado en la base de datos. Ingrese un ID valido.")
                         continue
-                    if reintentar not in ("S", "N"):
-                        print("Respuesta invalida: escriba 'S' para si o 'N' para no.")
+                    sala_nombre = sala_referencia["nombre"]
+
+                    existe_en_lista = any(registro_disponible[0] == sala_id for registro_disponible in disponibles)
+                    if not existe_en_lista:
+                        print(f"La sala {sala_id} no tiene turnos disponibles para esta fecha.")
+                        print("Seleccione otra sala de la lista.")
                         continue
+                    
+                    break
+
+                if cancelar:
+                    break
 
-                    if reintentar == "S":
+                lista_turnos_disponibles = []
+                for registro_disponible in disponibles:
+                    if registro_disponible[0] == sala_id:
+                        lista_turnos_disponibles.append(registro_disponible[3])
+
+                turnos_menu = [fila_turno["descripcion"] for fila_turno in referencia["turnos"]]
+                print("\nSELECCIONE EL TURNO")
+                for indice, descripcion_turno in enumerate(turnos_menu, start=1):
+                    disponible_texto = "DISPONIBLE" if descripcion_turno in lista_turnos_disponibles else "OCUPADO"
+                    print(f"{indice}. {descripcion_turno} - {disponible_texto}")
+                print("H. Horario personalizado (hora de inicio y fin)")
+                print("X. Cancelar operacion")
+            
+                while True:
+                    try:
+                        sel_turno_texto = input(f"\nElija el numero de turno (1-{len(turnos_menu)}), 'H' o 'X': ").strip().upper()
+                    except (EOFError, KeyboardInterrupt):
+                        print("\nOperacion cancelada por el usuario.")
+                        cancelar = True
                         break
-                    else:
+                    
+                    if sel_turno_texto == "X":
+                        print("Operacion cancelada por el usuario.")
                         cancelar = True
                         break
 
+                    if sel_turno_texto == "H":
+                        intervalo_elegido = solicitar_intervalo_horario(sala_id, fecha)
+                        if intervalo_elegido is None:
+                            continue
+                        minuto_inicio, minuto_fin = intervalo_elegido
+                        turno_seleccionado = formatear_intervalo(minuto_inicio, minuto_fin)
+                        turno_id = TURNO_HORARIO_ID
+                    else:
+                        if sel_turno_texto == "":
+                            print("Seleccion invalida: campo vacio.")
+                            continue
+                        if not sel_turno_texto.isdigit():
+                            print("Seleccion invalida: no se aceptan letras para seleccionar turno.")
+                            continue
+
+                        num_turno = int(sel_turno_texto)
+                        if num_turno < 1 or num_turno > len(turnos_menu):
+                            print(f"Seleccion fuera de rango: elija un numero entre 1 y {len(turnos_menu)}.")
+                            continue
+
+                        turno_seleccionado = turnos_menu[num_turno - 1]
+                        if turno_seleccionado not in lista_turnos_disponibles:
+                            print(f"Turno {turno_seleccionado} no disponible para la sala seleccionada.")
+                            inscribir = preguntar_si_no("¿Desea inscribir al cliente en la lista de espera de este turno? (S/N): ")
+                            if inscribir and solicitar_lista_espera(cliente_id, fecha, referencia, sala_id,
+                                                                    referencia["turnos_por_descripcion"][turno_seleccionado]):
+                                cancelar = True
+                                break
+                            print("Elija otro turno disponible.")
+                            continue
+
+                        turno_referencia = referencia["turnos_por_descripcion"][turno_seleccionado]
+                        turno_id = turno_referencia["turno_id"]
+                        minuto_inicio, minuto_fin = turno_referencia["minuto_inicio"], turno_referencia["minuto_fin"]
+
+                    try:
+                        retencion_id = retener_espacio(sala_id, fecha, minuto_inicio, minuto_fin)
+                    except Exception as error:
+                        print(f"Error al retener el espacio: {error}")
+                        continue
+                    if retencion_id is None:
+                        print(f"El espacio {turno_seleccionado} acaba de ser tomado por otra terminal. Elija otro.")
+                        continue
+                    print(f"Espacio retenido por {ttl_retencion:.0f} segundos mientras se captura el evento.")
+                    break
+                
+                if cancelar:
+                    break
+
+                while True:
+                    try:
+                        nombre_evento_texto = input("\nNombre del evento o 'X' para cancelar: ").strip()
+                    except (EOFError, KeyboardInterrupt):
+                        print("\nOperacion cancelada por el usuario.")
+                        cancelar = True
+                        break
+                    
+                    if nombre_evento_texto.upper() == "X":
+                        print("Operacion cancelada por el usuario.")
+                        cancelar = True
+                        break
+                    
+                    texto_limpio = nombre_evento_texto.strip()
+                    if not texto_limpio:
+                        print("El nombre del evento no puede estar vacio")
+                        continue
+                    if len(texto_limpio) < 3:
+                        print("El nombre del evento debe tener al menos 3 caracteres")
+                        continue
+                    if all(caracter in ' \t\n' for caracter in texto_limpio):
+                        print("El nombre del evento no puede contener solo espacios")
+                        continue
+                    
+                    break
+                
                 if cancelar:
+                    liberar_retencion(retencion_id)
                     break
-                else:
+
+                try:
+                    clave_reserva = nueva_clave_idempotencia()
+                    for intento in range(REINTENTOS_RESERVA):
+                        try:
+                            folio_generado = confirmar_reserva(cliente_id, sala_id, fecha, turno_id, nombre_evento_texto,
+                                                               minuto_inicio, minuto_fin, retencion_id, clave=clave_reserva)
+                            break
+                        except sqlite3.OperationalError as error:
+                            if intento == REINTENTOS_RESERVA - 1:
+                                raise
+                            print(f"La BD no respondio ({error}); reintentando con la misma clave...")
+                            time.sleep(0.5 * (intento + 1))
+                    if folio_generado is None:
+                        print("Error: Ya existe una reserva activa para esa sala y fecha que se empalma con ese horario")
+                        continue
+
+                    cargar_estado_desde_bd()
+                    print("\n" + "=" * 60)
+                    print("RESERVACION REGISTRADA EXITOSAMENTE")
+                    print("=" * 60)
+                    print(f"Folio: {folio_generado}")
+                    print(f"Cliente: {cliente_nombre_completo}")
+                    print(f"Sala: {sala_nombre}")
+                    print(f"Fecha: {fecha.strftime(FORMATO_FECHA_INPUT)}")
+                    print(f"Turno: {turno_seleccionado}")
+                    print(f"Evento: {nombre_evento_texto}")
+                    print("=" * 60)
+                
+                except sqlite3.IntegrityError as error:
+                    print(f"Reserva no insertada en BD (error de integridad): {error}")
+                except Exception as error:
+                    print(f"Error al insertar reserva en BD: {error}")
+            
+                break
+
+        elif opcion == 2:
+            print("\n" + "=" * 60)
+            print("CANCELAR RESERVACION")
+            print("=" * 60)
+            cancelar_operacion = False
+
+            while True:
+                try:
+                    texto_fecha_ini = input("\nFecha inicial (MM-DD-YYYY) o 'X' para cancelar: ").strip()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nOperacion cancelada por el usuario.")
+                    cancelar_operacion = True
+                    break
+                
+                if texto_fecha_ini.upper() == "X":
+                    print("Operacion cancelada por el usuario.")
+                    cancelar_operacion = True
+                    break
+                
+                if texto_fecha_ini == "":
+                    print("Fecha inicial invalida: campo vacio.")
+                    continue
+                
+                if any(caracter.isalpha() for caracter in texto_fecha_ini):
+                    print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
+                    continue
+                if any(caracter in ",./\\" for caracter in texto_fecha_ini) and "-" not in texto_fecha_ini:
+                    print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
                     continue
+                try:
+                    fecha_inicio = datetime.datetime.strptime(texto_fecha_ini, FORMATO_FECHA_INPUT).date()
+                except ValueError:
+                    print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
+                    continue
+                
+                break
+            
+            if cancelar_operacion:
+                continue
 
-            print("\n" + "-" * 50)
-            print(f"SALAS DISPONIBLES PARA {fecha.strftime(FORMATO_FECHA_INPUT)}")
-            print("-" * 50)
-            salas_mostradas = set()
-            for registro_disponible in disponibles:
-                id_sala_disp = registro_disponible[0]
-                nombre_sala_disp = registro_disponible[1]
-                cupo_sala_disp = registro_disponible[2]
+            while True:
+                try:
+                    texto_fecha_fin = input("Fecha final (MM-DD-YYYY) o 'X' para cancelar: ").strip()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nOperacion cancelada por el usuario.")
+                    cancelar_operacion = True
+                    break
+                
+                if texto_fecha_fin.upper() == "X":
+                    print("Operacion cancelada por el usuario.")
+                    cancelar_operacion = True
+                    break
                 
-                if id_sala_disp not in salas_mostradas:
-                    print(f"\nSALA {id_sala_disp}: {nombre_sala_disp} (Cupo: {cupo_sala_disp} personas)")
-                    salas_mostradas.add(id_sala_disp)
+                if texto_fecha_fin == "":
+                    print("Fecha final invalida: campo vacio.")
+                    continue
+                
+                if any(caracter.isalpha() for caracter in texto_fecha_fin):
+                    print("Fecha final invalida. Use formato MM-DD-YYYY.")
+                    continue
+                if any(caracter in ",./\\" for caracter in texto_fecha_fin) and "-" not in texto_fecha_fin:
+                    print("Fecha final invalida. Use formato MM-DD-YYYY.")
+                    continue
+                try:
+                    fecha_fin = datetime.datetime.strptime(texto_fecha_fin, FORMATO_FECHA_INPUT).date()
+                except ValueError:
+                    print("Fecha final invalida. Use formato MM-DD-YYYY.")
+                    continue
                 
-                turno_disp = registro_disponible[3]
-                print(f"   {turno_disp}")
+                break
+            
+            if cancelar_operacion:
+                continue
+
+            if fecha_fin < fecha_inicio:
+                print("Rango invalido: la fecha final es anterior a la inicial.")
+                continue
+
+            reservas_rango = generar_reporte_por_rango_fecha(fecha_inicio, fecha_fin)
+        
+            if not reservas_rango:
+                print(f"\nNo hay reservaciones activas entre {fecha_inicio.strftime(FORMATO_FECHA_INPUT)} y {fecha_fin.strftime(FORMATO_FECHA_INPUT)}")
+                continue
+
+            print("\n" + "-" * 50)
+            print(f"RESERVACIONES DEL {fecha_inicio.strftime(FORMATO_FECHA_INPUT)} AL {fecha_fin.strftime(FORMATO_FECHA_INPUT)}")
+            print("-" * 50)
+            imprimir_tabla(([reserva["folio"], reserva["fecha"], reserva["cliente"], reserva["sala"], reserva["turno"], reserva["evento"]]
+                            for reserva in reservas_rango), ["FOLIO", "FECHA", "CLIENTE", "SALA", "TURNO", "EVENTO"])
 
-            sala_nombre = ""
             while True:
                 try:
-                    sel_sala_texto = input("\nIngrese ID de sala o 'X' para cancelar: ").strip()
+                    folio_cancelar_texto = input("\nIngrese el folio a cancelar o 'X' para cancelar: ").strip()
                 except (EOFError, KeyboardInterrupt):
                     print("\nOperacion cancelada por el usuario.")
-                    cancelar = True
+                    cancelar_operacion = True
                     break
-                    
-                if sel_sala_texto.upper() == "X":
+                
+                if folio_cancelar_texto.upper() == "X":
                     print("Operacion cancelada por el usuario.")
-                    cancelar = True
+                    cancelar_operacion = True
                     break
-                    
-                if sel_sala_texto == "":
-                    print("ID de sala invalido: campo vacio.")
+                
+                if folio_cancelar_texto == "":
+                    print("Folio invalido: campo vacio.")
                     continue
-                if sel_sala_texto == "0":
-                    print("ID invalido: el numero debe ser mayor a 0.")
+                if not folio_cancelar_texto.isdigit():
+                    print("Folio invalido: debe ser un numero.")
                     continue
-                if not sel_sala_texto.isdigit():
-                    print("ID de sala invalido: no se aceptan letras en el ID.")
+                
+                folio_cancelar = int(folio_cancelar_texto)
+            
+                reserva_encontrada = next((reserva for reserva in reservas_rango if reserva["folio"] == folio_cancelar), None)
+                if not reserva_encontrada:
+                    print(f"Folio {folio_cancelar} no encontrado en el rango especificado.")
                     continue
+                
+                fecha_reserva = datetime.datetime.strptime(reserva_encontrada["fecha"], FORMATO_FECHA_INPUT).date()
+                dias_restantes = (fecha_reserva - datetime.date.today()).days
+            
+                if dias_restantes < 2:
+                    print(f"No se puede cancelar: faltan {dias_restantes} dia(s).")
+                    print("Se requiere al menos 2 dias de anticipacion para cancelar.")
+                    break
+                
+                while True:
+                    try:
+                        confirmacion = input(f"Esta seguro de cancelar la reservacion folio {folio_cancelar}? (S/N): ").strip().upper()
+                    except (EOFError, KeyboardInterrupt):
+                        print("\nOperacion cancelada por el usuario.")
+                        cancelar_operacion = True
+                        break
                     
-                sala_id = int(sel_sala_texto)
+                    if confirmacion == "":
+                        print("Confirmacion vacia: escriba 'S' para si o 'N' para no.")
+                        continue
+                    if confirmacion not in ("S", "N"):
+                        print("Confirmacion invalida: escriba 'S' para si o 'N' para no.")
+                        continue
+                    break
+                
+                if cancelar_operacion:
+                    break
+
+                if confirmacion != "S":
+                    print("Cancelacion abortada por el usuario.")
+                    break
 
                 try:
-                    with sqlite3.connect(DB_FILE) as conexion:
-                        cursor = conexion.cursor()
-                        cursor.execute("SELECT sala_id, nombre FROM salas WHERE sala_id=?", (sala_id,))
-                        resultado = cursor.fetchone()
-                        cursor.close()
-                        
-                    if not resultado:
-                        print(f"ID {sala_id} no encontrado en la base de datos. Ingrese un ID valido.")
+                    grupo = grupo_de_folio(folio_cancelar)
+                except Exception as error:
+                    print(f"Error consultando el grupo del folio {folio_cancelar}: {error}")
+                    break
+                if grupo and grupo["activas"] > 1:
+                    cancelar_todo = preguntar_si_no(f"El folio {folio_cancelar} pertenece al grupo {grupo['grupo_id']} con {grupo['activas']} reservaciones activas. Cancelar todo el grupo? (S/N): ")
+                    if cancelar_todo is None:
+                        cancelar_operacion = True
+                        break
+                    if cancelar_todo:
+                        try:
+                            resultado = cancelar_grupo(grupo["grupo_id"])
+                        except Exception as error:
+                            print(f"Error al cancelar el grupo {grupo['grupo_id']}: {error}")
+                            break
+                        if not resultado["ok"]:
+                            print(resultado["error"])
+                            print("Se requiere al menos 2 dias de anticipacion para cancelar.")
+                            break
+                        cargar_estado_desde_bd()
+                        print(f"Grupo {grupo['grupo_id']} cancelado exitosamente: {resultado['canceladas']} reservacion(es).")
+                        print("Las reservas ya no apareceran en los reportes del sistema.")
+                        imprimir_promociones(resultado["promovidas"])
+                        break
+                
+                try:
+                    resultado = cancelar_reservas([folio_cancelar])
+                    cargar_estado_desde_bd()
+                    print(f"Reservacion folio {folio_cancelar} cancelada exitosamente.")
+                    print("La reserva ya no aparecera en los reportes del sistema.")
+                    imprimir_promociones(resultado["promovidas"])
+                except Exception as error:
+                    print(f"Error al cancelar la reservacion folio {folio_cancelar}: {error}")
+                
+                break
+            
+            if cancelar_operacion:
+                continue
+
+        elif opcion == 3:
+            print("\n" + "=" * 60)
+            print("EDITAR NOMBRE DE EVENTO")
+            print("=" * 60)
+            cancelar_operacion = False
+            texto_busqueda = ""
+
+            while True:
+                try:
+                    texto_fecha_ini = input("\nFecha inicial (MM-DD-YYYY), 'B' para buscar por evento o cliente, o 'X' para cancelar: ").strip()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nOperacion cancelada por el usuario.")
+                    cancelar_operacion = True
+                    break
+                
+                if texto_fecha_ini.upper() == "X":
+                    print("Operacion cancelada por el usuario.")
+                    cancelar_operacion = True
+                    break
+
+                if texto_fecha_ini.upper() == "B":
+                    try:
+                        texto_busqueda = input("Texto a buscar (evento o cliente): ").strip()
+                    except (EOFError, KeyboardInterrupt):
+                        print("\nOperacion cancelada por el usuario.")
+                        cancelar_operacion = True
+                        break
+                    if not consulta_fts(texto_busqueda):
+                        print("Busqueda invalida: escriba al menos una palabra.")
+                        texto_busqueda = ""
                         continue
-                    else:
-                        sala_nombre = resultado[1]
-                        
+                    break
+                
+                if texto_fecha_ini == "":
+                    print("Fecha inicial invalida: campo vacio.")
+                    continue
+                
+                if any(caracter.isalpha() for caracter in texto_fecha_ini):
+                    print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
+                    continue
+                if any(caracter in ",./\\" for caracter in texto_fecha_ini) and "-" not in texto_fecha_ini:
+                    print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
+                    continue
+                try:
+                    fecha_inicio = datetime.datetime.strptime(texto_fecha_ini, FORMATO_FECHA_INPUT).date()
+                except ValueError:
+                    print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
+                    continue
+                
+                break
+            
+            if cancelar_operacion:
+                continue
+
+            while not texto_busqueda:
+                try:
+                    texto_fecha_fin = input("Fecha final (MM-DD-YYYY) o 'X' para cancelar: ").strip()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nOperacion cancelada por el usuario.")
+                    cancelar_operacion = True
+                    break
+                
+                if texto_fecha_fin.upper() == "X":
+                    print("Operacion cancelada por el usuario.")
+                    cancelar_operacion = True
+                    break
+                
+                if texto_fecha_fin == "":
+                    print("Fecha final invalida: campo vacio.")
+                    continue
+                
+                if any(caracter.isalpha() for caracter in texto_fecha_fin):
+                    print("Fecha final invalida. Use formato MM-DD-YYYY.")
+                    continue
+                if any(caracter in ",./\\" for caracter in texto_fecha_fin) and "-" not in texto_fecha_fin:
+                    print("Fecha final invalida. Use formato MM-DD-YYYY.")
+                    continue
+                try:
+                    fecha_fin = datetime.datetime.strptime(texto_fecha_fin, FORMATO_FECHA_INPUT).date()
+                except ValueError:
+                    print("Fecha final invalida. Use formato MM-DD-YYYY.")
+                    continue
+                
+                break
+            
+            if cancelar_operacion:
+                continue
+
+            if texto_busqueda:
+                try:
+                    reservas_rango = buscar_reservas(texto_busqueda)
                 except Exception as error:
-                    print(f"Error verificando sala: {error}")
+                    print(f"Error al buscar reservaciones: {error}")
                     continue
-
-                existe_en_lista = any(registro_disponible[0] == sala_id for registro_disponible in disponibles)
-                if not existe_en_lista:
-                    print(f"La sala {sala_id} no tiene turnos disponibles para esta fecha.")
-                    print("Seleccione otra sala de la lista.")
+                if not reservas_rango:
+                    print(f"\nNo hay reservaciones activas que coincidan con '{texto_busqueda}'")
+                    continue
+                print("\n" + "-" * 50)
+                print(f"RESULTADOS PARA '{texto_busqueda}'")
+                print("-" * 50)
+            else:
+                if fecha_fin < fecha_inicio:
+                    print("Rango invalido: la fecha final es anterior a la inicial.")
                     continue
-                    
-                break
 
-            if cancelar:
-                break
+                reservas_rango = generar_reporte_por_rango_fecha(fecha_inicio, fecha_fin)
 
-            lista_turnos_disponibles = []
-            for registro_disponible in disponibles:
-                if registro_disponible[0] == sala_id:
-                    lista_turnos_disponibles.append(registro_disponible[3])
+                if not reservas_rango:
+                    print(f"\nNo hay reservaciones activas entre {fecha_inicio.strftime(FORMATO_FECHA_INPUT)} y {fecha_fin.strftime(FORMATO_FECHA_INPUT)}")
+                    continue
+
+                print("\n" + "-" * 50)
+                print(f"RESERVACIONES DEL {fecha_inicio.strftime(FORMATO_FECHA_INPUT)} AL {fecha_fin.strftime(FORMATO_FECHA_INPUT)}")
+                print("-" * 50)
+            imprimir_tabla(([reserva["folio"], reserva["fecha"], reserva["cliente"], reserva["sala"], reserva["turno"], reserva["evento"]]
+                            for reserva in reservas_rango), ["FOLIO", "FECHA", "CLIENTE", "SALA", "TURNO", "EVENTO"])
 
-            print("\nSELECCIONE EL TURNO")
-            for indice, descripcion_turno in enumerate(("Matutino", "Vespertino", "Nocturno"), start=1):
-                disponible_texto = "DISPONIBLE" if descripcion_turno in lista_turnos_disponibles else "OCUPADO"
-                print(f"{indice}. {descripcion_turno} - {disponible_texto}")
-            print("X. Cancelar operacion")
-            
             while True:
                 try:
-                    sel_turno_texto = input("\nElija el numero de turno (1-3) o 'X': ").strip().upper()
+                    folio_editar_texto = input("\nIngrese el folio a editar o 'X' para cancelar: ").strip()
                 except (EOFError, KeyboardInterrupt):
                     print("\nOperacion cancelada por el usuario.")
-                    cancelar = True
+                    cancelar_operacion = True
                     break
-                    
-                if sel_turno_texto == "X":
+                
+                if folio_editar_texto.upper() == "X":
                     print("Operacion cancelada por el usuario.")
-                    cancelar = True
+                    cancelar_operacion = True
                     break
-                    
-                if sel_turno_texto == "":
-                    print("Seleccion invalida: campo vacio.")
-                    continue
-                if not sel_turno_texto.isdigit():
-                    print("Seleccion invalida: no se aceptan letras para seleccionar turno.")
+                
+                if folio_editar_texto == "":
+                    print("Folio invalido: campo vacio.")
                     continue
-                    
-                num_turno = int(sel_turno_texto)
-                if num_turno not in (1, 2, 3):
-                    print("Seleccion fuera de rango: elija 1, 2 o 3.")
+                if not folio_editar_texto.isdigit():
+                    print("Folio invalido: debe ser un numero.")
                     continue
-                    
-                turno_seleccionado = {1: "Matutino", 2: "Vespertino", 3: "Nocturno"}[num_turno]
-                if turno_seleccionado not in lista_turnos_disponibles:
-                    print(f"Turno {turno_seleccionado} no disponible para la sala seleccionada.")
-                    print("Elija otro turno disponible.")
+                
+                folio_editar = int(folio_editar_texto)
+            
+                reserva_encontrada = next((reserva for reserva in reservas_rango if reserva["folio"] == folio_editar), None)
+                if not reserva_encontrada:
+                    print(f"Folio {folio_editar} no encontrado en el rango especificado.")
                     continue
-                    
-                break
                 
-            if cancelar:
                 break
+            
+            if cancelar_operacion:
+                continue
 
             while True:
                 try:
-                    nombre_evento_texto = input("\nNombre del evento o 'X' para cancelar: ").strip()
+                    nuevo_nombre = input("\nNuevo nombre del evento o 'X' para cancelar: ").strip()
                 except (EOFError, KeyboardInterrupt):
                     print("\nOperacion cancelada por el usuario.")
-                    cancelar = True
+                    cancelar_operacion = True
                     break
-                    
-                if nombre_evento_texto.upper() == "X":
+                
+                if nuevo_nombre.upper() == "X":
                     print("Operacion cancelada por el usuario.")
-                    cancelar = True
+                    cancelar_operacion = True
                     break
-                    
-                texto_limpio = nombre_evento_texto.strip()
+                
+                texto_limpio = nuevo_nombre.strip()
                 if not texto_limpio:
                     print("El nombre del evento no puede estar vacio")
                     continue
@@ -810,198 +5458,20 @@ while True:
                 if all(caracter in ' \t\n' for caracter in texto_limpio):
                     print("El nombre del evento no puede contener solo espacios")
                     continue
-                    
-                break
-                
-            if cancelar:
-                break
-
-            fecha_norm_texto = fecha.strftime(FORMATO_FECHA_ISO)
-            
-            try:
-                with sqlite3.connect(DB_FILE) as conexion:
-                    cursor = conexion.cursor()
-                    cursor.execute("SELECT turno_id FROM turnos WHERE descripcion = ?", (turno_seleccionado,))
-                    resultado = cursor.fetchone()
-                    cursor.close()
-                    turno_id = resultado[0] if resultado else None
-            except Exception as error:
-                print(f"Error al obtener ID del turno: {error}")
-                turno_id = None
-
-            if not turno_id:
-                print(f"Error: Turno '{turno_seleccionado}' no encontrado")
-                continue
-
-            try:
-                with sqlite3.connect(DB_FILE) as conexion:
-                    conexion.row_factory = sqlite3.Row
-                    cursor = conexion.cursor()
-
-                    cursor.execute("SELECT 1 FROM reservas WHERE sala_id=? AND fecha_normalizada=? AND turno_id=? AND activo=1", 
-                                  (sala_id, fecha_norm_texto, turno_id))
-                    if cursor.fetchone():
-                        print("Error: Ya existe una reserva activa para esa sala, fecha y turno")
-                        continue
-
-                    cursor.execute("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento) VALUES (?,?,?,?,?)",
-                                  (cliente_id, sala_id, fecha_norm_texto, turno_id, nombre_evento_texto))
-                    conexion.commit()
-                    folio_generado = cursor.lastrowid
-                    cursor.close()
-                    
-                cargar_estado_desde_bd()
-                print("\n" + "=" * 60)
-                print("RESERVACION REGISTRADA EXITOSAMENTE")
-                print("=" * 60)
-                print(f"Folio: {folio_generado}")
-                print(f"Cliente: {cliente_nombre_completo}")
-                print(f"Sala: {sala_nombre}")
-                print(f"Fecha: {fecha.strftime(FORMATO_FECHA_INPUT)}")
-                print(f"Turno: {turno_seleccionado}")
-                print(f"Evento: {nombre_evento_texto}")
-                print("=" * 60)
-                
-            except sqlite3.IntegrityError as error:
-                print(f"Reserva no insertada en BD (error de integridad): {error}")
-            except Exception as error:
-                print(f"Error al insertar reserva en BD: {error}")
-            
-            break
-
-    elif opcion == 2:
-        print("\n" + "=" * 60)
-        print("CANCELAR RESERVACION")
-        print("=" * 60)
-        cancelar_operacion = False
-
-        while True:
-            try:
-                texto_fecha_ini = input("\nFecha inicial (MM-DD-YYYY) o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
                 
-            if texto_fecha_ini.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_operacion = True
                 break
-                
-            if texto_fecha_ini == "":
-                print("Fecha inicial invalida: campo vacio.")
-                continue
-                
-            if any(caracter.isalpha() for caracter in texto_fecha_ini):
-                print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
-                continue
-            if any(caracter in ",./\\" for caracter in texto_fecha_ini) and "-" not in texto_fecha_ini:
-                print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
-                continue
-            try:
-                fecha_inicio = datetime.datetime.strptime(texto_fecha_ini, FORMATO_FECHA_INPUT).date()
-            except ValueError:
-                print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
-                continue
-                
-            break
             
-        if cancelar_operacion:
-            continue
-
-        while True:
-            try:
-                texto_fecha_fin = input("Fecha final (MM-DD-YYYY) o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if texto_fecha_fin.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if texto_fecha_fin == "":
-                print("Fecha final invalida: campo vacio.")
-                continue
-                
-            if any(caracter.isalpha() for caracter in texto_fecha_fin):
-                print("Fecha final invalida. Use formato MM-DD-YYYY.")
-                continue
-            if any(caracter in ",./\\" for caracter in texto_fecha_fin) and "-" not in texto_fecha_fin:
-                print("Fecha final invalida. Use formato MM-DD-YYYY.")
-                continue
-            try:
-                fecha_fin = datetime.datetime.strptime(texto_fecha_fin, FORMATO_FECHA_INPUT).date()
-            except ValueError:
-                print("Fecha final invalida. Use formato MM-DD-YYYY.")
+            if cancelar_operacion:
                 continue
-                
-            break
-            
-        if cancelar_operacion:
-            continue
-
-        if fecha_fin < fecha_inicio:
-            print("Rango invalido: la fecha final es anterior a la inicial.")
-            continue
-
-        reservas_rango = generar_reporte_por_rango_fecha(fecha_inicio, fecha_fin)
-        
-        if not reservas_rango:
-            print(f"\nNo hay reservaciones activas entre {fecha_inicio.strftime(FORMATO_FECHA_INPUT)} y {fecha_fin.strftime(FORMATO_FECHA_INPUT)}")
-            continue
-
-        print("\n" + "-" * 50)
-        print(f"RESERVACIONES DEL {fecha_inicio.strftime(FORMATO_FECHA_INPUT)} AL {fecha_fin.strftime(FORMATO_FECHA_INPUT)}")
-        print("-" * 50)
-        tabla_reservas = [[reserva["folio"], reserva["fecha"], reserva["cliente"], reserva["sala"], reserva["turno"], reserva["evento"]] for reserva in reservas_rango]
-        print(tabulate(tabla_reservas, headers=["FOLIO", "FECHA", "CLIENTE", "SALA", "TURNO", "EVENTO"], tablefmt="grid"))
 
-        while True:
-            try:
-                folio_cancelar_texto = input("\nIngrese el folio a cancelar o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if folio_cancelar_texto.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if folio_cancelar_texto == "":
-                print("Folio invalido: campo vacio.")
-                continue
-            if not folio_cancelar_texto.isdigit():
-                print("Folio invalido: debe ser un numero.")
-                continue
-                
-            folio_cancelar = int(folio_cancelar_texto)
-            
-            reserva_encontrada = next((reserva for reserva in reservas_rango if reserva["folio"] == folio_cancelar), None)
-            if not reserva_encontrada:
-                print(f"Folio {folio_cancelar} no encontrado en el rango especificado.")
-                continue
-                
-            fecha_reserva = datetime.datetime.strptime(reserva_encontrada["fecha"], FORMATO_FECHA_INPUT).date()
-            dias_restantes = (fecha_reserva - datetime.date.today()).days
-            
-            if dias_restantes < 2:
-                print(f"No se puede cancelar: faltan {dias_restantes} dia(s).")
-                print("Se requiere al menos 2 dias de anticipacion para cancelar.")
-                break
-                
             while True:
                 try:
-                    confirmacion = input(f"Esta seguro de cancelar la reservacion folio {folio_cancelar}? (S/N): ").strip().upper()
+                    confirmacion = input(f"Esta seguro de cambiar el nombre del evento folio {folio_editar}? (S/N): ").strip().upper()
                 except (EOFError, KeyboardInterrupt):
                     print("\nOperacion cancelada por el usuario.")
                     cancelar_operacion = True
                     break
-                    
+                
                 if confirmacion == "":
                     print("Confirmacion vacia: escriba 'S' para si o 'N' para no.")
                     continue
@@ -1009,504 +5479,969 @@ while True:
                     print("Confirmacion invalida: escriba 'S' para si o 'N' para no.")
                     continue
                 break
-                
-            if cancelar_operacion:
-                break
-
-            if confirmacion != "S":
-                print("Cancelacion abortada por el usuario.")
-                break
-                
-            try:
-                with sqlite3.connect(DB_FILE) as conexion:
-                    cursor = conexion.cursor()
-                    cursor.execute("UPDATE reservas SET activo = 0 WHERE folio = ?", (folio_cancelar,))
-                    conexion.commit()
-                    cursor.close()
-                cargar_estado_desde_bd()
-                print(f"Reservacion folio {folio_cancelar} cancelada exitosamente.")
-                print("La reserva ya no aparecera en los reportes del sistema.")
-            except Exception as error:
-                print(f"Error al cancelar la reservacion folio {folio_cancelar}: {error}")
-                
-            break
-            
-        if cancelar_operacion:
-            continue
-
-    elif opcion == 3:
-        print("\n" + "=" * 60)
-        print("EDITAR NOMBRE DE EVENTO")
-        print("=" * 60)
-        cancelar_operacion = False
-
-        while True:
-            try:
-                texto_fecha_ini = input("\nFecha inicial (MM-DD-YYYY) o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if texto_fecha_ini.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if texto_fecha_ini == "":
-                print("Fecha inicial invalida: campo vacio.")
-                continue
-                
-            if any(caracter.isalpha() for caracter in texto_fecha_ini):
-                print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
-                continue
-            if any(caracter in ",./\\" for caracter in texto_fecha_ini) and "-" not in texto_fecha_ini:
-                print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
-                continue
-            try:
-                fecha_inicio = datetime.datetime.strptime(texto_fecha_ini, FORMATO_FECHA_INPUT).date()
-            except ValueError:
-                print("Fecha inicial invalida. Use formato MM-DD-YYYY.")
-                continue
-                
-            break
             
-        if cancelar_operacion:
-            continue
-
-        while True:
-            try:
-                texto_fecha_fin = input("Fecha final (MM-DD-YYYY) o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if texto_fecha_fin.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if texto_fecha_fin == "":
-                print("Fecha final invalida: campo vacio.")
-                continue
-                
-            if any(caracter.isalpha() for caracter in texto_fecha_fin):
-                print("Fecha final invalida. Use formato MM-DD-YYYY.")
-                continue
-            if any(caracter in ",./\\" for caracter in texto_fecha_fin) and "-" not in texto_fecha_fin:
-                print("Fecha final invalida. Use formato MM-DD-YYYY.")
-                continue
-            try:
-                fecha_fin = datetime.datetime.strptime(texto_fecha_fin, FORMATO_FECHA_INPUT).date()
-            except ValueError:
-                print("Fecha final invalida. Use formato MM-DD-YYYY.")
+            if cancelar_operacion:
                 continue
-                
-            break
-            
-        if cancelar_operacion:
-            continue
-
-        if fecha_fin < fecha_inicio:
-            print("Rango invalido: la fecha final es anterior a la inicial.")
-            continue
-
-        reservas_rango = generar_reporte_por_rango_fecha(fecha_inicio, fecha_fin)
-        
-        if not reservas_rango:
-            print(f"\nNo hay reservaciones activas entre {fecha_inicio.strftime(FORMATO_FECHA_INPUT)} y {fecha_fin.strftime(FORMATO_FECHA_INPUT)}")
-            continue
 
-        print("\n" + "-" * 50)
-        print(f"RESERVACIONES DEL {fecha_inicio.strftime(FORMATO_FECHA_INPUT)} AL {fecha_fin.strftime(FORMATO_FECHA_INPUT)}")
-        print("-" * 50)
-        tabla_reservas = [[reserva["folio"], reserva["fecha"], reserva["cliente"], reserva["sala"], reserva["turno"], reserva["evento"]] for reserva in reservas_rango]
-        print(tabulate(tabla_reservas, headers=["FOLIO", "FECHA", "CLIENTE", "SALA", "TURNO", "EVENTO"], tablefmt="grid"))
-
-        while True:
-            try:
-                folio_editar_texto = input("\nIngrese el folio a editar o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if folio_editar_texto.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if folio_editar_texto == "":
-                print("Folio invalido: campo vacio.")
-                continue
-            if not folio_editar_texto.isdigit():
-                print("Folio invalido: debe ser un numero.")
-                continue
-                
-            folio_editar = int(folio_editar_texto)
-            
-            reserva_encontrada = next((reserva for reserva in reservas_rango if reserva["folio"] == folio_editar), None)
-            if not reserva_encontrada:
-                print(f"Folio {folio_editar} no encontrado en el rango especificado.")
+            if confirmacion != "S":
+                print("Edicion abortada por el usuario.")
                 continue
-                
-            break
-            
-        if cancelar_operacion:
-            continue
 
-        while True:
             try:
-                nuevo_nombre = input("\nNuevo nombre del evento o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if nuevo_nombre.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            texto_limpio = nuevo_nombre.strip()
-            if not texto_limpio:
-                print("El nombre del evento no puede estar vacio")
-                continue
-            if len(texto_limpio) < 3:
-                print("El nombre del evento debe tener al menos 3 caracteres")
-                continue
-            if all(caracter in ' \t\n' for caracter in texto_limpio):
-                print("El nombre del evento no puede contener solo espacios")
+                grupo = grupo_de_folio(folio_editar)
+            except Exception as error:
+                print(f"Error consultando el grupo del folio {folio_editar}: {error}")
                 continue
-                
-            break
-            
-        if cancelar_operacion:
-            continue
+            if grupo and grupo["activas"] > 1:
+                renombrar_todo = preguntar_si_no(f"El folio {folio_editar} pertenece al grupo {grupo['grupo_id']} con {grupo['activas']} reservaciones activas. Renombrar todo el grupo? (S/N): ")
+                if renombrar_todo is None:
+                    continue
+                if renombrar_todo:
+                    try:
+                        resultado = renombrar_grupo(grupo["grupo_id"], nuevo_nombre)
+                    except Exception as error:
+                        print(f"Error al renombrar el grupo {grupo['grupo_id']}: {error}")
+                        continue
+                    if not resultado["ok"]:
+                        print(resultado["error"])
+                        continue
+                    cargar_estado_desde_bd()
+                    print(f"Grupo {grupo['grupo_id']} actualizado exitosamente: {resultado['actualizadas']} reservacion(es).")
+                    print(f"Nuevo nombre: {nuevo_nombre}")
+                    continue
 
-        while True:
             try:
-                confirmacion = input(f"Esta seguro de cambiar el nombre del evento folio {folio_editar}? (S/N): ").strip().upper()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_operacion = True
-                break
-                
-            if confirmacion == "":
-                print("Confirmacion vacia: escriba 'S' para si o 'N' para no.")
-                continue
-            if confirmacion not in ("S", "N"):
-                print("Confirmacion invalida: escriba 'S' para si o 'N' para no.")
-                continue
-            break
-            
-        if cancelar_operacion:
-            continue
+                renombrar_evento(folio_editar, nuevo_nombre)
+                cargar_estado_desde_bd()
+                print(f"Evento folio {folio_editar} actualizado exitosamente.")
+                print(f"Nuevo nombre: {nuevo_nombre}")
+            except Exception as error:
+                print(f"Error al actualizar el evento folio {folio_editar}: {error}")
 
-        if confirmacion != "S":
-            print("Edicion abortada por el usuario.")
-            continue
+        elif opcion == 4:
+            print("\n" + "=" * 60)
+            print("CONSULTAR RESERVACIONES POR FECHA")
+            print("=" * 60)
 
-        try:
-            with sqlite3.connect(DB_FILE) as conexion:
-                cursor = conexion.cursor()
-                cursor.execute("UPDATE reservas SET evento = ? WHERE folio = ?", (nuevo_nombre, folio_editar))
-                conexion.commit()
-                cursor.close()
-            cargar_estado_desde_bd()
-            print(f"Evento folio {folio_editar} actualizado exitosamente.")
-            print(f"Nuevo nombre: {nuevo_nombre}")
-        except Exception as error:
-            print(f"Error al actualizar el evento folio {folio_editar}: {error}")
+            while True:
+                try:
+                    texto_fecha_consulta = input("\nIngrese la fecha a consultar (MM-DD-YYYY), Enter para hoy o 'C' para historial de un cliente: ").strip()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nOperacion cancelada por el usuario.")
+                    break
 
-    elif opcion == 4:
-        print("\n" + "=" * 60)
-        print("CONSULTAR RESERVACIONES POR FECHA")
-        print("=" * 60)
+                if texto_fecha_consulta.upper() == "C":
+                    try:
+                        texto_cliente = input("ID de cliente: ").strip()
+                    except (EOFError, KeyboardInterrupt):
+                        print("\nOperacion cancelada por el usuario.")
+                        break
+                    if not texto_cliente.isdigit():
+                        print("Cliente invalido: el ID debe ser numerico.")
+                        continue
+                    if consultar_historial_cliente(int(texto_cliente)):
+                        break
+                    continue
 
-        while True:
-            try:
-                texto_fecha_consulta = input("\nIngrese la fecha a consultar (MM-DD-YYYY) o Enter para hoy: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                break
+                if texto_fecha_consulta == "":
+                    fecha_consulta = datetime.date.today()
+                    print(f"\nFecha consultada: {fecha_consulta.strftime(FORMATO_FECHA_INPUT)} (hoy)")
+                else:
+                    if any(caracter.isalpha() for caracter in texto_fecha_consulta):
+                        print("Fecha invalida: hay letras en la fecha. Use solo digitos y guiones.")
+                        continue
+                    if any(caracter in ",./\\" for caracter in texto_fecha_consulta) and "-" not in texto_fecha_consulta:
+                        print("Fecha invalida: separadores incorrectos. Use '-' entre mes, dia y año.")
+                        continue
+                    try:
+                        fecha_consulta = datetime.datetime.strptime(texto_fecha_consulta, FORMATO_FECHA_INPUT).date()
+                    except ValueError:
+                        print("Fecha invalida: formato incorrecto. Use MM-DD-YYYY.")
+                        continue
+                    print(f"\nFecha consultada: {fecha_consulta.strftime(FORMATO_FECHA_INPUT)}")
 
-            if texto_fecha_consulta == "":
-                fecha_consulta = datetime.date.today()
-                print(f"\nFecha consultada: {fecha_consulta.strftime(FORMATO_FECHA_INPUT)} (hoy)")
-            else:
-                if any(caracter.isalpha() for caracter in texto_fecha_consulta):
-                    print("Fecha invalida: hay letras en la fecha. Use solo digitos y guiones.")
-                    continue
-                if any(caracter in ",./\\" for caracter in texto_fecha_consulta) and "-" not in texto_fecha_consulta:
-                    print("Fecha invalida: separadores incorrectos. Use '-' entre mes, dia y año.")
-                    continue
-                try:
-                    fecha_consulta = datetime.datetime.strptime(texto_fecha_consulta, FORMATO_FECHA_INPUT).date()
-                except ValueError:
-                    print("Fecha invalida: formato incorrecto. Use MM-DD-YYYY.")
-                    continue
-                print(f"\nFecha consultada: {fecha_consulta.strftime(FORMATO_FECHA_INPUT)}")
+                hay_registros = imprimir_reporte_tabular_por_fecha(fecha_consulta)
+            
+                if not hay_registros:
+                    while True:
+                        try:
+                            resp_no_reg = input("\nDesea consultar otra fecha? (S/N): ").strip().upper()
+                        except (EOFError, KeyboardInterrupt):
+                            print("\nOperacion cancelada por el usuario.")
+                            resp_no_reg = "N"
+                            break
+                        
+                        if resp_no_reg == "":
+                            print("Respuesta vacia: escriba 'S' para si o 'N' para no.")
+                            continue
+                        if resp_no_reg not in ("S", "N"):
+                            print("Respuesta invalida: escriba 'S' para si o 'N' para no.")
+                            continue
+                        
+                        if resp_no_reg == "S":
+                            break
+                        else:
+                            break
+                    if resp_no_reg == "N":
+                        break
+                    else:
+                        continue
 
-            hay_registros = imprimir_reporte_tabular_por_fecha(fecha_consulta)
+                print("\n" + "-" * 50)
+                print("OPCIONES DE EXPORTACION")
+                print("-" * 50)
+                print("a) Exportar a CSV")
+                print("b) Exportar a JSON") 
+                print("c) Exportar a Excel")
+                print("d) No exportar (regresar al menu)")
             
-            if not hay_registros:
                 while True:
                     try:
-                        resp_no_reg = input("\nDesea consultar otra fecha? (S/N): ").strip().upper()
+                        opcion_export_texto = input("\nSeleccione una opcion (a/b/c/d): ").strip().upper()
                     except (EOFError, KeyboardInterrupt):
                         print("\nOperacion cancelada por el usuario.")
-                        resp_no_reg = "N"
-                        break
-                        
-                    if resp_no_reg == "":
-                        print("Respuesta vacia: escriba 'S' para si o 'N' para no.")
-                        continue
-                    if resp_no_reg not in ("S", "N"):
-                        print("Respuesta invalida: escriba 'S' para si o 'N' para no.")
+                        opcion_export_texto = "D"
+                    
+                    if opcion_export_texto == "":
+                        print("Opcion vacia: seleccione a, b, c o d.")
                         continue
-                        
-                    if resp_no_reg == "S":
-                        break
-                    else:
+                    
+                    if opcion_export_texto == "D":
                         break
-                if resp_no_reg == "N":
+                    
+                    if opcion_export_texto not in ("A", "B", "C"):
+                        print("Opcion invalida: seleccione a, b, c o d.")
+                        continue
+                    
+                    filas_export = generar_reporte_por_fecha_lista(fecha_consulta)
+                    if opcion_export_texto == "A":
+                        exportar_reporte_csv(fecha_consulta, filas_export)
+                    elif opcion_export_texto == "B":
+                        exportar_reporte_json(fecha_consulta, filas_export)
+                    elif opcion_export_texto == "C":
+                        exportar_reporte_excel(fecha_consulta, filas_export)
                     break
-                else:
-                    continue
+                
+                break
+
+        elif opcion == 5:
+            print("\n" + "=" * 60)
+            print("REGISTRAR NUEVO CLIENTE")
+            print("=" * 60)
+            cancelar_cliente = False
 
-            print("\n" + "-" * 50)
-            print("OPCIONES DE EXPORTACION")
-            print("-" * 50)
-            print("a) Exportar a CSV")
-            print("b) Exportar a JSON") 
-            print("c) Exportar a Excel")
-            print("d) No exportar (regresar al menu)")
-            
             while True:
                 try:
-                    opcion_export_texto = input("\nSeleccione una opcion (a/b/c/d): ").strip().upper()
+                    texto_nombre = input("\nIngrese el nombre del cliente o 'X' para cancelar: ").strip()
                 except (EOFError, KeyboardInterrupt):
                     print("\nOperacion cancelada por el usuario.")
-                    opcion_export_texto = "D"
-                    
-                if opcion_export_texto == "":
-                    print("Opcion vacia: seleccione a, b, c o d.")
-                    continue
-                    
-                if opcion_export_texto == "D":
+                    cancelar_cliente = True
                     break
-                    
-                if opcion_export_texto not in ("A", "B", "C"):
-                    print("Opcion invalida: seleccione a, b, c o d.")
-                    continue
-                    
-                filas_export = generar_reporte_por_fecha_lista(fecha_consulta)
-                if opcion_export_texto == "A":
-                    exportar_reporte_csv(fecha_consulta, filas_export)
-                elif opcion_export_texto == "B":
-                    exportar_reporte_json(fecha_consulta, filas_export)
-                elif opcion_export_texto == "C":
-                    exportar_reporte_excel(fecha_consulta, filas_export)
-                break
                 
-            break
-
-    elif opcion == 5:
-        print("\n" + "=" * 60)
-        print("REGISTRAR NUEVO CLIENTE")
-        print("=" * 60)
-        cancelar_cliente = False
-
-        while True:
-            try:
-                texto_nombre = input("\nIngrese el nombre del cliente o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_cliente = True
-                break
+                if texto_nombre.upper() == "X":
+                    print("Operacion cancelada por el usuario.")
+                    cancelar_cliente = True
+                    break
                 
-            if texto_nombre.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_cliente = True
+                if texto_nombre == "":
+                    print("Nombre invalido: el campo 'Nombre' esta vacio.")
+                    continue
+                if any(caracter.isdigit() for caracter in texto_nombre):
+                    print("Nombre invalido: no se aceptan digitos en el nombre.")
+                    continue
+                if not texto_nombre.replace(" ", "").isalpha():
+                    print("Nombre invalido: solo letras y espacios son permitidos.")
+                    continue
                 break
-                
-            if texto_nombre == "":
-                print("Nombre invalido: el campo 'Nombre' esta vacio.")
-                continue
-            if any(caracter.isdigit() for caracter in texto_nombre):
-                print("Nombre invalido: no se aceptan digitos en el nombre.")
-                continue
-            if not texto_nombre.replace(" ", "").isalpha():
-                print("Nombre invalido: solo letras y espacios son permitidos.")
-                continue
-            break
             
-        if cancelar_cliente:
-            continue
+            if cancelar_cliente:
+                continue
 
-        while True:
-            try:
-                texto_apellidos = input("Ingrese los apellidos del cliente o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_cliente = True
-                break
+            while True:
+                try:
+                    texto_apellidos = input("Ingrese los apellidos del cliente o 'X' para cancelar: ").strip()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nOperacion cancelada por el usuario.")
+                    cancelar_cliente = True
+                    break
                 
-            if texto_apellidos.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_cliente = True
-                break
+                if texto_apellidos.upper() == "X":
+                    print("Operacion cancelada por el usuario.")
+                    cancelar_cliente = True
+                    break
                 
-            if texto_apellidos == "":
-                print("Apellidos invalidos: el campo 'Apellidos' esta vacio.")
-                continue
-            if any(caracter.isdigit() for caracter in texto_apellidos):
-                print("Apellidos invalidos: no se aceptan digitos en los apellidos.")
-                continue
-            if not texto_apellidos.replace(" ", "").isalpha():
-                print("Apellidos invalidos: solo letras y espacios son permitidos.")
-                continue
-            break
+                if texto_apellidos == "":
+                    print("Apellidos invalidos: el campo 'Apellidos' esta vacio.")
+                    continue
+                if any(caracter.isdigit() for caracter in texto_apellidos):
+                    print("Apellidos invalidos: no se aceptan digitos en los apellidos.")
+                    continue
+                if not texto_apellidos.replace(" ", "").isalpha():
+                    print("Apellidos invalidos: solo letras y espacios son permitidos.")
+                    continue
+                break
             
-        if cancelar_cliente:
-            continue
+            if cancelar_cliente:
+                continue
 
-        try:
-            asegurar_tablas()
-            with sqlite3.connect(DB_FILE) as conexion:
-                cursor = conexion.cursor()
-                cursor.execute("INSERT INTO clientes(nombre,apellidos) VALUES(?,?)", (texto_nombre, texto_apellidos))
-                conexion.commit()
-                cliente_id_bd = cursor.lastrowid
-                cursor.close()
+            try:
+                asegurar_tablas()
+                cliente_id_bd = registrar_cliente(texto_nombre, texto_apellidos)
                 
-            cargar_estado_desde_bd()
-            print(f"\nCliente registrado exitosamente con ID: {cliente_id_bd}")
-            print(f"Nombre: {texto_nombre} {texto_apellidos}")
+                cargar_estado_desde_bd()
+                print(f"\nCliente registrado exitosamente con ID: {cliente_id_bd}")
+                print(f"Nombre: {texto_nombre} {texto_apellidos}")
             
-        except sqlite3.IntegrityError as error:
-            print(f"Cliente no insertado en BD (error de integridad): {error}")
-        except Exception as error:
-            print(f"Error al insertar cliente en BD: {error}")
+            except sqlite3.IntegrityError as error:
+                print(f"Cliente no insertado en BD (error de integridad): {error}")
+            except Exception as error:
+                print(f"Error al insertar cliente en BD: {error}")
 
-    elif opcion == 6:
-        print("\n" + "=" * 60)
-        print("REGISTRAR NUEVA SALA")
-        print("=" * 60)
-        cancelar_sala = False
+        elif opcion == 6:
+            print("\n" + "=" * 60)
+            print("REGISTRAR NUEVA SALA")
+            print("=" * 60)
+            cancelar_sala = False
 
-        while True:
-            try:
-                texto_nombre_sala = input("\nIngrese el nombre de la sala o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_sala = True
-                break
+            while True:
+                try:
+                    texto_nombre_sala = input("\nIngrese el nombre de la sala o 'X' para cancelar: ").strip()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nOperacion cancelada por el usuario.")
+                    cancelar_sala = True
+                    break
                 
-            if texto_nombre_sala.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_sala = True
-                break
+                if texto_nombre_sala.upper() == "X":
+                    print("Operacion cancelada por el usuario.")
+                    cancelar_sala = True
+                    break
                 
-            if texto_nombre_sala == "":
-                print("Nombre de sala invalido: campo vacio.")
-                continue
-            if any(caracter.isdigit() for caracter in texto_nombre_sala):
-                print("Nombre de sala invalido: no se aceptan digitos en el nombre de sala.")
-                continue
-            if not all(caracter.isalpha() or caracter.isspace() for caracter in texto_nombre_sala):
-                print("Nombre de sala invalido: solo letras y espacios permitidos.")
-                continue
-            break
+                if texto_nombre_sala == "":
+                    print("Nombre de sala invalido: campo vacio.")
+                    continue
+                if any(caracter.isdigit() for caracter in texto_nombre_sala):
+                    print("Nombre de sala invalido: no se aceptan digitos en el nombre de sala.")
+                    continue
+                if not all(caracter.isalpha() or caracter.isspace() for caracter in texto_nombre_sala):
+                    print("Nombre de sala invalido: solo letras y espacios permitidos.")
+                    continue
+                break
             
-        if cancelar_sala:
-            continue
+            if cancelar_sala:
+                continue
 
-        while True:
-            try:
-                texto_cupo = input("Ingrese el cupo de la sala (entero mayor a 0) o 'X' para cancelar: ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                cancelar_sala = True
-                break
+            while True:
+                try:
+                    texto_cupo = input("Ingrese el cupo de la sala (entero mayor a 0) o 'X' para cancelar: ").strip()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nOperacion cancelada por el usuario.")
+                    cancelar_sala = True
+                    break
                 
-            if texto_cupo.upper() == "X":
-                print("Operacion cancelada por el usuario.")
-                cancelar_sala = True
-                break
+                if texto_cupo.upper() == "X":
+                    print("Operacion cancelada por el usuario.")
+                    cancelar_sala = True
+                    break
                 
-            if texto_cupo == "":
-                print("Cupo invalido: campo vacio.")
-                continue
-            if any(caracter.isalpha() for caracter in texto_cupo):
-                print("Cupo invalido: no se aceptan letras en el cupo.")
-                continue
-            if not texto_cupo.isdigit():
-                print("Cupo invalido: formato no numerico.")
-                continue
+                if texto_cupo == "":
+                    print("Cupo invalido: campo vacio.")
+                    continue
+                if any(caracter.isalpha() for caracter in texto_cupo):
+                    print("Cupo invalido: no se aceptan letras en el cupo.")
+                    continue
+                if not texto_cupo.isdigit():
+                    print("Cupo invalido: formato no numerico.")
+                    continue
                 
-            try:
-                cupo_int = int(texto_cupo)
-            except ValueError:
-                print("Cupo invalido: no se pudo convertir a entero.")
-                continue
+                try:
+                    cupo_int = int(texto_cupo)
+                except ValueError:
+                    print("Cupo invalido: no se pudo convertir a entero.")
+                    continue
                 
-            if cupo_int == 0:
-                print("Cupo invalido: la sala no puede tener cupo 0.")
-                continue
-            if cupo_int < 0:
-                print("Cupo invalido: no se aceptan numeros negativos.")
-                continue
-            break
+                if cupo_int == 0:
+                    print("Cupo invalido: la sala no puede tener cupo 0.")
+                    continue
+                if cupo_int < 0:
+                    print("Cupo invalido: no se aceptan numeros negativos.")
+                    continue
+                break
             
-        if cancelar_sala:
-            continue
+            if cancelar_sala:
+                continue
 
-        try:
-            asegurar_tablas()
-            with sqlite3.connect(DB_FILE) as conexion:
-                cursor = conexion.cursor()
-                cursor.execute("INSERT INTO salas(nombre,cupo) VALUES(?,?)", (texto_nombre_sala, cupo_int))
-                conexion.commit()
-                sala_id_bd = cursor.lastrowid
-                cursor.close()
+            try:
+                asegurar_tablas()
+                sala_id_bd = registrar_sala(texto_nombre_sala, cupo_int)
                 
-            cargar_estado_desde_bd()
-            print(f"\nSala registrada exitosamente con ID: {sala_id_bd}")
-            print(f"Nombre: {texto_nombre_sala}")
-            print(f"Cupo: {cupo_int} personas")
+                cargar_estado_desde_bd()
+                print(f"\nSala registrada exitosamente con ID: {sala_id_bd}")
+                print(f"Nombre: {texto_nombre_sala}")
+                print(f"Cupo: {cupo_int} personas")
             
-        except sqlite3.IntegrityError as error:
-            print(f"Sala no insertada en BD (error de integridad): {error}")
-        except Exception as error:
-            print(f"Error al insertar sala en BD: {error}")
+            except sqlite3.IntegrityError as error:
+                print(f"Sala no insertada en BD (error de integridad): {error}")
+            except Exception as error:
+                print(f"Error al insertar sala en BD: {error}")
 
-    elif opcion == 7:
-        while True:
-            try:
-                respuesta_salir = input("\nEsta seguro que desea salir del programa? (S/N): ").strip().upper()
-            except (EOFError, KeyboardInterrupt):
-                print("\nOperacion cancelada por el usuario.")
-                respuesta_salir = "N"
+        elif opcion == 7:
+            while True:
+                try:
+                    respuesta_salir = input("\nEsta seguro que desea salir del programa? (S/N): ").strip().upper()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nOperacion cancelada por el usuario.")
+                    respuesta_salir = "N"
                 
-            if respuesta_salir == "":
-                print("Entrada vacia: indique 'S' para salir o 'N' para cancelar.")
-                continue
-            if respuesta_salir not in ("S", "N"):
-                print("Opcion invalida: solo 'S' o 'N'.")
-                continue
-            break
+                if respuesta_salir == "":
+                    print("Entrada vacia: indique 'S' para salir o 'N' para cancelar.")
+                    continue
+                if respuesta_salir not in ("S", "N"):
+                    print("Opcion invalida: solo 'S' o 'N'.")
+                    continue
+                break
             
-        if respuesta_salir == "S":
-            print("\n" + "=" * 70)
-            print("¡Gracias por usar el Sistema de Reservacion!".center(70))
-            print("Saliendo del programa...".center(70))
-            print("=" * 70)
-            sys.exit()
+            if respuesta_salir == "S":
+                print("\n" + "=" * 70)
+                print("¡Gracias por usar el Sistema de Reservacion!".center(70))
+                print("Saliendo del programa...".center(70))
+                print("=" * 70)
+                sys.exit()
+            else:
+                print("Continuando en el programa...")
+
         else:
-            print("Continuando en el programa...")
+            print("Opcion no valida. Intente de nuevo.")
 
-    else:
-        print("Opcion no valida. Intente de nuevo.")
\ No newline at end of file
+def _benchmarks():
+    from benchmarks import rendimiento
+    return rendimiento
+
+def main(argv=None):
+    global DB_FILE
+    parser = argparse.ArgumentParser(description="Sistema de reservacion de salas")
+    parser.add_argument("--db", default=DB_FILE, help="Ruta de la base de datos SQLite")
+    parser.add_argument("--sedes", default=os.environ.get("EV_SEDES"),
+                        help="Archivo JSON {\"sede\": \"ruta.db\"} con la BD de cada edificio")
+    parser.add_argument("--sede", default=os.environ.get("EV_SEDE"),
+                        help="Sede en la que se registran las operaciones (reemplaza --db con la BD de esa sede)")
+    parser.add_argument("--estadisticas", nargs="?", const="-", default=os.environ.get("EV_ESTADISTICAS"),
+                        help="Vuelca tiempos por operacion al salir ('-' en pantalla, ruta .json o de texto)")
+    parser.add_argument("--traza-sql", nargs="?", const="-", default=os.environ.get("EV_TRAZA_SQL"),
+                        help="Registra cada sentencia SQL ('-' en stderr o ruta de archivo)")
+    parser.add_argument("--perfil", choices=("cprofile", "tracemalloc", "ambos"), default=os.environ.get("EV_PERFIL"),
+                        help="Activa cProfile y/o tracemalloc durante la ejecucion")
+    parser.add_argument("--sentencias", nargs="?", const="-", default=os.environ.get("EV_SENTENCIAS"),
+                        help="Vuelca estadisticas por sentencia SQL normalizada al salir ('-' en pantalla, ruta .json o de texto)")
+    parser.add_argument("--lento-ms", type=float, default=float(os.environ["EV_LENTO_MS"]) if os.environ.get("EV_LENTO_MS") else None,
+                        help="Registra en el log de consultas lentas las sentencias que superen este tiempo")
+    parser.add_argument("--log-lento", default=os.environ.get("EV_LOG_LENTO", "consultas_lentas.log"),
+                        help="Archivo del log de consultas lentas (incluye EXPLAIN QUERY PLAN)")
+    parser.add_argument("--replica", default=os.environ.get("EV_REPLICA"),
+                        help="Ruta de una replica de solo lectura para reportes y exportaciones")
+    parser.add_argument("--intervalo-replica", type=float, default=60.0,
+                        help="Segundos entre refrescos de la replica en el menu interactivo (0 = no refrescar)")
+    parser.add_argument("--ttl-retencion", type=float,
+                        default=float(os.environ["EV_TTL_RETENCION"]) if os.environ.get("EV_TTL_RETENCION") else TTL_RETENCION_PREDETERMINADO,
+                        help="Segundos que dura la retencion de un espacio mientras se captura la reservacion")
+    parser.add_argument("--precarga", type=int, nargs="?", const=DIAS_PRECARGA_PREDETERMINADOS,
+                        default=int(os.environ["EV_PRECARGA"]) if os.environ.get("EV_PRECARGA") else 0,
+                        help="Precarga en segundo plano los reportes y la disponibilidad de los proximos N dias (menu interactivo)")
+    parser.add_argument("--mantenimiento", type=float, nargs="?", const=HORAS_MANTENIMIENTO_PREDETERMINADAS,
+                        default=float(os.environ["EV_MANTENIMIENTO"]) if os.environ.get("EV_MANTENIMIENTO") else 0,
+                        help="Ejecuta el mantenimiento en linea cada N horas mientras el menu interactivo este abierto")
+    parser.add_argument("--mapa", default=os.environ.get("EV_MAPA"),
+                        help="Nombre de un mapa de disponibilidad publicado con mapa-disponibilidad para consultar sin ir a la BD")
+    parser.add_argument("--grabar-traza", default=os.environ.get("EV_GRABAR_TRAZA"),
+                        help="Graba cada operacion de negocio en esta traza (.gz para comprimir) junto con una copia base de la BD")
+    subcomandos = parser.add_subparsers(dest="comando")
+
+    sub = subcomandos.add_parser("exportar-estado", help="Guarda el estado de la BD en un snapshot binario")
+    sub.add_argument("ruta")
+    sub.add_argument("--comprimir", action="store_true")
+
+    sub = subcomandos.add_parser("importar-estado", help="Carga un snapshot binario en una BD vacia")
+    sub.add_argument("ruta")
+
+    sub = subcomandos.add_parser("convertir-estado", help="Convierte entre estado JSON y snapshot binario")
+    sub.add_argument("origen")
+    sub.add_argument("destino")
+    sub.add_argument("--comprimir", action="store_true")
+
+    sub = subcomandos.add_parser("exportar-rango", help="Exporta reportes de un rango de fechas en paralelo")
+    sub.add_argument("fecha_inicio", type=_fecha_argumento, help="MM-DD-YYYY")
+    sub.add_argument("fecha_fin", type=_fecha_argumento, help="MM-DD-YYYY")
+    sub.add_argument("--formatos", default="csv,json,xlsx", help="Lista separada por comas: csv,json,xlsx")
+    sub.add_argument("--particion", choices=("dia", "semana"), default="dia")
+    sub.add_argument("--procesos", type=int, default=None)
+    sub.add_argument("--directorio", default=".")
+    sub.add_argument("--combinado", action="store_true", help="Genera ademas un archivo con todo el rango")
+    sub.add_argument("--serie", action="store_true", help="Ejecuta sin pool de procesos")
+    sub.add_argument("--comparar", action="store_true", help="Mide serie contra pool de procesos")
+
+    sub = subcomandos.add_parser("refrescar-replica", help="Copia la BD a la replica de lectura con la API de backup")
+    sub.add_argument("destino", nargs="?", help="Ruta de la replica (por defecto --replica)")
+
+    sub = subcomandos.add_parser("respaldar", help="Respalda la BD en linea con la API de backup, por pasos y verificando la copia")
+    sub.add_argument("destino")
+    sub.add_argument("--paginas", type=int,
+                     help=f"Paginas copiadas por paso (-1 = todo en un paso; por defecto -1 en WAL y {PAGINAS_RESPALDO} en otro modo)")
+    sub.add_argument("--pausa", type=float, default=PAUSA_RESPALDO, help="Segundos de espera entre pasos")
+    sub.add_argument("--gzip", action="store_true", help="Comprime la copia con gzip")
+    sub.add_argument("--sin-verificar", action="store_true", help="Omite integrity_check sobre la copia")
+
+    sub = subcomandos.add_parser("bench-respaldo", help="Mide el respaldo en linea sobre una BD sintetica grande")
+    sub.add_argument("--reservas", type=int, default=5000000)
+
+    sub = subcomandos.add_parser("sedes", help="Lista las sedes configuradas y crea las BD que falten")
+
+    sub = subcomandos.add_parser("reporte-sedes", help="Reporte de reservaciones de todas las sedes en un rango de fechas")
+    sub.add_argument("--fecha-inicio", type=_fecha_argumento, required=True, help="MM-DD-YYYY")
+    sub.add_argument("--fecha-fin", type=_fecha_argumento, help="MM-DD-YYYY (por defecto igual a la inicial)")
+    sub.add_argument("--modo", choices=MODOS_FEDERADOS, default="hilos")
+    sub.add_argument("--solo", type=lambda texto: texto.split(","), help="Sedes a consultar separadas por comas")
+
+    sub = subcomandos.add_parser("disponibilidad-sedes", help="Espacios libres de una fecha en todas las sedes")
+    sub.add_argument("--fecha", type=_fecha_argumento, required=True, help="MM-DD-YYYY")
+    sub.add_argument("--modo", choices=MODOS_FEDERADOS, default="hilos")
+
+    sub = subcomandos.add_parser("reservar-sede", help="Reserva un espacio directamente en la BD de una sede")
+    sub.add_argument("sede_destino", metavar="SEDE")
+    sub.add_argument("--cliente", type=int, required=True)
+    sub.add_argument("--sala", type=int, required=True)
+    sub.add_argument("--fecha", type=_fecha_argumento, required=True, help="MM-DD-YYYY")
+    sub.add_argument("--evento", required=True)
+    grupo_turno = sub.add_mutually_exclusive_group(required=True)
+    grupo_turno.add_argument("--turno", type=int, help="Id de turno fijo")
+    grupo_turno.add_argument("--horario", help="Intervalo libre HH:MM-HH:MM")
+    sub.add_argument("--clave", help="Clave de idempotencia: un reintento con la misma clave devuelve el folio original")
+
+    sub = subcomandos.add_parser("bench-sedes", help="Compara el reporte federado en serie, hilos, procesos y ATTACH")
+    sub.add_argument("--reservas", type=int, default=400000)
+    sub.add_argument("--sedes", dest="num_sedes", type=int, default=4)
+
+    sub = subcomandos.add_parser("bench-lectura-escritura", help="Mide escrituras con reportes concurrentes (rollback, WAL, replica)")
+    sub.add_argument("--reservas", type=int, default=100000)
+    sub.add_argument("--escrituras", type=int, default=200)
+    sub.add_argument("--lectores", type=int, default=2)
+
+    sub = subcomandos.add_parser("bench-intervalos", help="Mide la deteccion de empalmes de horario con alta densidad")
+    sub.add_argument("--salas", type=int, default=20)
+    sub.add_argument("--dias", type=int, default=365)
+    sub.add_argument("--por-dia", type=int, default=40)
+    sub.add_argument("--consultas", type=int, default=200000)
+
+    sub = subcomandos.add_parser("bench-retenciones", help="Simula terminales concurrentes con y sin retenciones de espacio")
+    sub.add_argument("--terminales", type=int, default=8)
+    sub.add_argument("--intentos", type=int, default=40)
+    sub.add_argument("--salas", type=int, default=4)
+    sub.add_argument("--dias", type=int, default=10)
+
+    sub = subcomandos.add_parser("barrer-retenciones", help="Elimina las retenciones vencidas")
+
+    sub = subcomandos.add_parser("cancelar-reservas", help="Cancela varios folios y promueve la lista de espera en un lote")
+    sub.add_argument("folios", type=int, nargs="+")
+
+    sub = subcomandos.add_parser("lista-espera", help="Muestra las solicitudes pendientes en lista de espera")
+    sub.add_argument("--fecha", type=_fecha_argumento, help="MM-DD-YYYY")
+
+    sub = subcomandos.add_parser("bench-lista-espera", help="Mide la promocion por cancelacion con colas grandes")
+    sub.add_argument("--tamanos", type=_lista_enteros_argumento, default=[1000, 100000])
+    sub.add_argument("--cancelaciones", type=int, default=200)
+
+    sub = subcomandos.add_parser("asignar-salas", help="Asigna salas a un lote de solicitudes minimizando asientos desperdiciados")
+    sub.add_argument("ruta", help="Archivo .csv o .json con cliente_id, asistentes, fecha, turnos, evento")
+    sub.add_argument("--segundos", type=float, default=5.0, help="Presupuesto de tiempo del optimizador")
+    sub.add_argument("--aplicar", action="store_true", help="Registra las reservaciones asignadas")
+
+    sub = subcomandos.add_parser("bench-asignacion", help="Compara el optimizador contra la asignacion voraz")
+    sub.add_argument("--solicitudes", type=int, default=2000)
+    sub.add_argument("--salas", type=int, default=40)
+    sub.add_argument("--dias", type=int, default=20)
+    sub.add_argument("--segundos", type=float, default=30.0)
+
+    sub = subcomandos.add_parser("buscar", help="Busca reservaciones por nombre de evento o de cliente")
+    sub.add_argument("texto")
+    sub.add_argument("--desde", type=_fecha_argumento, help="MM-DD-YYYY")
+    sub.add_argument("--hasta", type=_fecha_argumento, help="MM-DD-YYYY")
+    sub.add_argument("--sala", type=int)
+    sub.add_argument("--canceladas", action="store_true", help="Incluye reservaciones canceladas")
+    sub.add_argument("--limite", type=int, default=20)
+
+    sub = subcomandos.add_parser("reconstruir-busqueda", help="Reconstruye el indice de busqueda de texto completo")
+
+    sub = subcomandos.add_parser("bench-busqueda", help="Mide la latencia de busqueda de texto completo")
+    sub.add_argument("--reservas", type=int, default=1000000)
+    sub.add_argument("--consultas", type=int, default=2000)
+
+    sub = subcomandos.add_parser("historial", help="Muestra el resumen y el historial paginado de un cliente")
+    sub.add_argument("cliente", type=int)
+    sub.add_argument("--pasadas", action="store_true", help="Lista reservaciones pasadas en lugar de proximas")
+    sub.add_argument("--despues", type=_cursor_historial_argumento, help="Cursor YYYY-MM-DD:FOLIO de la pagina anterior")
+    sub.add_argument("--canceladas", action="store_true", help="Incluye reservaciones canceladas")
+    sub.add_argument("--limite", type=int, default=PAGINA_HISTORIAL)
+
+    sub = subcomandos.add_parser("bench-historial", help="Mide la latencia del resumen y del historial por cliente")
+    sub.add_argument("--reservas", type=int, default=200000)
+    sub.add_argument("--clientes", type=int, default=50)
+    sub.add_argument("--consultas", type=int, default=2000)
+
+    sub = subcomandos.add_parser("exportar-cambios", help="Exporta altas, cancelaciones y cambios desde la ultima marca del consumidor")
+    sub.add_argument("consumidor", help="Nombre del consumidor cuya marca de agua se usa y avanza")
+    sub.add_argument("--formato", choices=("csv", "ndjson"), default="csv")
+    sub.add_argument("--gzip", action="store_true", help="Comprime la salida con gzip")
+    sub.add_argument("--directorio", default=".")
+    sub.add_argument("--desde", type=int, help="Secuencia inicial explicita en lugar de la marca guardada")
+
+    sub = subcomandos.add_parser("bench-cambios", help="Compara la exportacion incremental contra el historial completo")
+    sub.add_argument("--reservas", type=int, default=500000)
+
+    sub = subcomandos.add_parser("purgar-claves", help="Borra por lotes las claves de idempotencia vencidas")
+    sub.add_argument("--lote", type=int, default=LOTE_PURGA_CLAVES)
+
+    sub = subcomandos.add_parser("bench-idempotencia", help="Mide el costo de las claves de idempotencia y de su purga")
+    sub.add_argument("--operaciones", type=int, default=2000)
+    sub.add_argument("--vencidas", type=int, default=200000)
+
+    sub = subcomandos.add_parser("seguir-cambios", help="Muestra como NDJSON los cambios de reservaciones conforme ocurren")
+    sub.add_argument("--desde", type=int, help="Secuencia inicial (por defecto la ultima)")
+    sub.add_argument("--espera", type=float, default=30.0, help="Segundos maximos de cada espera larga")
+
+    sub = subcomandos.add_parser("bench-avisos", help="Mide la latencia y el costo en CPU del notificador de cambios")
+    sub.add_argument("--reservas", type=int, default=200000)
+    sub.add_argument("--cambios", type=int, default=200)
+
+    sub = subcomandos.add_parser("mantenimiento", help="ANALYZE, vacuum incremental y quick_check por porciones, sin detener la BD")
+    sub.add_argument("--paginas", type=int, default=PAGINAS_VACUUM_PASO, help="Paginas liberadas por porcion de incremental_vacuum")
+    sub.add_argument("--pausa", type=float, default=PAUSA_MANTENIMIENTO, help="Segundos de espera entre porciones")
+    sub.add_argument("--sin-verificar", action="store_true", help="Omite quick_check")
+    sub.add_argument("--convertir", action="store_true",
+                     help="Activa auto_vacuum INCREMENTAL en una BD existente (hace un VACUUM completo una sola vez)")
+    sub.add_argument("--detalle", action="store_true", help="Mide tambien el espacio sin usar dentro de las paginas (recorre toda la BD)")
+
+    sub = subcomandos.add_parser("bench-mantenimiento", help="Mide el efecto del mantenimiento en linea sobre las escrituras")
+    sub.add_argument("--reservas", type=int, default=200000)
+
+    sub = subcomandos.add_parser("particionar", help="Particiona por mes o anio las reservaciones para los reportes por rango")
+    sub.add_argument("--por", choices=("mes", "anio"), default="mes")
+    sub.add_argument("--quitar", action="store_true", help="Elimina todas las particiones")
+
+    sub = subcomandos.add_parser("bench-particiones", help="Mide el reporte por rango contra el numero de particiones")
+    sub.add_argument("--reservas", type=int, default=1000000)
+
+    sub = subcomandos.add_parser("mapa-disponibilidad", help="Publica en memoria compartida la ocupacion por sala, fecha y turno")
+    sub.add_argument("--nombre", help="Nombre del bloque de memoria compartida (por defecto uno aleatorio)")
+    sub.add_argument("--dias", type=int, default=DIAS_MAPA_PREDETERMINADOS, help="Dias cubiertos a partir de hoy")
+
+    sub = subcomandos.add_parser("verificar-mapa", help="Compara el mapa de disponibilidad compartido contra la BD")
+    sub.add_argument("nombre", help="Nombre del bloque publicado con mapa-disponibilidad")
+
+    sub = subcomandos.add_parser("bench-mapa", help="Mide consultas de disponibilidad por segundo con el mapa compartido y con SQLite")
+    sub.add_argument("--reservas", type=int, default=200000)
+    sub.add_argument("--procesos", type=_lista_enteros_argumento, default=(1, 2, 4, 8), help="Numeros de procesos separados por comas")
+    sub.add_argument("--consultas", type=int, default=50000, help="Consultas por proceso")
+
+    sub = subcomandos.add_parser("duplicados-clientes", help="Detecta clientes duplicados por bloques y, si se indica, los fusiona")
+    sub.add_argument("--umbral", type=float, default=UMBRAL_DUPLICADOS, help="Similitud minima (0-1) para proponer una fusion")
+    sub.add_argument("--fusionar", action="store_true", help="Reasigna las reservaciones y elimina los duplicados")
+    sub.add_argument("--si", action="store_true", help="Fusiona sin pedir confirmacion")
+
+    sub = subcomandos.add_parser("bench-duplicados", help="Mide la deteccion y fusion de clientes duplicados")
+    sub.add_argument("--clientes", type=int, default=1000000)
+    sub.add_argument("--proporcion", type=float, default=0.1, help="Fraccion de clientes que son variantes de otro")
+
+    sub = subcomandos.add_parser("bench-precarga", help="Mide el primer reporte y la disponibilidad con y sin precarga")
+    sub.add_argument("--reservas", type=int, default=300000)
+    sub.add_argument("--dias", type=int, default=DIAS_PRECARGA_PREDETERMINADOS)
+    sub.add_argument("--repeticiones", type=int, default=10)
+
+    sub = subcomandos.add_parser("bench-tabla", help="Compara el renderizado de tablas contra tabulate")
+    sub.add_argument("--filas", type=int, default=100000)
+
+    sub = subcomandos.add_parser("reproducir-traza", help="Reejecuta una traza grabada sobre una copia de su BD base")
+    sub.add_argument("traza")
+    sub.add_argument("--base", help="BD base (por defecto la copia grabada junto con la traza)")
+    sub.add_argument("--modo", choices=("original", "maxima"), default="original", help="Velocidad original o maxima")
+    sub.add_argument("--sesiones", type=int, default=1, help="Sesiones paralelas que reproducen la traza completa")
+
+    sub = subcomandos.add_parser("reservar-grupo", help="Reserva varias salas, fechas y turnos en una sola transaccion")
+    sub.add_argument("--cliente", type=int, required=True)
+    sub.add_argument("--evento", required=True)
+    sub.add_argument("--salas", type=_lista_enteros_argumento, required=True, help="Ids de sala separados por comas")
+    sub.add_argument("--fecha-inicio", type=_fecha_argumento, required=True, help="MM-DD-YYYY")
+    sub.add_argument("--fecha-fin", type=_fecha_argumento, help="MM-DD-YYYY (por defecto la fecha inicial)")
+    sub.add_argument("--turnos", type=_lista_enteros_argumento, help="Ids de turno separados por comas (por defecto todos)")
+    sub.add_argument("--clave", help="Clave de idempotencia: un reintento con la misma clave devuelve el grupo original")
+
+    sub = subcomandos.add_parser("cancelar-grupo", help="Cancela todas las reservaciones de un grupo")
+    sub.add_argument("grupo_id", type=int)
+
+    sub = subcomandos.add_parser("renombrar-grupo", help="Cambia el nombre del evento de todo un grupo")
+    sub.add_argument("grupo_id", type=int)
+    sub.add_argument("evento")
+
+    args = parser.parse_args(argv)
+    DB_FILE = args.db
+    if args.sedes:
+        try:
+            cargar_sedes(args.sedes)
+        except (OSError, ValueError) as error:
+            print(f"No se pudo leer la configuracion de sedes {args.sedes}: {error}")
+            return 1
+    if args.sede:
+        try:
+            DB_FILE = ruta_sede(args.sede)
+        except KeyError as error:
+            print(error.args[0])
+            return 1
+    if args.comando in ("sedes", "reporte-sedes", "disponibilidad-sedes", "reservar-sede") and not sedes:
+        print("No hay sedes configuradas; indique --sedes ARCHIVO.json o EV_SEDES.")
+        return 1
+    if args.perfil not in (None, "", "cprofile", "tracemalloc", "ambos"):
+        parser.error(f"valor de EV_PERFIL invalido: {args.perfil}")
+    configurar_instrumentacion(args.estadisticas, args.traza_sql, args.perfil,
+                               args.sentencias, args.lento_ms, args.log_lento)
+
+    if args.replica and args.comando not in ("refrescar-replica", "bench-lectura-escritura"):
+        asegurar_tablas()
+        configurar_replica(args.replica, args.intervalo_replica if args.comando is None else 0)
+
+    configurar_retenciones(args.ttl_retencion, barrido=args.comando is None)
+
+    if args.mapa and args.comando not in ("mapa-disponibilidad", "verificar-mapa", "bench-mapa"):
+        try:
+            abrir_mapa_disponibilidad(args.mapa)
+        except (FileNotFoundError, ValueError) as error:
+            print(f"Advertencia: no se pudo abrir el mapa de disponibilidad {args.mapa}: {error}")
+
+    if args.grabar_traza and args.comando != "reproducir-traza":
+        asegurar_tablas()
+        if not iniciar_grabacion(args.grabar_traza):
+            return 1
+
+    if args.comando is None:
+        iniciar_mantenimiento(args.mantenimiento)
+        menu_principal(args.precarga)
+    elif args.comando == "exportar-estado":
+        return 0 if exportar_estado_snapshot(args.ruta, args.comprimir) else 1
+    elif args.comando == "importar-estado":
+        return 0 if importar_estado_snapshot(args.ruta) else 1
+    elif args.comando == "convertir-estado":
+        if args.origen.lower().endswith(".json"):
+            return 0 if convertir_json_a_snapshot(args.origen, args.destino, args.comprimir) else 1
+        return 0 if convertir_snapshot_a_json(args.origen, args.destino) else 1
+    elif args.comando == "refrescar-replica":
+        destino = args.destino or args.replica
+        if not destino:
+            print("Indique la ruta de la replica (argumento o --replica).")
+            return 1
+        try:
+            segundos = refrescar_replica(destino)
+        except Exception as error:
+            print(f"Error al refrescar la replica: {error}")
+            return 1
+        print(f"Replica {destino} actualizada en {segundos:.3f} s")
+    elif args.comando == "respaldar":
+        asegurar_tablas()
+        if os.path.abspath(args.destino) == os.path.abspath(DB_FILE):
+            print("El destino del respaldo no puede ser la BD en uso.")
+            return 1
+        try:
+            resultado = respaldar_bd(args.destino, args.paginas, args.pausa, args.gzip, not args.sin_verificar, sys.stderr.isatty())
+        except (sqlite3.Error, OSError) as error:
+            print(f"Error al respaldar la BD: {error}")
+            return 1
+        if not resultado["ok"]:
+            print(f"La copia no paso integrity_check: {'; '.join(resultado['integridad'][:5])}")
+            return 1
+        print(f"Respaldo {resultado['destino']}: {resultado['paginas']} paginas ({resultado['bytes'] / 1048576:.1f} MB) "
+              f"en {resultado['segundos_copia']:.2f} s ({resultado['mb_s']:.1f} MB/s), "
+              f"archivo de {resultado['bytes_archivo'] / 1048576:.1f} MB, total {resultado['segundos']:.2f} s"
+              f"{', reinicios: ' + str(resultado['reinicios']) if resultado['reinicios'] else ''}"
+              f"{', integrity_check ok' if resultado['integridad'] else ''}")
+    elif args.comando == "bench-respaldo":
+        _benchmarks().benchmark_respaldo(args.reservas)
+    elif args.comando == "sedes":
+        filas = []
+        for nombre, ruta in sedes.items():
+            existia = os.path.exists(ruta)
+            asegurar_tablas(ruta)
+            with contextlib.closing(conectar_bd(ruta)) as conexion:
+                reservas_activas = conexion.execute("SELECT COUNT(*) FROM reservas WHERE activo = 1").fetchone()[0]
+            filas.append([nombre, ruta, reservas_activas, "" if existia else "creada"])
+        print(tabulate(filas, headers=["SEDE", "BD", "RESERVAS ACTIVAS", ""], tablefmt="grid"))
+    elif args.comando == "reporte-sedes":
+        fecha_fin = args.fecha_fin or args.fecha_inicio
+        try:
+            filas = reporte_sedes(args.fecha_inicio, fecha_fin, args.modo, args.solo)
+        except (KeyError, ValueError, sqlite3.Error) as error:
+            print(f"Error al consultar las sedes: {error.args[0]}")
+            return 1
+        imprimir_reporte_sedes(filas, args.fecha_inicio, fecha_fin)
+    elif args.comando == "disponibilidad-sedes":
+        try:
+            filas = disponibilidad_sedes(args.fecha, args.modo)
+        except (KeyError, ValueError, sqlite3.Error) as error:
+            print(f"Error al consultar las sedes: {error.args[0]}")
+            return 1
+        imprimir_tabla(filas, ["SEDE", "SALA ID", "SALA", "CUPO", "TURNO"])
+    elif args.comando == "reservar-sede":
+        evento = args.evento.strip()
+        if len(evento) < 3:
+            print("Nombre de evento invalido: debe tener al menos 3 caracteres.")
+            return 1
+        if args.fecha < datetime.date.today() + datetime.timedelta(days=2):
+            print("Restriccion de antelacion: la fecha debe ser al menos dos dias posterior a hoy.")
+            return 1
+        try:
+            ruta = ruta_sede(args.sede_destino)
+            asegurar_tablas(ruta)
+            with contextlib.closing(conectar_bd(ruta)) as conexion:
+                cliente = conexion.execute("SELECT 1 FROM clientes WHERE cliente_id = ?", (args.cliente,)).fetchone()
+                sala = conexion.execute("SELECT 1 FROM salas WHERE sala_id = ?", (args.sala,)).fetchone()
+                intervalo = conexion.execute("SELECT minuto_inicio, minuto_fin FROM turnos WHERE turno_id = ? AND turno_id <> ?",
+                                             (args.turno, TURNO_HORARIO_ID)).fetchone()
+            if cliente is None:
+                print(f"El cliente {args.cliente} no existe en la sede {args.sede_destino}.")
+                return 1
+            if sala is None:
+                print(f"La sala {args.sala} no existe en la sede {args.sede_destino}.")
+                return 1
+            if args.horario:
+                texto_inicio, _, texto_fin = args.horario.partition("-")
+                minuto_inicio, minuto_fin = interpretar_hora(texto_inicio), interpretar_hora(texto_fin)
+                if minuto_inicio is None or minuto_fin is None or minuto_inicio >= minuto_fin:
+                    print("Horario invalido: use HH:MM-HH:MM con la hora final posterior a la inicial.")
+                    return 1
+                turno_id = TURNO_HORARIO_ID
+            elif intervalo is None or None in intervalo:
+                print(f"El turno {args.turno} no existe en la sede {args.sede_destino}.")
+                return 1
+            else:
+                turno_id, (minuto_inicio, minuto_fin) = args.turno, intervalo
+            folio = reservar_en_sede(args.sede_destino, args.cliente, args.sala, args.fecha, turno_id, evento,
+                                     minuto_inicio, minuto_fin, clave=args.clave)
+        except (KeyError, ValueError, sqlite3.Error) as error:
+            print(f"Error al reservar en la sede: {error.args[0]}")
+            return 1
+        if folio is None:
+            print("El espacio solicitado ya esta ocupado en esa sede.")
+            return 1
+        print(f"Reservacion confirmada en la sede {args.sede_destino} con folio {folio}.")
+    elif args.comando == "bench-sedes":
+        _benchmarks().benchmark_sedes(args.reservas, args.num_sedes)
+    elif args.comando == "bench-lectura-escritura":
+        _benchmarks().benchmark_lectura_escritura(args.reservas, args.escrituras, args.lectores)
+    elif args.comando == "bench-intervalos":
+        _benchmarks().benchmark_intervalos(args.salas, args.dias, args.por_dia, args.consultas)
+    elif args.comando == "bench-retenciones":
+        _benchmarks().benchmark_retenciones(args.terminales, args.intentos, args.salas, args.dias)
+    elif args.comando == "barrer-retenciones":
+        asegurar_tablas()
+        print(f"{barrer_retenciones()} retencion(es) vencida(s) eliminada(s).")
+    elif args.comando == "cancelar-reservas":
+        asegurar_tablas()
+        resultado = cancelar_reservas(args.folios)
+        print(f"{len(resultado['canceladas'])} reservacion(es) cancelada(s).")
+        imprimir_promociones(resultado["promovidas"])
+    elif args.comando == "lista-espera":
+        asegurar_tablas()
+        consulta = """
+            SELECT e.espera_id, e.fecha_normalizada, s.nombre, t.descripcion, c.apellidos || ', ' || c.nombre, e.evento
+            FROM lista_espera e
+            JOIN salas s ON s.sala_id = e.sala_id
+            JOIN turnos t ON t.turno_id = e.turno_id
+            JOIN clientes c ON c.cliente_id = e.cliente_id
+            WHERE e.estado = 'pendiente'
+        """
+        parametros = []
+        if args.fecha:
+            consulta += " AND e.fecha_normalizada = ?"
+            parametros.append(args.fecha.strftime(FORMATO_FECHA_ISO))
+        with conectar_bd() as conexion:
+            filas = conexion.execute(consulta + " ORDER BY e.fecha_normalizada, e.sala_id, e.turno_id, e.espera_id", parametros).fetchall()
+        print(tabulate(filas, headers=["ESPERA", "FECHA", "SALA", "TURNO", "CLIENTE", "EVENTO"], tablefmt="grid"))
+    elif args.comando == "bench-lista-espera":
+        _benchmarks().benchmark_lista_espera(args.tamanos, args.cancelaciones)
+    elif args.comando == "asignar-salas":
+        asegurar_tablas()
+        return 0 if asignar_salas_lote(args.ruta, args.segundos, args.aplicar) else 1
+    elif args.comando == "bench-asignacion":
+        _benchmarks().benchmark_asignacion(args.solicitudes, args.salas, args.dias, args.segundos)
+    elif args.comando == "buscar":
+        asegurar_tablas()
+        resultados = buscar_reservas(args.texto, args.desde, args.hasta, args.sala, args.canceladas, args.limite)
+        if not resultados:
+            print(f"No hay reservaciones que coincidan con '{args.texto}'.")
+            return 1
+        imprimir_busqueda(resultados)
+    elif args.comando == "reconstruir-busqueda":
+        asegurar_tablas()
+        inicio = time.perf_counter()
+        print(f"Indice de busqueda reconstruido: {reconstruir_busqueda()} reservacion(es) en {time.perf_counter() - inicio:.2f} s")
+    elif args.comando == "bench-busqueda":
+        _benchmarks().benchmark_busqueda(args.reservas, args.consultas)
+    elif args.comando == "historial":
+        asegurar_tablas()
+        resumen = resumen_cliente(args.cliente)
+        if resumen is None:
+            print(f"Cliente invalido: no existe el cliente con ID {args.cliente}.")
+            return 1
+        imprimir_resumen_cliente(resumen)
+        filas, siguiente = historial_cliente(args.cliente, args.pasadas, args.limite, args.despues, args.canceladas)
+        if filas:
+            imprimir_historial(filas)
+        else:
+            print("Sin reservaciones en esta seccion.")
+        if siguiente:
+            print(f"Siguiente pagina: --despues {siguiente[0]}:{siguiente[1]}")
+    elif args.comando == "bench-historial":
+        _benchmarks().benchmark_historial(args.reservas, args.clientes, args.consultas)
+    elif args.comando == "exportar-cambios":
+        asegurar_tablas()
+        resultado = exportar_cambios(args.consumidor, args.formato, args.directorio, args.gzip, args.desde)
+        if resultado["archivo"] is None:
+            print(f"Sin cambios para '{args.consumidor}' desde la secuencia {resultado['desde']}.")
+        else:
+            print(f"{resultado['filas']} cambio(s) ({resultado['desde'] + 1}-{resultado['hasta']}) guardados en {resultado['archivo']}")
+    elif args.comando == "bench-cambios":
+        _benchmarks().benchmark_cambios(args.reservas)
+    elif args.comando == "purgar-claves":
+        asegurar_tablas()
+        print(f"{purgar_claves_idempotencia(lote=args.lote)} clave(s) de idempotencia vencida(s) eliminada(s).")
+    elif args.comando == "bench-idempotencia":
+        _benchmarks().benchmark_idempotencia(args.operaciones, args.vencidas)
+    elif args.comando == "seguir-cambios":
+        asegurar_tablas()
+        seguir_cambios(args.desde, args.espera)
+    elif args.comando == "bench-avisos":
+        _benchmarks().benchmark_avisos(args.reservas, args.cambios)
+    elif args.comando == "mantenimiento":
+        asegurar_tablas()
+        resultado = mantenimiento(paginas_vacuum=args.paginas, verificar=not args.sin_verificar, convertir=args.convertir,
+                                  pausa=args.pausa, detalle=args.detalle)
+        imprimir_mantenimiento(resultado)
+        return 1 if resultado["problemas"] else 0
+    elif args.comando == "bench-mantenimiento":
+        _benchmarks().benchmark_mantenimiento(args.reservas)
+    elif args.comando == "particionar":
+        asegurar_tablas()
+        if args.quitar:
+            print(f"{quitar_particiones()} particion(es) eliminada(s).")
+            return 0
+        try:
+            creadas = particionar_reservas(args.por)
+        except ValueError as error:
+            print(error)
+            return 1
+        print(f"{len(creadas)} particion(es) nueva(s){': ' + ', '.join(creadas) if creadas else ''}")
+    elif args.comando == "bench-particiones":
+        _benchmarks().benchmark_particiones(args.reservas)
+    elif args.comando == "mapa-disponibilidad":
+        asegurar_tablas()
+        try:
+            servir_mapa_disponibilidad(args.nombre, args.dias)
+        except FileExistsError:
+            print(f"Ya existe un bloque de memoria compartida llamado {args.nombre}.")
+            return 1
+    elif args.comando == "verificar-mapa":
+        asegurar_tablas()
+        try:
+            mapa = abrir_mapa_disponibilidad(args.nombre)
+        except (FileNotFoundError, ValueError) as error:
+            print(f"No se pudo abrir el mapa {args.nombre}: {error}")
+            return 1
+        resultado = verificar_mapa_disponibilidad(mapa)
+        imprimir_verificacion_mapa(resultado)
+        return 1 if resultado["diferencias"] else 0
+    elif args.comando == "bench-mapa":
+        _benchmarks().benchmark_mapa(args.reservas, args.procesos, args.consultas)
+    elif args.comando == "duplicados-clientes":
+        asegurar_tablas()
+        resultado = buscar_clientes_duplicados(args.umbral)
+        imprimir_duplicados(resultado)
+        if not args.fusionar or not resultado["grupos"]:
+            return 0
+        if not args.si and not preguntar_si_no(f"Fusionar {sum(len(grupo['duplicados']) for grupo in resultado['grupos'])} cliente(s) duplicados? (S/N): "):
+            print("Fusion cancelada.")
+            return 0
+        try:
+            fusion = fusionar_clientes(resultado["grupos"])
+        except (ValueError, sqlite3.Error) as error:
+            print(f"No se pudo fusionar: {error}")
+            return 1
+        print(f"{fusion['clientes']} cliente(s) fusionados; {fusion['reservas']} reservacion(es), {fusion['esperas']} solicitud(es) "
+              f"en lista de espera y {fusion['grupos_reserva']} grupo(s) reasignados.")
+    elif args.comando == "bench-duplicados":
+        _benchmarks().benchmark_duplicados(args.clientes, args.proporcion)
+    elif args.comando == "bench-precarga":
+        _benchmarks().benchmark_precarga(args.reservas, args.dias, args.repeticiones)
+    elif args.comando == "bench-tabla":
+        _benchmarks().benchmark_tabla(args.filas)
+    elif args.comando == "reproducir-traza":
+        return 0 if reproducir_traza(args.traza, args.base, args.modo, args.sesiones) else 1
+    elif args.comando == "reservar-grupo":
+        asegurar_tablas()
+        evento = args.evento.strip()
+        fecha_fin = args.fecha_fin or args.fecha_inicio
+        if len(evento) < 3:
+            print("Nombre de evento invalido: debe tener al menos 3 caracteres.")
+            return 1
+        if fecha_fin < args.fecha_inicio:
+            print("Rango invalido: la fecha final es anterior a la inicial.")
+            return 1
+        if args.fecha_inicio < datetime.date.today() + datetime.timedelta(days=2):
+            print("Restriccion de antelacion: la fecha debe ser al menos dos dias posterior a hoy.")
+            return 1
+        turnos_ids = args.turnos or [turno["turno_id"] for turno in referencia_actual()["turnos"]]
+        if TURNO_HORARIO_ID in turnos_ids:
+            print("El turno por horario no se puede reservar en grupo; indique turnos fijos.")
+            return 1
+        espacios = espacios_de_rango(args.salas, args.fecha_inicio, fecha_fin, turnos_ids)
+        try:
+            resultado = reservar_multiples(args.cliente, espacios, evento, clave=args.clave)
+        except ValueError as error:
+            print(error)
+            return 1
+        if not resultado["ok"]:
+            print(f"Reservacion en grupo rechazada: {resultado['error']}")
+            for sala_id, fecha_iso, turno_id, folio in resultado.get("conflictos", []):
+                fecha_texto = datetime.datetime.strptime(fecha_iso, FORMATO_FECHA_ISO).strftime(FORMATO_FECHA_INPUT)
+                ocupante = f"ocupado por folio {folio}" if folio is not None else "retenido temporalmente por otra terminal"
+                print(f"  Sala {sala_id}, {fecha_texto}, turno {turno_id}: {ocupante}")
+            return 1
+        print(f"Grupo {resultado['grupo_id']} {'ya existia' if resultado.get('repetida') else 'creado'} con "
+              f"{len(resultado['folios'])} reservacion(es): folios {resultado['folios'][0]}-{resultado['folios'][-1]}")
+    elif args.comando in ("cancelar-grupo", "renombrar-grupo"):
+        asegurar_tablas()
+        if args.comando == "cancelar-grupo":
+            resultado = cancelar_grupo(args.grupo_id)
+        elif len(args.evento.strip()) < 3:
+            print("Nombre de evento invalido: debe tener al menos 3 caracteres.")
+            return 1
+        else:
+            resultado = renombrar_grupo(args.grupo_id, args.evento.strip())
+        if not resultado["ok"]:
+            print(resultado["error"])
+            return 1
+        print(f"Grupo {args.grupo_id}: {resultado.get('canceladas', resultado.get('actualizadas'))} reservacion(es) actualizada(s).")
+        imprimir_promociones(resultado.get("promovidas", []))
+    elif args.comando == "exportar-rango":
+        formatos = [formato.strip().lower() for formato in args.formatos.split(",") if formato.strip()]
+        desconocidos = [formato for formato in formatos if formato not in EXPORTADORES]
+        if desconocidos or not formatos:
+            print(f"Formatos invalidos: {', '.join(desconocidos) or 'ninguno'}. Use csv, json o xlsx.")
+            return 1
+        if args.fecha_fin < args.fecha_inicio:
+            print("Rango invalido: la fecha final es anterior a la inicial.")
+            return 1
+        if args.comparar:
+            comparar_exportacion_rango(args.fecha_inicio, args.fecha_fin, formatos, args.particion, args.procesos, args.directorio)
+        else:
+            resultado = ejecutar_exportacion_rango(args.fecha_inicio, args.fecha_fin, formatos, args.particion, args.procesos,
+                                                   args.directorio, args.combinado, args.serie)
+            print(f"{resultado['archivos']} archivo(s), {resultado['filas']} fila(s) en {resultado['segundos']:.3f} s")
+    return 0
+
+if __name__ == "__main__":
+    sys.modules.setdefault("E1", sys.modules[__name__])
+    sys.exit(main())
@@ -0,0 +1,1021 @@
+import concurrent.futures
+import datetime
+import functools
+import io
+import itertools
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from tabulate import tabulate
+
+import E1
+from E1 import (
+    ANCHOS_REPORTE_FECHA,
+    CONSULTA_REPORTE_RANGO,
+    DIAS_PRECARGA_PREDETERMINADOS,
+    ENCABEZADOS_REPORTE_FECHA,
+    FORMATO_FECHA_INPUT,
+    FORMATO_FECHA_ISO,
+    INTERVALOS_TURNO_PREDETERMINADOS,
+    INTERVALO_AVISOS,
+    LOTE_PURGA_CLAVES,
+    MODOS_FEDERADOS,
+    PAUSA_RESPALDO,
+    REINTENTOS_RESERVA,
+    SQL_INTERVALO_OCUPADO,
+    SQL_OCUPACION_TURNOS,
+    TURNO_HORARIO_ID,
+    _abrir_memoria_compartida,
+    _cancelar_y_promover,
+    _consultar_sede,
+    _filas_reporte_rango,
+    _imprimir_comparacion_asignacion,
+    _iterar_reporte_rango,
+    _mapa_desde_memoria,
+    _percentil,
+    abrir_mapa_disponibilidad,
+    asegurar_tablas,
+    buscar_clientes_duplicados,
+    buscar_huecos,
+    buscar_reservas,
+    cancelar_reservas,
+    cancelar_suscripcion,
+    cerrar_mapa_disponibilidad,
+    conectar_bd,
+    conectar_solo_lectura,
+    confirmar_reserva,
+    construir_indice_intervalos,
+    crear_mapa_disponibilidad,
+    detener_avisos,
+    detener_precarga,
+    disponibilidad_fecha,
+    disponibilidad_sedes,
+    espacio_ocupado,
+    exportar_cambios,
+    fusionar_clientes,
+    generar_reporte_por_fecha_lista,
+    historial_cliente,
+    imprimir_mantenimiento,
+    imprimir_tabla,
+    iniciar_precarga,
+    intervalo_ocupado,
+    mantenimiento,
+    nueva_clave_idempotencia,
+    optimizar_asignacion,
+    particionar_reservas,
+    purgar_claves_idempotencia,
+    quitar_particiones,
+    referencia_actual,
+    refrescar_replica,
+    reporte_sedes,
+    respaldar_bd,
+    resumen_cliente,
+    retener_espacio,
+    suscribir_cambios,
+    transaccion_inmediata,
+    turno_libre_mapa,
+    verificar_mapa_disponibilidad,
+)
+from benchmarks.sinteticos import (
+    APELLIDOS_SINTETICOS,
+    NOMBRES_SINTETICOS,
+    PALABRAS_EVENTO,
+    _apellido_sintetico,
+    _variante_cliente,
+    generar_bd_sintetica,
+)
+
+def benchmark_tabla(num_filas=100000, semilla=0):
+    generador = random.Random(semilla)
+    fecha_texto = datetime.date.today().strftime(FORMATO_FECHA_INPUT)
+    filas = [[folio, fecha_texto,
+              f"{generador.choice(APELLIDOS_SINTETICOS)} {generador.choice(APELLIDOS_SINTETICOS)}, {generador.choice(NOMBRES_SINTETICOS)}",
+              f"Sala {generador.randint(1, 40)}", generador.choice((10, 15, 20, 30, 50, 80)),
+              generador.choice(("Matutino", "Vespertino", "Nocturno")),
+              f"{generador.choice(PALABRAS_EVENTO)} {generador.choice(PALABRAS_EVENTO)} {folio}"]
+             for folio in range(1, num_filas + 1)]
+    filas_resultado = []
+    for nombre, renderizar in (("tabulate", lambda salida: salida.write(tabulate(filas, headers=ENCABEZADOS_REPORTE_FECHA, tablefmt="grid") + "\n")),
+                               ("imprimir_tabla", lambda salida: imprimir_tabla(iter(filas), ENCABEZADOS_REPORTE_FECHA, ANCHOS_REPORTE_FECHA, salida=salida))):
+        with open(os.devnull, "w", encoding="utf-8") as salida:
+            inicio = time.perf_counter()
+            renderizar(salida)
+            segundos = time.perf_counter() - inicio
+            tracemalloc_activo = tracemalloc.is_tracing()
+            if not tracemalloc_activo:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            renderizar(salida)
+            pico = tracemalloc.get_traced_memory()[1]
+            if not tracemalloc_activo:
+                tracemalloc.stop()
+        filas_resultado.append([nombre, num_filas, f"{segundos:.3f}", f"{pico / 1048576:.1f}"])
+    muestra = filas[:200]
+    identica = tabulate(muestra, headers=ENCABEZADOS_REPORTE_FECHA, tablefmt="grid") + "\n" == _tabla_en_texto(muestra)
+    print(f"\nBenchmark de renderizado de tablas: {num_filas} filas (salida a {os.devnull})")
+    print(tabulate(filas_resultado, headers=["RENDERIZADOR", "FILAS", "SEGUNDOS", "PICO MEMORIA MB"], tablefmt="grid"))
+    print(f"Salida identica a tabulate en una muestra de {len(muestra)} filas: {'si' if identica else 'NO'}")
+    return filas_resultado
+
+def _tabla_en_texto(filas):
+    salida = io.StringIO()
+    imprimir_tabla(iter(filas), ENCABEZADOS_REPORTE_FECHA, ANCHOS_REPORTE_FECHA, salida=salida)
+    return salida.getvalue()
+
+def benchmark_cambios(num_reservas=500000, cambios=(100, 10000), semilla=0):
+    generador = random.Random(semilla)
+    filas_resultado = []
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_bd = os.path.join(directorio, "cambios.db")
+        generar_bd_sintetica(ruta_bd, num_reservas, semilla=semilla)
+        inicio = time.perf_counter()
+        resultado = exportar_cambios("bench", directorio=directorio, comprimir=True, ruta_bd=ruta_bd)
+        filas_resultado.append(["inicial (historial completo)", resultado["filas"], f"{(time.perf_counter() - inicio) * 1000:.1f}"])
+        for num_cambios in cambios:
+            with conectar_bd(ruta_bd) as conexion:
+                folios = generador.sample(range(1, num_reservas + 1), num_cambios)
+                conexion.executemany("UPDATE reservas SET evento = evento || ' (editado)' WHERE folio = ?",
+                                     ((folio,) for folio in folios[: num_cambios // 2]))
+                conexion.executemany("UPDATE reservas SET activo = 0 WHERE folio = ?", ((folio,) for folio in folios[num_cambios // 2:]))
+            inicio = time.perf_counter()
+            resultado = exportar_cambios("bench", directorio=directorio, comprimir=True, ruta_bd=ruta_bd)
+            filas_resultado.append([f"incremental tras {num_cambios} cambios", resultado["filas"],
+                                    f"{(time.perf_counter() - inicio) * 1000:.1f}"])
+        inicio = time.perf_counter()
+        resultado = exportar_cambios("bench", directorio=directorio, comprimir=True, ruta_bd=ruta_bd)
+        filas_resultado.append(["incremental sin cambios", resultado["filas"], f"{(time.perf_counter() - inicio) * 1000:.1f}"])
+    print(f"\nBenchmark de exportacion incremental sobre {num_reservas} reservaciones (CSV gzip)")
+    print(tabulate(filas_resultado, headers=["EJECUCION", "FILAS", "MS"], tablefmt="grid"))
+    return filas_resultado
+
+def benchmark_idempotencia(operaciones=2000, claves_vencidas=200000, lote=None):
+    lote = lote or LOTE_PURGA_CLAVES
+    ruta_original = E1.DB_FILE
+    filas_resultado = []
+    with tempfile.TemporaryDirectory() as directorio:
+        E1.DB_FILE = os.path.join(directorio, "idempotencia.db")
+        try:
+            generar_bd_sintetica(E1.DB_FILE, 1000, num_salas=20)
+            fecha_base = datetime.date.today() + datetime.timedelta(days=400)
+            turnos = sorted(INTERVALOS_TURNO_PREDETERMINADOS.items())
+            espacios = [(indice % 20 + 1, fecha_base + datetime.timedelta(days=indice // 60), turnos[indice // 20 % 3])
+                        for indice in range(3 * operaciones)]
+            claves = [nueva_clave_idempotencia() for _ in range(operaciones)]
+
+            def medir_modo(nombre, solicitudes):
+                tiempos = []
+                for sala_id, fecha_dt, (turno_id, (minuto_inicio, minuto_fin)), clave in solicitudes:
+                    inicio = time.perf_counter()
+                    confirmar_reserva(1, sala_id, fecha_dt, turno_id, "Benchmark", minuto_inicio, minuto_fin, clave=clave)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                tiempos.sort()
+                with conectar_bd() as conexion:
+                    total = conexion.execute("SELECT COUNT(*) FROM reservas").fetchone()[0]
+                filas_resultado.append([nombre, len(tiempos), f"{_percentil(tiempos, 0.5):.3f}",
+                                        f"{_percentil(tiempos, 0.95):.3f}", total])
+
+            medir_modo("sin clave", [espacio + (None,) for espacio in espacios[:operaciones]])
+            medir_modo("clave nueva", [espacio + (clave,) for espacio, clave in zip(espacios[operaciones:2 * operaciones], claves)])
+            medir_modo("reintento (clave repetida)", [espacio + (clave,) for espacio, clave in zip(espacios[operaciones:2 * operaciones], claves)])
+
+            vencimiento = time.time() - 1
+            with conectar_bd() as conexion:
+                conexion.executemany("INSERT INTO claves_idempotencia (clave, huella, folio, expira) VALUES (?, '', NULL, ?)",
+                                     ((f"vencida-{indice}", vencimiento - indice % 3600) for indice in range(claves_vencidas)))
+                conexion.commit()
+            inicio = time.perf_counter()
+            borradas = purgar_claves_idempotencia(lote=lote)
+            segundos = time.perf_counter() - inicio
+            with conectar_bd() as conexion:
+                vigentes = conexion.execute("SELECT COUNT(*) FROM claves_idempotencia").fetchone()[0]
+        finally:
+            E1.DB_FILE = ruta_original
+    print(f"\nBenchmark de claves de idempotencia ({operaciones} reservacion(es) por modo)")
+    print(tabulate(filas_resultado, headers=["MODO", "OPERACIONES", "P50 MS", "P95 MS", "RESERVAS EN BD"], tablefmt="grid"))
+    print(f"Purga: {borradas} clave(s) vencida(s) en lotes de {lote} en {segundos * 1000:.1f} ms "
+          f"({segundos * 1000 * lote / max(borradas, 1):.2f} ms por lote); quedan {vigentes} vigente(s)")
+    return filas_resultado
+
+def _lector_benchmark(conectar, consulta, parametros, parada, resultados):
+    conexion = conectar()
+    consultas = 0
+    while not parada.is_set():
+        conexion.execute(consulta, parametros).fetchall()
+        consultas += 1
+    conexion.close()
+    resultados.append(consultas)
+
+def _refresco_benchmark(ruta_copia, ruta_bd, parada):
+    while not parada.wait(0.5):
+        refrescar_replica(ruta_copia, ruta_bd)
+
+def benchmark_lectura_escritura(num_reservas=100000, escrituras=200, lectores=2, timeout_escritura=2.0):
+    filas_resultado = []
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_plantilla = os.path.join(directorio, "plantilla.db")
+        info = generar_bd_sintetica(ruta_plantilla, num_reservas)
+        parametros_lectura = (info["fecha_inicio"].strftime(FORMATO_FECHA_ISO), info["fecha_fin"].strftime(FORMATO_FECHA_ISO))
+        fecha_escritura = info["fecha_fin"] + datetime.timedelta(days=1)
+
+        for modo in ("rollback", "wal", "replica"):
+            ruta_bd = os.path.join(directorio, f"{modo}.db")
+            ruta_copia = os.path.join(directorio, f"{modo}_replica.db")
+            shutil.copyfile(ruta_plantilla, ruta_bd)
+            with sqlite3.connect(ruta_bd) as conexion:
+                conexion.execute(f"PRAGMA journal_mode = {'DELETE' if modo == 'rollback' else 'WAL'}")
+            if modo == "rollback":
+                conectar = lambda: sqlite3.connect(ruta_bd, timeout=timeout_escritura)
+            elif modo == "wal":
+                conectar = lambda: conectar_solo_lectura(ruta_bd)
+            else:
+                refrescar_replica(ruta_copia, ruta_bd)
+                conectar = lambda: conectar_solo_lectura(ruta_copia)
+
+            parada = threading.Event()
+            consultas_por_lector = []
+            hilos = [threading.Thread(target=_lector_benchmark,
+                                      args=(conectar, CONSULTA_REPORTE_RANGO, parametros_lectura, parada, consultas_por_lector))
+                     for _ in range(lectores)]
+            if modo == "replica":
+                parada_refresco = threading.Event()
+                hilos.append(threading.Thread(target=_refresco_benchmark, args=(ruta_copia, ruta_bd, parada_refresco)))
+            for hilo in hilos:
+                hilo.start()
+            time.sleep(0.2)
+
+            escritor = sqlite3.connect(ruta_bd, timeout=timeout_escritura)
+            latencias = []
+            bloqueos = 0
+            inicio = time.perf_counter()
+            for indice in range(escrituras):
+                dia, resto = divmod(indice, info["num_salas"] * 3)
+                inicio_escritura = time.perf_counter()
+                try:
+                    escritor.execute("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento) VALUES (?,?,?,?,?)",
+                                     (1, resto // 3 + 1, (fecha_escritura + datetime.timedelta(days=dia)).strftime(FORMATO_FECHA_ISO),
+                                      resto % 3 + 1, f"Benchmark {indice}"))
+                    escritor.commit()
+                except sqlite3.OperationalError:
+                    escritor.rollback()
+                    bloqueos += 1
+                latencias.append((time.perf_counter() - inicio_escritura) * 1000)
+            segundos = time.perf_counter() - inicio
+            escritor.close()
+            parada.set()
+            if modo == "replica":
+                parada_refresco.set()
+            for hilo in hilos:
+                hilo.join()
+
+            latencias.sort()
+            filas_resultado.append([
+                modo, escrituras, bloqueos,
+                f"{_percentil(latencias, 0.5):.2f}", f"{_percentil(latencias, 0.95):.2f}", f"{latencias[-1]:.2f}",
+                f"{escrituras / segundos:.0f}", sum(consultas_por_lector),
+            ])
+
+    print(f"\nBenchmark lectura/escritura: {num_reservas} reservaciones, {lectores} lector(es) con reporte de rango completo")
+    print(tabulate(filas_resultado,
+                   headers=["MODO", "ESCRITURAS", "BLOQUEOS", "P50 MS", "P95 MS", "MAX MS", "ESCR/S", "REPORTES"],
+                   tablefmt="grid"))
+    return filas_resultado
+
+def benchmark_intervalos(num_salas=20, dias=365, reservas_por_dia=40, consultas=200000, consultas_sql=20000, semilla=0):
+    generador = random.Random(semilla)
+    fecha_base = datetime.date.today()
+    filas = []
+    for sala_id in range(1, num_salas + 1):
+        for dia in range(dias):
+            cortes = sorted(generador.sample(range(7 * 12, 23 * 12), reservas_por_dia * 2))
+            fecha_dt = fecha_base + datetime.timedelta(days=dia)
+            for posicion in range(0, len(cortes), 2):
+                filas.append((sala_id, fecha_dt, cortes[posicion] * 5, cortes[posicion + 1] * 5))
+    sondeos = []
+    for _ in range(consultas):
+        minuto_inicio = generador.randrange(7 * 60, 23 * 60, 5)
+        sondeos.append((generador.randint(1, num_salas), fecha_base + datetime.timedelta(days=generador.randrange(dias)),
+                        minuto_inicio, minuto_inicio + generador.choice((15, 30, 60, 120))))
+
+    inicio = time.perf_counter()
+    indice = construir_indice_intervalos(filas)
+    segundos_construccion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    ocupados_indice = sum(intervalo_ocupado(indice, *sondeo) for sondeo in sondeos)
+    segundos_indice = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    ocupados_lineal = 0
+    for sala_id, fecha_dt, minuto_inicio, minuto_fin in sondeos:
+        inicios, fines, _ = indice.get((sala_id, fecha_dt), ((), (), ()))
+        ocupados_lineal += any(inicio_r < minuto_fin and fin_r > minuto_inicio for inicio_r, fin_r in zip(inicios, fines))
+    segundos_lineal = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    huecos_encontrados = sum(len(buscar_huecos(indice, sala_id, fecha_dt, 30, minuto_inicio, limite=1))
+                             for sala_id, fecha_dt, minuto_inicio, _ in sondeos)
+    segundos_huecos = time.perf_counter() - inicio
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_bd = os.path.join(directorio, "intervalos.db")
+        asegurar_tablas(ruta_bd)
+        conexion = sqlite3.connect(ruta_bd)
+        conexion.execute("INSERT INTO clientes (nombre, apellidos) VALUES ('Benchmark', 'Intervalos')")
+        conexion.executemany("INSERT INTO salas (nombre, cupo) VALUES (?, 10)", ((f"Sala {indice_sala}",) for indice_sala in range(1, num_salas + 1)))
+        conexion.executemany(
+            "INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento, minuto_inicio, minuto_fin) VALUES (1,?,?,?,'Benchmark',?,?)",
+            ((sala_id, fecha_dt.strftime(FORMATO_FECHA_ISO), TURNO_HORARIO_ID, minuto_inicio, minuto_fin)
+             for sala_id, fecha_dt, minuto_inicio, minuto_fin in filas))
+        conexion.commit()
+        sondeos_sql = sondeos[:consultas_sql]
+        inicio = time.perf_counter()
+        ocupados_sql = sum(conexion.execute(SQL_INTERVALO_OCUPADO, (sala_id, fecha_dt.strftime(FORMATO_FECHA_ISO), minuto_fin, minuto_inicio)).fetchone() is not None
+                           for sala_id, fecha_dt, minuto_inicio, minuto_fin in sondeos_sql)
+        segundos_sql = time.perf_counter() - inicio
+        conexion.close()
+
+    print(f"\nBenchmark de intervalos: {len(filas)} reservaciones, {reservas_por_dia} por sala y dia, "
+          f"indice construido en {segundos_construccion:.3f} s")
+    print(tabulate([
+        ["indice (bisect)", consultas, ocupados_indice, f"{consultas / segundos_indice:.0f}"],
+        ["recorrido lineal", consultas, ocupados_lineal, f"{consultas / segundos_lineal:.0f}"],
+        ["huecos (bisect)", consultas, huecos_encontrados, f"{consultas / segundos_huecos:.0f}"],
+        ["SQLite (indice parcial)", len(sondeos_sql), ocupados_sql, f"{len(sondeos_sql) / segundos_sql:.0f}"],
+    ], headers=["METODO", "CONSULTAS", "RESULTADOS", "CONSULTAS/S"], tablefmt="grid"))
+
+def benchmark_precarga(num_reservas=300000, dias=DIAS_PRECARGA_PREDETERMINADOS, repeticiones=10, semilla=0):
+    generador = random.Random(semilla)
+    ruta_original = E1.DB_FILE
+    filas_resultado = []
+    with tempfile.TemporaryDirectory() as directorio:
+        E1.DB_FILE = os.path.join(directorio, "precarga.db")
+        try:
+            generar_bd_sintetica(E1.DB_FILE, num_reservas, fecha_inicial=datetime.date.today(), semilla=semilla)
+            for con_precarga in (False, True):
+                arranques, reportes, disponibilidades, precargas = [], [], [], []
+                for _ in range(repeticiones):
+                    detener_precarga()
+                    fecha = datetime.date.today() + datetime.timedelta(days=generador.randrange(2, dias))
+                    inicio = time.perf_counter()
+                    if con_precarga:
+                        iniciar_precarga(dias)
+                    arranques.append((time.perf_counter() - inicio) * 1000)
+                    if con_precarga:
+                        E1.precarga_completa.wait()
+                        precargas.append((time.perf_counter() - inicio) * 1000)
+                    inicio = time.perf_counter()
+                    generar_reporte_por_fecha_lista(fecha)
+                    reportes.append((time.perf_counter() - inicio) * 1000)
+                    inicio = time.perf_counter()
+                    disponibilidad_fecha(fecha)
+                    disponibilidades.append((time.perf_counter() - inicio) * 1000)
+                filas_resultado.append([
+                    "con precarga" if con_precarga else "sin precarga",
+                    f"{_percentil(sorted(arranques), 0.5):.3f}",
+                    f"{_percentil(sorted(precargas), 0.5):.1f}" if precargas else "-",
+                    f"{_percentil(sorted(reportes), 0.5):.3f}",
+                    f"{_percentil(sorted(disponibilidades), 0.5):.3f}",
+                ])
+        finally:
+            detener_precarga()
+            E1.DB_FILE = ruta_original
+            E1.primer_reporte_medido = False
+    print(f"\nBenchmark de precarga: {num_reservas} reservaciones, ventana de {dias} dia(s), mediana de {repeticiones} arranque(s)")
+    print(tabulate(filas_resultado, headers=["MODO", "RETRASO AL MENU MS", "PRECARGA TOTAL MS",
+                                             "PRIMER REPORTE MS", "PRIMERA DISPONIBILIDAD MS"], tablefmt="grid"))
+    return filas_resultado
+
+def _ciclo_sondeo_completo(parada, dias):
+    conexion = conectar_bd()
+    try:
+        while not parada.is_set():
+            hoy = datetime.date.today()
+            for indice in range(dias):
+                conexion.execute(SQL_OCUPACION_TURNOS, ((hoy + datetime.timedelta(days=indice)).strftime(FORMATO_FECHA_ISO),)).fetchall()
+            parada.wait(INTERVALO_AVISOS)
+    finally:
+        conexion.close()
+
+def benchmark_avisos(num_reservas=200000, cambios=200, pausa_ms=20, reposo=3.0, dias=DIAS_PRECARGA_PREDETERMINADOS, semilla=0):
+    generador = random.Random(semilla)
+    ruta_original = E1.DB_FILE
+    filas_resultado = []
+    with tempfile.TemporaryDirectory() as directorio:
+        E1.DB_FILE = os.path.join(directorio, "avisos.db")
+        try:
+            generar_bd_sintetica(E1.DB_FILE, num_reservas, fecha_inicial=datetime.date.today(), semilla=semilla)
+
+            def medir_cpu(iniciar, detener):
+                iniciar()
+                time.sleep(0.2)
+                inicio_cpu, inicio = time.process_time(), time.perf_counter()
+                time.sleep(reposo)
+                porcentaje = 100.0 * (time.process_time() - inicio_cpu) / (time.perf_counter() - inicio)
+                detener()
+                return porcentaje
+
+            cpu_base = medir_cpu(lambda: None, lambda: None)
+            cpu_avisos = medir_cpu(lambda: suscribir_cambios(lambda avisos, reinicio: None, "bench"),
+                                   lambda: cancelar_suscripcion("bench"))
+            parada_sondeo = threading.Event()
+            hilo_sondeo = threading.Thread(target=_ciclo_sondeo_completo, args=(parada_sondeo, dias), daemon=True)
+            cpu_sondeo = medir_cpu(hilo_sondeo.start, lambda: (parada_sondeo.set(), hilo_sondeo.join()))
+
+            recibidos = {}
+            lotes = []
+
+            def registrar(avisos, reinicio):
+                momento = time.perf_counter()
+                lotes.append(len(avisos))
+                for aviso in avisos:
+                    recibidos.setdefault(aviso["folio"], momento)
+
+            suscribir_cambios(registrar, "bench")
+            time.sleep(0.2)
+            confirmados = {}
+            with conectar_bd() as conexion:
+                for folio in generador.sample(range(1, num_reservas + 1), cambios):
+                    conexion.execute("UPDATE reservas SET activo = 0 WHERE folio = ?", (folio,))
+                    conexion.commit()
+                    confirmados[folio] = time.perf_counter()
+                    time.sleep(generador.uniform(0, 2 * pausa_ms) / 1000)
+            limite = time.perf_counter() + 5
+            while len(recibidos) < len(confirmados) and time.perf_counter() < limite:
+                time.sleep(0.01)
+            cancelar_suscripcion("bench")
+            latencias = sorted((recibidos[folio] - momento) * 1000 for folio, momento in confirmados.items() if folio in recibidos)
+        finally:
+            detener_avisos()
+            E1.DB_FILE = ruta_original
+    filas_resultado.append(["sin notificador", f"{cpu_base:.2f}%", "-", "-", "-"])
+    filas_resultado.append([f"notificador (data_version cada {INTERVALO_AVISOS * 1000:.0f} ms)", f"{cpu_avisos:.2f}%",
+                            f"{_percentil(latencias, 0.5):.1f}", f"{_percentil(latencias, 0.95):.1f}",
+                            f"{len(latencias)}/{len(confirmados)} en {len(lotes)} lote(s)"])
+    filas_resultado.append([f"sondeo completo de {dias} dia(s) cada {INTERVALO_AVISOS * 1000:.0f} ms", f"{cpu_sondeo:.2f}%",
+                            "-", "-", "-"])
+    print(f"\nBenchmark de avisos de cambios: {num_reservas} reservaciones, {cambios} cancelacion(es), reposo de {reposo:.0f} s")
+    print(tabulate(filas_resultado, headers=["MODO", "CPU EN REPOSO", "LATENCIA P50 MS", "LATENCIA P95 MS", "RECIBIDOS"],
+                   tablefmt="grid"))
+    return filas_resultado
+
+def _escritor_benchmark(ruta_bd, folios, parada, tiempos):
+    conexion = conectar_bd(ruta_bd)
+    try:
+        for folio in itertools.cycle(folios):
+            if parada.is_set():
+                break
+            inicio = time.perf_counter()
+            conexion.execute("UPDATE reservas SET evento = evento || '.' WHERE folio = ?", (folio,))
+            conexion.commit()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            time.sleep(0.005)
+    finally:
+        conexion.close()
+
+def benchmark_mantenimiento(num_reservas=200000, escritura=1.0, semilla=0):
+    generador = random.Random(semilla)
+    filas_resultado = []
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_bd = os.path.join(directorio, "mantenimiento.db")
+        generar_bd_sintetica(ruta_bd, num_reservas, semilla=semilla)
+        with conectar_bd(ruta_bd) as conexion:
+            conexion.execute("DELETE FROM avisos_reserva")
+            conexion.commit()
+        folios = generador.sample(range(1, num_reservas + 1), 500)
+        for nombre, accion in (("sin mantenimiento", lambda: time.sleep(escritura)),
+                               ("durante mantenimiento", lambda: resultados.append(mantenimiento(ruta_bd, detalle=True)))):
+            resultados = []
+            tiempos = []
+            parada = threading.Event()
+            hilo = threading.Thread(target=_escritor_benchmark, args=(ruta_bd, folios, parada, tiempos))
+            hilo.start()
+            inicio = time.perf_counter()
+            accion()
+            segundos = time.perf_counter() - inicio
+            parada.set()
+            hilo.join()
+            tiempos.sort()
+            filas_resultado.append([nombre, f"{segundos:.2f}", len(tiempos), f"{_percentil(tiempos, 0.5):.2f}",
+                                    f"{_percentil(tiempos, 0.95):.2f}", f"{tiempos[-1] if tiempos else 0:.1f}"])
+    print(f"\nBenchmark de mantenimiento en linea: {num_reservas} reservaciones, avisos borrados para liberar paginas")
+    imprimir_mantenimiento(resultados[0])
+    print(tabulate(filas_resultado, headers=["ESCRITOR", "SEGUNDOS", "ESCRITURAS", "P50 MS", "P95 MS", "MAX MS"], tablefmt="grid"))
+    return filas_resultado
+
+def benchmark_respaldo(num_reservas=5000000, pasos=(256, 4096, -1), pausa=PAUSA_RESPALDO, semilla=0):
+    generador = random.Random(semilla)
+    filas_resultado = []
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_bd = os.path.join(directorio, "respaldo.db")
+        inicio = time.perf_counter()
+        generar_bd_sintetica(ruta_bd, num_reservas, semilla=semilla)
+        print(f"BD sintetica de {os.path.getsize(ruta_bd) / 1048576:.0f} MB generada en {time.perf_counter() - inicio:.0f} s")
+        folios = generador.sample(range(1, num_reservas + 1), 500)
+        destino = os.path.join(directorio, "copia.db")
+        modos = [("copia de archivo (insegura)", lambda: shutil.copyfile(ruta_bd, destino))]
+        modos += [(f"backup en pasos de {paginas} paginas" if paginas > 0 else "backup en un solo paso",
+                   functools.partial(respaldar_bd, destino, paginas, pausa if paginas > 0 else 0, False, True, False, ruta_bd))
+                  for paginas in pasos]
+        modos.append(("backup predeterminado + gzip", functools.partial(respaldar_bd, destino, None, pausa, True, True, False, ruta_bd)))
+        for nombre, accion in modos:
+            tiempos = []
+            parada = threading.Event()
+            hilo = threading.Thread(target=_escritor_benchmark, args=(ruta_bd, folios, parada, tiempos))
+            hilo.start()
+            inicio = time.perf_counter()
+            resultado = accion()
+            segundos = time.perf_counter() - inicio
+            parada.set()
+            hilo.join()
+            tiempos.sort()
+            bytes_origen = os.path.getsize(ruta_bd)
+            if isinstance(resultado, dict):
+                estado = "ok" if resultado["ok"] else "fallo"
+                tamano = resultado.get("bytes_archivo", 0)
+                reinicios = resultado["reinicios"]
+            else:
+                estado, tamano, reinicios = "sin verificar", os.path.getsize(destino), "-"
+            filas_resultado.append([nombre, f"{segundos:.2f}", f"{bytes_origen / 1048576 / segundos:.0f}",
+                                    f"{tamano / 1048576:.0f}", reinicios, estado, len(tiempos),
+                                    f"{_percentil(tiempos, 0.95):.2f}", f"{tiempos[-1] if tiempos else 0:.1f}"])
+            for ruta in (destino, destino + ".gz"):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+    print(f"\nBenchmark de respaldo en linea: {num_reservas} reservaciones con un escritor concurrente")
+    print(tabulate(filas_resultado, headers=["MODO", "SEGUNDOS", "MB/S", "MB DESTINO", "REINICIOS", "VERIFICACION",
+                                             "ESCRITURAS", "ESCRITURA P95 MS", "ESCRITURA MAX MS"], tablefmt="grid"))
+    return filas_resultado
+
+def benchmark_sedes(num_reservas=400000, num_sedes=4, dias=30, repeticiones=5, semilla=0):
+    filas_resultado = []
+    respaldo_sedes = dict(E1.sedes)
+    ruta_original = E1.DB_FILE
+    with tempfile.TemporaryDirectory() as directorio:
+        try:
+            fecha_inicial = datetime.date.today()
+            ruta_unica = os.path.join(directorio, "unica.db")
+            generar_bd_sintetica(ruta_unica, num_reservas, num_salas=20 * num_sedes, fecha_inicial=fecha_inicial, semilla=semilla)
+            E1.sedes.clear()
+            for indice in range(num_sedes):
+                E1.sedes[f"sede{indice + 1}"] = os.path.join(directorio, f"sede{indice + 1}.db")
+                generar_bd_sintetica(E1.sedes[f"sede{indice + 1}"], num_reservas // num_sedes, fecha_inicial=fecha_inicial,
+                                     semilla=semilla + indice)
+            fecha_inicio = fecha_inicial + datetime.timedelta(days=5)
+            fecha_fin = fecha_inicio + datetime.timedelta(days=dias - 1)
+            parametros = (fecha_inicio.strftime(FORMATO_FECHA_ISO), fecha_fin.strftime(FORMATO_FECHA_ISO))
+            modos = [("BD unica (referencia)", lambda: _consultar_sede(ruta_unica, CONSULTA_REPORTE_RANGO, parametros))]
+            modos += [(f"{num_sedes} sedes, {modo}", functools.partial(reporte_sedes, fecha_inicio, fecha_fin, modo))
+                      for modo in MODOS_FEDERADOS]
+            for nombre, accion in modos:
+                tiempos = []
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    filas = accion()
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                tiempos.sort()
+                filas_resultado.append([nombre, len(filas), f"{_percentil(tiempos, 0.5):.1f}", f"{tiempos[0]:.1f}"])
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                disponibilidad_sedes(fecha_inicio, "hilos")
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            disponibles = len(disponibilidad_sedes(fecha_inicio, "hilos"))
+        finally:
+            E1.sedes.clear()
+            E1.sedes.update(respaldo_sedes)
+            E1.DB_FILE = ruta_original
+    print(f"\nBenchmark de reportes federados: {num_reservas} reservaciones, rango de {dias} dia(s), mediana de {repeticiones}")
+    print(tabulate(filas_resultado, headers=["MODO", "FILAS", "P50 MS", "MIN MS"], tablefmt="grid"))
+    print(f"Disponibilidad federada de un dia (hilos): {disponibles} espacio(s) libre(s), p50 {_percentil(sorted(tiempos), 0.5):.1f} ms")
+    return filas_resultado
+
+def benchmark_particiones(num_reservas=1000000, num_salas=300, rangos=(7, 90), repeticiones=20, escrituras=300, semilla=0):
+    generador = random.Random(semilla)
+    ruta_original = E1.DB_FILE
+    filas_resultado = []
+    with tempfile.TemporaryDirectory() as directorio:
+        E1.DB_FILE = os.path.join(directorio, "particiones.db")
+        try:
+            datos = generar_bd_sintetica(E1.DB_FILE, num_reservas, num_salas=num_salas, semilla=semilla, desordenar=True)
+            asegurar_tablas()
+            dias_totales = (datos["fecha_fin"] - datos["fecha_inicio"]).days
+            inicios = {dias: [datos["fecha_inicio"] + datetime.timedelta(days=generador.randrange(max(1, dias_totales - dias)))
+                              for _ in range(repeticiones)] for dias in rangos}
+            fechas_escritura = [datos["fecha_fin"] + datetime.timedelta(days=30 - generador.randrange(dias_totales))
+                                for _ in range(escrituras)]
+            for por in (None, "anio", "mes"):
+                quitar_particiones()
+                segundos_particionado = 0.0
+                if por:
+                    inicio = time.perf_counter()
+                    particionar_reservas(por)
+                    segundos_particionado = time.perf_counter() - inicio
+                with conectar_bd() as conexion:
+                    num_particiones = conexion.execute("SELECT COUNT(*) FROM particiones_reservas").fetchone()[0]
+                    fila = [por or "sin particiones", num_particiones, f"{segundos_particionado:.1f}"]
+                    for dias in rangos:
+                        tiempos_consulta, tiempos_reporte = [], []
+                        for fecha_inicio in inicios[dias]:
+                            fecha_fin = fecha_inicio + datetime.timedelta(days=dias - 1)
+                            inicio = time.perf_counter()
+                            for _ in _iterar_reporte_rango(conexion, fecha_inicio, fecha_fin):
+                                pass
+                            tiempos_consulta.append((time.perf_counter() - inicio) * 1000)
+                            inicio = time.perf_counter()
+                            _filas_reporte_rango(conexion, fecha_inicio, fecha_fin)
+                            tiempos_reporte.append((time.perf_counter() - inicio) * 1000)
+                        fila += [f"{_percentil(sorted(tiempos_consulta), 0.5):.1f}", f"{_percentil(sorted(tiempos_reporte), 0.5):.1f}"]
+                tiempos = []
+                for indice, fecha_dt in enumerate(fechas_escritura):
+                    inicio = time.perf_counter()
+                    folio = confirmar_reserva(1, indice % num_salas + 1, fecha_dt, TURNO_HORARIO_ID, "Benchmark", 0, 30)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                    if folio is not None:
+                        with conectar_bd() as conexion:
+                            conexion.execute("DELETE FROM reservas WHERE folio = ?", (folio,))
+                            conexion.commit()
+                fila.append(f"{_percentil(sorted(tiempos), 0.5):.2f}")
+                filas_resultado.append(fila)
+        finally:
+            E1.DB_FILE = ruta_original
+    print(f"\nBenchmark de particiones: {num_reservas} reservaciones insertadas en desorden a lo largo de {dias_totales} dia(s), "
+          f"mediana de {repeticiones} rango(s)")
+    print(tabulate(filas_resultado,
+                   headers=["PARTICION", "PARTICIONES", "CREACION S"]
+                   + [encabezado for dias in rangos for encabezado in (f"CONSULTA {dias} DIAS MS", f"REPORTE {dias} DIAS MS")]
+                   + ["RESERVA P50 MS"], tablefmt="grid"))
+    return filas_resultado
+
+def _muestras_mapa_benchmark(generador, cantidad, fecha_base, dias, num_salas, turnos_benchmark):
+    return [(generador.randint(1, num_salas), fecha_base + datetime.timedelta(days=generador.randrange(dias)), generador.choice(turnos_benchmark))
+            for _ in range(cantidad)]
+
+def _lector_mapa_benchmark(ruta_bd, nombre_mapa, consultas, fecha_base, dias, num_salas, turnos_benchmark, semilla):
+    muestras = _muestras_mapa_benchmark(random.Random(semilla), consultas, fecha_base, dias, num_salas, turnos_benchmark)
+    libres = 0
+    if nombre_mapa:
+        mapa = _mapa_desde_memoria(_abrir_memoria_compartida(nombre_mapa), None)
+        try:
+            inicio = time.perf_counter()
+            for sala_id, fecha_dt, (turno_id, _, _) in muestras:
+                libres += turno_libre_mapa(sala_id, fecha_dt, turno_id, mapa)
+            segundos = time.perf_counter() - inicio
+        finally:
+            mapa["datos"].release()
+            mapa["retenciones"].release()
+            mapa["memoria"].close()
+    else:
+        conexion = conectar_bd(ruta_bd)
+        try:
+            cursor = conexion.cursor()
+            inicio = time.perf_counter()
+            for sala_id, fecha_dt, (_, minuto_inicio, minuto_fin) in muestras:
+                libres += not espacio_ocupado(cursor, sala_id, fecha_dt.strftime(FORMATO_FECHA_ISO), minuto_inicio, minuto_fin)
+            segundos = time.perf_counter() - inicio
+        finally:
+            conexion.close()
+    return segundos, libres
+
+def _escritor_mapa_benchmark(ruta_bd, nombre_mapa, operaciones, fecha_base, dias, num_salas, turnos_benchmark, semilla):
+    E1.DB_FILE = ruta_bd
+    generador = random.Random(semilla)
+    abrir_mapa_disponibilidad(nombre_mapa)
+    folios = []
+    try:
+        for sala_id, fecha_dt, (turno_id, minuto_inicio, minuto_fin) in _muestras_mapa_benchmark(
+                generador, operaciones, fecha_base, dias, num_salas, turnos_benchmark):
+            for intento in range(REINTENTOS_RESERVA):
+                try:
+                    if folios and generador.random() < 0.4:
+                        cancelar_reservas([folios.pop(generador.randrange(len(folios)))])
+                    else:
+                        folio = confirmar_reserva(1, sala_id, fecha_dt, turno_id, "Benchmark mapa", minuto_inicio, minuto_fin)
+                        if folio is not None:
+                            folios.append(folio)
+                    break
+                except sqlite3.OperationalError:
+                    time.sleep(0.01 * (intento + 1))
+    finally:
+        cerrar_mapa_disponibilidad()
+    return len(folios)
+
+def benchmark_mapa(num_reservas=200000, procesos=(1, 2, 4, 8), consultas=50000, escrituras=300, num_salas=50, semilla=0):
+    ruta_original = E1.DB_FILE
+    contexto = multiprocessing.get_context("spawn")
+    filas_resultado = []
+    with tempfile.TemporaryDirectory() as directorio:
+        E1.DB_FILE = os.path.join(directorio, "mapa.db")
+        try:
+            datos = generar_bd_sintetica(E1.DB_FILE, num_reservas, num_salas=num_salas, fecha_inicial=datetime.date.today(), semilla=semilla)
+            asegurar_tablas()
+            dias = (datos["fecha_fin"] - datos["fecha_inicio"]).days + 1
+            inicio = time.perf_counter()
+            mapa = crear_mapa_disponibilidad(dias=dias, fecha_inicio=datos["fecha_inicio"])
+            segundos_construccion = time.perf_counter() - inicio
+            turnos_benchmark = [(fila_turno["turno_id"], fila_turno["minuto_inicio"], fila_turno["minuto_fin"])
+                                for fila_turno in referencia_actual()["turnos"]]
+            for num_procesos in procesos:
+                tasas, libres_por_modo = [], []
+                for nombre_mapa in (None, mapa["nombre"]):
+                    with concurrent.futures.ProcessPoolExecutor(max_workers=num_procesos, mp_context=contexto) as ejecutor:
+                        resultados = list(ejecutor.map(
+                            _lector_mapa_benchmark, *zip(*[(E1.DB_FILE, nombre_mapa, consultas, datos["fecha_inicio"], dias, num_salas,
+                                                            turnos_benchmark, semilla + indice) for indice in range(num_procesos)])))
+                    tasas.append(num_procesos * consultas / max(segundos for segundos, _ in resultados))
+                    libres_por_modo.append(sum(libres for _, libres in resultados))
+                filas_resultado.append([num_procesos, f"{tasas[0]:,.0f}", f"{tasas[1]:,.0f}", f"{tasas[1] / tasas[0]:.1f}x",
+                                        "si" if libres_por_modo[0] == libres_por_modo[1] else "NO"])
+            num_escritores = max(procesos)
+            inicio = time.perf_counter()
+            with concurrent.futures.ProcessPoolExecutor(max_workers=num_escritores, mp_context=contexto) as ejecutor:
+                list(ejecutor.map(_escritor_mapa_benchmark, *zip(*[(E1.DB_FILE, mapa["nombre"], escrituras, datos["fecha_inicio"], dias,
+                                                                    num_salas, turnos_benchmark, semilla + 1000 + indice)
+                                                                   for indice in range(num_escritores)])))
+            segundos_escritura = time.perf_counter() - inicio
+            verificacion = verificar_mapa_disponibilidad(mapa)
+        finally:
+            cerrar_mapa_disponibilidad()
+            E1.DB_FILE = ruta_original
+    print(f"\nBenchmark del mapa de disponibilidad: {num_reservas} reservaciones, {num_salas} salas, {dias} dia(s); "
+          f"mapa de {verificacion['espacios']} byte(s) construido en {segundos_construccion * 1000:.0f} ms")
+    print(tabulate(filas_resultado, headers=["PROCESOS", "CONSULTAS SQLITE/S", "CONSULTAS MAPA/S", "ACELERACION", "MISMO RESULTADO"],
+                   tablefmt="grid"))
+    print(f"{num_escritores} proceso(s) con {escrituras} reservacion(es) o cancelacion(es) cada uno en {segundos_escritura:.1f} s; "
+          f"verificacion: {len(verificacion['diferencias'])} diferencia(s), secuencia del mapa {verificacion['secuencia_mapa']} "
+          f"de {verificacion['secuencia_bd']}")
+    return filas_resultado, verificacion
+
+def _terminal_benchmark(indice, fecha_base, dias, intentos, pausa_ms, usar_retenciones, semilla, resultados):
+    generador = random.Random(semilla * 1000 + indice)
+    terminal = f"benchmark-{indice}"
+    cuenta = {"confirmadas": 0, "conflicto_retencion": 0, "conflicto_confirmacion": 0, "sin_disponibilidad": 0}
+    for _ in range(intentos):
+        fecha_dt = fecha_base + datetime.timedelta(days=generador.randrange(dias))
+        disponibles = disponibilidad_fecha(fecha_dt, terminal)
+        if not disponibles:
+            cuenta["sin_disponibilidad"] += 1
+            continue
+        sala_id, _, _, descripcion_turno = generador.choice(disponibles)
+        turno = referencia_actual()["turnos_por_descripcion"][descripcion_turno]
+        retencion_id = None
+        if usar_retenciones:
+            retencion_id = retener_espacio(sala_id, fecha_dt, turno["minuto_inicio"], turno["minuto_fin"], terminal)
+            if retencion_id is None:
+                cuenta["conflicto_retencion"] += 1
+                continue
+        time.sleep(generador.uniform(*pausa_ms) / 1000)
+        folio = confirmar_reserva(1, sala_id, fecha_dt, turno["turno_id"], f"Terminal {indice}",
+                                  turno["minuto_inicio"], turno["minuto_fin"], retencion_id, terminal)
+        cuenta["confirmadas" if folio is not None else "conflicto_confirmacion"] += 1
+    resultados.append(cuenta)
+
+def benchmark_retenciones(terminales=8, intentos=40, num_salas=4, dias=10, pausa_ms=(20, 80), semilla=0):
+    ruta_original = E1.DB_FILE
+    filas_resultado = []
+    fecha_base = datetime.date.today() + datetime.timedelta(days=2)
+    with tempfile.TemporaryDirectory() as directorio:
+        for usar_retenciones in (False, True):
+            E1.DB_FILE = os.path.join(directorio, f"retenciones_{int(usar_retenciones)}.db")
+            try:
+                asegurar_tablas()
+                with conectar_bd() as conexion:
+                    conexion.execute("INSERT INTO clientes (nombre, apellidos) VALUES ('Benchmark', 'Retenciones')")
+                    conexion.executemany("INSERT INTO salas (nombre, cupo) VALUES (?, 10)",
+                                         ((f"Sala {indice_sala}",) for indice_sala in range(1, num_salas + 1)))
+                    conexion.commit()
+                resultados = []
+                hilos = [threading.Thread(target=_terminal_benchmark,
+                                          args=(indice, fecha_base, dias, intentos, pausa_ms, usar_retenciones, semilla, resultados))
+                         for indice in range(terminales)]
+                inicio = time.perf_counter()
+                for hilo in hilos:
+                    hilo.start()
+                for hilo in hilos:
+                    hilo.join()
+                segundos = time.perf_counter() - inicio
+            finally:
+                E1.DB_FILE = ruta_original
+            total = {clave: sum(cuenta[clave] for cuenta in resultados) for clave in resultados[0]}
+            intentadas = total["confirmadas"] + total["conflicto_confirmacion"]
+            filas_resultado.append([
+                "con retenciones" if usar_retenciones else "sin retenciones", terminales * intentos,
+                total["confirmadas"], total["conflicto_retencion"], total["conflicto_confirmacion"],
+                f"{100.0 * total['conflicto_confirmacion'] / intentadas if intentadas else 0:.1f}%",
+                total["sin_disponibilidad"], f"{total['confirmadas'] / segundos:.1f}",
+            ])
+    print(f"\nBenchmark de retenciones: {terminales} terminal(es), {num_salas} sala(s) x {dias} dia(s), "
+          f"captura de {pausa_ms[0]}-{pausa_ms[1]} ms")
+    print(tabulate(filas_resultado,
+                   headers=["MODO", "INTENTOS", "CONFIRMADAS", "CONFL. AL RETENER", "CONFL. AL CONFIRMAR",
+                            "TASA CONFL. CONFIRMAR", "SIN DISPONIBILIDAD", "RESERVAS/S"],
+                   tablefmt="grid"))
+    return filas_resultado
+
+def benchmark_lista_espera(tamanos=(1000, 100000), cancelaciones=200, semilla=0):
+    generador = random.Random(semilla)
+    filas_resultado = []
+    fecha_base = datetime.date.today() + datetime.timedelta(days=2)
+    with tempfile.TemporaryDirectory() as directorio:
+        for tamano in tamanos:
+            ruta_bd = os.path.join(directorio, f"espera_{tamano}.db")
+            asegurar_tablas(ruta_bd)
+            conexion = sqlite3.connect(ruta_bd)
+            conexion.execute("INSERT INTO clientes (nombre, apellidos) VALUES ('Benchmark', 'Espera')")
+            conexion.execute("INSERT INTO salas (nombre, cupo) VALUES ('Sala 1', 10)")
+            fechas = [(fecha_base + datetime.timedelta(days=dia)).strftime(FORMATO_FECHA_ISO) for dia in range(cancelaciones)]
+            conexion.executemany("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento) VALUES (1, 1, ?, 1, 'Original')",
+                                 ((fecha_iso,) for fecha_iso in fechas))
+            conexion.executemany("INSERT INTO lista_espera (cliente_id, sala_id, fecha_normalizada, turno_id, evento) VALUES (1, 1, ?, 1, 'Espera')",
+                                 ((generador.choice(fechas),) for _ in range(tamano)))
+            conexion.commit()
+            folios = [fila[0] for fila in conexion.execute("SELECT folio FROM reservas ORDER BY folio")]
+            conexion.close()
+
+            latencias = []
+            promovidas = 0
+            with transaccion_inmediata(ruta_bd) as cursor:
+                for folio in folios:
+                    inicio = time.perf_counter()
+                    promovidas += len(_cancelar_y_promover(cursor, "folio = ?", (folio,))[1])
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+            latencias.sort()
+            filas_resultado.append([tamano, len(folios), promovidas, f"{_percentil(latencias, 0.5):.3f}",
+                                    f"{_percentil(latencias, 0.95):.3f}", f"{latencias[-1]:.3f}"])
+    print(f"\nBenchmark de lista de espera: {cancelaciones} cancelacion(es) con promocion por tamano de cola")
+    print(tabulate(filas_resultado, headers=["EN ESPERA", "CANCELACIONES", "PROMOVIDAS", "P50 MS", "P95 MS", "MAX MS"],
+                   tablefmt="grid"))
+    return filas_resultado
+
+def benchmark_asignacion(num_solicitudes=2000, num_salas=40, dias=20, segundos=30.0, semilla=0):
+    generador = random.Random(semilla)
+    fecha_base = datetime.date.today() + datetime.timedelta(days=2)
+    fechas = [fecha_base + datetime.timedelta(days=dia) for dia in range(dias)]
+    cupos = [generador.choice((10, 15, 20, 30, 40, 50, 60, 80, 100, 150, 200)) for _ in range(num_salas)]
+    intervalos = sorted(INTERVALOS_TURNO_PREDETERMINADOS.items())
+    libres = {fecha_dt: [(sala_id, cupo, turno_id, minuto_inicio, minuto_fin)
+                         for sala_id, cupo in enumerate(cupos, start=1) for turno_id, (minuto_inicio, minuto_fin) in intervalos]
+              for fecha_dt in fechas}
+    solicitudes = []
+    for indice in range(num_solicitudes):
+        turnos = generador.sample([turno_id for turno_id, _ in intervalos], generador.choice((0, 1, 2)))
+        solicitudes.append({"cliente_id": 1, "asistentes": min(200, int(generador.expovariate(1 / 35)) + 5),
+                            "fecha": generador.choice(fechas), "turnos": turnos, "evento": f"Solicitud {indice}"})
+    inicio = time.perf_counter()
+    voraz = optimizar_asignacion(solicitudes, libres, metodo="voraz")
+    segundos_voraz = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    flujo = optimizar_asignacion(solicitudes, libres, segundos)
+    segundos_flujo = time.perf_counter() - inicio
+    print(f"\nBenchmark de asignacion: {num_solicitudes} solicitudes, {num_salas} salas, {dias} dias "
+          f"({num_salas * len(intervalos) * dias} espacios libres)")
+    _imprimir_comparacion_asignacion(num_solicitudes, voraz, segundos_voraz, flujo, segundos_flujo)
+
+def benchmark_busqueda(num_reservas=1000000, consultas=2000, semilla=0):
+    generador = random.Random(semilla)
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_bd = os.path.join(directorio, "busqueda.db")
+        inicio = time.perf_counter()
+        info = generar_bd_sintetica(ruta_bd, num_reservas)
+        segundos_carga = time.perf_counter() - inicio
+        conexion = conectar_bd(ruta_bd)
+        eventos = [conexion.execute("SELECT evento FROM reservas WHERE folio = ?", (generador.randint(1, num_reservas),)).fetchone()[0]
+                   for _ in range(consultas)]
+        clientes_muestra = [f"{generador.choice(NOMBRES_SINTETICOS)} {generador.choice(APELLIDOS_SINTETICOS)}" for _ in range(consultas)]
+        filas_resultado = []
+        for nombre, lote, filtros in (("evento completo", eventos, {}),
+                                      ("evento parcial (prefijo)", [evento.rsplit(" ", 1)[0] + " " + evento.rsplit(" ", 1)[1][:-1]
+                                                                    for evento in eventos], {}),
+                                      ("cliente (nombre y apellido)", clientes_muestra, {}),
+                                      ("cliente + sala + fechas", clientes_muestra,
+                                       {"sala_id": 1, "fecha_inicio": info["fecha_inicio"],
+                                        "fecha_fin": info["fecha_inicio"] + datetime.timedelta(days=30)})):
+            latencias = []
+            encontrados = 0
+            for texto in lote:
+                inicio = time.perf_counter()
+                encontrados += len(buscar_reservas(texto, limite=10, conexion=conexion, **filtros))
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            latencias.sort()
+            filas_resultado.append([nombre, len(lote), encontrados, f"{_percentil(latencias, 0.5):.3f}",
+                                    f"{_percentil(latencias, 0.95):.3f}", f"{latencias[-1]:.3f}"])
+        conexion.close()
+    print(f"\nBenchmark de busqueda: {num_reservas} reservaciones indexadas en {segundos_carga:.1f} s (carga con triggers)")
+    print(tabulate(filas_resultado, headers=["CONSULTA", "CONSULTAS", "RESULTADOS", "P50 MS", "P95 MS", "MAX MS"], tablefmt="grid"))
+    return filas_resultado
+
+def benchmark_historial(num_reservas=200000, num_clientes=50, consultas=2000, semilla=0):
+    generador = random.Random(semilla)
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_bd = os.path.join(directorio, "historial.db")
+        info = generar_bd_sintetica(ruta_bd, num_reservas, num_clientes=num_clientes,
+                                    fecha_inicial=datetime.date.today() - datetime.timedelta(days=365), semilla=semilla)
+        conexion = conectar_bd(ruta_bd)
+        conexion.execute("UPDATE reservas SET activo = 0 WHERE folio % 7 = 0")
+        conexion.commit()
+        clientes = [generador.randint(1, num_clientes) for _ in range(consultas)]
+
+        def resumen_agregado(cliente_id):
+            conexion.execute("SELECT COUNT(*), SUM(activo = 0) FROM reservas WHERE cliente_id = ?", (cliente_id,)).fetchone()
+            conexion.execute("""SELECT sala_id, COUNT(*) FROM reservas WHERE cliente_id = ? AND activo = 1
+                                GROUP BY sala_id ORDER BY 2 DESC LIMIT 1""", (cliente_id,)).fetchone()
+            conexion.execute("""SELECT turno_id, COUNT(*) FROM reservas WHERE cliente_id = ? AND activo = 1
+                                GROUP BY turno_id ORDER BY 2 DESC LIMIT 1""", (cliente_id,)).fetchone()
+
+        def pagina_profunda(cliente_id):
+            filas, siguiente = historial_cliente(cliente_id, conexion=conexion)
+            for _ in range(4):
+                if siguiente is None:
+                    break
+                filas, siguiente = historial_cliente(cliente_id, despues=siguiente, conexion=conexion)
+
+        filas_resultado = []
+        for nombre, operacion in (("resumen (contadores)", lambda cliente_id: resumen_cliente(cliente_id, conexion)),
+                                  ("resumen (agregado sobre reservas)", resumen_agregado),
+                                  ("primera pagina proximas", lambda cliente_id: historial_cliente(cliente_id, conexion=conexion)),
+                                  ("primera pagina pasadas", lambda cliente_id: historial_cliente(cliente_id, True, conexion=conexion)),
+                                  ("quinta pagina proximas", pagina_profunda)):
+            latencias = []
+            for cliente_id in clientes:
+                inicio = time.perf_counter()
+                operacion(cliente_id)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            latencias.sort()
+            filas_resultado.append([nombre, len(latencias), f"{_percentil(latencias, 0.5):.3f}",
+                                    f"{_percentil(latencias, 0.95):.3f}", f"{latencias[-1]:.3f}"])
+        conexion.close()
+    print(f"\nBenchmark de historial: {info['num_reservas']} reservaciones, {num_clientes} clientes "
+          f"(~{num_reservas // num_clientes} por cliente)")
+    print(tabulate(filas_resultado, headers=["CONSULTA", "CONSULTAS", "P50 MS", "P95 MS", "MAX MS"], tablefmt="grid"))
+    return filas_resultado
+
+def benchmark_duplicados(num_clientes=1000000, proporcion=0.1, num_reservas=100000, semilla=0):
+    generador = random.Random(semilla)
+    ruta_original = E1.DB_FILE
+    with tempfile.TemporaryDirectory() as directorio:
+        E1.DB_FILE = os.path.join(directorio, "duplicados.db")
+        try:
+            generar_bd_sintetica(E1.DB_FILE, num_reservas, num_clientes=1000, semilla=semilla)
+            asegurar_tablas()
+            num_originales = int(num_clientes * (1 - proporcion))
+            apellidos_base = [_apellido_sintetico(generador) for _ in range(max(1, num_originales // 50))]
+            personas = {}
+            while len(personas) < num_originales:
+                personas[(generador.choice(NOMBRES_SINTETICOS), f"{generador.choice(apellidos_base)} {generador.choice(apellidos_base)}")] = None
+            personas = list(personas)
+            originales = {}
+            for indice in range(num_clientes - num_originales):
+                original = generador.randrange(num_originales)
+                originales[num_originales + indice + 1] = original + 1
+                personas.append(_variante_cliente(generador, *personas[original]))
+            with transaccion_inmediata() as cursor:
+                cursor.executemany("UPDATE clientes SET nombre = ?, apellidos = ? WHERE cliente_id = ?",
+                                   ((nombre, apellidos, indice + 1) for indice, (nombre, apellidos) in enumerate(personas[:1000])))
+                cursor.executemany("INSERT INTO clientes (cliente_id, nombre, apellidos) VALUES (?, ?, ?)",
+                                   ((indice + 1, nombre, apellidos) for indice, (nombre, apellidos) in enumerate(personas) if indice >= 1000))
+                cursor.execute("SELECT folio FROM reservas")
+                folios = generador.sample([fila[0] for fila in cursor.fetchall()], min(len(originales), num_reservas // 10))
+                cursor.executemany("UPDATE reservas SET cliente_id = ? WHERE folio = ?",
+                                   zip(generador.sample(sorted(originales), len(folios)), folios))
+            with conectar_bd() as conexion:
+                total_reservas = conexion.execute("SELECT COUNT(*) FROM reservas").fetchone()[0]
+            inicio = time.perf_counter()
+            resultado = buscar_clientes_duplicados()
+            segundos_busqueda = time.perf_counter() - inicio
+            grupo_de_cliente = {cliente_id: grupo["conservar"] for grupo in resultado["grupos"]
+                                for cliente_id in [grupo["conservar"]] + grupo["duplicados"]}
+            duplicados_detectados = sum(grupo_de_cliente.get(duplicado, -1) == grupo_de_cliente.get(original)
+                                        for duplicado, original in originales.items())
+            fusiones = [(grupo["conservar"], duplicado) for grupo in resultado["grupos"] for duplicado in grupo["duplicados"]]
+            fusiones_correctas = sum(originales.get(conservar, conservar) == originales.get(duplicado, duplicado) for conservar, duplicado in fusiones)
+            inicio = time.perf_counter()
+            fusion = fusionar_clientes(resultado["grupos"])
+            segundos_fusion = time.perf_counter() - inicio
+            with conectar_bd() as conexion:
+                huerfanas = conexion.execute("SELECT COUNT(*) FROM reservas WHERE cliente_id NOT IN (SELECT cliente_id FROM clientes)").fetchone()[0]
+                reservas_finales = conexion.execute("SELECT COUNT(*) FROM reservas").fetchone()[0]
+                resumen_total = conexion.execute("SELECT COALESCE(SUM(reservas), 0) FROM resumen_cliente").fetchone()[0]
+        finally:
+            E1.DB_FILE = ruta_original
+    tiempos = resultado["tiempos"]
+    print(f"\nBenchmark de duplicados: {num_clientes} clientes ({len(originales)} variantes de {num_originales} personas), "
+          f"{total_reservas} reservaciones")
+    print(tabulate([
+        ["carga de clientes", f"{tiempos['carga']:.2f}", ""],
+        ["claves de bloqueo", f"{tiempos['bloqueo']:.2f}", f"{resultado['bloques']} bloque(s) con 2 o mas clientes"],
+        ["comparaciones", f"{tiempos['comparacion']:.2f}",
+         f"{resultado['comparaciones']} par(es) comparados ({resultado['comparaciones'] / max(1, num_clientes * (num_clientes - 1) / 2):.2e} de todos)"],
+        ["agrupacion", f"{tiempos['agrupacion']:.2f}", f"{len(resultado['ambiguos'])} cliente(s) ambiguos para revision manual"],
+        ["busqueda total", f"{segundos_busqueda:.2f}", f"{len(resultado['grupos'])} grupo(s), {len(fusiones)} fusion(es) propuestas"],
+        ["fusion", f"{segundos_fusion:.2f}", f"{fusion['clientes']} cliente(s) eliminados, {fusion['reservas']} reservacion(es) reasignadas"],
+    ], headers=["FASE", "SEGUNDOS", "DETALLE"], tablefmt="grid"))
+    print(f"Variantes detectadas: {duplicados_detectados}/{len(originales)} ({duplicados_detectados / max(1, len(originales)):.1%}); "
+          f"fusiones propuestas entre la misma persona: {fusiones_correctas}/{len(fusiones)}")
+    print(f"Reservaciones antes/despues: {total_reservas}/{reservas_finales}, sin cliente: {huerfanas}, "
+          f"total en resumen_cliente: {resumen_total}")
+    return resultado, fusion
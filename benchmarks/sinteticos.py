@@ -0,0 +1,71 @@
+import datetime
+import random
+
+from E1 import (
+    FORMATO_FECHA_ISO,
+    asegurar_tablas,
+    conectar_bd,
+)
+
+NOMBRES_SINTETICOS = ("Ana", "Luis", "Maria", "Jose", "Carmen", "Jorge", "Lucia", "Pedro", "Sofia", "Miguel", "Elena", "Diego")
+APELLIDOS_SINTETICOS = ("Garcia", "Martinez", "Lopez", "Hernandez", "Gonzalez", "Perez", "Rodriguez", "Sanchez",
+                        "Ramirez", "Torres", "Flores", "Rivera")
+PALABRAS_EVENTO = ("Congreso", "Taller", "Junta", "Seminario", "Torneo", "Apertura", "Cierre", "Conferencia",
+                   "Curso", "Festival", "Reunion", "Expo")
+
+def generar_bd_sintetica(ruta_bd, num_reservas, num_clientes=1000, num_salas=20, fecha_inicial=None, semilla=0, desordenar=False):
+    generador = random.Random(semilla)
+    asegurar_tablas(ruta_bd)
+    fecha_inicial = fecha_inicial or datetime.date.today() + datetime.timedelta(days=3)
+    espacios_por_dia = num_salas * 3
+    dias = max(1, -(-num_reservas * 4 // (espacios_por_dia * 3)))
+    conexion = conectar_bd(ruta_bd)
+    try:
+        cursor = conexion.cursor()
+        cursor.executemany("INSERT INTO clientes (nombre, apellidos) VALUES (?,?)",
+                           ((generador.choice(NOMBRES_SINTETICOS),
+                             f"{generador.choice(APELLIDOS_SINTETICOS)} {generador.choice(APELLIDOS_SINTETICOS)}")
+                            for _ in range(num_clientes)))
+        cursor.executemany("INSERT INTO salas (nombre, cupo) VALUES (?,?)",
+                           ((f"Sala {indice}", generador.choice((10, 15, 20, 30, 50, 80))) for indice in range(1, num_salas + 1)))
+        espacios = generador.sample(range(dias * espacios_por_dia), num_reservas)
+        if not desordenar:
+            espacios.sort()
+        cursor.executemany(
+            "INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento) VALUES (?,?,?,?,?)",
+            ((generador.randint(1, num_clientes),
+              espacio % espacios_por_dia // 3 + 1,
+              (fecha_inicial + datetime.timedelta(days=espacio // espacios_por_dia)).strftime(FORMATO_FECHA_ISO),
+              espacio % 3 + 1,
+              f"{generador.choice(PALABRAS_EVENTO)} {generador.choice(PALABRAS_EVENTO)} {indice}")
+             for indice, espacio in enumerate(espacios)))
+        conexion.commit()
+        cursor.close()
+    finally:
+        conexion.close()
+    return {
+        "fecha_inicio": fecha_inicial,
+        "fecha_fin": fecha_inicial + datetime.timedelta(days=dias - 1),
+        "num_salas": num_salas,
+        "num_clientes": num_clientes,
+        "num_reservas": num_reservas,
+    }
+
+SILABAS_SINTETICAS = ("ca", "ro", "me", "li", "sa", "ter", "gon", "dez", "ma", "ri", "bel", "lo", "pe", "ra", "to", "var",
+                      "gas", "na", "bri", "es", "te", "ban", "vi", "lla", "qui", "ce", "zu", "mo", "gue", "rra")
+
+def _apellido_sintetico(generador):
+    return "".join(generador.choice(SILABAS_SINTETICAS) for _ in range(generador.randint(3, 4))).capitalize()
+
+def _variante_cliente(generador, nombre, apellidos):
+    cambio = generador.randrange(5)
+    if cambio == 0:
+        return nombre, apellidos.split()[0]
+    if cambio == 1:
+        return nombre.upper(), apellidos.lower()
+    if cambio == 2:
+        return nombre, apellidos.replace("v", "b").replace("z", "s").replace("ll", "y")
+    posicion = generador.randrange(1, len(apellidos) - 1)
+    if cambio == 3:
+        return nombre, apellidos[:posicion] + apellidos[posicion + 1:]
+    return nombre, apellidos[:posicion] + apellidos[posicion + 1] + apellidos[posicion] + apellidos[posicion + 2:]
@@ -0,0 +1,32 @@
+import datetime
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import E1
+
+
+@pytest.fixture
+def bd(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "prueba.db")
+    monkeypatch.setattr(E1, "DB_FILE", ruta)
+    E1.asegurar_tablas()
+    yield ruta
+    E1.detener_precarga()
+    E1.detener_avisos()
+    E1.cerrar_mapa_disponibilidad()
+
+
+@pytest.fixture
+def datos(bd):
+    with sqlite3.connect(bd) as conexion:
+        clientes = [conexion.execute("INSERT INTO clientes (nombre, apellidos) VALUES (?, ?)", cliente).lastrowid
+                    for cliente in (("Ana", "Lopez Ruiz"), ("Luis", "Garcia Perez"))]
+        salas = [conexion.execute("INSERT INTO salas (nombre, cupo) VALUES (?, ?)", sala).lastrowid
+                 for sala in (("Sala A", 10), ("Sala B", 20))]
+    conexion.close()
+    return {"clientes": clientes, "salas": salas, "fecha": datetime.date.today() + datetime.timedelta(days=5)}
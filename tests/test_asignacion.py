@@ -0,0 +1,63 @@
+import datetime
+
+import pytest
+
+import E1
+
+FECHA = datetime.date(2031, 5, 6)
+
+
+def _solicitud(asistentes, turnos, evento="Evento"):
+    return {"cliente_id": 1, "asistentes": asistentes, "fecha": FECHA, "turnos": turnos, "evento": evento}
+
+
+def _espacio(sala_id, cupo, turno_id):
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[turno_id]
+    return (sala_id, cupo, turno_id, inicio, fin)
+
+
+def test_flujo_asigna_lo_que_el_voraz_deja_fuera():
+    solicitudes = [_solicitud(5, [1, 2]), _solicitud(5, [1])]
+    libres = {FECHA: [_espacio(1, 10, 1), _espacio(1, 10, 2)]}
+    voraz = E1.optimizar_asignacion(solicitudes, libres, metodo="voraz")
+    assert voraz["sin_asignar"] == [1]
+    flujo = E1.optimizar_asignacion(solicitudes, libres)
+    assert flujo["completo"] and flujo["sin_asignar"] == []
+    assert flujo["asignaciones"] == {0: _espacio(1, 10, 2), 1: _espacio(1, 10, 1)}
+    assert flujo["desperdicio"] == 10
+
+
+def test_flujo_minimiza_desperdicio_y_respeta_cupo():
+    solicitudes = [_solicitud(18, []), _solicitud(8, []), _solicitud(50, [])]
+    libres = {FECHA: [_espacio(1, 20, 1), _espacio(2, 10, 1), _espacio(3, 40, 1)]}
+    resultado = E1.optimizar_asignacion(solicitudes, libres)
+    assert resultado["asignaciones"] == {0: _espacio(1, 20, 1), 1: _espacio(2, 10, 1)}
+    assert resultado["sin_asignar"] == [2]
+    assert resultado["desperdicio"] == 4
+
+
+def test_sin_tiempo_recurre_al_voraz():
+    solicitudes = [_solicitud(5, [1])]
+    resultado = E1.optimizar_asignacion(solicitudes, {FECHA: [_espacio(1, 10, 1)]}, segundos=0)
+    assert not resultado["completo"]
+    assert resultado["asignaciones"] == {0: _espacio(1, 10, 1)}
+
+
+def test_leer_y_aplicar_lote(datos, tmp_path):
+    ruta = tmp_path / "solicitudes.csv"
+    fecha = datos["fecha"].strftime(E1.FORMATO_FECHA_INPUT)
+    ruta.write_text(f"cliente_id,asistentes,fecha,turnos,evento\n{datos['clientes'][0]},8,{fecha},1|2,Taller\n"
+                    f"{datos['clientes'][1]},15,{fecha},,Foro\n", encoding="utf-8")
+    solicitudes = E1.leer_solicitudes_lote(str(ruta))
+    assert solicitudes[0]["turnos"] == [1, 2] and solicitudes[1]["turnos"] == []
+    libres = E1.espacios_libres(solicitud["fecha"] for solicitud in solicitudes)
+    resultado = E1.optimizar_asignacion(solicitudes, libres)
+    assert resultado["sin_asignar"] == []
+    assert E1.aplicar_asignacion(solicitudes, resultado["asignaciones"]) == {"ok": True, "insertadas": 2}
+    repetida = E1.aplicar_asignacion(solicitudes, resultado["asignaciones"])
+    assert not repetida["ok"] and "se ocuparon" in repetida["error"]
+    assert not E1.aplicar_asignacion([dict(solicitudes[0], cliente_id=999)], {0: resultado["asignaciones"][0]})["ok"]
+
+    ruta.write_text("cliente_id,asistentes,fecha,evento\n1,muchos,01-01-2031,X\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="Solicitud 1 invalida"):
+        E1.leer_solicitudes_lote(str(ruta))
@@ -0,0 +1,79 @@
+import datetime
+import threading
+import time
+
+import E1
+
+
+def test_alta_sin_minutos_toma_el_intervalo_del_turno(datos):
+    with E1.conectar_bd() as conexion:
+        conexion.execute("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento) VALUES (?, ?, ?, 1, 'Junta')",
+                         (datos["clientes"][0], datos["salas"][0], datos["fecha"].strftime(E1.FORMATO_FECHA_ISO)))
+        conexion.commit()
+        fila = conexion.execute("SELECT minuto_inicio, minuto_fin FROM reservas").fetchone()
+    avisos, _, _ = E1.leer_avisos(0)
+    assert fila == E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    assert (avisos[-1]["tipo"], avisos[-1]["minuto_inicio"], avisos[-1]["minuto_fin"]) == ("alta", *fila)
+
+
+def test_avisos_en_orden_con_cancelacion_y_cambio_de_fecha(datos):
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[2]
+    folio = E1.confirmar_reserva(datos["clientes"][0], datos["salas"][0], datos["fecha"], 2, "Taller", inicio, fin)
+    with E1.conectar_bd() as conexion:
+        conexion.execute("UPDATE reservas SET fecha_normalizada = date(fecha_normalizada, '+1 day') WHERE folio = ?", (folio,))
+        conexion.execute("UPDATE reservas SET activo = 0 WHERE folio = ?", (folio,))
+        conexion.commit()
+    avisos, hasta, reinicio = E1.leer_avisos(0)
+    assert [aviso["tipo"] for aviso in avisos] == ["alta", "modificada", "cancelada"]
+    assert [aviso["secuencia"] for aviso in avisos] == sorted(aviso["secuencia"] for aviso in avisos)
+    assert avisos[1]["anterior"]["fecha"] == datos["fecha"].strftime(E1.FORMATO_FECHA_ISO)
+    assert hasta == avisos[-1]["secuencia"] and not reinicio
+
+
+def test_leer_avisos_detecta_hueco_purgado(datos):
+    for turno_id in (1, 2, 3):
+        inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[turno_id]
+        E1.confirmar_reserva(datos["clientes"][0], datos["salas"][0], datos["fecha"], turno_id, "Junta", inicio, fin)
+    E1.purgar_avisos(conservar=1)
+    avisos, _, reinicio = E1.leer_avisos(0)
+    assert len(avisos) == 1 and reinicio
+
+
+def test_suscriptor_recibe_escrituras_concurrentes_en_orden(datos, capsys):
+    recibidos = []
+    listos = threading.Event()
+
+    def recibir(avisos, reinicio):
+        assert not reinicio
+        recibidos.extend(avisos)
+        if len(recibidos) >= 24:
+            listos.set()
+
+    def fallar(avisos, reinicio):
+        raise RuntimeError("suscriptor roto")
+
+    E1.suscribir_cambios(recibir, "prueba")
+    E1.suscribir_cambios(fallar, "roto")
+    while E1.secuencia_avisos is None:
+        time.sleep(0.01)
+    desde = E1.secuencia_avisos
+    assert E1.esperar_cambios(desde, espera=0.05) == ([], desde, False)
+
+    def escribir(cliente, sala):
+        for turno_id in (1, 2, 3):
+            inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[turno_id]
+            for dias in range(4):
+                E1.confirmar_reserva(cliente, sala, datos["fecha"] + datetime.timedelta(days=dias), turno_id, "Junta", inicio, fin)
+
+    hilos = [threading.Thread(target=escribir, args=(cliente, sala)) for cliente, sala in zip(datos["clientes"], datos["salas"])]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert listos.wait(5)
+    E1.cancelar_suscripcion("prueba")
+    E1.cancelar_suscripcion("roto")
+    assert [aviso["secuencia"] for aviso in recibidos] == list(range(desde + 1, desde + 25))
+    assert len({aviso["folio"] for aviso in recibidos}) == 24
+    assert "el suscriptor 'roto' fallo" in capsys.readouterr().out
+    assert E1.hilo_avisos is None
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+from benchmarks import sinteticos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_generar_bd_sintetica_sin_empalmes(tmp_path):
+    ruta = str(tmp_path / "sintetica.db")
+    datos = sinteticos.generar_bd_sintetica(ruta, 500, num_clientes=20, num_salas=4, desordenar=True)
+    with sqlite3.connect(ruta) as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM reservas").fetchone()[0] == 500
+        assert conexion.execute("SELECT COUNT(*) FROM clientes").fetchone()[0] == 20
+        repetidos = conexion.execute("""
+            SELECT COUNT(*) FROM (SELECT 1 FROM reservas WHERE activo = 1
+                                  GROUP BY sala_id, fecha_normalizada, turno_id HAVING COUNT(*) > 1)
+        """).fetchone()[0]
+    assert repetidos == 0
+    assert datos["fecha_inicio"] <= datos["fecha_fin"]
+
+
+def test_benchmark_desde_la_linea_de_comandos(tmp_path):
+    resultado = subprocess.run([sys.executable, os.path.join(RAIZ, "E1.py"), "--db", str(tmp_path / "cli.db"), "bench-tabla", "--filas", "300"],
+                               capture_output=True, text=True, cwd=tmp_path, timeout=120)
+    assert resultado.returncode == 0, resultado.stderr
+    assert "Salida identica a tabulate en una muestra de 200 filas: si" in resultado.stdout
@@ -0,0 +1,70 @@
+import datetime
+import sqlite3
+
+import E1
+
+
+def _reservar(datos, cliente, sala, turno_id, evento):
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[turno_id]
+    return E1.confirmar_reserva(cliente, sala, datos["fecha"], turno_id, evento, inicio, fin)
+
+
+def test_busqueda_ignora_acentos_admite_prefijo_y_pondera_evento(datos):
+    ana, luis = datos["clientes"]
+    sala_a, sala_b = datos["salas"]
+    conferencia = _reservar(datos, luis, sala_a, 1, "Conferencia de Química")
+    lopez = _reservar(datos, ana, sala_b, 1, "Taller de lectura")
+    evento_lopez = _reservar(datos, luis, sala_b, 2, "Homenaje a Lopez")
+
+    assert [resultado["folio"] for resultado in E1.buscar_reservas("quimica")] == [conferencia]
+    assert [resultado["folio"] for resultado in E1.buscar_reservas("conferencia quim")] == [conferencia]
+    assert [resultado["folio"] for resultado in E1.buscar_reservas("lopez")] == [evento_lopez, lopez]
+    assert [resultado["folio"] for resultado in E1.buscar_reservas("lopez", sala_id=sala_b, fecha_inicio=datos["fecha"])] == [evento_lopez, lopez]
+    assert E1.buscar_reservas("lopez quimica") == []
+    assert E1.buscar_reservas("  ¿? ") == []
+    assert E1.consulta_fts("Café  del-día") == '"cafe" "del" "dia"*'
+
+
+def test_busqueda_sigue_cambios_de_reservas_y_clientes(datos):
+    ana, _ = datos["clientes"]
+    folio = _reservar(datos, ana, datos["salas"][0], 1, "Junta")
+    with sqlite3.connect(E1.DB_FILE) as conexion:
+        conexion.execute("UPDATE reservas SET evento = 'Asamblea anual' WHERE folio = ?", (folio,))
+    assert E1.buscar_reservas("junta") == []
+    assert E1.buscar_reservas("asamblea")[0]["folio"] == folio
+    with E1.conectar_bd() as conexion:
+        conexion.execute("UPDATE clientes SET apellidos = 'Mendoza' WHERE cliente_id = ?", (ana,))
+        conexion.commit()
+    resultado = E1.buscar_reservas("mendoza")
+    assert resultado[0]["cliente"] == "Mendoza, Ana"
+
+    E1.cancelar_reservas([folio])
+    assert E1.buscar_reservas("asamblea") == []
+    cancelada = E1.buscar_reservas("asamblea", incluir_canceladas=True)
+    assert [(fila["folio"], fila["activo"]) for fila in cancelada] == [(folio, False)]
+
+    with E1.conectar_bd() as conexion:
+        conexion.execute("DELETE FROM busqueda_reservas")
+        conexion.commit()
+    assert E1.buscar_reservas("asamblea", incluir_canceladas=True) == []
+    assert E1.reconstruir_busqueda() == 1
+    assert E1.buscar_reservas("asamblea", incluir_canceladas=True)[0]["folio"] == folio
+
+
+def test_busqueda_ordena_por_bm25_antes_de_limitar(datos):
+    ana, luis = datos["clientes"]
+    sala = datos["salas"][0]
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    filas = [(ana, sala, (datos["fecha"] + datetime.timedelta(days=dia)).strftime(E1.FORMATO_FECHA_ISO), evento, inicio, fin)
+             for dia, evento in enumerate(["Apertura Worlds 2025"] +
+                                          [f"Apertura Worlds 2025 ronda clasificatoria grupo {numero} sede alterna" for numero in range(60)])]
+    with sqlite3.connect(E1.DB_FILE) as conexion:
+        conexion.executemany("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento, minuto_inicio, minuto_fin)"
+                             " VALUES (?, ?, ?, 1, ?, ?, ?)", filas)
+        primero = conexion.execute("SELECT MIN(folio) FROM reservas").fetchone()[0]
+
+    resultados = E1.buscar_reservas("apertura worlds 2025", limite=5)
+    assert len(resultados) == 5
+    assert resultados[0]["folio"] == primero
+    assert resultados[0]["evento"] == "Apertura Worlds 2025"
+    assert resultados[0]["puntaje"] > resultados[1]["puntaje"]
@@ -0,0 +1,53 @@
+import csv
+import gzip
+import json
+import sqlite3
+
+import E1
+
+
+def _reservar(datos, cliente, turno_id):
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[turno_id]
+    return E1.confirmar_reserva(cliente, datos["salas"][0], datos["fecha"], turno_id, f"Evento {turno_id}", inicio, fin)
+
+
+def _leer_csv(ruta):
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        return list(csv.DictReader(archivo))
+
+
+def test_exportar_cambios_avanza_la_marca_por_consumidor(datos, tmp_path):
+    ana, luis = datos["clientes"]
+    primero = _reservar(datos, ana, 1)
+    segundo = _reservar(datos, luis, 2)
+    directorio = str(tmp_path)
+
+    inicial = E1.exportar_cambios("contabilidad", directorio=directorio)
+    assert inicial["filas"] == 2 and inicial["desde"] == 0
+    assert [fila["TIPO"] for fila in _leer_csv(inicial["archivo"])] == ["alta", "alta"]
+    assert E1.exportar_cambios("contabilidad", directorio=directorio)["archivo"] is None
+
+    with sqlite3.connect(E1.DB_FILE) as conexion:
+        conexion.execute("UPDATE reservas SET evento = 'Renombrado' WHERE folio = ?", (primero,))
+    E1.cancelar_reservas([segundo])
+    tercero = _reservar(datos, ana, 3)
+    incremental = E1.exportar_cambios("contabilidad", directorio=directorio)
+    filas = _leer_csv(incremental["archivo"])
+    assert [(int(fila["FOLIO"]), fila["TIPO"]) for fila in filas] == [(primero, "modificada"), (segundo, "cancelada"), (tercero, "alta")]
+    assert incremental["desde"] == inicial["hasta"]
+    assert E1.marca_exportacion("contabilidad") == incremental["hasta"]
+
+    otro = E1.exportar_cambios("auditoria", formato="ndjson", directorio=directorio, comprimir=True)
+    with gzip.open(otro["archivo"], "rt", encoding="utf-8") as archivo:
+        registros = [json.loads(linea) for linea in archivo]
+    assert sorted(registro["folio"] for registro in registros) == [primero, segundo, tercero]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_exportar_desde_no_retrocede_la_marca(datos, tmp_path):
+    _reservar(datos, datos["clientes"][0], 1)
+    _reservar(datos, datos["clientes"][0], 2)
+    completo = E1.exportar_cambios("bi", directorio=str(tmp_path))
+    repeticion = E1.exportar_cambios("bi", directorio=str(tmp_path), desde=completo["hasta"] - 1)
+    assert repeticion["filas"] == 1
+    assert E1.marca_exportacion("bi") == completo["hasta"]
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+import E1
+
+
+def _reservar(datos, cliente, turno_id):
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[turno_id]
+    return E1.confirmar_reserva(cliente, datos["salas"][0], datos["fecha"], turno_id, "Junta", inicio, fin)
+
+
+def test_similitud_tolera_acentos_y_variantes_foneticas():
+    assert E1.codigo_fonetico("gonzalez") == E1.codigo_fonetico("gonsales")
+    assert E1.similitud_jaro_winkler("martha", "marhta") == pytest.approx(0.9611, abs=1e-4)
+    assert E1.similitud_clientes("ana", "lopez ruiz", "ana", "lopes ruiz") >= E1.UMBRAL_DUPLICADOS
+    assert E1.UMBRAL_DUPLICADOS <= E1.similitud_clientes("ana", "lopez ruiz", "ana", "lopez") < 1.0
+    assert E1.similitud_clientes("ana", "lopez ruiz", "ana", "") < E1.UMBRAL_DUPLICADOS
+    assert E1.similitud_clientes("ana", "lopez ruiz", "ana", "lopez diaz") < E1.UMBRAL_DUPLICADOS
+    assert E1.similitud_clientes("ana", "lopez ruiz", "luis", "garcia perez") < E1.UMBRAL_DUPLICADOS
+
+
+def test_buscar_y_fusionar_conserva_al_cliente_con_mas_reservas(datos):
+    ana, luis = datos["clientes"]
+    copia = E1.registrar_cliente("Ána", "López  Ruiz")
+    otra_copia = E1.registrar_cliente("Ana", "Lopes Ruiz")
+    _reservar(datos, copia, 1)
+    _reservar(datos, copia, 2)
+    _reservar(datos, ana, 3)
+    espera = E1.inscribir_lista_espera(otra_copia, datos["salas"][0], datos["fecha"], 1, "Espera")
+
+    resultado = E1.buscar_clientes_duplicados()
+    assert resultado["grupos"] == [{"conservar": copia, "duplicados": sorted([ana, otra_copia])}]
+    assert luis not in resultado["ambiguos"]
+
+    fusion = E1.fusionar_clientes(resultado["grupos"])
+    assert fusion == {"clientes": 2, "reservas": 1, "esperas": 1, "grupos_reserva": 0}
+    with E1.conectar_bd() as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM clientes").fetchone()[0] == 2
+        assert conexion.execute("SELECT cliente_id FROM lista_espera WHERE espera_id = ?", (espera["espera_id"],)).fetchone()[0] == copia
+    assert E1.resumen_cliente(copia)["reservas"] == 3
+    assert {fila["cliente"] for fila in E1.buscar_reservas("junta")} == {"López  Ruiz, Ána"}
+    assert E1.buscar_clientes_duplicados()["grupos"] == []
+
+
+def test_fusion_rechaza_grupos_invalidos(datos):
+    ana, luis = datos["clientes"]
+    with pytest.raises(ValueError, match="mas de un grupo"):
+        E1.fusionar_clientes([{"conservar": ana, "duplicados": [luis]}, {"conservar": 999, "duplicados": [luis]}])
+    with pytest.raises(ValueError, match="no puede fusionarse"):
+        E1.fusionar_clientes([{"conservar": ana, "duplicados": [luis]}, {"conservar": luis, "duplicados": [998]}])
+    _reservar(datos, luis, 1)
+    with pytest.raises(ValueError, match="no existe"):
+        E1.fusionar_clientes([{"conservar": 999, "duplicados": [luis]}])
+    with E1.conectar_bd() as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM reservas WHERE cliente_id = ?", (luis,)).fetchone()[0] == 1
+    assert E1.fusionar_clientes([]) == {"clientes": 0, "reservas": 0, "esperas": 0, "grupos_reserva": 0}
+
+
+def test_fusiones_concurrentes_del_mismo_grupo_se_aplican_una_vez(datos):
+    ana, luis = datos["clientes"]
+    for turno_id in (1, 2, 3):
+        _reservar(datos, luis, turno_id)
+    grupos = [{"conservar": ana, "duplicados": [luis]}]
+    hilos_totales = 4
+    barrera = threading.Barrier(hilos_totales)
+    resultados = []
+
+    def fusionar():
+        barrera.wait()
+        resultados.append(E1.fusionar_clientes(grupos))
+
+    hilos = [threading.Thread(target=fusionar) for _ in range(hilos_totales)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert sum(resultado["clientes"] for resultado in resultados) == 1
+    assert sum(resultado["reservas"] for resultado in resultados) == 3
+    assert E1.resumen_cliente(ana)["reservas"] == 3
+    assert E1.resumen_cliente(luis) is None
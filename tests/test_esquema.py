@@ -0,0 +1,29 @@
+import sqlite3
+
+import E1
+
+
+def _tablas(ruta):
+    with sqlite3.connect(ruta) as conexion:
+        return {fila[0] for fila in conexion.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_una_migracion_fallida_no_detiene_las_demas(tmp_path, monkeypatch, capsys):
+    def sin_fts5(conexion):
+        raise sqlite3.OperationalError("no such module: fts5")
+
+    monkeypatch.setattr(E1, "_migrar_busqueda", sin_fts5)
+    ruta = str(tmp_path / "sin_fts.db")
+    E1.asegurar_tablas(ruta)
+    salida = capsys.readouterr().out
+    assert "no se pudo crear el indice de busqueda (FTS5): no such module: fts5" in salida
+    assert "modo WAL" not in salida
+    assert {"resumen_cliente", "claves_idempotencia", "avisos_reserva", "particiones_reservas"} <= _tablas(ruta)
+
+
+def test_asegurar_tablas_es_idempotente(bd, capsys):
+    E1.asegurar_tablas()
+    E1.asegurar_tablas()
+    assert "Advertencia" not in capsys.readouterr().out
+    with sqlite3.connect(bd) as conexion:
+        assert conexion.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
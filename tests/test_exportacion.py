@@ -0,0 +1,34 @@
+import datetime
+import json
+import os
+import sqlite3
+
+import E1
+
+
+def test_particionar_rango_por_semana_corta_la_ultima():
+    inicio = datetime.date(2031, 1, 1)
+    particiones = E1.particionar_rango(inicio, datetime.date(2031, 1, 16), "semana")
+    assert particiones == [(inicio, datetime.date(2031, 1, 7)), (datetime.date(2031, 1, 8), datetime.date(2031, 1, 14)),
+                           (datetime.date(2031, 1, 15), datetime.date(2031, 1, 16))]
+    assert E1.particionar_rango(inicio, inicio - datetime.timedelta(days=1)) == []
+
+
+def test_exportacion_en_procesos_igual_a_serie(datos, tmp_path):
+    with sqlite3.connect(E1.DB_FILE) as conexion:
+        conexion.executemany("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento) VALUES (?, ?, ?, ?, 'Junta')",
+                             [(datos["clientes"][0], datos["salas"][0], (datos["fecha"] + datetime.timedelta(days=dias)).strftime(E1.FORMATO_FECHA_ISO),
+                               turno_id) for dias, turno_id in ((0, 1), (0, 2), (2, 1))])
+    fecha_fin = datos["fecha"] + datetime.timedelta(days=3)
+    resultados = {}
+    for modo, en_serie in (("serie", True), ("procesos", False)):
+        directorio = tmp_path / modo
+        resultados[modo] = E1.ejecutar_exportacion_rango(datos["fecha"], fecha_fin, ["json", "csv"], procesos=2,
+                                                         directorio=str(directorio), combinado=True, en_serie=en_serie)
+        assert sorted(os.listdir(directorio)) == sorted(os.listdir(tmp_path / "serie"))
+    assert resultados["serie"]["filas"] == resultados["procesos"]["filas"] == 3
+    assert resultados["procesos"]["archivos"] == 2 * 2 + 2
+    sufijo = f"{datos['fecha'].strftime('%Y%m%d')}_{fecha_fin.strftime('%Y%m%d')}"
+    with open(tmp_path / "procesos" / f"reporte_{sufijo}.json", encoding="utf-8") as archivo:
+        contenido = json.load(archivo)
+    assert "Junta" in json.dumps(contenido)
@@ -0,0 +1,93 @@
+import datetime
+import sqlite3
+import threading
+
+import E1
+
+
+def _contar_activas(conexion):
+    return conexion.execute("SELECT COUNT(*) FROM reservas WHERE activo = 1").fetchone()[0]
+
+
+def test_grupo_es_atomico_ante_un_conflicto(datos):
+    cliente_a, cliente_b = datos["clientes"]
+    sala_a, sala_b = datos["salas"]
+    fecha = datos["fecha"]
+    with sqlite3.connect(E1.DB_FILE) as conexion:
+        conexion.execute("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento) VALUES (?, ?, ?, 2, 'Previa')",
+                         (cliente_b, sala_b, fecha.strftime(E1.FORMATO_FECHA_ISO)))
+
+    resultado = E1.reservar_multiples(cliente_a, [(sala_a, fecha, 1), (sala_a, fecha, 2), (sala_b, fecha, 2)], "Congreso")
+    assert not resultado["ok"]
+    assert [conflicto[:3] for conflicto in resultado["conflictos"]] == [(sala_b, fecha.strftime(E1.FORMATO_FECHA_ISO), 2)]
+    with E1.conectar_bd() as conexion:
+        assert _contar_activas(conexion) == 1
+        assert conexion.execute("SELECT COUNT(*) FROM grupos_reserva").fetchone()[0] == 0
+
+
+def test_grupo_reserva_renombra_y_cancela(datos):
+    cliente = datos["clientes"][0]
+    sala_a, sala_b = datos["salas"]
+    fecha = datos["fecha"]
+    espacios = [(sala_a, fecha, 1), (sala_b, fecha, 1), (sala_a, fecha + datetime.timedelta(days=1), 3), (sala_a, fecha, 1)]
+    resultado = E1.reservar_multiples(cliente, espacios, "Congreso")
+    assert resultado["ok"] and len(resultado["folios"]) == 3
+    grupo = E1.grupo_de_folio(resultado["folios"][-1])
+    assert grupo == {"grupo_id": resultado["grupo_id"], "activas": 3, "primera_fecha": fecha}
+
+    assert E1.renombrar_grupo(resultado["grupo_id"], "Congreso anual") == {"ok": True, "actualizadas": 3}
+    assert not E1.renombrar_grupo(resultado["grupo_id"] + 99, "Nada")["ok"]
+    assert not E1.cancelar_grupo(resultado["grupo_id"], dias_minimos=10)["ok"]
+    cancelacion = E1.cancelar_grupo(resultado["grupo_id"])
+    assert cancelacion["ok"] and cancelacion["canceladas"] == 3
+    assert E1.grupo_de_folio(resultado["folios"][0]) is None
+    assert not E1.cancelar_grupo(resultado["grupo_id"])["ok"]
+
+
+def test_grupo_rechaza_sala_turno_o_lista_vacia(datos):
+    cliente = datos["clientes"][0]
+    sala = datos["salas"][0]
+    assert "sala" in E1.reservar_multiples(cliente, [(999, datos["fecha"], 1)], "X")["error"]
+    assert "turno" in E1.reservar_multiples(cliente, [(sala, datos["fecha"], 99)], "X")["error"]
+    assert not E1.reservar_multiples(cliente, [], "X")["ok"]
+    assert "cliente" in E1.reservar_multiples(999, [(sala, datos["fecha"], 1)], "X")["error"]
+
+
+def test_grupos_concurrentes_solapados_solo_uno_gana(datos):
+    cliente_a, cliente_b = datos["clientes"]
+    sala_a, sala_b = datos["salas"]
+    fecha = datos["fecha"]
+    barrera = threading.Barrier(2)
+    resultados = []
+
+    def reservar(cliente, espacios):
+        barrera.wait()
+        resultados.append(E1.reservar_multiples(cliente, espacios, "Carrera"))
+
+    hilos = [threading.Thread(target=reservar, args=(cliente_a, [(sala_a, fecha, 1), (sala_b, fecha, 1)])),
+             threading.Thread(target=reservar, args=(cliente_b, [(sala_b, fecha, 1), (sala_a, fecha, 2)]))]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert sorted(resultado["ok"] for resultado in resultados) == [False, True]
+    with E1.conectar_bd() as conexion:
+        assert _contar_activas(conexion) == 2
+
+
+def test_grupo_rechaza_espacios_empalmados_o_sin_horario(datos):
+    cliente = datos["clientes"][0]
+    sala_a, sala_b = datos["salas"]
+    fecha = datos["fecha"]
+    with sqlite3.connect(E1.DB_FILE) as conexion:
+        conexion.execute("INSERT INTO turnos (turno_id, descripcion, minuto_inicio, minuto_fin) VALUES (8, 'Comida', 720, 840)")
+        conexion.execute("INSERT INTO turnos (turno_id, descripcion) VALUES (9, 'Sin horario')")
+        conexion.execute("UPDATE version_referencia SET version = version + 1 WHERE id = 1")
+
+    resultado = E1.reservar_multiples(cliente, [(sala_b, fecha, 8), (sala_a, fecha, 8), (sala_a, fecha, 1)], "Congreso")
+    assert not resultado["ok"]
+    assert resultado["conflictos"] == [(sala_a, fecha.strftime(E1.FORMATO_FECHA_ISO), 8, 1)]
+    assert "turno 9" in E1.reservar_multiples(cliente, [(sala_a, fecha, 9)], "Congreso")["error"]
+    with E1.conectar_bd() as conexion:
+        assert _contar_activas(conexion) == 0
+    assert E1.reservar_multiples(cliente, [(sala_b, fecha, 8), (sala_a, fecha, 2), (sala_a, fecha, 1)], "Congreso")["ok"]
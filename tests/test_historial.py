@@ -0,0 +1,58 @@
+import datetime
+
+import E1
+
+
+def _reservar(datos, cliente, sala, dias, turno_id=1):
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[turno_id]
+    fecha = datos["fecha"] + datetime.timedelta(days=dias)
+    return E1.confirmar_reserva(cliente, sala, fecha, turno_id, f"Evento {dias}", inicio, fin)
+
+
+def _resumen_reconstruido(cliente_id):
+    with E1.conectar_bd() as conexion:
+        conexion.execute("BEGIN")
+        E1._reconstruir_resumen_clientes(conexion)
+        resumen = E1.resumen_cliente(cliente_id, conexion=conexion)
+        conexion.rollback()
+    return resumen
+
+
+def test_resumen_incremental_coincide_con_reconstruccion(datos):
+    ana, luis = datos["clientes"]
+    sala_a, sala_b = datos["salas"]
+    folios = [_reservar(datos, ana, sala_a, dias) for dias in range(3)] + [_reservar(datos, ana, sala_b, 0, 2)]
+    _reservar(datos, luis, sala_b, 5)
+    E1.cancelar_reservas(folios[:2])
+    with E1.conectar_bd() as conexion:
+        conexion.execute("UPDATE reservas SET cliente_id = ? WHERE folio = ?", (luis, folios[2]))
+        conexion.commit()
+
+    resumen = E1.resumen_cliente(ana)
+    assert resumen == _resumen_reconstruido(ana)
+    assert (resumen["reservas"], resumen["activas"], resumen["canceladas"]) == (3, 1, 2)
+    assert resumen["sala_favorita"] == ("Sala B", 1)
+    assert E1.resumen_cliente(luis)["reservas"] == 2
+    assert E1.resumen_cliente(999) is None
+
+
+def test_historial_pagina_con_cursor_y_separa_pasadas(datos):
+    ana = datos["clientes"][0]
+    sala = datos["salas"][0]
+    folios = [_reservar(datos, ana, sala, dias) for dias in range(5)]
+    E1.cancelar_reservas([folios[1]])
+
+    pagina, siguiente = E1.historial_cliente(ana, limite=2)
+    assert [fila["folio"] for fila in pagina] == [folios[0], folios[2]]
+    pagina, siguiente = E1.historial_cliente(ana, limite=2, despues=siguiente)
+    assert [fila["folio"] for fila in pagina] == [folios[3], folios[4]]
+    assert siguiente is None
+
+    completas, _ = E1.historial_cliente(ana, incluir_canceladas=True)
+    assert [fila["activo"] for fila in completas] == [True, False, True, True, True]
+
+    hoy = datos["fecha"] + datetime.timedelta(days=3)
+    pasadas, _ = E1.historial_cliente(ana, pasadas=True, hoy=hoy)
+    assert [fila["folio"] for fila in pasadas] == [folios[2], folios[0]]
+    proximas, _ = E1.historial_cliente(ana, hoy=hoy)
+    assert [fila["folio"] for fila in proximas] == [folios[3], folios[4]]
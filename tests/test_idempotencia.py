@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+import E1
+
+
+def _confirmar(datos, clave, evento="Junta", turno_id=1):
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[turno_id]
+    return E1.confirmar_reserva(datos["clientes"][0], datos["salas"][0], datos["fecha"], turno_id, evento, inicio, fin, clave=clave)
+
+
+def _activas():
+    with E1.conectar_bd() as conexion:
+        return conexion.execute("SELECT COUNT(*) FROM reservas WHERE activo = 1").fetchone()[0]
+
+
+def test_reintento_con_la_misma_clave_devuelve_el_mismo_folio(datos):
+    clave = E1.nueva_clave_idempotencia()
+    folio = _confirmar(datos, clave)
+    assert folio is not None
+    assert _confirmar(datos, clave) == folio
+    assert _confirmar(datos, None) is None
+    with pytest.raises(ValueError, match="datos distintos"):
+        _confirmar(datos, clave, evento="Otra")
+    assert _activas() == 1
+
+
+def test_claves_concurrentes_crean_una_sola_reserva(datos):
+    clave = E1.nueva_clave_idempotencia()
+    hilos_totales = 6
+    barrera = threading.Barrier(hilos_totales)
+    folios = []
+
+    def confirmar():
+        barrera.wait()
+        folios.append(_confirmar(datos, clave, turno_id=2))
+
+    hilos = [threading.Thread(target=confirmar) for _ in range(hilos_totales)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert len(set(folios)) == 1 and folios[0] is not None
+    assert _activas() == 1
+
+
+def test_clave_de_grupo_y_purga_de_vencidas(datos):
+    cliente = datos["clientes"][1]
+    espacios = [(datos["salas"][1], datos["fecha"], 1), (datos["salas"][1], datos["fecha"], 2)]
+    primero = E1.reservar_multiples(cliente, espacios, "Curso", clave="grupo-1")
+    repetido = E1.reservar_multiples(cliente, espacios, "Curso", clave="grupo-1")
+    assert repetido["repetida"] and repetido["folios"] == primero["folios"]
+    assert _confirmar(datos, "simple-1") is not None
+
+    assert E1.purgar_claves_idempotencia() == 0
+    assert E1.purgar_claves_idempotencia(ahora=time.time() + E1.TTL_CLAVE_IDEMPOTENCIA + 1, lote=1) == 2
+    with E1.conectar_bd() as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM claves_idempotencia").fetchone()[0] == 0
+    assert not E1.reservar_multiples(cliente, espacios, "Curso", clave="grupo-1")["ok"]
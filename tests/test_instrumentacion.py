@@ -0,0 +1,36 @@
+import json
+import threading
+
+import E1
+
+
+def test_registrar_operacion_no_pierde_conteos_entre_hilos(monkeypatch):
+    monkeypatch.setattr(E1, "estadisticas_operaciones", {})
+    hilos, repeticiones = 8, 2000
+    barrera = threading.Barrier(hilos)
+
+    def trabajar():
+        barrera.wait()
+        for indice in range(repeticiones):
+            E1.registrar_operacion("prueba.hilos", indice % 7 / 1000, error=indice % 100 == 0)
+
+    trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    registro = E1.estadisticas_operaciones["prueba.hilos"]
+    assert registro["conteo"] == hilos * repeticiones == sum(registro["histograma"])
+    assert registro["errores"] == hilos * repeticiones // 100
+    assert registro["max_ms"] == 6
+
+
+def test_volcar_estadisticas_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(E1, "estadisticas_operaciones", {})
+    with E1.medir("prueba.medir"):
+        pass
+    destino = tmp_path / "estadisticas.json"
+    E1.volcar_estadisticas(str(destino))
+    datos = json.loads(destino.read_text(encoding="utf-8"))
+    assert datos["operaciones"]["prueba.medir"]["conteo"] == 1
+    assert len(datos["operaciones"]["prueba.medir"]["histograma"]) == len(E1.LIMITES_HISTOGRAMA_MS) + 1
@@ -0,0 +1,40 @@
+import datetime
+import sqlite3
+
+import E1
+
+
+def test_turno_sin_horario_no_se_ofrece(bd, capsys):
+    with sqlite3.connect(bd) as conexion:
+        conexion.execute("INSERT INTO turnos (turno_id, descripcion) VALUES (7, 'Sin horario')")
+        conexion.execute("UPDATE version_referencia SET version = version + 1 WHERE id = 1")
+    referencia = E1.referencia_actual()
+    assert 7 not in referencia["turnos_por_id"]
+    assert all(turno["minuto_fin"] - turno["minuto_inicio"] < E1.MINUTOS_DIA for turno in referencia["turnos"])
+    assert "turno 7 (Sin horario) no tiene horario" in capsys.readouterr().out
+
+
+def test_migracion_no_rellena_reservas_en_cada_arranque(bd):
+    with sqlite3.connect(bd) as conexion:
+        conexion.execute("DROP TRIGGER tr_reservas_intervalo_turno")
+        conexion.execute("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento, activo)"
+                         " VALUES (1, 1, '2030-01-01', 1, 'Sin minutos', 1)")
+    with sqlite3.connect(bd) as conexion:
+        E1._migrar_intervalos(conexion)
+        fila = conexion.execute("SELECT minuto_inicio, minuto_fin FROM reservas WHERE evento = 'Sin minutos'").fetchone()
+    assert fila == (None, None)
+
+
+def test_indice_detecta_intervalos_anidados():
+    fecha = datetime.date(2030, 1, 1)
+    indice = E1.construir_indice_intervalos([(1, fecha, 480, 1080), (1, fecha, 600, 660)])
+    assert E1.intervalo_ocupado(indice, 1, fecha, 700, 760)
+    assert not E1.intervalo_ocupado(indice, 1, fecha, 1080, 1140)
+    assert E1.buscar_huecos(indice, 1, fecha, 30, desde=650, hasta=1200) == [(1080, 1200)]
+
+    E1.agregar_intervalo(indice, 1, fecha, 300, 1200)
+    assert E1.intervalo_ocupado(indice, 1, fecha, 1100, 1150)
+    assert E1.quitar_intervalo(indice, 1, fecha, 300)
+    assert not E1.intervalo_ocupado(indice, 1, fecha, 1100, 1150)
+    assert E1.quitar_intervalo(indice, 1, fecha, 480)
+    assert not E1.intervalo_ocupado(indice, 1, fecha, 700, 760)
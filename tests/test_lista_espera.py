@@ -0,0 +1,69 @@
+import threading
+
+import E1
+
+
+def _reservar(datos, cliente, turno_id, sala=None):
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[turno_id]
+    return E1.confirmar_reserva(cliente, sala or datos["salas"][0], datos["fecha"], turno_id, "Original", inicio, fin)
+
+
+def test_cancelacion_promueve_en_orden_de_llegada(datos):
+    ana, luis = datos["clientes"]
+    sala = datos["salas"][0]
+    folio = _reservar(datos, ana, 1)
+    primera = E1.inscribir_lista_espera(luis, sala, datos["fecha"], 1, "Espera 1")
+    retirada = E1.inscribir_lista_espera(ana, sala, datos["fecha"], 1, "Espera 2")
+    segunda = E1.inscribir_lista_espera(ana, sala, datos["fecha"], 1, "Espera 3")
+    assert [primera["posicion"], retirada["posicion"], segunda["posicion"]] == [1, 2, 3]
+    assert E1.retirar_lista_espera(retirada["espera_id"])
+    assert not E1.retirar_lista_espera(retirada["espera_id"])
+
+    resultado = E1.cancelar_reservas([folio])
+    assert resultado["canceladas"] == [folio]
+    assert [espera_id for _, espera_id in resultado["promovidas"]] == [primera["espera_id"]]
+    folio_promovido = resultado["promovidas"][0][0]
+    with E1.conectar_bd() as conexion:
+        assert conexion.execute("SELECT cliente_id, evento, activo FROM reservas WHERE folio = ?", (folio_promovido,)).fetchone() == (luis, "Espera 1", 1)
+        estados = dict(conexion.execute("SELECT espera_id, estado FROM lista_espera").fetchall())
+    assert estados == {primera["espera_id"]: "promovida", retirada["espera_id"]: "retirada", segunda["espera_id"]: "pendiente"}
+
+    segunda_ronda = E1.cancelar_reservas([folio_promovido])
+    assert [espera_id for _, espera_id in segunda_ronda["promovidas"]] == [segunda["espera_id"]]
+
+
+def test_no_promueve_si_el_espacio_sigue_ocupado(datos):
+    ana, luis = datos["clientes"]
+    sala = datos["salas"][0]
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    horario = E1.confirmar_reserva(ana, sala, datos["fecha"], E1.TURNO_HORARIO_ID, "Parcial", inicio, inicio + 30)
+    resto = E1.confirmar_reserva(ana, sala, datos["fecha"], E1.TURNO_HORARIO_ID, "Resto", inicio + 30, fin)
+    E1.inscribir_lista_espera(luis, sala, datos["fecha"], 1, "Espera")
+    assert E1.cancelar_reservas([horario])["promovidas"] == []
+    assert len(E1.cancelar_reservas([resto])["promovidas"]) == 1
+    assert E1.cancelar_reservas([resto]) == {"canceladas": [], "promovidas": []}
+
+
+def test_cancelaciones_concurrentes_promueven_una_sola_vez(datos):
+    ana, luis = datos["clientes"]
+    sala = datos["salas"][1]
+    folio = _reservar(datos, ana, 2, sala)
+    for indice in range(3):
+        E1.inscribir_lista_espera(luis, sala, datos["fecha"], 2, f"Espera {indice}")
+    hilos_totales = 4
+    barrera = threading.Barrier(hilos_totales)
+    resultados = []
+
+    def cancelar():
+        barrera.wait()
+        resultados.append(E1.cancelar_reservas([folio]))
+
+    hilos = [threading.Thread(target=cancelar) for _ in range(hilos_totales)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert sum(len(resultado["promovidas"]) for resultado in resultados) == 1
+    with E1.conectar_bd() as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM reservas WHERE sala_id = ? AND activo = 1", (sala,)).fetchone()[0] == 1
+        assert conexion.execute("SELECT COUNT(*) FROM lista_espera WHERE estado = 'pendiente'").fetchone()[0] == 2
@@ -0,0 +1,46 @@
+import threading
+
+import E1
+
+
+def _crear_y_borrar(datos, filas=3000):
+    with E1.conectar_bd() as conexion:
+        conexion.executemany("INSERT INTO clientes (nombre, apellidos) VALUES (?, ?)",
+                             [(f"Nombre {indice}", "Apellido " + "x" * 200) for indice in range(filas)])
+        conexion.commit()
+        conexion.execute("DELETE FROM clientes WHERE nombre LIKE 'Nombre %'")
+        conexion.commit()
+
+
+def test_mantenimiento_recupera_paginas_libres_por_porciones(datos):
+    primero = E1.mantenimiento(convertir=True, pausa=0)
+    assert primero["antes"]["auto_vacuum"] == primero["despues"]["auto_vacuum"] == "INCREMENTAL"
+    assert "vacuum (conversion)" not in [paso[0] for paso in primero["pasos"]]
+    assert ("analyze", "todas") in [paso[:2] for paso in primero["pasos"]]
+    assert primero["problemas"] == []
+
+    _crear_y_borrar(datos)
+    segundo = E1.mantenimiento(paginas_vacuum=16, pausa=0, detalle=True)
+    nombres = [paso[0] for paso in segundo["pasos"]]
+    assert segundo["antes"]["libres"] > 16
+    assert segundo["despues"]["libres"] == 0
+    assert nombres.count("incremental_vacuum") > 1
+    assert "quick_check" in nombres and nombres[-1] == "checkpoint"
+    assert ("analyze", "todas") not in [paso[:2] for paso in segundo["pasos"]]
+
+
+def test_mantenimiento_se_detiene_al_pedir_parada(datos):
+    parada = threading.Event()
+    parada.set()
+    assert E1.mantenimiento(pausa=0, parada=parada) is None
+    assert E1.mantenimiento(pausa=0, verificar=False)["pasos"][-1][0] == "checkpoint"
+
+
+def test_mantenimiento_convierte_bd_sin_auto_vacuum(bd):
+    with E1.conectar_bd() as conexion:
+        conexion.execute("PRAGMA auto_vacuum = NONE")
+        conexion.execute("VACUUM")
+    resultado = E1.mantenimiento(convertir=True, pausa=0)
+    assert resultado["antes"]["auto_vacuum"] == "NONE"
+    assert resultado["despues"]["auto_vacuum"] == "INCREMENTAL"
+    assert resultado["pasos"][0][0] == "vacuum (conversion)"
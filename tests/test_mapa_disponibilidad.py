@@ -0,0 +1,75 @@
+import time
+
+import E1
+
+
+def _esperar_mapa(mapa):
+    with E1.conectar_bd() as conexion:
+        ultimo = conexion.execute("SELECT ultimo FROM secuencia_cambios WHERE id = 1").fetchone()[0]
+    limite = time.monotonic() + 5
+    while E1.estado_mapa(mapa)[0] < ultimo and time.monotonic() < limite:
+        time.sleep(E1.INTERVALO_AVISOS)
+
+
+def test_mapa_sigue_reservas_y_cancelaciones(datos):
+    mapa = E1.crear_mapa_disponibilidad(dias=30)
+    sala_id, fecha = datos["salas"][0], datos["fecha"]
+    assert E1.turno_libre_mapa(sala_id, fecha, 1) is True
+    folio = E1.confirmar_reserva(datos["clientes"][0], sala_id, fecha, 1, "Junta", *E1.INTERVALOS_TURNO_PREDETERMINADOS[1])
+    assert E1.turno_libre_mapa(sala_id, fecha, 1) is False
+    E1.cancelar_reservas([folio])
+    _esperar_mapa(mapa)
+    assert E1.turno_libre_mapa(sala_id, fecha, 1) is True
+    assert E1.verificar_mapa_disponibilidad(mapa)["diferencias"] == []
+
+
+def test_aviso_sin_minutos_recalcula_la_celda(datos):
+    mapa = E1.crear_mapa_disponibilidad(dias=30)
+    E1.cancelar_suscripcion("mapa")
+    sala_id, fecha = datos["salas"][0], datos["fecha"]
+    with E1.conectar_bd() as conexion:
+        conexion.execute("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento) VALUES (?, ?, ?, 2, 'Taller')",
+                         (datos["clientes"][0], sala_id, fecha.strftime(E1.FORMATO_FECHA_ISO)))
+        conexion.commit()
+    avisos, _, _ = E1.leer_avisos(E1.estado_mapa(mapa)[0])
+    for aviso in avisos:
+        aviso["minuto_inicio"] = aviso["minuto_fin"] = None
+    E1._aviso_mapa(avisos, False)
+    assert E1.turno_libre_mapa(sala_id, fecha, 2) is False
+    assert E1.verificar_mapa_disponibilidad(mapa, espera=0)["diferencias"] == []
+
+
+def test_fuera_de_la_ventana_no_responde(datos):
+    E1.crear_mapa_disponibilidad(dias=3)
+    assert E1.turno_libre_mapa(datos["salas"][0], datos["fecha"], 1) is None
+
+
+def test_disponibilidad_con_mapa_no_consulta_sqlite(datos, monkeypatch):
+    E1.crear_mapa_disponibilidad(dias=30)
+    sala_id, fecha = datos["salas"][0], datos["fecha"]
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    turno = E1.referencia_actual()["turnos_por_id"][1]["descripcion"]
+    retencion = E1.retener_espacio(sala_id, fecha, inicio, fin, terminal="caja-1")
+
+    def prohibido(*argumentos, **opciones):
+        raise AssertionError("la ruta del mapa no debe abrir SQLite")
+
+    with monkeypatch.context() as parche:
+        for nombre in ("conectar_bd", "_abrir_conexion", "referencia_actual"):
+            parche.setattr(E1, nombre, prohibido)
+        parche.setattr(E1.sqlite3, "connect", prohibido)
+        assert (sala_id, turno) not in {(fila[0], fila[3]) for fila in E1.disponibilidad_fecha(fecha, terminal="caja-2")}
+        assert (sala_id, turno) in {(fila[0], fila[3]) for fila in E1.disponibilidad_fecha(fecha, terminal="caja-1")}
+
+    E1.liberar_retencion(retencion)
+    assert (sala_id, turno) in {(fila[0], fila[3]) for fila in E1.disponibilidad_fecha(fecha, terminal="caja-2")}
+    vencida = E1.retener_espacio(sala_id, fecha, inicio, fin, terminal="caja-1", ttl=0.05)
+    time.sleep(0.1)
+    assert (sala_id, turno) in {(fila[0], fila[3]) for fila in E1.disponibilidad_fecha(fecha, terminal="caja-2")}
+    E1.liberar_retencion(vencida)
+
+    retencion = E1.retener_espacio(sala_id, fecha, inicio, fin, terminal="caja-1")
+    E1.reconstruir_mapa()
+    assert E1.retenciones_mapa(fecha, terminal="caja-2") == [(sala_id, inicio, fin)]
+    assert E1.confirmar_reserva(datos["clientes"][0], sala_id, fecha, 1, "Junta", inicio, fin, retencion_id=retencion, terminal="caja-1")
+    assert E1.retenciones_mapa(fecha, terminal="caja-2") == []
@@ -0,0 +1,77 @@
+import datetime
+
+import E1
+
+
+def _insertar(datos, fechas):
+    with E1.conectar_bd() as conexion:
+        conexion.executemany("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento) VALUES (?, ?, ?, ?, 'Junta')",
+                             [(datos["clientes"][0], datos["salas"][indice % 2], fecha.strftime(E1.FORMATO_FECHA_ISO), indice % 3 + 1)
+                              for indice, fecha in enumerate(fechas)])
+        conexion.commit()
+
+
+def _contenido_particiones(conexion):
+    filas = set()
+    for (tabla,) in conexion.execute("SELECT tabla FROM particiones_reservas").fetchall():
+        filas.update(conexion.execute(f"SELECT {E1.COLUMNAS_PARTICION} FROM {tabla}").fetchall())
+    return filas
+
+
+def _enero(dia):
+    return datetime.date(2031, 1, 1) + datetime.timedelta(days=dia)
+
+
+def test_particiones_por_mes_copian_y_siguen_cambios(datos):
+    _insertar(datos, [_enero(dia) for dia in range(0, 90, 3)])
+    creadas = E1.particionar_reservas("mes", hasta=datetime.date(2031, 3, 31))
+    assert {"reservas_203101", "reservas_203102", "reservas_203103"} <= set(creadas)
+    with E1.conectar_bd() as conexion:
+        disparadores = conexion.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'tr_reservas_particion_%'").fetchone()[0]
+        folio_movido, folio_borrado = [fila[0] for fila in conexion.execute("SELECT folio FROM reservas ORDER BY folio LIMIT 2")]
+        conexion.execute("UPDATE reservas SET fecha_normalizada = '2031-03-15' WHERE folio = ?", (folio_movido,))
+        conexion.execute("DELETE FROM reservas WHERE folio = ?", (folio_borrado,))
+        conexion.commit()
+    _insertar(datos, [_enero(40)])
+    conexion = E1.conectar_solo_lectura(E1.DB_FILE)
+    try:
+        pendientes = conexion.execute("SELECT COUNT(*) FROM particion_pendientes").fetchone()[0]
+        filas = list(E1._iterar_reporte_rango(conexion, _enero(0), datetime.date(2031, 3, 31)))
+        assert E1.tramos_rango(conexion, "2031-01-01", "2031-03-31") == [("reservas", "2031-01-01", "2031-03-31")]
+        assert conexion.execute("SELECT COUNT(*) FROM particion_pendientes").fetchone()[0] == pendientes > 0
+    finally:
+        conexion.close()
+
+    assert E1.sincronizar_particiones() == pendientes
+    with E1.conectar_bd() as conexion:
+        assert [tramo[0] for tramo in E1.tramos_rango(conexion, "2031-01-01", "2031-03-31")] == ["reservas_203101", "reservas_203102", "reservas_203103"]
+        assert len(list(E1._iterar_reporte_rango(conexion, _enero(0), datetime.date(2031, 3, 31)))) == len(filas)
+        reservas = set(conexion.execute(f"SELECT {E1.COLUMNAS_PARTICION} FROM reservas").fetchall())
+        assert _contenido_particiones(conexion) == reservas
+        assert conexion.execute("SELECT fecha_normalizada FROM reservas_203103 WHERE folio = ?", (folio_movido,)).fetchone() == ("2031-03-15",)
+    assert disparadores == 3
+    assert len(filas) == len(reservas)
+
+
+def test_copia_por_lotes_marca_la_particion_completa(datos):
+    _insertar(datos, [_enero(dia % 31) for dia in range(25)])
+    E1.particionar_reservas("mes", hasta=datetime.date(2031, 1, 31))
+    with E1.conectar_bd() as conexion:
+        conexion.execute("DELETE FROM reservas_203101")
+        conexion.execute("UPDATE particiones_reservas SET completa = 0 WHERE tabla = 'reservas_203101'")
+        conexion.commit()
+        assert E1.tramos_rango(conexion, "2031-01-01", "2031-01-31") == [("reservas", "2031-01-01", "2031-01-31")]
+    E1._copiar_particion("reservas_203101", "2031-01-01", "2031-02-01", lote=4)
+    with E1.conectar_bd() as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM reservas_203101").fetchone()[0] == 25
+        assert conexion.execute("SELECT completa FROM particiones_reservas WHERE tabla = 'reservas_203101'").fetchone() == (1,)
+
+
+def test_quitar_particiones_elimina_tablas_y_disparadores(datos):
+    _insertar(datos, [_enero(dia) for dia in range(3)])
+    E1.particionar_reservas("anio", hasta=datetime.date(2031, 12, 31))
+    assert E1.quitar_particiones() >= 1
+    _insertar(datos, [_enero(5)])
+    with E1.conectar_bd() as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'reservas_2%' OR name LIKE 'tr_reservas_particion_%'").fetchone()[0] == 0
+        assert conexion.execute("SELECT COUNT(*) FROM particion_pendientes").fetchone()[0] == 0
@@ -0,0 +1,46 @@
+import datetime
+import sqlite3
+import time
+
+import E1
+
+
+def _esperar_dia(fecha, condicion=lambda entrada: True, limite=5.0):
+    tope = time.time() + limite
+    while time.time() < tope:
+        entrada = E1.dia_precargado(fecha)
+        if entrada is not None and condicion(entrada):
+            return entrada
+        time.sleep(0.02)
+    return None
+
+
+def test_precarga_calienta_dias_y_se_invalida_con_reservas(datos):
+    assert E1.dia_precargado(datos["fecha"]) is None
+    E1.iniciar_precarga(dias=7)
+    assert E1.precarga_completa.wait(5)
+    sala = datos["salas"][0]
+    entrada = E1.dia_precargado(datos["fecha"])
+    assert entrada is not None and entrada["ocupados"] == set()
+    assert E1.dia_precargado(datos["fecha"] + datetime.timedelta(days=7)) is None
+
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    E1.confirmar_reserva(datos["clientes"][0], sala, datos["fecha"], 1, "Junta", inicio, fin)
+    entrada = _esperar_dia(datos["fecha"], lambda entrada: (sala, 1) in entrada["ocupados"])
+    assert entrada is not None
+    assert len(entrada["reporte"]) == 1
+    turno = E1.referencia_actual()["turnos_por_id"][1]["descripcion"]
+    assert (sala, turno) not in {(fila[0], fila[3]) for fila in E1.disponibilidad_fecha(datos["fecha"])}
+
+
+def test_cambio_de_referencia_vacia_la_cache(datos):
+    E1.iniciar_precarga(dias=7)
+    assert E1.precarga_completa.wait(5)
+    anterior = E1.dia_precargado(datos["fecha"])
+    with sqlite3.connect(E1.DB_FILE) as conexion:
+        conexion.execute("INSERT INTO salas (nombre, cupo) VALUES ('Sala C', 5)")
+    nueva = _esperar_dia(datos["fecha"], lambda entrada: entrada["version_referencia"] != anterior["version_referencia"])
+    assert nueva is not None
+    E1.detener_precarga()
+    assert E1.dia_precargado(datos["fecha"]) is None
+    assert E1.cache_dias == {}
@@ -0,0 +1,28 @@
+import sqlite3
+
+import E1
+
+
+def test_referencia_se_reutiliza_hasta_que_cambian_salas_o_turnos(datos):
+    primera = E1.referencia_actual()
+    assert E1.referencia_actual() is primera
+    assert {sala["nombre"] for sala in primera["salas"]} == {"Sala A", "Sala B"}
+
+    with sqlite3.connect(E1.DB_FILE) as conexion:
+        conexion.execute("INSERT INTO clientes (nombre, apellidos) VALUES ('Eva', 'Soto')")
+    assert E1.referencia_actual() is primera
+
+    with sqlite3.connect(E1.DB_FILE) as conexion:
+        conexion.execute("UPDATE salas SET cupo = 15 WHERE nombre = 'Sala A'")
+    segunda = E1.referencia_actual()
+    assert segunda is not primera
+    assert segunda["version"] > primera["version"]
+    assert segunda["salas_por_nombre"]["Sala A"]["cupo"] == 15
+
+
+def test_referencia_sigue_a_la_bd_activa(datos, tmp_path, monkeypatch):
+    assert "Sala A" in E1.referencia_actual()["salas_por_nombre"]
+    otra = str(tmp_path / "otra.db")
+    monkeypatch.setattr(E1, "DB_FILE", otra)
+    E1.asegurar_tablas()
+    assert E1.referencia_actual()["salas"] == []
@@ -0,0 +1,39 @@
+import os
+import sqlite3
+
+import E1
+
+
+def test_refrescar_replica_copia_y_conectar_lectura_la_prefiere(datos, tmp_path, monkeypatch):
+    ruta_replica = str(tmp_path / "replica.db")
+    monkeypatch.setattr(E1, "ruta_replica", None)
+    assert E1.configurar_replica(ruta_replica, intervalo=0)
+    assert E1.ruta_lectura(permitir_replica=True) == ruta_replica
+    assert E1.ruta_lectura() == E1.DB_FILE
+    assert not os.path.exists(ruta_replica + ".tmp")
+
+    with sqlite3.connect(E1.DB_FILE) as conexion:
+        conexion.execute("INSERT INTO clientes (nombre, apellidos) VALUES ('Eva', 'Soto Diaz')")
+    with E1.conectar_lectura(permitir_replica=True) as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM clientes").fetchone()[0] == 2
+        assert conexion.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    with E1.conectar_lectura() as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM clientes").fetchone()[0] == 3
+
+    E1.refrescar_replica()
+    with E1.conectar_lectura(permitir_replica=True) as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM clientes").fetchone()[0] == 3
+        try:
+            conexion.execute("DELETE FROM clientes")
+        except sqlite3.OperationalError as error:
+            assert "readonly" in str(error)
+        else:
+            raise AssertionError("la replica deberia abrirse en solo lectura")
+
+
+def test_configurar_replica_invalida_vuelve_a_la_principal(bd, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(E1, "ruta_replica", None)
+    assert not E1.configurar_replica(str(tmp_path / "no_existe" / "replica.db"), intervalo=0)
+    assert "no se pudo crear la replica" in capsys.readouterr().out
+    assert E1.ruta_replica is None
+    assert E1.ruta_lectura(permitir_replica=True) == E1.DB_FILE
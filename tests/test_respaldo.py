@@ -0,0 +1,63 @@
+import gzip
+import sqlite3
+import threading
+
+import pytest
+
+import E1
+
+
+def _contar_clientes(ruta):
+    with sqlite3.connect(ruta) as conexion:
+        return conexion.execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
+
+
+def test_respaldo_simple_y_comprimido(datos, tmp_path):
+    destino = str(tmp_path / "respaldo.db")
+    resultado = E1.respaldar_bd(destino, paginas=2, pausa=0)
+    assert resultado["ok"] and resultado["integridad"] == ["ok"]
+    assert _contar_clientes(destino) == 2
+    with sqlite3.connect(destino) as conexion:
+        assert conexion.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+
+    comprimido = E1.respaldar_bd(str(tmp_path / "respaldo2.db"), comprimir=True, verificar=False)
+    assert comprimido["destino"].endswith(".gz") and comprimido["integridad"] is None
+    restaurado = tmp_path / "restaurado.db"
+    with gzip.open(comprimido["destino"], "rb") as entrada:
+        restaurado.write_bytes(entrada.read())
+    assert _contar_clientes(str(restaurado)) == 2
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_respaldo_consistente_con_escrituras_concurrentes(datos, tmp_path):
+    with E1.conectar_bd() as conexion:
+        conexion.executemany("INSERT INTO clientes (nombre, apellidos) VALUES (?, ?)",
+                             [(f"Cliente {indice}", "Relleno " + "x" * 300) for indice in range(2000)])
+        conexion.commit()
+    terminar = threading.Event()
+
+    def escribir():
+        while not terminar.is_set():
+            E1.registrar_cliente("Concurrente", "Escritor Activo")
+
+    escritor = threading.Thread(target=escribir)
+    escritor.start()
+    try:
+        resultado = E1.respaldar_bd(str(tmp_path / "vivo.db"), paginas=8, pausa=0.001)
+    finally:
+        terminar.set()
+        escritor.join()
+    assert resultado["ok"] and resultado["integridad"] == ["ok"]
+    assert _contar_clientes(str(tmp_path / "vivo.db")) >= 2002
+
+
+def test_progreso_aborta_tras_demasiados_reinicios():
+    estado = {"restantes": None, "total": 0, "reinicios": 0, "tamano_pagina": 4096}
+    progreso = E1._progreso_respaldo(estado, 0.0, False)
+    progreso(0, 5, 10)
+    for _ in range(E1.REINICIOS_RESPALDO_MAXIMOS):
+        progreso(0, 4, 10)
+        progreso(0, 9, 10)
+    progreso(0, 4, 10)
+    with pytest.raises(InterruptedError):
+        progreso(0, 9, 10)
@@ -0,0 +1,113 @@
+import datetime
+import threading
+import time
+
+import pytest
+
+import E1
+
+
+@pytest.fixture(autouse=True)
+def monticulo_aislado(monkeypatch):
+    monkeypatch.setattr(E1, "monticulo_retenciones", [])
+
+
+def _retenciones(bd):
+    with E1.conectar_bd() as conexion:
+        return conexion.execute("SELECT COUNT(*) FROM retenciones").fetchone()[0]
+
+
+def test_retencion_bloquea_a_otras_terminales_hasta_confirmar(datos):
+    cliente = datos["clientes"][0]
+    sala = datos["salas"][0]
+    fecha = datos["fecha"]
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    retencion = E1.retener_espacio(sala, fecha, inicio, fin, terminal="caja-1")
+    assert retencion is not None
+    assert E1.retener_espacio(sala, fecha, inicio + 30, fin, terminal="caja-2") is None
+    assert E1.confirmar_reserva(cliente, sala, fecha, 1, "Intrusa", inicio, fin, terminal="caja-2") is None
+    turno = E1.referencia_actual()["turnos_por_id"][1]["descripcion"]
+    assert (sala, turno) not in {(fila[0], fila[3]) for fila in E1.disponibilidad_fecha(fecha, terminal="caja-2")}
+    assert (sala, turno) in {(fila[0], fila[3]) for fila in E1.disponibilidad_fecha(fecha, terminal="caja-1")}
+
+    folio = E1.confirmar_reserva(cliente, sala, fecha, 1, "Junta", inicio, fin, retencion_id=retencion, terminal="caja-1")
+    assert folio is not None
+    assert _retenciones(datos) == 0
+
+
+def test_confirmacion_rechazada_conserva_la_retencion(datos):
+    cliente_a, cliente_b = datos["clientes"]
+    sala = datos["salas"][0]
+    fecha = datos["fecha"]
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    retencion = E1.retener_espacio(sala, fecha, inicio, fin, terminal="caja-1")
+    with E1.conectar_bd() as conexion:
+        conexion.execute("INSERT INTO reservas (cliente_id, sala_id, fecha_normalizada, turno_id, evento, minuto_inicio, minuto_fin)"
+                         " VALUES (?, ?, ?, 1, 'Previa', ?, ?)", (cliente_b, sala, fecha.strftime(E1.FORMATO_FECHA_ISO), inicio, fin))
+        conexion.commit()
+    assert E1.confirmar_reserva(cliente_a, sala, fecha, 1, "Junta", inicio, fin, retencion_id=retencion, terminal="caja-1") is None
+    assert _retenciones(datos) == 1
+
+    with E1.conectar_bd() as conexion:
+        conexion.execute("UPDATE reservas SET activo = 0")
+        conexion.commit()
+    assert E1.confirmar_reserva(cliente_a, sala, fecha, 1, "Junta", inicio, fin, retencion_id=retencion) is not None
+    assert _retenciones(datos) == 0
+
+
+def test_retencion_liberada_o_vencida_no_bloquea(datos):
+    sala = datos["salas"][0]
+    fecha = datos["fecha"]
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[2]
+    retencion = E1.retener_espacio(sala, fecha, inicio, fin, terminal="caja-1")
+    E1.liberar_retencion(retencion)
+    E1.liberar_retencion(None)
+    vencida = E1.retener_espacio(sala, fecha, inicio, fin, terminal="caja-1", ttl=0.01)
+    time.sleep(0.02)
+    vigente = E1.retener_espacio(sala, fecha + datetime.timedelta(days=1), inicio, fin, terminal="caja-1", ttl=60)
+    assert vencida is not None and vigente is not None
+    assert E1.retener_espacio(sala, fecha, inicio, fin, terminal="caja-2") is not None
+    assert E1.barrer_retenciones() == 1
+    assert vencida not in [retencion_id for _, retencion_id in E1.monticulo_retenciones]
+    assert len(E1.monticulo_retenciones) == 3
+    assert _retenciones(datos) == 2
+
+
+def test_retenciones_concurrentes_solo_una_gana(datos):
+    sala = datos["salas"][1]
+    fecha = datos["fecha"]
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[3]
+    hilos_totales = 6
+    barrera = threading.Barrier(hilos_totales)
+    resultados = []
+
+    def retener(indice):
+        barrera.wait()
+        resultados.append(E1.retener_espacio(sala, fecha, inicio, fin, terminal=f"caja-{indice}"))
+
+    hilos = [threading.Thread(target=retener, args=(indice,)) for indice in range(hilos_totales)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert sum(resultado is not None for resultado in resultados) == 1
+    assert _retenciones(datos) == 1
+
+
+def test_ciclo_barrido_despierta_al_vencer_la_retencion(datos, monkeypatch):
+    monkeypatch.setattr(E1, "ttl_retencion", 30.0)
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    E1.retener_espacio(datos["salas"][0], datos["fecha"], inicio, fin, terminal="caja-1", ttl=0.1)
+    parada = threading.Event()
+    hilo = threading.Thread(target=E1._ciclo_barrido, args=(parada,), daemon=True)
+    hilo.start()
+    try:
+        limite = time.time() + 5
+        while _retenciones(datos) and time.time() < limite:
+            time.sleep(0.02)
+        assert _retenciones(datos) == 0
+        assert E1.monticulo_retenciones == []
+    finally:
+        parada.set()
+        hilo.join(timeout=5)
+    assert not hilo.is_alive()
@@ -0,0 +1,55 @@
+import datetime
+import json
+import sqlite3
+
+import pytest
+
+import E1
+
+
+@pytest.fixture(autouse=True)
+def sedes_aisladas(monkeypatch):
+    monkeypatch.setattr(E1, "sedes", {})
+
+
+def _configurar_sedes(tmp_path):
+    ruta_configuracion = tmp_path / "sedes.json"
+    ruta_configuracion.write_text(json.dumps({"norte": "norte.db", "sur": "sur.db"}), encoding="utf-8")
+    for nombre in ("norte", "sur"):
+        ruta = str(tmp_path / f"{nombre}.db")
+        E1.asegurar_tablas(ruta)
+        with sqlite3.connect(ruta) as conexion:
+            conexion.execute("INSERT INTO clientes (cliente_id, nombre, apellidos) VALUES (1, 'Ana', 'Lopez')")
+            conexion.execute("INSERT INTO salas (sala_id, nombre, cupo) VALUES (1, 'Sala A', 10)")
+    return str(ruta_configuracion)
+
+
+def _reservar(bd, configuracion, *extra):
+    fecha = (datetime.date.today() + datetime.timedelta(days=5)).strftime(E1.FORMATO_FECHA_INPUT)
+    return E1.main(["--db", bd, "--sedes", configuracion, "reservar-sede", "sur", "--cliente", "1", "--sala", "1",
+                    "--fecha", fecha, "--evento", "Junta", *extra])
+
+
+def test_reservar_sede_escribe_solo_en_la_sede_indicada(bd, tmp_path, capsys):
+    configuracion = _configurar_sedes(tmp_path)
+    assert _reservar(bd, configuracion, "--turno", "1", "--clave", "k-1") in (None, 0)
+    assert _reservar(bd, configuracion, "--turno", "1", "--clave", "k-1") in (None, 0)
+    assert _reservar(bd, configuracion, "--turno", "1") == 1
+    salida = capsys.readouterr().out
+    assert salida.count("con folio") == 2 and "ya esta ocupado" in salida
+    with sqlite3.connect(tmp_path / "sur.db") as conexion:
+        assert conexion.execute("SELECT COUNT(*), MIN(minuto_inicio) FROM reservas").fetchone() == (1, E1.INTERVALOS_TURNO_PREDETERMINADOS[1][0])
+    with sqlite3.connect(tmp_path / "norte.db") as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM reservas").fetchone() == (0,)
+
+
+def test_reservar_sede_valida_horario_y_sede(bd, tmp_path, capsys):
+    configuracion = _configurar_sedes(tmp_path)
+    assert _reservar(bd, configuracion, "--horario", "11:00-10:00") == 1
+    assert _reservar(bd, configuracion, "--horario", "09:00-09:45") in (None, 0)
+    salida = capsys.readouterr().out
+    assert "Horario invalido" in salida and "con folio" in salida
+    fecha = (datetime.date.today() + datetime.timedelta(days=5)).strftime(E1.FORMATO_FECHA_INPUT)
+    assert E1.main(["--db", bd, "--sedes", configuracion, "reservar-sede", "oeste", "--cliente", "1", "--sala", "1",
+                    "--fecha", fecha, "--evento", "Junta", "--turno", "1"]) == 1
+    assert "La sede 'oeste' no existe" in capsys.readouterr().out
@@ -0,0 +1,49 @@
+import io
+import sqlite3
+
+import E1
+
+
+def test_normalizar_sql_colapsa_literales_y_listas():
+    sentencia = "SELECT * FROM reservas  WHERE folio IN (?, ?, ?) AND evento = 'a''b' AND id_sala = 12;"
+    assert E1.normalizar_sql(sentencia) == "SELECT * FROM reservas WHERE folio IN (?, ...) AND evento = ? AND id_sala = ?"
+    assert E1.normalizar_sql("SELECT t1.x FROM t1 WHERE y = -3.5") == "SELECT t1.x FROM t1 WHERE y = ?"
+
+
+def test_registrar_sentencia_cuenta_y_escribe_log_lento(monkeypatch):
+    log = io.StringIO()
+    monkeypatch.setattr(E1, "estadisticas_sentencias", {})
+    monkeypatch.setattr(E1, "umbral_lento_ms", 5)
+    monkeypatch.setattr(E1, "archivo_log_lento", log)
+    conexion = sqlite3.connect(":memory:")
+    conexion.execute("CREATE TABLE t (a INTEGER PRIMARY KEY, b TEXT)")
+    sentencia = "SELECT b FROM t WHERE a = 7"
+    E1.registrar_sentencia(conexion, sentencia, (), 0.001, 1)
+    E1.registrar_sentencia(conexion, "SELECT b FROM t WHERE a = 9", (), 0.010, 0)
+    conexion.close()
+    registro = E1.estadisticas_sentencias["SELECT b FROM t WHERE a = ?"]
+    assert registro["ejecuciones"] == 2
+    assert registro["filas"] == 1
+    assert registro["lentas"] == 1
+    assert abs(registro["max_ms"] - 10) < 1e-9
+    texto = log.getvalue()
+    assert texto.count("tiempo_ms=") == 1
+    assert "SELECT b FROM t WHERE a = ?;\n" in texto
+    assert "-- " in texto and "t USING" in texto
+
+
+def test_conexion_medida_registra_sin_umbral(tmp_path, monkeypatch):
+    monkeypatch.setattr(E1, "estadisticas_sentencias", {})
+    monkeypatch.setattr(E1, "umbral_lento_ms", None)
+    monkeypatch.setattr(E1, "archivo_log_lento", None)
+    conexion = sqlite3.connect(str(tmp_path / "medida.db"), factory=E1.ConexionMedida)
+    cursor = conexion.cursor()
+    cursor.execute("CREATE TABLE t (a INTEGER)")
+    cursor.executemany("INSERT INTO t VALUES (?)", [(1,), (2,), (3,)])
+    filas = cursor.execute("SELECT a FROM t WHERE a > 1").fetchall()
+    cursor.close()
+    conexion.close()
+    assert len(filas) == 2
+    registro = E1.estadisticas_sentencias["SELECT a FROM t WHERE a > ?"]
+    assert registro["ejecuciones"] == 1 and registro["filas"] == 2 and registro["lentas"] == 0
+    assert E1.estadisticas_sentencias["INSERT INTO t VALUES (?)"]["ejecuciones"] == 1
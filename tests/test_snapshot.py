@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+import E1
+
+CONSULTAS = (
+    "SELECT cliente_id, nombre, apellidos FROM clientes ORDER BY cliente_id",
+    "SELECT sala_id, nombre, cupo FROM salas ORDER BY sala_id",
+    "SELECT folio, cliente_id, sala_id, fecha_normalizada, turno_id, evento, activo, minuto_inicio, minuto_fin FROM reservas ORDER BY folio",
+)
+
+
+def _contenido():
+    with E1.conectar_bd() as conexion:
+        return [conexion.execute(consulta).fetchall() for consulta in CONSULTAS]
+
+
+@pytest.mark.parametrize("comprimir", [False, True])
+def test_snapshot_ida_y_vuelta(datos, tmp_path, monkeypatch, comprimir):
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    E1.confirmar_reserva(datos["clientes"][0], datos["salas"][0], datos["fecha"], 1, "Junta ñandú", inicio, fin)
+    folio = E1.confirmar_reserva(datos["clientes"][1], datos["salas"][1], datos["fecha"], E1.TURNO_HORARIO_ID, "Taller", 600, 690)
+    with E1.conectar_bd() as conexion:
+        conexion.execute("UPDATE reservas SET activo = 0 WHERE folio = ?", (folio,))
+        conexion.commit()
+    original = _contenido()
+    ruta = str(tmp_path / "estado.snap")
+    assert E1.exportar_estado_snapshot(ruta, comprimir)
+
+    monkeypatch.setattr(E1, "DB_FILE", str(tmp_path / "copia.db"))
+    assert E1.importar_estado_snapshot(ruta)
+    assert _contenido() == original
+    assert not E1.importar_estado_snapshot(ruta)
+
+
+def test_snapshot_a_json_conserva_solo_activas(datos, tmp_path):
+    E1.confirmar_reserva(datos["clientes"][0], datos["salas"][0], datos["fecha"], E1.TURNO_HORARIO_ID, "Taller", 600, 690)
+    ruta_snapshot, ruta_json = str(tmp_path / "estado.snap"), str(tmp_path / "estado.json")
+    assert E1.exportar_estado_snapshot(ruta_snapshot)
+    assert E1.convertir_snapshot_a_json(ruta_snapshot, ruta_json)
+    with open(ruta_json, encoding="utf-8") as archivo:
+        estado = json.load(archivo)
+    assert [reserva["horario"] for reserva in estado["reservas"]] == ["10:00-11:30"]
+    assert [cliente["apellidos"] for cliente in estado["clientes"]] == ["Lopez Ruiz", "Garcia Perez"]
+
+
+def _estado_en_memoria():
+    return E1.clientes, E1.salas, E1.turnos, E1.reservas, (E1.next_cliente_id, E1.next_sala_id, E1.next_folio)
+
+
+def test_cargar_estado_desde_snapshot_coincide_con_bd(datos, tmp_path, monkeypatch):
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    E1.confirmar_reserva(datos["clientes"][1], datos["salas"][0], datos["fecha"], 1, "Junta", inicio, fin)
+    E1.confirmar_reserva(datos["clientes"][0], datos["salas"][1], datos["fecha"], E1.TURNO_HORARIO_ID, "Taller", 600, 690)
+    ruta = str(tmp_path / "estado.snap")
+    assert E1.exportar_estado_snapshot(ruta)
+    for nombre in ("clientes", "salas", "turnos", "reservas"):
+        monkeypatch.setattr(E1, nombre, [])
+    E1.cargar_estado_desde_bd()
+    esperado = _estado_en_memoria()
+
+    for nombre in ("clientes", "salas", "turnos", "reservas"):
+        monkeypatch.setattr(E1, nombre, [])
+    monkeypatch.setattr(E1, "DB_FILE", str(tmp_path / "sin_uso.db"))
+    assert E1.cargar_estado_desde_snapshot(ruta)
+    assert _estado_en_memoria() == esperado
+    assert [reserva["turno"] for reserva in E1.reservas] == ["Matutino", "10:00-11:30"]
+    assert not (tmp_path / "sin_uso.db").exists()
+    assert not E1.cargar_estado_desde_snapshot(str(tmp_path / "no_existe.snap"))
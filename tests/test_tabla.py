@@ -0,0 +1,36 @@
+import io
+
+from tabulate import tabulate
+
+import E1
+
+ENCABEZADOS = ["FOLIO", "CLIENTE", "CUPO", "EVENTO", "NOTA"]
+
+
+def _tabla(filas, **opciones):
+    salida = io.StringIO()
+    E1.imprimir_tabla(iter(filas), ENCABEZADOS, salida=salida, **opciones)
+    return salida.getvalue()
+
+
+def test_salida_identica_a_tabulate_con_numeros_mixtos_y_celdas_largas():
+    filas = [
+        [1, "Lopez Ruiz, Ana", 10, "1.5", None],
+        [22, "Garcia Perez, Luis", 2.75, "12", "x" * 90],
+        [333, "Ortiz, Eva", 100, "0.125", ""],
+        [4, "Diaz, Mar", 1e-05, "3", "Fin"],
+    ]
+    assert _tabla(filas) == tabulate(filas, headers=ENCABEZADOS, tablefmt="grid") + "\n"
+
+
+def test_columna_crece_despues_de_la_muestra():
+    filas = [[indice, "Ana", 10, "Junta", "corta"] for indice in range(3)] + [[9, "Ana", 10, "Junta", "y" * 80]]
+    salida = _tabla(filas, muestra=2)
+    assert "y" * 80 in salida
+    assert salida.splitlines()[-1] == "+" + "+".join("-" * (ancho + 2) for ancho in (7, 9, 6, 8, 80)) + "+"
+
+
+def test_ancho_maximo_trunca_solo_si_se_pide():
+    filas = [[1, "Ana", 10, "Junta", "z" * 30]]
+    assert "z" * 29 + "…" not in _tabla(filas)
+    assert "z" * 9 + "…" in _tabla(filas, ancho_maximo=10)
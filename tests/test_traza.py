@@ -0,0 +1,53 @@
+import sqlite3
+
+import E1
+
+
+def test_grabar_y_reproducir_traza(datos, tmp_path, capsys):
+    ruta_traza = str(tmp_path / "sesion.jsonl.gz")
+    assert E1.iniciar_grabacion(ruta_traza)
+    ana, luis = datos["clientes"]
+    sala = datos["salas"][0]
+    inicio, fin = E1.INTERVALOS_TURNO_PREDETERMINADOS[1]
+    try:
+        folio = E1.confirmar_reserva(ana, sala, datos["fecha"], 1, "Junta", inicio, fin, terminal="caja-1")
+        E1.renombrar_evento(folio, "Junta semanal")
+        grupo = E1.reservar_multiples(luis, [(sala, datos["fecha"], 2), (sala, datos["fecha"], 3)], "Curso")
+        E1.cancelar_grupo(grupo["grupo_id"])
+    finally:
+        E1.detener_grabacion()
+
+    cabecera, eventos = E1.leer_traza(ruta_traza)
+    assert cabecera["base"] == str(tmp_path / "sesion_base.db")
+    assert [evento["op"] for evento in eventos] == ["reservar", "renombrar", "reservar_grupo", "cancelar_grupo"]
+    assert eventos[0]["args"]["fecha_dt"] == datos["fecha"] and "terminal" not in eventos[0]["args"]
+    assert eventos[2]["args"]["espacios"][0] == [sala, datos["fecha"], 2]
+    assert not any(evento["error"] for evento in eventos)
+    with sqlite3.connect(cabecera["base"]) as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM reservas").fetchone()[0] == 0
+
+    bd_original = E1.DB_FILE
+    resultado = E1.reproducir_traza(ruta_traza, modo="maxima", sesiones=2)
+    assert E1.DB_FILE == bd_original
+    assert resultado["operaciones"] == 8
+    por_operacion = {fila[0]: fila[1:5] for fila in resultado["por_operacion"]}
+    assert por_operacion["reservar"] == [2, 1, 1, 0]
+    assert por_operacion["renombrar"] == [2, 2, 0, 0]
+    assert por_operacion["reservar_grupo"][1] + por_operacion["reservar_grupo"][2] == 2
+    assert "Reproduccion de" in capsys.readouterr().out
+    with sqlite3.connect(bd_original) as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM reservas").fetchone()[0] == 3
+
+
+def test_traza_con_operacion_desconocida_o_sin_base(bd, tmp_path, monkeypatch, capsys):
+    ruta = tmp_path / "mala.jsonl"
+    ruta.write_text('{"traza": 1, "base": "no_existe.db"}\n{"t": 0, "op": "borrar_todo", "args": {}, "ms": 1, "error": false}\n',
+                    encoding="utf-8")
+    assert E1.reproducir_traza(str(ruta)) is None
+    assert "operaciones desconocidas borrar_todo" in capsys.readouterr().out
+    ruta.write_text('{"traza": 1, "base": "no_existe.db"}\n', encoding="utf-8")
+    assert E1.reproducir_traza(str(ruta)) is None
+    assert "No existe la copia base" in capsys.readouterr().out
+    monkeypatch.setattr(E1, "DB_FILE", str(tmp_path / "sesion_base.db"))
+    assert not E1.iniciar_grabacion(str(tmp_path / "sesion.jsonl"))
+    assert "coincide con la BD en uso" in capsys.readouterr().out